@@ -0,0 +1,90 @@
+"""
+Time Data.load through the row-by-row model path and through BulkLoad.
+
+Usage (from the backend directory):
+    python bench/bench_bulk_load.py [--repeat N] [--db-uri URI]
+
+By default this runs against an in-memory SQLite database, which understates
+the gap: against MySQL every extra round trip the row-by-row path makes also
+costs network latency.  Point --db-uri at a scratch MySQL schema to see that.
+The schema is dropped and recreated, so DON'T point it at a real database.
+"""
+import argparse
+import datetime
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from flask import Flask  # noqa: E402
+from sqlalchemy import event  # noqa: E402
+from data import Data  # noqa: E402
+from models import db, User, UserStatus  # noqa: E402
+
+
+def create_app(db_uri: str) -> Flask:
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = db_uri
+    app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+    db.init_app(app)
+    return app
+
+
+def count_statements() -> list[int]:
+    counter = [0]
+
+    def _count(*_args: object) -> None:
+        counter[0] += 1
+
+    event.listen(db.engine, "before_cursor_execute", _count)
+    return counter
+
+
+def time_load(user_id: int, bulk: bool, counter: list[int]) -> tuple[float, int]:
+    counter[0] = 0
+    started = time.perf_counter()
+    with db.session.begin():
+        Data.load(user_id, bulk=bulk)
+    return time.perf_counter() - started, counter[0]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=3, help="loads per mode (default 3)")
+    parser.add_argument("--db-uri", default="sqlite://", help="database URI (default in-memory SQLite)")
+    args = parser.parse_args()
+
+    app = create_app(args.db_uri)
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        with db.session.begin():
+            user = User(
+                username="bench",
+                status=UserStatus.confirmed,
+                encrypted_email_addr=None,
+                email_addr_hash="bench",
+                created_at=datetime.datetime.now(),
+            )
+            db.session.add(user)
+        counter = count_statements()
+
+        results: dict[str, list[tuple[float, int]]] = {"row-by-row": [], "bulk": []}
+        for _ in range(args.repeat):
+            results["row-by-row"].append(time_load(user.id, False, counter))
+            results["bulk"].append(time_load(user.id, True, counter))
+
+        print(f"{'mode':<12} {'median s':>10} {'min s':>10} {'statements':>12}")
+        for mode, runs in results.items():
+            seconds = [run[0] for run in runs]
+            print(f"{mode:<12} {statistics.median(seconds):>10.3f} {min(seconds):>10.3f} {runs[-1][1]:>12}")
+        speedup = statistics.median(r[0] for r in results["row-by-row"]) / statistics.median(r[0] for r in results["bulk"])
+        print(f"bulk speedup: {speedup:.1f}x")
+
+        db.drop_all()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Weigh the CPU cost of compressing the food list against the bytes it saves.
+
+Usage (from the backend directory):
+    python bench/bench_compression.py [--foods N] [--repeat N]
+
+Builds the GET /api/food response for N foods (default 1,000, two alternatives
+each), in both the plain JSON and the columnar format, then compresses each
+with gzip and (if it's installed) brotli at a few levels.  The last line is
+what a cache hit costs instead: the LRU lookup in Compression.compressed().
+"""
+import argparse
+import datetime
+import gzip
+import os
+import statistics
+import sys
+import time
+from typing import Callable
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from sqlalchemy.orm import selectinload  # noqa: E402
+from bench_json import add_foods, create_app  # noqa: E402
+from columnar import Columnar  # noqa: E402
+from compression import Compression, brotli  # noqa: E402
+from json_provider import FastJSONProvider  # noqa: E402
+from models import db, User, UserStatus, Food, NutritionAlternative  # noqa: E402
+
+
+def median_ms(repeat: int, fn: Callable[[], object]) -> float:
+    seconds = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        seconds.append(time.perf_counter() - started)
+    return statistics.median(seconds) * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--foods", type=int, default=1000, help="number of foods (default 1000)")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per codec (default 5)")
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        with db.session.begin():
+            user = User(
+                username="bench",
+                status=UserStatus.confirmed,
+                encrypted_email_addr=None,
+                email_addr_hash="bench",
+                created_at=datetime.datetime.now(),
+            )
+            db.session.add(user)
+            db.session.flush()
+            add_foods(user.id, args.foods, 2)
+        with db.session.begin():
+            foods = [food.json() for food in db.session.scalars(
+                db.select(Food).options(
+                    selectinload(Food.nutrition),
+                    selectinload(Food.nutrition_alternatives).selectinload(NutritionAlternative.nutrition),
+                )
+            )]
+        provider = FastJSONProvider(app)
+        payloads = {
+            "json": provider.response(foods).get_data(),
+            "columnar": provider.response(Columnar.encode(foods)).get_data(),
+        }
+        db.drop_all()
+
+    codecs: dict[str, Callable[[bytes], bytes]] = {
+        "gzip -1": lambda body: gzip.compress(body, 1, mtime=0),
+        "gzip -6": lambda body: gzip.compress(body, 6, mtime=0),
+        "gzip -9": lambda body: gzip.compress(body, 9, mtime=0),
+    }
+    if brotli is not None:
+        codecs["br q1"] = lambda body: brotli.compress(body, quality=1)
+        codecs["br q5"] = lambda body: brotli.compress(body, quality=5)
+        codecs["br q11"] = lambda body: brotli.compress(body, quality=11)
+    else:
+        print("brotli isn't installed; only timing gzip")
+
+    print(f"{args.foods} foods, 2 alternatives each")
+    print(f"{'payload':<10} {'codec':<8} {'bytes':>11} {'ratio':>7} {'ms':>8} {'KB saved/ms':>12}")
+    for name, body in payloads.items():
+        print(f"{name:<10} {'none':<8} {len(body):>11,} {1:>7.2f} {0:>8.1f} {'':>12}")
+        for codec, compress in codecs.items():
+            compressed = compress(body)
+            ms = median_ms(args.repeat, lambda: compress(body))
+            saved_kb = (len(body) - len(compressed)) / 1024
+            print(f"{name:<10} {codec:<8} {len(compressed):>11,} {len(body) / len(compressed):>7.2f} {ms:>8.1f} {saved_kb / ms:>12.0f}")
+
+    Compression.clear_cache()
+    body = payloads["json"]
+    Compression.compressed(body, "gzip", "bench")
+    ms = median_ms(args.repeat * 100, lambda: Compression.compressed(body, "gzip", "bench"))
+    print(f"cache hit: {ms * 1000:.1f} µs")
+
+
+if __name__ == "__main__":
+    main()
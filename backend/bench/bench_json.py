@@ -0,0 +1,157 @@
+"""
+Time turning 1,000 foods (each with nutrition and serving-size alternatives)
+into a JSON response, the way GET /api/food does.
+
+Usage (from the backend directory):
+    python bench/bench_json.py [--foods N] [--alternatives N] [--repeat N]
+
+The two halves of the work are timed separately:
+  build   Food.json() for every food: reading the columns through the ORM
+          attributes (what json() used to do) vs the ColumnSerializers.
+  encode  the list of dicts to a response: Flask's default (stdlib json)
+          provider vs FastJSONProvider (orjson).
+"""
+import argparse
+import datetime
+import os
+import statistics
+import sys
+import time
+from typing import Any, Callable
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from flask import Flask  # noqa: E402
+from flask.json.provider import DefaultJSONProvider  # noqa: E402
+from sqlalchemy.orm import selectinload  # noqa: E402
+from json_provider import FastJSONProvider, orjson  # noqa: E402
+from models import db, User, UserStatus, Food, FoodGroup, Nutrition, NutritionAlternative  # noqa: E402
+from serializers import ColumnSerializer  # noqa: E402
+
+
+def create_app() -> Flask:
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite://"
+    app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+    db.init_app(app)
+    return app
+
+
+def nutrition(user_id: int, i: int) -> Nutrition:
+    dao = Nutrition(user_id)
+    dao.user_id = user_id
+    dao.serving_size_description = f"{i % 5 + 1} pieces"
+    dao.serving_size_g = 100 + i % 50
+    dao.serving_size_oz = round(dao.serving_size_g / 28.3495, 2)
+    dao.calories = 50 + i % 400
+    dao.total_fat_g = (i % 30) / 2
+    dao.protein_g = i % 25
+    dao.total_carbs_g = i % 60
+    dao.sodium_mg = i % 700
+    return dao
+
+
+def add_foods(user_id: int, count: int, alternatives: int) -> None:
+    for i in range(count):
+        food = Food(user_id)
+        food.user_id = user_id
+        food.group = list(FoodGroup)[i % len(FoodGroup)]
+        food.name = f"Food {i}"
+        food.vendor = "Bench Market"
+        food.size_description = "1 bag"
+        food.size_imperial = 16.0
+        food.size_metric = 454
+        food.servings = 4.0
+        food.price = 3.99
+        food.price_date = datetime.date(2026, 4, 1)
+        food.nutrition = nutrition(user_id, i)
+        for ordinal in range(alternatives):
+            alt = NutritionAlternative()
+            alt.serving_value = 100 * (ordinal + 1)
+            alt.serving_unit = "g"
+            alt.serving_unit_kind = "solid"
+            alt.ordinal = ordinal
+            alt.is_primary = False
+            alt.nutrition = nutrition(user_id, i + ordinal)
+            food.nutrition_alternatives.append(alt)
+        db.session.add(food)
+
+
+def by_attribute(self: ColumnSerializer, dao: Any) -> dict[str, Any]:
+    return {name: getattr(dao, name) for name in self.columns}
+
+
+def timed(repeat: int, fn: Callable[[], Any]) -> tuple[list[float], Any]:
+    seconds = []
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        seconds.append(time.perf_counter() - started)
+    return seconds, result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--foods", type=int, default=1000, help="number of foods (default 1000)")
+    parser.add_argument("--alternatives", type=int, default=2, help="alternatives per food (default 2)")
+    parser.add_argument("--repeat", type=int, default=10, help="runs per mode (default 10)")
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        with db.session.begin():
+            user = User(
+                username="bench",
+                status=UserStatus.confirmed,
+                encrypted_email_addr=None,
+                email_addr_hash="bench",
+                created_at=datetime.datetime.now(),
+            )
+            db.session.add(user)
+            db.session.flush()
+            add_foods(user.id, args.foods, args.alternatives)
+        db.session.expunge_all()
+
+        with db.session.begin():
+            foods = db.session.scalars(
+                db.select(Food).options(
+                    selectinload(Food.nutrition),
+                    selectinload(Food.nutrition_alternatives).selectinload(NutritionAlternative.nutrition),
+                )
+            ).all()
+
+        results: dict[str, list[float]] = {}
+        fast_call = ColumnSerializer.__call__
+        ColumnSerializer.__call__ = by_attribute  # type: ignore[method-assign]
+        results["build: attributes"], _ = timed(args.repeat, lambda: [food.json() for food in foods])
+        ColumnSerializer.__call__ = fast_call  # type: ignore[method-assign]
+        results["build: serializers"], payload = timed(args.repeat, lambda: [food.json() for food in foods])
+
+        sizes: dict[str, int] = {}
+        for name, provider in (("encode: stdlib", DefaultJSONProvider(app)), ("encode: orjson", FastJSONProvider(app))):
+            if name == "encode: orjson" and orjson is None:
+                print("orjson isn't installed; skipping it")
+                continue
+            results[name], response = timed(args.repeat, lambda: provider.response(payload))
+            sizes[name] = len(response.get_data())
+
+        print(f"{args.foods} foods, {args.alternatives} alternatives each")
+        print(f"{'mode':<20} {'median ms':>10} {'min ms':>10}")
+        for mode, seconds in results.items():
+            print(f"{mode:<20} {statistics.median(seconds) * 1000:>10.1f} {min(seconds) * 1000:>10.1f}")
+        for mode, size in sizes.items():
+            print(f"{mode} response: {size:,} bytes")
+
+        before = statistics.median(results["build: attributes"]) + statistics.median(results["encode: stdlib"])
+        after = statistics.median(results["build: serializers"]) + statistics.median(
+            results.get("encode: orjson", results["encode: stdlib"])
+        )
+        print(f"overall speedup: {before / after:.1f}x")
+
+        db.drop_all()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Time a rate limit check against each storage the backend can use.
+
+Usage (from the backend directory):
+    python bench/bench_ratelimit.py [--checks N] [--keys N] [--processes N]
+
+Each check is what Flask-Limiter does for one request to a limited route: a
+hit() on the limit, for one of --keys callers.  Timed for the in-memory
+storage (the old default, which can't be shared between workers) and the
+SQLite file (see ratelimit_storage.py), with the fixed window and sliding
+window counter strategies, in microseconds per check.
+
+The last lines run the SQLite sliding window from --processes processes at
+once, the way the workers share it, and show the per-check time with that
+contention and that the limit held across all of them.
+"""
+import argparse
+import multiprocessing
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from limits import parse  # noqa: E402
+from limits.storage import MemoryStorage, Storage, storage_from_string  # noqa: E402
+from limits.strategies import FixedWindowRateLimiter, RateLimiter, SlidingWindowCounterRateLimiter  # noqa: E402
+import ratelimit_storage  # noqa: E402, F401  (registers sqlite://)
+
+# High enough that every check is counted, and none is refused early
+LIMIT = parse("1000000/hour")
+
+
+def per_check_us(limiter: RateLimiter, checks: int, keys: int) -> list[float]:
+    timings = []
+    for i in range(checks):
+        started = time.perf_counter()
+        limiter.hit(LIMIT, "register", str(i % keys))
+        timings.append((time.perf_counter() - started) * 1e6)
+    return timings
+
+
+def _contended(uri: str, checks: int, start: "multiprocessing.synchronize.Event", results: "multiprocessing.Queue[tuple[float, int]]") -> None:
+    limiter = SlidingWindowCounterRateLimiter(storage_from_string(uri))
+    limit = parse(f"{checks}/hour")
+    start.wait()
+    started = time.perf_counter()
+    allowed = sum(limiter.hit(limit, "contended") for _ in range(checks))
+    results.put(((time.perf_counter() - started) * 1e6 / checks, allowed))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--checks", type=int, default=20000, help="checks per storage (default 20000)")
+    parser.add_argument("--keys", type=int, default=100, help="distinct callers (default 100)")
+    parser.add_argument("--processes", type=int, default=4, help="processes for the contended run (default 4)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        uri = f"sqlite:///{os.path.join(directory, 'ratelimit.db')}"
+        storages: dict[str, Storage] = {"memory": MemoryStorage(), "sqlite": storage_from_string(uri)}
+
+        print(f"{args.checks} checks over {args.keys} keys")
+        print(f"{'storage':<8} {'strategy':<24} {'median µs':>10} {'p95 µs':>10}")
+        for name, storage in storages.items():
+            for strategy, limiter in (
+                ("fixed-window", FixedWindowRateLimiter(storage)),
+                ("sliding-window-counter", SlidingWindowCounterRateLimiter(storage)),
+            ):
+                storage.reset()
+                timings = per_check_us(limiter, args.checks, args.keys)
+                p95 = statistics.quantiles(timings, n=20)[-1]
+                print(f"{name:<8} {strategy:<24} {statistics.median(timings):>10.1f} {p95:>10.1f}")
+
+        # Every process tries to take all the slots; between them they should get
+        # exactly that many
+        storages["sqlite"].reset()
+        context = multiprocessing.get_context("fork" if hasattr(os, "fork") else "spawn")
+        start = context.Event()
+        results = context.Queue()
+        processes = [context.Process(target=_contended, args=(uri, args.checks // args.processes, start, results))
+                     for _ in range(args.processes)]
+        for process in processes:
+            process.start()
+        start.set()
+        outcomes = [results.get() for _ in processes]
+        for process in processes:
+            process.join()
+
+        mean_us = statistics.mean(us for us, _ in outcomes)
+        allowed = sum(allowed for _, allowed in outcomes)
+        print()
+        print(f"sqlite sliding-window-counter, {args.processes} processes at once: {mean_us:.1f} µs per check")
+        print(f"allowed {allowed} of {args.processes * (args.checks // args.processes)} against a limit of {args.checks // args.processes}")
+
+
+if __name__ == "__main__":
+    main()
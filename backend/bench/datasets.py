@@ -0,0 +1,165 @@
+"""
+Seeded, reproducible datasets for the benchmark suite (see suite.py).
+
+A dataset at scale N has:
+  - N users, each with the bundled data/foods.json, recipes.json and
+    ingredients.json (the prices varied a little per user), plus LOG_DAYS days
+    of daily log entries picked from their own foods and recipes
+  - a catalog user with N copies of the bundled foods, each marked as coming
+    from the USDA with its own FDC ID, for catalog search and catalog copy
+
+Everything random comes from one random.Random(seed), so the same scale and
+seed always build the same rows.  The foods, recipes and ingredients are
+loaded with BulkLoad; the daily log entries go through
+DailyLogItem.add_from_schema, so their Nutrition snapshots are right.
+"""
+import datetime
+import random
+from dataclasses import dataclass, field
+from typing import Any
+
+from bulk_load import BulkLoad
+from crypto import Crypto
+from data import Data
+from models import db, User, UserStatus, Food, Recipe, DailyLogItem
+from schemas import DailyLogItemRequest, FoodRequest, IngredientRequest, RecipeRequest
+
+PASSWORD = "Bench-passw0rd!"
+LOG_DAYS = 30
+LOGS_PER_DAY = 3
+LOG_START = datetime.date(2026, 3, 1)
+
+
+@dataclass
+class BenchUser:
+    id: int
+    email: str
+
+
+@dataclass
+class Dataset:
+    scale: int
+    seed: int
+    users: list[BenchUser]
+    catalog_food_ids: list[int]
+    # The recipe with the most ingredients, for the single-recipe recalc
+    recipe_id: int
+    counts: dict[str, int] = field(default_factory=dict)
+
+
+def email_for(n: int) -> str:
+    return f"bench{n}@example.com"
+
+
+def _add_user(username: str, email: str | None, password_hash: str | None) -> User:
+    user = User(
+        username=username,
+        status=UserStatus.confirmed,
+        encrypted_email_addr=Crypto.encrypt(email) if email else None,
+        email_addr_hash=Crypto.hash(email) if email else None,
+        created_at=datetime.datetime(2026, 1, 1),
+        password_hash=password_hash,
+    )
+    db.session.add(user)
+    db.session.flush()
+    return user
+
+
+def _count(model: Any) -> int:
+    return int(db.session.scalar(db.select(db.func.count()).select_from(model)) or 0)
+
+
+def build(scale: int, seed: int) -> Dataset:
+    """
+    Build the dataset in the (empty) database the app is bound to.
+    """
+    rng = random.Random(seed)
+    foods = BulkLoad.validate(FoodRequest, Data.read_json("foods.json"))
+    recipes = BulkLoad.validate(RecipeRequest, Data.read_json("recipes.json"))
+    ingredients = BulkLoad.validate(IngredientRequest, Data.read_json("ingredients.json"))
+    # bcrypt is slow on purpose, and every user has the same password
+    password_hash = Crypto.hash_password(PASSWORD)
+
+    with db.session.begin():
+        catalog = _add_user(Data.CATALOG_USER_NAME, None, None)
+        catalog_food_ids: list[int] = []
+        for copy in range(scale):
+            catalog_food_ids.extend(BulkLoad.load_foods(catalog.id, [
+                food.model_copy(update={"id": None, "source": "usda", "fdc_id": copy * len(foods) + n + 1})
+                for n, food in enumerate(foods)
+            ]))
+
+    users: list[BenchUser] = []
+    recipe_id = 0
+    for n in range(1, scale + 1):
+        with db.session.begin():
+            user = _add_user(f"bench{n}", email_for(n), password_hash)
+            keylists: dict[str, dict[int, int]] = {}
+            BulkLoad.load_foods(user.id, [
+                food.model_copy(update={"price": round(food.price * rng.uniform(0.8, 1.2), 2) if food.price else food.price})
+                for food in foods
+            ], keylists)
+            BulkLoad.load_recipes(user.id, recipes, keylists, recalculate=False)
+            BulkLoad.recalculate_recipes(user.id, BulkLoad.load_ingredients(user.id, ingredients, keylists, recalculate=False))
+
+            food_ids = list(keylists["foods"].values())
+            recipe_ids = list(keylists["recipes"].values())
+            for day in range(LOG_DAYS):
+                date = (LOG_START + datetime.timedelta(days=day)).isoformat()
+                for _ in range(LOGS_PER_DAY):
+                    if rng.random() < 0.3:
+                        log = DailyLogItemRequest(date=date, recipe_id=rng.choice(recipe_ids), servings=rng.choice((0.5, 1, 2)))
+                    else:
+                        log = DailyLogItemRequest(date=date, food_id=rng.choice(food_ids), servings=rng.choice((0.5, 1, 2)))
+                    DailyLogItem.add_from_schema(user.id, log)
+            if n == 1:
+                ingredient_counts: dict[int, int] = {}
+                for ingredient in ingredients:
+                    if ingredient.recipe_id is not None:
+                        ingredient_counts[ingredient.recipe_id] = ingredient_counts.get(ingredient.recipe_id, 0) + 1
+                recipe_id = keylists["recipes"][max(ingredient_counts, key=lambda old_id: ingredient_counts[old_id])]
+            users.append(BenchUser(user.id, email_for(n)))
+
+    with db.session.begin():
+        counts = {
+            "users": _count(User),
+            "foods": _count(Food),
+            "recipes": _count(Recipe),
+            "daily_logs": _count(DailyLogItem),
+        }
+    db.session.expunge_all()
+    return Dataset(scale, seed, users, catalog_food_ids, recipe_id, counts)
+
+
+# FDC nutrient numbers, and a plausible amount per 100 g for each
+_FDC_NUTRIENTS = {
+    "1008": 250, "1004": 12.0, "1258": 4.0, "1257": 0.1, "1253": 30, "1093": 400, "1005": 30,
+    "1079": 3, "2000": 8, "1235": 2, "1003": 10, "1114": 1, "1087": 120, "1089": 2.0, "1092": 300,
+}
+_FDC_CATEGORIES = ("Dairy and Egg Products", "Fruits and Fruit Juices", "Beverages", "Baked Products", "Spices and Herbs")
+_FDC_PORTIONS = (("cup", 240), ("tbsp", 15), ("slice", 28), ("oz", 28.35), ("piece", 50))
+
+
+def fdc_payloads(count: int, seed: int) -> list[dict[str, Any]]:
+    """
+    count FoodData Central food records, shaped like the API's Foundation and
+    SR Legacy results, for timing USDAFdcImporter.map_to_food_request.
+    """
+    rng = random.Random(seed)
+    payloads: list[dict[str, Any]] = []
+    for n in range(count):
+        payloads.append({
+            "fdcId": 100000 + n,
+            "dataType": rng.choice(("Foundation", "SR Legacy")),
+            "description": f"Bench food {n}, raw",
+            "foodCategory": {"description": rng.choice(_FDC_CATEGORIES)},
+            "foodNutrients": [
+                {"nutrient": {"number": number}, "amount": round(amount * rng.uniform(0.5, 1.5), 2)}
+                for number, amount in _FDC_NUTRIENTS.items()
+            ],
+            "foodPortions": [
+                {"amount": 1, "measureUnit": {"name": unit}, "gramWeight": grams, "modifier": ""}
+                for unit, grams in rng.sample(_FDC_PORTIONS, 3)
+            ],
+        })
+    return payloads
@@ -0,0 +1,105 @@
+"""
+Profile how long the backend takes to import, i.e. the cold start of the
+server (and of "flask db upgrade"), before it has done any work.
+
+Usage (from the backend directory):
+    python bench/importtime.py [--module NAME] [--top N] [--runs N] [--json]
+
+Runs `python -X importtime -c "import <module>"` (app, by default) in a fresh
+interpreter, with src on the path, and summarizes the report:
+
+  total         wall time of the whole import, in milliseconds (the best of
+                --runs, since the first run also pays for a cold disk cache)
+  packages      the top-level packages that cost the most, counting every
+                module under them (self time, so nothing's counted twice)
+  modules       the single modules with the highest cumulative time, i.e.
+                including everything they imported first
+
+Anything that isn't needed to serve a request -- the OAuth and HTTP clients,
+Flask-Migrate and Alembic -- should be imported where it's used, not at the
+top of a module.  test_cold_start.py checks that stays true.
+"""
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+from typing import Any
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+
+# "import time:   self [us] | cumulative | imported package"
+LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+
+def profile(module: str) -> list[tuple[str, int, int, int]]:
+    """
+    Import module in a fresh interpreter.  Returns (name, self us, cumulative
+    us, depth) for each module it imported, in the order they finished.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=SRC, capture_output=True, text=True, check=False,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr}")
+
+    entries = []
+    for line in result.stderr.splitlines():
+        match = LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            entries.append((name, int(self_us), int(cumulative_us), len(indent) // 2))
+    return entries
+
+
+def summarize(entries: list[tuple[str, int, int, int]], top: int) -> dict[str, Any]:
+    packages: dict[str, int] = {}
+    for name, self_us, _, _ in entries:
+        package = name.split(".")[0]
+        packages[package] = packages.get(package, 0) + self_us
+
+    return {
+        # The top-level imports (depth 0) add up to the whole thing
+        "total_ms": round(sum(cumulative for _, _, cumulative, depth in entries if depth == 0) / 1000, 1),
+        "modules_imported": len(entries),
+        "packages": [
+            {"name": name, "ms": round(us / 1000, 1)}
+            for name, us in sorted(packages.items(), key=lambda item: -item[1])[:top]
+        ],
+        "modules": [
+            {"name": name, "ms": round(cumulative / 1000, 1)}
+            for name, _, cumulative, _ in sorted(entries, key=lambda entry: -entry[2])[:top]
+        ],
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="app")
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--json", action="store_true", help="print the summary as JSON")
+    args = parser.parse_args()
+
+    runs = [summarize(profile(args.module), args.top) for _ in range(max(args.runs, 1))]
+    summary = min(runs, key=lambda run: run["total_ms"])
+
+    if args.json:
+        print(json.dumps(summary, indent=2))
+        return
+
+    print(f"import {args.module}: {summary['total_ms']} ms, {summary['modules_imported']} modules (best of {len(runs)})")
+    print()
+    print(f"{'package (self time)':<50} {'ms':>8}")
+    for package in summary["packages"]:
+        print(f"{package['name']:<50} {package['ms']:>8}")
+    print()
+    print(f"{'module (cumulative)':<50} {'ms':>8}")
+    for module in summary["modules"]:
+        print(f"{module['name']:<50} {module['ms']:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,405 @@
+"""
+Load-test the backend locally: the real app under waitress, driven by virtual
+users walking through scripted journeys, with throughput, latency percentiles
+and error rates per route at the end.
+
+Usage (from the backend directory):
+    python bench/loadtest.py [--users N] [--duration SECONDS] [--ramp-up SECONDS]
+                             [--think-ms MS] [--threads N] [--scale N] [--seed N]
+                             [--mix JOURNEY=WEIGHT,...] [--stub-latency-ms MS]
+                             [--db-uri URI] [--output FILE]
+
+The server runs in a child process, so the virtual users don't share its GIL.
+It's the app as app.py configures it (compression, request metrics, the
+blueprint), minus the rate limits (every virtual user comes from 127.0.0.1),
+serving a dataset built by datasets.py at --scale, in a SQLite file in a
+temporary directory by default.  Point --db-uri at a scratch MySQL (or MariaDB)
+schema to test against that instead; the schema is dropped and recreated, so
+DON'T point it at a real database.  --threads is waitress's thread count, as in
+production.
+
+Google sign-in, Turnstile, USDA FoodData Central and SMTP are local stubs (see
+stubs.py), each taking --stub-latency-ms to answer.
+
+Each virtual user picks a journey at random (weighted by --mix), walks through
+it with --think-ms (give or take half) between steps, and repeats until the
+time is up:
+
+  daily     log in, list foods, view today's log, add two entries, view it again
+  recipe    log in, list recipes, open one, edit its servings and save it
+  catalog   sign in with Google, search the catalog, page on, copy a food
+  contact   send the contact form (Turnstile, then SMTP)
+  usda      log in as admin, search USDA FoodData Central, preview some foods
+"""
+import argparse
+import datetime
+import json
+import logging
+import multiprocessing
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, "..", "src"))
+sys.path.insert(0, BENCH_DIR)
+
+import requests  # noqa: E402
+from sqlalchemy.engine import make_url  # noqa: E402
+import datasets  # noqa: E402
+
+DEFAULT_MIX = "daily=50,recipe=20,catalog=20,contact=5,usda=5"
+ADMIN_EMAIL = "admin@example.com"
+CATALOG_QUERIES = ("apple", "milk", "bread", "chicken", "rice", "cheese")
+REQUEST_TIMEOUT = 60
+
+
+##############################
+# SERVER (child process)
+##############################
+def serve(args: argparse.Namespace, ready: Any, stop: Any) -> None:
+    """
+    Build the dataset, start the stubs and serve the app until stop is set.
+    Sends ("ready", port) on ready once it's listening, then ("done", stub
+    calls) after it stops, or ("error", message) if it couldn't start.
+    """
+    try:
+        from waitress.server import create_server
+
+        from compression import Compression
+        from crypto import Crypto
+        from data import Data
+        from instrumentation import Instrumentation
+        from models import db, User
+        from routes import limiter
+        from stubs import StubServices
+        from suite import create_app
+
+        logging.basicConfig(level=logging.WARNING)
+        stubs = StubServices(args.stub_latency_ms, args.seed)
+        os.environ["USDA_FDC_BASE_URL"] = stubs.start()
+        os.environ["USDA_FDC_API_KEY"] = "loadtest"
+
+        app = create_app(args.db_uri)
+        Instrumentation.init_app(app)
+        Compression.init_app(app)
+        app.config["RATELIMIT_ENABLED"] = False
+        limiter.init_app(app)
+
+        with app.app_context():
+            db.drop_all()
+            db.create_all()
+            datasets.build(args.scale, args.seed)
+            with db.session.begin():
+                admin = User.query.filter_by(username="bench1").one()
+                db.session.add(User(
+                    username=Data.ADMIN_USER_NAME,
+                    status=admin.status,
+                    encrypted_email_addr=Crypto.encrypt(ADMIN_EMAIL),
+                    email_addr_hash=Crypto.hash(ADMIN_EMAIL),
+                    created_at=admin.created_at,
+                    password_hash=admin.password_hash,
+                ))
+
+        server = create_server(app, host="127.0.0.1", port=0, threads=args.threads)
+        threading.Thread(target=server.run, daemon=True).start()
+        ready.put(("ready", server.effective_port))
+    except Exception as e:
+        ready.put(("error", repr(e)))
+        return
+
+    stop.wait()
+    # Let the worker threads finish what they're sending before the sockets go
+    server.task_dispatcher.shutdown()
+    server.close()
+    stubs.stop()
+    with app.app_context():
+        db.drop_all()
+    ready.put(("done", stubs.calls))
+
+
+##############################
+# VIRTUAL USERS
+##############################
+@dataclass
+class RouteStats:
+    seconds: list[float] = field(default_factory=list)
+    errors: int = 0
+    statuses: dict[str, int] = field(default_factory=dict)
+
+
+class Recorder:
+    def __init__(self) -> None:
+        self.routes: dict[str, RouteStats] = {}
+        self.journeys: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def record(self, route: str, seconds: float, status: str, error: bool) -> None:
+        with self._lock:
+            stats = self.routes.setdefault(route, RouteStats())
+            stats.seconds.append(seconds)
+            stats.statuses[status] = stats.statuses.get(status, 0) + 1
+            if error:
+                stats.errors += 1
+
+    def journey(self, name: str) -> None:
+        with self._lock:
+            self.journeys[name] = self.journeys.get(name, 0) + 1
+
+
+class JourneyFailed(Exception):
+    pass
+
+
+class VirtualUser:
+    def __init__(self, number: int, base_url: str, recorder: Recorder, args: argparse.Namespace, deadline: float) -> None:
+        self.number = number
+        self.base_url = base_url
+        self.recorder = recorder
+        self.think = args.think_ms / 1000
+        self.deadline = deadline
+        self.rng = random.Random(args.seed * 100003 + number)
+        self.email = datasets.email_for(number % args.scale + 1)
+        self.session = requests.Session()
+        self.headers: dict[str, str] = {}
+        self.journeys: dict[str, Callable[[], None]] = {
+            "daily": self.daily,
+            "recipe": self.recipe,
+            "catalog": self.catalog,
+            "contact": self.contact,
+            "usda": self.usda,
+        }
+
+    def run(self, mix: dict[str, int]) -> None:
+        names = list(mix)
+        weights = [mix[name] for name in names]
+        while time.monotonic() < self.deadline:
+            name = self.rng.choices(names, weights)[0]
+            try:
+                self.journeys[name]()
+            except JourneyFailed:
+                # A failed request has been recorded already (and running out
+                # of time isn't one); start on another journey
+                continue
+            self.recorder.journey(name)
+
+    def _pause(self) -> None:
+        if self.think:
+            time.sleep(self.think * self.rng.uniform(0.5, 1.5))
+
+    def call(self, method: str, route: str, path: str, **kwargs: Any) -> Any:
+        """
+        One request, timed and recorded under route (the path with its IDs
+        left out, so they add up).  A failure ends the journey.
+        """
+        if time.monotonic() >= self.deadline:
+            raise JourneyFailed()
+        self._pause()
+        label = f"{method} {route}"
+        started = time.perf_counter()
+        try:
+            response = self.session.request(method, self.base_url + path, headers=self.headers, timeout=REQUEST_TIMEOUT, **kwargs)
+        except requests.RequestException as e:
+            self.recorder.record(label, time.perf_counter() - started, type(e).__name__, True)
+            raise JourneyFailed() from e
+        self.recorder.record(label, time.perf_counter() - started, str(response.status_code), response.status_code >= 400)
+        if response.status_code >= 400:
+            raise JourneyFailed()
+        return response.json()
+
+    def _log_in(self, email: str) -> None:
+        self.headers = {}
+        token = self.call("POST", "/api/login", "/api/login", json={"email": email, "password": datasets.PASSWORD})["access_token"]
+        self.headers = {"Authorization": f"Bearer {token}"}
+
+    def daily(self) -> None:
+        self._log_in(self.email)
+        foods = self.call("GET", "/api/food", "/api/food")
+        today = datetime.date.today().isoformat()
+        self.call("GET", "/api/dailylogitem?date=", f"/api/dailylogitem?date={today}")
+        for _ in range(2):
+            food = self.rng.choice(foods)
+            self.call("POST", "/api/dailylogitem", "/api/dailylogitem", json={"date": today, "food_id": food["id"], "servings": self.rng.choice((0.5, 1, 2))})
+        self.call("GET", "/api/dailylogitem?date=", f"/api/dailylogitem?date={today}")
+
+    def recipe(self) -> None:
+        self._log_in(self.email)
+        recipes = self.call("GET", "/api/recipe", "/api/recipe")
+        recipe_id = self.rng.choice(recipes)["id"]
+        recipe = self.call("GET", "/api/recipe/<id>", f"/api/recipe/{recipe_id}")
+        ingredients = self.call("GET", "/api/recipe/<id>/ingredient", f"/api/recipe/{recipe_id}/ingredient")
+        recipe["servings"] = self.rng.choice((1, 2, 4, 6))
+        recipe["ingredients"] = ingredients
+        self.call("PUT", "/api/recipe", "/api/recipe", json=recipe)
+
+    def catalog(self) -> None:
+        self.headers = {}
+        token = self.call("POST", "/api/social_login", "/api/social_login", json={
+            "provider": "google", "platform": "android", "token": f"loadtest:{self.email}",
+        })["access_token"]
+        self.headers = {"Authorization": f"Bearer {token}"}
+        query = self.rng.choice(CATALOG_QUERIES)
+        page = self.call("GET", "/api/catalog/food?query=", f"/api/catalog/food?query={query}")
+        if page["total"] > page["pageSize"]:
+            page = self.call("GET", "/api/catalog/food?query=", f"/api/catalog/food?query={query}&pageNumber=2")
+        if page["items"]:
+            food_id = self.rng.choice(page["items"])["id"]
+            self.call("POST", "/api/catalog/food/copy", "/api/catalog/food/copy", json={"food_ids": [food_id]})
+
+    def contact(self) -> None:
+        self.headers = {}
+        self.call("POST", "/api/contact", "/api/contact", json={
+            "name": f"Virtual user {self.number}", "email": self.email, "subject": "Load test",
+            "message": "Just checking the contact form holds up.", "turnstileToken": "loadtest",
+        })
+
+    def usda(self) -> None:
+        self._log_in(ADMIN_EMAIL)
+        results = self.call("GET", "/api/import/fdc/search?query=", "/api/import/fdc/search?query=bench&pageSize=25")
+        fdc_ids = [food["fdcId"] for food in results["foods"][:5]]
+        if fdc_ids:
+            self.call("POST", "/api/import/fdc/preview", "/api/import/fdc/preview", json={"fdc_ids": fdc_ids})
+
+
+##############################
+# REPORT
+##############################
+def percentile(sorted_values: list[float], fraction: float) -> float:
+    # Nearest rank
+    return sorted_values[max(0, min(len(sorted_values) - 1, round(fraction * len(sorted_values) + 0.5) - 1))]
+
+
+def summarize(stats: RouteStats, elapsed: float) -> dict[str, Any]:
+    ms = sorted(second * 1000 for second in stats.seconds)
+    return {
+        "requests": len(ms),
+        "errors": stats.errors,
+        "error_rate": round(stats.errors / len(ms), 4),
+        "rps": round(len(ms) / elapsed, 2),
+        "p50_ms": round(percentile(ms, 0.50), 1),
+        "p95_ms": round(percentile(ms, 0.95), 1),
+        "p99_ms": round(percentile(ms, 0.99), 1),
+        "mean_ms": round(statistics.fmean(ms), 1),
+        "max_ms": round(ms[-1], 1),
+        "statuses": dict(sorted(stats.statuses.items())),
+    }
+
+
+def print_table(results: dict[str, Any]) -> None:
+    columns = ("requests", "errors", "rps", "p50_ms", "p95_ms", "p99_ms", "max_ms")
+    rows = [(route, summary) for route, summary in results["routes"].items()] + [("TOTAL", results["total"])]
+    width = max(len(route) for route, _ in rows)
+    print(f"{'route':<{width}}  " + "  ".join(f"{column:>9}" for column in columns))
+    for route, summary in rows:
+        print(f"{route:<{width}}  " + "  ".join(f"{summary[column]:>9}" for column in columns))
+    print(f"\n{results['meta']['users']} virtual users for {results['meta']['elapsed_seconds']} s: "
+          f"{results['total']['rps']} requests/s, {results['total']['error_rate']:.2%} errors")
+
+
+def parse_mix(value: str) -> dict[str, int]:
+    mix: dict[str, int] = {}
+    for item in value.split(","):
+        name, _, weight = item.partition("=")
+        if name.strip() not in ("daily", "recipe", "catalog", "contact", "usda"):
+            raise argparse.ArgumentTypeError(f"unknown journey {name.strip()!r}")
+        mix[name.strip()] = int(weight or 1)
+    if not any(mix.values()):
+        raise argparse.ArgumentTypeError("at least one journey needs a weight")
+    return {name: weight for name, weight in mix.items() if weight > 0}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=10, help="concurrent virtual users (default 10)")
+    parser.add_argument("--duration", type=float, default=30, help="seconds to run, after the ramp-up (default 30)")
+    parser.add_argument("--ramp-up", type=float, default=5, help="seconds over which to start the virtual users (default 5)")
+    parser.add_argument("--think-ms", type=float, default=250, help="pause before each request, give or take half (default 250)")
+    parser.add_argument("--threads", type=int, default=4, help="waitress threads (default 4, as waitress does)")
+    parser.add_argument("--scale", type=int, default=10, help="dataset scale, i.e. users (default 10; see datasets.py)")
+    parser.add_argument("--seed", type=int, default=1, help="random seed (default 1)")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix(DEFAULT_MIX), help=f"journey weights (default {DEFAULT_MIX})")
+    parser.add_argument("--stub-latency-ms", type=float, default=50, help="how long each stubbed service takes (default 50)")
+    parser.add_argument("--db-uri", help="database URI (default a SQLite file in a temporary directory)")
+    parser.add_argument("--output", help="also write the results here, as JSON")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        if not args.db_uri:
+            args.db_uri = f"sqlite:///{os.path.join(temp_dir, 'loadtest.db')}"
+        results = run(args)
+
+    print_table(results)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(json.dumps(results, indent=2) + "\n")
+
+
+def run(args: argparse.Namespace) -> dict[str, Any]:
+    ready: Any = multiprocessing.Queue()
+    stop = multiprocessing.Event()
+    server = multiprocessing.Process(target=serve, args=(args, ready, stop), daemon=True)
+    server.start()
+    print(f"Building the dataset (scale {args.scale})...", file=sys.stderr)
+    status, value = ready.get()
+    if status == "error":
+        server.join()
+        sys.exit(f"The server didn't start: {value}")
+    base_url = f"http://127.0.0.1:{value}"
+
+    print(f"Running {args.users} virtual users against {base_url}...", file=sys.stderr)
+    recorder = Recorder()
+    started = time.monotonic()
+    deadline = started + args.ramp_up + args.duration
+    threads: list[threading.Thread] = []
+    for number in range(args.users):
+        user = VirtualUser(number, base_url, recorder, args, deadline)
+        threads.append(threading.Thread(target=user.run, args=(args.mix,), daemon=True))
+        threads[-1].start()
+        time.sleep(args.ramp_up / args.users)
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+
+    stop.set()
+    _, stub_calls = ready.get()
+    server.join()
+
+    everything = RouteStats()
+    for stats in recorder.routes.values():
+        everything.seconds.extend(stats.seconds)
+        everything.errors += stats.errors
+        for status, count in stats.statuses.items():
+            everything.statuses[status] = everything.statuses.get(status, 0) + count
+    if not everything.seconds:
+        sys.exit("No requests were made; try a longer --duration")
+
+    return {
+        "meta": {
+            "users": args.users,
+            "duration_seconds": args.duration,
+            "ramp_up_seconds": args.ramp_up,
+            "elapsed_seconds": round(elapsed, 1),
+            "think_ms": args.think_ms,
+            "threads": args.threads,
+            "scale": args.scale,
+            "seed": args.seed,
+            "mix": args.mix,
+            "stub_latency_ms": args.stub_latency_ms,
+            "db": make_url(args.db_uri).get_backend_name(),
+            "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        },
+        "journeys": dict(sorted(recorder.journeys.items())),
+        "stub_calls": stub_calls,
+        "routes": {route: summarize(stats, elapsed) for route, stats in sorted(recorder.routes.items())},
+        "total": summarize(everything, elapsed),
+    }
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Local stand-ins for the third-party services the backend calls, so the load
+test (see loadtest.py) never leaves the machine:
+
+  - USDA FoodData Central: a real HTTP server on localhost, answering
+    /v1/foods/search and /v1/foods with synthetic records.  The app is pointed
+    at it with USDA_FDC_BASE_URL, so its HTTP client code runs as it would live.
+  - Google OAuth and Cloudflare Turnstile: the app calls these at fixed URLs,
+    so routes._verify_google_token and routes.verify_turnstile are replaced.
+    A Google token "loadtest:<email>" verifies as that email.
+  - SMTP: Sendmail.sendmail_smtp is replaced, and just counts the mail.
+
+Every stub waits latency_ms before answering, standing in for the round trip
+to the real service; that's what ties up the server's threads.
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+from urllib.parse import parse_qs, urlparse
+
+import datasets
+import routes
+from sendmail import Sendmail
+
+GOOGLE_TOKEN_PREFIX = "loadtest:"
+USDA_RECORDS = 200
+
+
+class StubServices:
+    def __init__(self, latency_ms: float = 50, seed: int = 1) -> None:
+        self.latency = latency_ms / 1000
+        self.calls: dict[str, int] = {"usda": 0, "google": 0, "turnstile": 0, "smtp": 0}
+        self._lock = threading.Lock()
+        self._usda_foods = datasets.fdc_payloads(USDA_RECORDS, seed)
+        for food in self._usda_foods:
+            # The importer only takes these two
+            food["dataType"] = "Foundation"
+        self._usda_by_id = {food["fdcId"]: food for food in self._usda_foods}
+        self._server: ThreadingHTTPServer | None = None
+
+
+    def _called(self, service: str) -> None:
+        with self._lock:
+            self.calls[service] += 1
+        time.sleep(self.latency)
+
+
+    def start(self) -> str:
+        """
+        Start the USDA server and swap in the other stubs.  Returns the USDA
+        base URL, for USDA_FDC_BASE_URL.
+        """
+        stubs = self
+
+        class UsdaHandler(BaseHTTPRequestHandler):
+            def _send(self, payload: Any) -> None:
+                body = json.dumps(payload).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self) -> None:
+                stubs._called("usda")
+                url = urlparse(self.path)
+                if url.path != "/v1/foods/search":
+                    self.send_error(404)
+                    return
+                params = parse_qs(url.query)
+                page_size = int(params.get("pageSize", ["25"])[0])
+                page = int(params.get("pageNumber", ["1"])[0])
+                foods = stubs._usda_foods[(page - 1) * page_size:page * page_size]
+                self._send({
+                    "totalHits": len(stubs._usda_foods),
+                    "currentPage": page,
+                    "totalPages": -(-len(stubs._usda_foods) // page_size),
+                    "foods": foods,
+                })
+
+            def do_POST(self) -> None:
+                stubs._called("usda")
+                if urlparse(self.path).path != "/v1/foods":
+                    self.send_error(404)
+                    return
+                request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                self._send([stubs._usda_by_id[fdc_id] for fdc_id in request.get("fdcIds", []) if fdc_id in stubs._usda_by_id])
+
+            def log_message(self, format: str, *args: Any) -> None:
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), UsdaHandler)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+
+        setattr(routes, "_verify_google_token", self._verify_google_token)
+        setattr(routes, "verify_turnstile", self._verify_turnstile)
+        setattr(Sendmail, "sendmail_smtp", staticmethod(self._sendmail_smtp))
+        return f"http://127.0.0.1:{self._server.server_address[1]}"
+
+
+    def stop(self) -> None:
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+
+
+    @property
+    def usda_fdc_ids(self) -> list[int]:
+        return list(self._usda_by_id)
+
+
+    def _verify_google_token(self, token: str, platform: str) -> dict[str, Any]:
+        self._called("google")
+        if not token.startswith(GOOGLE_TOKEN_PREFIX):
+            raise ValueError("Google token invalid: invalid_token")
+        email = token[len(GOOGLE_TOKEN_PREFIX):]
+        return {"sub": f"google-{email}", "email": email, "name": email.split("@")[0], "email_verified": True}
+
+
+    def _verify_turnstile(self, token: str, ip: str) -> bool:
+        self._called("turnstile")
+        return bool(token.strip())
+
+
+    def _sendmail_smtp(self, email_address: str, email_subject: str, email_body_text: str, email_body_html: str, reply_to: str | None = None) -> None:
+        self._called("smtp")
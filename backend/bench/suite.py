@@ -0,0 +1,263 @@
+"""
+Time the hot operations against a seeded dataset, and compare with a baseline.
+
+Usage (from the backend directory):
+    python bench/suite.py [--scale N] [--seed N] [--repeat N] [--db-uri URI]
+                          [--only NAME,...] [--output FILE]
+                          [--compare BASELINE] [--threshold FRACTION]
+
+--scale is the number of users (1, 10 and 100 are the usual ones; see
+datasets.py for what each one gets).  By default everything runs against an
+in-memory SQLite database; point --db-uri at a scratch MySQL (or MariaDB)
+schema to time it there.  The schema is dropped and recreated, so DON'T point
+it at a real database.
+
+The operations go through the routes, with a real JWT, the way a client calls
+them:
+
+  food_list        GET  /api/food
+  catalog_search   GET  /api/catalog/food?query=...
+  recipe_recalc    POST /api/recipe/<id>/recalc   (the recipe with the most ingredients)
+  recalc_all       POST /api/recipe/recalc
+  daily_log_range  GET  /api/dailylogitem?start=...&end=...   (a month)
+  login            POST /api/login                (mostly bcrypt, on purpose)
+  catalog_copy     POST /api/catalog/food/copy    (COPY_BATCH new foods each run)
+  fdc_mapping      USDAFdcImporter.map_to_food_request on FDC_BATCH records
+
+The results are written as JSON (to stdout, or --output), one entry per
+operation with the median, min and p95 in milliseconds and the number of SQL
+statements it ran.  Save one run as a baseline, then run again with --compare:
+an operation is a regression if its median is more than --threshold (default
+0.25) slower than the baseline's and at least NOISE_MS slower, or if it runs
+more SQL statements than it did.  The exit status is 1 if anything regressed.
+"""
+import argparse
+import base64
+import datetime
+import json
+import logging
+import os
+import platform
+import secrets
+import statistics
+import sys
+import time
+from typing import Any, Callable
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, "..", "src"))
+sys.path.insert(0, BENCH_DIR)
+
+from flask import Flask  # noqa: E402
+from flask.testing import FlaskClient  # noqa: E402
+from flask_jwt_extended import JWTManager, create_access_token  # noqa: E402
+from sqlalchemy.engine import Engine, make_url  # noqa: E402
+import datasets  # noqa: E402
+from crypto import Crypto  # noqa: E402
+from data import Data  # noqa: E402
+from json_provider import FastJSONProvider  # noqa: E402
+from models import db  # noqa: E402
+from query_capture import QueryCapture  # noqa: E402
+from routes import bp  # noqa: E402
+from usda_fdc_importer import USDAFdcImporter  # noqa: E402
+
+COPY_BATCH = 25
+FDC_BATCH = 200
+NOISE_MS = 0.5
+CATALOG_QUERY = "apple"
+
+
+def create_app(db_uri: str) -> Flask:
+    app = Flask(__name__)
+    app.json = FastJSONProvider(app)
+    app.config["SQLALCHEMY_DATABASE_URI"] = db_uri
+    app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+    app.config["JWT_SECRET_KEY"] = secrets.token_hex(32)
+    db.init_app(app)
+    JWTManager(app)
+    app.register_blueprint(bp)
+    Crypto.initialize(base64.b64encode(secrets.token_bytes(32)).decode())
+    return app
+
+
+class Operations:
+    """
+    The timed operations.  Each one makes a single request (or does a single
+    batch) and checks it worked.
+    """
+    def __init__(self, app: Flask, dataset: datasets.Dataset) -> None:
+        self.client: FlaskClient = app.test_client()
+        self.dataset = dataset
+        self.user = dataset.users[0]
+        with app.app_context():
+            token = create_access_token(identity=self.user.email, additional_claims={"roles": [Data.ROLE_USER]})
+        self.headers = {"Authorization": f"Bearer {token}"}
+        self.copied = 0
+        self.importer = USDAFdcImporter(api_key="bench")
+        self.fdc_payloads = datasets.fdc_payloads(FDC_BATCH, dataset.seed)
+
+    def all(self) -> dict[str, Callable[[], None]]:
+        return {
+            "food_list": self.food_list,
+            "catalog_search": self.catalog_search,
+            "recipe_recalc": self.recipe_recalc,
+            "recalc_all": self.recalc_all,
+            "daily_log_range": self.daily_log_range,
+            "login": self.login,
+            "catalog_copy": self.catalog_copy,
+            "fdc_mapping": self.fdc_mapping,
+        }
+
+    def _check(self, response: Any, status: int = 200) -> None:
+        if response.status_code != status:
+            raise RuntimeError(f"{response.request.method} {response.request.path}: {response.status_code} {response.get_data(as_text=True)[:200]}")
+
+    def food_list(self) -> None:
+        self._check(self.client.get("/api/food", headers=self.headers))
+
+    def catalog_search(self) -> None:
+        self._check(self.client.get(f"/api/catalog/food?query={CATALOG_QUERY}&pageSize=50", headers=self.headers))
+
+    def recipe_recalc(self) -> None:
+        self._check(self.client.post(f"/api/recipe/{self.dataset.recipe_id}/recalc", headers=self.headers))
+
+    def recalc_all(self) -> None:
+        self._check(self.client.post("/api/recipe/recalc", headers=self.headers))
+
+    def daily_log_range(self) -> None:
+        start = datasets.LOG_START
+        end = start + datetime.timedelta(days=30)
+        self._check(self.client.get(f"/api/dailylogitem?start={start.isoformat()}&end={end.isoformat()}", headers=self.headers))
+
+    def login(self) -> None:
+        self._check(self.client.post("/api/login", json={"email": self.user.email, "password": datasets.PASSWORD}))
+
+    def catalog_copy(self) -> None:
+        # Fresh catalog foods every time, so each run actually copies them
+        food_ids = self.dataset.catalog_food_ids[self.copied:self.copied + COPY_BATCH]
+        if len(food_ids) < COPY_BATCH:
+            raise RuntimeError("Out of catalog foods to copy; use a bigger --scale or a smaller --repeat")
+        self.copied += COPY_BATCH
+        response = self.client.post("/api/catalog/food/copy", json={"food_ids": food_ids}, headers=self.headers)
+        self._check(response)
+        if response.get_json()["created_count"] != COPY_BATCH:
+            raise RuntimeError(f"catalog_copy: {response.get_json()}")
+
+    def fdc_mapping(self) -> None:
+        for payload in self.fdc_payloads:
+            self.importer.map_to_food_request(payload)
+
+
+def time_operation(engine: Engine, operation: Callable[[], None], repeat: int) -> dict[str, Any]:
+    # One untimed run first, to warm the caches.  No app context is pushed
+    # here, so each request gets its own, and its own session, as it would live.
+    operation()
+    seconds: list[float] = []
+    statements = 0
+    for _ in range(repeat):
+        with QueryCapture(engine) as queries:
+            started = time.perf_counter()
+            operation()
+            seconds.append(time.perf_counter() - started)
+        statements = queries.count
+    ms = sorted(second * 1000 for second in seconds)
+    return {
+        "runs": repeat,
+        "median_ms": round(statistics.median(ms), 3),
+        "min_ms": round(ms[0], 3),
+        "p95_ms": round(ms[min(len(ms) - 1, round(0.95 * (len(ms) - 1)))], 3),
+        "statements": statements,
+    }
+
+
+def compare(results: dict[str, Any], baseline: dict[str, Any], threshold: float) -> list[str]:
+    """
+    The regressions in results against baseline, as messages.
+    """
+    regressions: list[str] = []
+    for key in ("scale", "db"):
+        if results["meta"][key] != baseline["meta"].get(key):
+            print(f"warning: the baseline's {key} is {baseline['meta'].get(key)!r}, not {results['meta'][key]!r}", file=sys.stderr)
+    for name, result in results["operations"].items():
+        before = baseline["operations"].get(name)
+        if not before:
+            continue
+        ratio = result["median_ms"] / before["median_ms"] if before["median_ms"] else 1.0
+        result["baseline_median_ms"] = before["median_ms"]
+        result["change"] = round(ratio - 1, 3)
+        if ratio > 1 + threshold and result["median_ms"] - before["median_ms"] >= NOISE_MS:
+            regressions.append(f"{name}: median {before['median_ms']} ms -> {result['median_ms']} ms ({ratio - 1:+.0%})")
+        if result["statements"] > before["statements"]:
+            regressions.append(f"{name}: {before['statements']} -> {result['statements']} SQL statements")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", type=int, default=1, help="number of users (default 1)")
+    parser.add_argument("--seed", type=int, default=1, help="random seed for the dataset (default 1)")
+    parser.add_argument("--repeat", type=int, default=10, help="timed runs per operation (default 10)")
+    parser.add_argument("--db-uri", default="sqlite://", help="database URI (default in-memory SQLite)")
+    parser.add_argument("--only", help="comma-separated operations to run (default all)")
+    parser.add_argument("--output", help="write the JSON results here (default stdout)")
+    parser.add_argument("--compare", help="baseline JSON results to compare against")
+    parser.add_argument("--threshold", type=float, default=0.25, help="slowdown that counts as a regression (default 0.25)")
+    args = parser.parse_args()
+
+    # The routes log every request at INFO
+    logging.basicConfig(level=logging.WARNING)
+
+    app = create_app(args.db_uri)
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        started = time.perf_counter()
+        dataset = datasets.build(args.scale, args.seed)
+        build_seconds = time.perf_counter() - started
+        engine = db.engine
+
+    operations = Operations(app, dataset).all()
+    names = args.only.split(",") if args.only else list(operations)
+    unknown = [name for name in names if name not in operations]
+    if unknown:
+        parser.error(f"unknown operation(s): {', '.join(unknown)}")
+
+    results: dict[str, Any] = {
+        "meta": {
+            "scale": args.scale,
+            "seed": args.seed,
+            "repeat": args.repeat,
+            "db": make_url(args.db_uri).get_backend_name(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        },
+        "dataset": {**dataset.counts, "build_seconds": round(build_seconds, 2)},
+        "operations": {},
+    }
+    for name in names:
+        print(f"{name}...", file=sys.stderr)
+        results["operations"][name] = time_operation(engine, operations[name], args.repeat)
+
+    with app.app_context():
+        db.drop_all()
+
+    regressions: list[str] = []
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        results["regressions"] = regressions
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+    for regression in regressions:
+        print(f"REGRESSION {regression}", file=sys.stderr)
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
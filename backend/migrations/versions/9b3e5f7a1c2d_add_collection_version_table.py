@@ -0,0 +1,34 @@
+"""Add collection_version table
+
+Revision ID: 9b3e5f7a1c2d
+Revises: 4e8f1a2b3c5d
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9b3e5f7a1c2d'
+down_revision = '4e8f1a2b3c5d'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # One change counter per user per collection ("foods", "recipes", "daily_logs",
+    # "preferences").  Rows are created on the first write to each collection.
+    op.create_table(
+        'collection_version',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('collection', sa.String(length=30), nullable=False),
+        sa.Column('version', sa.BigInteger(), nullable=False, server_default='0'),
+        sa.Column('modified_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id']),
+        sa.PrimaryKeyConstraint('user_id', 'collection')
+    )
+
+
+def downgrade():
+    op.drop_table('collection_version')
@@ -0,0 +1,37 @@
+"""Add change_log table
+
+Revision ID: c4d2a8e6f0b1
+Revises: 9b3e5f7a1c2d
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4d2a8e6f0b1'
+down_revision = '9b3e5f7a1c2d'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Append-only log of upserts and deletes per user, for delta sync.  The
+    # version is the client's sync cursor.
+    op.create_table(
+        'change_log',
+        sa.Column('version', sa.BigInteger(), autoincrement=True, nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('entity', sa.String(length=20), nullable=False),
+        sa.Column('entity_id', sa.Integer(), nullable=True),
+        sa.Column('op', sa.String(length=10), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id']),
+        sa.PrimaryKeyConstraint('version')
+    )
+    op.create_index('ix_change_log_user_id_version', 'change_log', ['user_id', 'version'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_change_log_user_id_version', table_name='change_log')
+    op.drop_table('change_log')
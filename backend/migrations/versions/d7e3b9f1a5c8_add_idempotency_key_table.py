@@ -0,0 +1,35 @@
+"""Add idempotency_key table
+
+Revision ID: d7e3b9f1a5c8
+Revises: c4d2a8e6f0b1
+Create Date: 2026-10-19 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd7e3b9f1a5c8'
+down_revision = 'c4d2a8e6f0b1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # The stored results of writes sent with client-generated idempotency keys
+    op.create_table(
+        'idempotency_key',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('key', sa.String(length=64), nullable=False),
+        sa.Column('request_hash', sa.String(length=64), nullable=False),
+        sa.Column('status', sa.Integer(), nullable=False),
+        sa.Column('response_body', sa.JSON(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id']),
+        sa.PrimaryKeyConstraint('user_id', 'key')
+    )
+
+
+def downgrade():
+    op.drop_table('idempotency_key')
@@ -0,0 +1,23 @@
+"""Index idempotency_key.created_at for expiry
+
+Revision ID: e1f5c3a7b9d2
+Revises: d7e3b9f1a5c8
+Create Date: 2026-10-19 15:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'e1f5c3a7b9d2'
+down_revision = 'd7e3b9f1a5c8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_idempotency_key_created_at', 'idempotency_key', ['created_at'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_idempotency_key_created_at', table_name='idempotency_key')
@@ -1,32 +1,47 @@
 import os
 import sys
+import click
 from flask import Flask
 from flask_jwt_extended import JWTManager
 from flask_cors import CORS
-from flask_migrate import Migrate
 from sqlalchemy import text
 from sqlalchemy.exc import SQLAlchemyError
-from waitress import serve
-from models import db
+from models import db, User
 from dotenv import load_dotenv
 from routes import bp, limiter
 import logging
 from crypto import Crypto
 from data import Data
-
-
-def minimal_app_config() -> Flask:
+from json_provider import FastJSONProvider
+from compression import Compression
+from instrumentation import Instrumentation
+from prefork import Prefork
+from db_pool import DbPool
+from replica import REPLICA_BIND
+from logs import Logs, REQUEST_ID_HEADER
+import ratelimit_storage
+from cache import Cache
+
+
+def minimal_app_config(migrate: bool = True) -> Flask:
     """
     This is the minimum app config needed for the database migration code to work.
+    The server itself doesn't run migrations, so it passes migrate=False and skips
+    loading Flask-Migrate (and Alembic, and Mako) altogether.
     """
     # STARTUP
     # -------
     # Instantiate the Flask framework.
     app = Flask(__name__)
 
+    # Encode JSON responses with orjson (if it's installed) rather than the
+    # standard library.  The output is the same, it's just produced faster.
+    app.json = FastJSONProvider(app)
+
     # Configure the logger.  Any downstream modules will inherit this config.
-    logging.basicConfig(level=logging.DEBUG, 
-                        format='%(asctime)s %(levelname)s: %(message)s')
+    # Records are queued and written as JSON lines by a background thread, at
+    # LOG_LEVEL (default INFO).  See logs.py.
+    Logs.configure()
 
     # LOAD CONFIG
     # -----------
@@ -75,6 +90,15 @@ def minimal_app_config() -> Flask:
     db_safe_connection_uri = f"{db_protocol}{db_app_username}:DB_APP_PASSWORD@{db_hostname}/{db_database_name}"
     logging.info(f"Connecting to database: {db_safe_connection_uri}")
 
+    # An optional read replica, with the same database and login.  The reads of
+    # signed-in users' GET requests go there; see replica.py.
+    db_replica_hostname = os.environ.get('DB_REPLICA_HOSTNAME')
+    if db_replica_hostname:
+        app.config['SQLALCHEMY_BINDS'] = {
+            REPLICA_BIND: f"{db_protocol}{db_app_username}:{db_app_password}@{db_replica_hostname}/{db_database_name}"
+        }
+        logging.info(f"Reading from replica: {db_protocol}{db_app_username}:DB_APP_PASSWORD@{db_replica_hostname}/{db_database_name}")
+
     # Configure Flask-SQLAlchemy.
     # For all Flask-SQLAlchemy config settings, see https://flask-sqlalchemy.palletsprojects.com/en/2.x/config/
     # SQLALCHEMY_DATABASE_URI is the URI of the database.
@@ -82,6 +106,10 @@ def minimal_app_config() -> Flask:
     # The SQLALCHEMY_TRACK_MODIFICATIONS setting controls "the tracking of changes to objects".
     # Disabling it saves memory by turning off an unnecessary monitoring feature.
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    # Size the connection pool to the server's threads (one connection each), and
+    # keep its connections fresh enough that MySQL hasn't dropped them.  The DB_POOL_*
+    # variables override the defaults.  See db_pool.py.
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = DbPool.engine_options(int(os.environ.get("WEB_THREADS", "4")), db_protocol)
 
     # Connect the app object to the db object.
     db.init_app(app)
@@ -89,7 +117,9 @@ def minimal_app_config() -> Flask:
     # Instantiate the Flask migration object.  This thing is basically why I split the 
     # app setup into two separate functions.  The "minimal" config is what's needed to
     # run "flask db upgrade" from the command line.
-    Migrate(app, db)
+    if migrate:
+        from flask_migrate import Migrate
+        Migrate(app, db)
 
     # Register the app's "blueprints" -- the REST endpoints defined in routes.py.
     app.register_blueprint(bp)
@@ -99,6 +129,19 @@ def minimal_app_config() -> Flask:
     def init_db_command():
         Data.init_db()
 
+    # Create a CLI command to load the /data files for a user in bulk.  BulkLoad
+    # locks the tables it writes and can collide with other users' inserts, so
+    # this is for a server that isn't running; /api/db/load loads the same files
+    # one record at a time, which is slower but safe alongside other requests.
+    @app.cli.command("load-data")
+    @click.argument("username")
+    def load_data_command(username: str):
+        with db.session.begin():
+            user_id = User.get_id(username)
+            if not user_id:
+                raise click.ClickException(f"Could not retrieve user record for username '{username}'")
+            Data.load(user_id, bulk=True)
+
     return app
 
 
@@ -159,7 +202,31 @@ def additional_app_config(app: Flask):
     # I haven't worked out the correct domain names yet, so for now just allow
     # EVERYTHING.  This isn't secure, obviously, but I'll take my chances!
     #TODO: fix this!
-    CORS(app, expose_headers=["Location"])
+    CORS(app, expose_headers=["Location", REQUEST_ID_HEADER])
+
+    # REQUEST IDS
+    # -----------
+    # Give every request an ID, for its log records and the X-Request-ID response
+    # header.  See logs.py.
+    Logs.init_app(app)
+
+    # APPLICATION CACHE
+    # -----------------
+    # Keep the user ID lookups and the preferences, which nearly every request
+    # reads and hardly any changes.  See cache.py.
+    Cache.configure()
+
+    # REQUEST METRICS
+    # ---------------
+    # Time every request and count its SQL statements and response bytes, for
+    # /api/metrics.  See instrumentation.py.
+    Instrumentation.init_app(app)
+
+    # RESPONSE COMPRESSION
+    # --------------------
+    # Waitress doesn't compress anything, so we gzip (or brotli) the bigger JSON
+    # responses ourselves.  See compression.py.
+    Compression.init_app(app)
 
     # RATE LIMITING
     # -------------
@@ -167,9 +234,14 @@ def additional_app_config(app: Flask):
     # spamming backend APIs not protected by JWT tokens.  In the route definitions, a custom
     # decorator is defined which can be applied to any route API with a maximum rate per IP 
     # addrss of the caller (e.g., "3/hour").
-    rate_limit_storage_uri = os.environ.get("RATELIMIT_STORAGE_URI")
-    if rate_limit_storage_uri:
-        app.config["RATELIMIT_STORAGE_URI"] = rate_limit_storage_uri
+    #
+    # The counters are kept where every worker process can see them: by default in
+    # a SQLite file on this host (see ratelimit_storage.py), or wherever
+    # RATELIMIT_STORAGE_URI says (e.g. Redis, to share them between hosts).  The
+    # sliding window counter strategy stops a caller from doubling a limit by
+    # straddling two windows.
+    app.config["RATELIMIT_STORAGE_URI"] = os.environ.get("RATELIMIT_STORAGE_URI") or ratelimit_storage.default_uri()
+    app.config["RATELIMIT_STRATEGY"] = os.environ.get("RATELIMIT_STRATEGY", "sliding-window-counter")
 
     limiter.init_app(app)
 
@@ -206,7 +278,7 @@ def initialize_database(app: Flask):
 
 
 if __name__ == "__main__":
-    app = minimal_app_config()
+    app = minimal_app_config(migrate=False)
     additional_app_config(app)
 
     errmsg = verify_database_connection(app)
@@ -221,4 +293,11 @@ if __name__ == "__main__":
         logging.error(errmsg)
         sys.exit(0)
 
-    serve(app, listen="*:5000")
+    # SERVE
+    # -----
+    # WEB_WORKERS waitress processes (forked from this one, now that the startup
+    # work above is done), with WEB_THREADS threads each.  With more than one
+    # worker the rate limits need shared storage.  See prefork.py.
+    workers = int(os.environ.get("WEB_WORKERS", "1"))
+    threads = int(os.environ.get("WEB_THREADS", "4"))
+    Prefork.run(app, 5000, workers, threads)
@@ -0,0 +1,571 @@
+from __future__ import annotations
+from typing import Any, TypeVar
+from pydantic import BaseModel, TypeAdapter, ValidationError
+from models import db, ChangeLog, Food, FoodGroup, Recipe, Ingredient, Nutrition, NutritionAlternative
+from schemas import FoodRequest, RecipeRequest, IngredientRequest
+import datetime
+import logging
+
+# Loading a data set through Food.add, Recipe.add_from_schema and
+# Ingredient.add_from_schema costs several round trips per row: a flush to get
+# each new ID, a duplicate-check SELECT and two or three lookups per Ingredient,
+# and an incremental Nutrition update on the Recipe every time an Ingredient is
+# added.  That's fine for one record from the UI but painfully slow for a few
+# hundred records from a JSON file.
+#
+# This module loads the same data in bulk:
+#   1. Rows are validated in batches of BULK_CHUNK_SIZE with a pydantic TypeAdapter.
+#   2. New primary keys are reserved up front (see _reserve_ids), so the old ID to
+#      new ID mapping in keylists is known before anything is written.
+#   3. Each table is written with executemany INSERTs, which the MySQL driver turns
+#      into multi-row INSERT statements.
+#   4. Every affected Recipe is recalculated exactly once at the end, children
+#      before parents, from data that was loaded in a handful of queries.
+#
+# Everything runs inside the caller's transaction, just like the row-by-row path.
+# Because of the way the IDs are reserved, the loads are only for a database the
+# server isn't using ("flask load-data"); see _reserve_ids.  link_parents and
+# recalculate_recipes don't insert anything, so the row-by-row path uses them too.
+# These INSERTs bypass the ORM, so each one logs its ChangeLog entries by hand.
+
+BULK_CHUNK_SIZE = 500
+# The keylists entry of the parent_recipe_id links still to be set (new Recipe ID
+# to old parent ID), for parents that weren't mapped yet; see link_parents
+PENDING_PARENTS_KEY = "pending_parent_recipes"
+
+SchemaT = TypeVar("SchemaT", bound=BaseModel)
+
+_adapters: dict[type[BaseModel], TypeAdapter[Any]] = {}
+
+
+class BulkLoad:
+    ###################
+    # VALIDATION
+    ###################
+    @staticmethod
+    def validate(schema: type[SchemaT], rows: list[dict[str, Any]], chunk_size: int = BULK_CHUNK_SIZE) -> list[SchemaT]:
+        """
+        Validate raw JSON rows against a request schema, chunk_size rows at a time.
+        """
+        adapter = _adapters.get(schema)
+        if adapter is None:
+            adapter = TypeAdapter(list[schema])
+            _adapters[schema] = adapter
+
+        validated: list[SchemaT] = []
+        for start in range(0, len(rows), chunk_size):
+            try:
+                validated.extend(adapter.validate_python(rows[start:start + chunk_size]))
+            except ValidationError as e:
+                raise ValueError(f"{schema.__name__} rows {start}-{start + chunk_size - 1} failed validation: {str(e)}")
+        return validated
+
+
+    ###################
+    # FOODS
+    ###################
+    @staticmethod
+    def load_foods(
+        user_id: int,
+        food_requests: list[FoodRequest],
+        keylists: dict[str, dict[int, int]] | None = None,
+    ) -> list[int]:
+        """
+        Insert Foods, their Nutrition records and their NutritionAlternatives.
+        Returns the new Food IDs in the same order as food_requests.  When keylists
+        is given, each request's old ID is mapped to its new ID in keylists["foods"].
+        """
+        if not food_requests:
+            return []
+        try:
+            food_ids = BulkLoad._reserve_ids(Food, len(food_requests))
+            alt_count = sum(1 for food in food_requests for alt in food.nutrition_alternatives if not alt.is_primary)
+            nutrition_ids = iter(BulkLoad._reserve_ids(Nutrition, len(food_requests) + alt_count))
+
+            nutrition_rows: list[dict[str, Any]] = []
+            food_rows: list[dict[str, Any]] = []
+            alt_rows: list[dict[str, Any]] = []
+            for food_id, food in zip(food_ids, food_requests):
+                food_nutrition_id = next(nutrition_ids)
+                nutrition_rows.append(BulkLoad._nutrition_row(user_id, food_nutrition_id, food.nutrition.model_dump()))
+                food_rows.append(BulkLoad._food_row(user_id, food_id, food_nutrition_id, food))
+
+                # As in Food.add, the primary serving size shares the Food's own Nutrition record
+                for alt in food.nutrition_alternatives:
+                    if alt.is_primary:
+                        alt_nutrition_id = food_nutrition_id
+                    else:
+                        alt_nutrition_id = next(nutrition_ids)
+                        nutrition_rows.append(BulkLoad._nutrition_row(user_id, alt_nutrition_id, alt.nutrition.model_dump()))
+                    alt_rows.append({
+                        "food_id": food_id,
+                        "nutrition_id": alt_nutrition_id,
+                        "serving_value": alt.serving_value,
+                        "serving_unit": alt.serving_unit,
+                        "serving_unit_kind": alt.serving_unit_kind,
+                        "household_weight_g": alt.household_weight_g,
+                        "ordinal": alt.ordinal,
+                        "is_primary": alt.is_primary,
+                    })
+
+            BulkLoad._insert(Nutrition, nutrition_rows)
+            BulkLoad._insert(Food, food_rows)
+            BulkLoad._insert(NutritionAlternative, alt_rows)
+            ChangeLog.record(user_id, {("foods", food_id): ChangeLog.UPSERT for food_id in food_ids})
+
+            if keylists is not None:
+                food_keys = keylists.setdefault("foods", {})
+                for food_id, food in zip(food_ids, food_requests):
+                    if food.id is not None:
+                        food_keys[food.id] = food_id
+
+            logging.info(f"Bulk loaded {len(food_rows)} Food records for user {user_id}")
+            return food_ids
+
+        except Exception as e:
+            raise ValueError("Food records could not be bulk loaded: " + str(e))
+
+
+    ###################
+    # RECIPES
+    ###################
+    @staticmethod
+    def load_recipes(
+        user_id: int,
+        recipe_requests: list[RecipeRequest],
+        keylists: dict[str, dict[int, int]] | None = None,
+        recalculate: bool = True,
+    ) -> list[int]:
+        """
+        Insert Recipes and their Nutrition records, plus any Ingredients nested in
+        the requests.  Returns the new Recipe IDs in the same order as
+        recipe_requests.  When keylists is given, each request's old ID is mapped
+        to its new ID in keylists["recipes"], and parent_recipe_id and nested
+        Ingredient keys are remapped through it.  A parent that isn't mapped yet
+        is linked by link_parents, once every batch has been loaded.
+
+        Recipes that got Ingredients are recalculated unless recalculate is False
+        (in which case it's the caller's job, e.g. after loading more Ingredients).
+        """
+        if not recipe_requests:
+            return []
+        try:
+            recipe_ids = BulkLoad._reserve_ids(Recipe, len(recipe_requests))
+            nutrition_ids = BulkLoad._reserve_ids(Nutrition, len(recipe_requests))
+
+            if keylists is not None:
+                recipe_keys = keylists.setdefault("recipes", {})
+                for recipe_id, recipe in zip(recipe_ids, recipe_requests):
+                    if recipe.id is not None:
+                        recipe_keys[recipe.id] = recipe_id
+
+            nutrition_rows: list[dict[str, Any]] = []
+            recipe_rows: list[dict[str, Any]] = []
+            parent_rows: list[dict[str, Any]] = []
+            ingredient_requests: list[IngredientRequest] = []
+            for recipe_id, nutrition_id, recipe in zip(recipe_ids, nutrition_ids, recipe_requests):
+                nutrition_rows.append(BulkLoad._nutrition_row(user_id, nutrition_id, recipe.nutrition.model_dump()))
+                recipe_rows.append({
+                    "id": recipe_id,
+                    "user_id": user_id,
+                    "cuisine": recipe.cuisine,
+                    "name": recipe.name,
+                    "total_yield": recipe.total_yield,
+                    "servings": recipe.servings,
+                    "size_oz": recipe.size_oz,
+                    "size_g": recipe.size_g,
+                    "price": recipe.price,
+                    "nutrition_id": nutrition_id,
+                    "parent_recipe_id": None,
+                })
+
+                # The parent may be later in the same batch, so the links are set after
+                # the INSERT.  It may be in a later batch, too, in which case the link
+                # waits for link_parents: until then the old ID could be anyone's recipe.
+                if recipe.parent_recipe_id is not None:
+                    parent_recipe_id: int | None = recipe.parent_recipe_id
+                    if keylists is not None:
+                        parent_recipe_id = keylists["recipes"].get(recipe.parent_recipe_id)
+                        if parent_recipe_id is None:
+                            keylists.setdefault(PENDING_PARENTS_KEY, {})[recipe_id] = recipe.parent_recipe_id
+                    if parent_recipe_id is not None:
+                        parent_rows.append({"id": recipe_id, "parent_recipe_id": parent_recipe_id})
+
+                # Nested Ingredients always belong to the new Recipe
+                for ingredient in recipe.ingredients:
+                    ingredient_requests.append(ingredient.model_copy(update={"recipe_id": recipe_id}))
+
+            BulkLoad._insert(Nutrition, nutrition_rows)
+            BulkLoad._insert(Recipe, recipe_rows)
+            if parent_rows:
+                db.session.execute(db.update(Recipe), parent_rows)
+            ChangeLog.record(user_id, {("recipes", recipe_id): ChangeLog.UPSERT for recipe_id in recipe_ids})
+
+            if ingredient_requests:
+                BulkLoad._insert_ingredients(user_id, ingredient_requests, keylists, remap_recipe_id=False)
+                if recalculate:
+                    BulkLoad.recalculate_recipes(user_id, {ingredient.recipe_id for ingredient in ingredient_requests if ingredient.recipe_id})
+
+            logging.info(f"Bulk loaded {len(recipe_rows)} Recipe records for user {user_id}")
+            return recipe_ids
+
+        except Exception as e:
+            raise ValueError("Recipe records could not be bulk loaded: " + str(e))
+
+
+    @staticmethod
+    def link_parents(keylists: dict[str, dict[int, int]]) -> None:
+        """
+        Set the parent_recipe_id links that load_recipes had to leave, because
+        the parent hadn't been loaded yet.  Call it after the last batch of
+        Recipes.  A parent that never turned up is left NULL, with a warning.
+        """
+        pending = keylists.pop(PENDING_PARENTS_KEY, {})
+        recipe_keys = keylists.get("recipes", {})
+        parent_rows: list[dict[str, Any]] = []
+        for recipe_id, old_parent_id in pending.items():
+            parent_recipe_id = recipe_keys.get(old_parent_id)
+            if parent_recipe_id is None:
+                logging.warning(f"Parent recipe {old_parent_id} of Recipe {recipe_id} wasn't loaded, so the Recipe has no parent")
+            else:
+                parent_rows.append({"id": recipe_id, "parent_recipe_id": parent_recipe_id})
+        if parent_rows:
+            db.session.execute(db.update(Recipe), parent_rows)
+
+
+    ###################
+    # INGREDIENTS
+    ###################
+    @staticmethod
+    def load_ingredients(
+        user_id: int,
+        ingredient_requests: list[IngredientRequest],
+        keylists: dict[str, dict[int, int]] | None = None,
+        recalculate: bool = True,
+    ) -> set[int]:
+        """
+        Insert Ingredients, remapping recipe_id, food_ingredient_id and
+        recipe_ingredient_id through keylists when it's given.  Returns the IDs of
+        the Recipes that got new Ingredients, which are recalculated (once each,
+        in dependency order) unless recalculate is False.
+        """
+        if not ingredient_requests:
+            return set()
+        try:
+            recipe_ids = BulkLoad._insert_ingredients(user_id, ingredient_requests, keylists, remap_recipe_id=True)
+            if recalculate:
+                BulkLoad.recalculate_recipes(user_id, recipe_ids)
+            logging.info(f"Bulk loaded {len(ingredient_requests)} Ingredient records for user {user_id}")
+            return recipe_ids
+
+        except Exception as e:
+            raise ValueError("Ingredient records could not be bulk loaded: " + str(e))
+
+
+    ###################
+    # RECALCULATION
+    ###################
+    @staticmethod
+    def recalculate_recipes(user_id: int, recipe_ids: set[int]) -> list[int]:
+        """
+        Recalculate the Nutrition, price and size of the given Recipes, plus every
+        Recipe that (directly or indirectly) uses one of them as an Ingredient.
+
+        Each Recipe is recalculated exactly once, after all the Recipes it uses,
+        using Recipe.apply_ingredient_totals.  All the records involved are loaded
+        up front in a handful of queries; the changes are flushed with the rest of
+        the transaction.  Returns the Recipe IDs in the order they were recalculated.
+        """
+        if not recipe_ids:
+            return []
+
+        recipes: dict[int, Recipe] = {
+            recipe.id: recipe for recipe in db.session.scalars(db.select(Recipe).where(Recipe.user_id == user_id))
+        }
+        ingredients_by_recipe: dict[int, list[Ingredient]] = {}
+        for ingredient in db.session.scalars(
+            db.select(Ingredient).where(Ingredient.user_id == user_id).order_by(Ingredient.id)
+        ):
+            ingredients_by_recipe.setdefault(ingredient.recipe_id, []).append(ingredient)
+
+        missing = sorted(recipe_id for recipe_id in recipe_ids if recipe_id not in recipes)
+        if missing:
+            raise ValueError(f"Recipe record not found for ID {missing[0]}")
+
+        # Widen the set to include every Recipe that depends on one being recalculated
+        users_of: dict[int, set[int]] = {}
+        for recipe_id, ingredients in ingredients_by_recipe.items():
+            for ingredient in ingredients:
+                if ingredient.recipe_ingredient_id:
+                    users_of.setdefault(ingredient.recipe_ingredient_id, set()).add(recipe_id)
+        targets = set(recipe_ids)
+        pending = list(recipe_ids)
+        while pending:
+            for user_recipe_id in users_of.get(pending.pop(), set()):
+                if user_recipe_id not in targets:
+                    targets.add(user_recipe_id)
+                    pending.append(user_recipe_id)
+
+        order = BulkLoad._dependency_order(targets, ingredients_by_recipe)
+
+        # Load everything the targets' Ingredients refer to
+        food_ids = {
+            ingredient.food_ingredient_id
+            for recipe_id in targets
+            for ingredient in ingredients_by_recipe.get(recipe_id, [])
+            if ingredient.food_ingredient_id
+        }
+        foods: dict[int, Food] = {food.id: food for food in BulkLoad._select_in(Food, Food.id, food_ids, Food.user_id == user_id)}
+        nutrition_ids = {food.nutrition_id for food in foods.values() if food.nutrition_id}
+        nutrition_ids.update(recipe.nutrition_id for recipe in recipes.values() if recipe.nutrition_id)
+        nutritions: dict[int, Nutrition] = {nutrition.id: nutrition for nutrition in BulkLoad._select_in(Nutrition, Nutrition.id, nutrition_ids)}
+
+        for recipe_id in order:
+            recipe_dao = recipes[recipe_id]
+            recipe_nutrition_dao = nutritions.get(recipe_dao.nutrition_id or 0)
+            if not recipe_nutrition_dao:
+                raise ValueError(f"Nutrition record {recipe_id}/{recipe_dao.nutrition_id} not found")
+
+            resolved: list[tuple[Ingredient, Food | None, Recipe | None, Nutrition]] = []
+            for ingredient in ingredients_by_recipe.get(recipe_id, []):
+                food_dao = None
+                child_recipe_dao = None
+                if ingredient.food_ingredient_id and not ingredient.recipe_ingredient_id:
+                    food_dao = foods.get(ingredient.food_ingredient_id)
+                    if not food_dao:
+                        raise ValueError(f"Food record not found for ID {ingredient.food_ingredient_id}")
+                    ingredient_nutrition_id = food_dao.nutrition_id
+                elif ingredient.recipe_ingredient_id and not ingredient.food_ingredient_id:
+                    child_recipe_dao = recipes.get(ingredient.recipe_ingredient_id)
+                    if not child_recipe_dao:
+                        raise ValueError(f"Recipe record not found for ID {ingredient.recipe_ingredient_id}")
+                    ingredient_nutrition_id = child_recipe_dao.nutrition_id
+                else:
+                    raise ValueError("Either food ID or recipe ID must be proviided for an ingredient, but not both")
+
+                ingredient_nutrition_dao = nutritions.get(ingredient_nutrition_id or 0)
+                if not ingredient_nutrition_dao:
+                    raise ValueError(f"Nutrition record {ingredient_nutrition_id} not found")
+                resolved.append((ingredient, food_dao, child_recipe_dao, ingredient_nutrition_dao))
+
+            Recipe.apply_ingredient_totals(recipe_dao, recipe_nutrition_dao, resolved)
+
+        logging.info(f"Recalculated {len(order)} Recipe records for user {user_id}")
+        return order
+
+
+    ###################
+    # HELPERS
+    ###################
+    @staticmethod
+    def _insert_ingredients(
+        user_id: int,
+        ingredient_requests: list[IngredientRequest],
+        keylists: dict[str, dict[int, int]] | None,
+        remap_recipe_id: bool,
+    ) -> set[int]:
+        """
+        Remap, check and insert Ingredient rows.  Replaces the per-row lookups in
+        Ingredient.add_from_schema with a few set-based queries.  Returns the IDs
+        of the Recipes that got new Ingredients.
+        """
+        rows: list[dict[str, Any]] = []
+        for ingredient in ingredient_requests:
+            if ingredient.recipe_id is None:
+                raise ValueError("recipe_id is required")
+            recipe_id = BulkLoad._remap(keylists, "recipes", ingredient.recipe_id) if remap_recipe_id else ingredient.recipe_id
+            food_ingredient_id = BulkLoad._remap(keylists, "foods", ingredient.food_ingredient_id)
+            recipe_ingredient_id = BulkLoad._remap(keylists, "recipes", ingredient.recipe_ingredient_id)
+            if not food_ingredient_id and not recipe_ingredient_id:
+                raise ValueError("Either food_ingredient_id or recipe_ingredient_id must be provided")
+            rows.append({
+                "user_id": user_id,
+                "recipe_id": recipe_id,
+                "food_ingredient_id": food_ingredient_id,
+                "recipe_ingredient_id": recipe_ingredient_id,
+                "ordinal": ingredient.ordinal,
+                "servings": ingredient.servings,
+                "summary": ingredient.summary,
+            })
+
+        # Every referenced Recipe and Food must belong to this user
+        recipe_ids = {row["recipe_id"] for row in rows}
+        referenced_recipe_ids = recipe_ids | {row["recipe_ingredient_id"] for row in rows if row["recipe_ingredient_id"]}
+        referenced_food_ids = {row["food_ingredient_id"] for row in rows if row["food_ingredient_id"]}
+        BulkLoad._check_owned(Recipe, referenced_recipe_ids, user_id)
+        BulkLoad._check_owned(Food, referenced_food_ids, user_id)
+
+        # Reject duplicates, both within the batch and against what's already stored
+        seen: set[tuple[int, int | None, int | None]] = set()
+        ordinals: dict[int, int] = {recipe_id: 0 for recipe_id in recipe_ids}
+        for existing in BulkLoad._select_in(Ingredient, Ingredient.recipe_id, recipe_ids):
+            seen.add((existing.recipe_id, existing.food_ingredient_id, existing.recipe_ingredient_id))
+            ordinals[existing.recipe_id] += 1
+        for row in rows:
+            key = (row["recipe_id"], row["food_ingredient_id"], row["recipe_ingredient_id"])
+            if key in seen:
+                raise ValueError(f"Ingredient record {key[0]}/{key[1]}/{key[2]} already exists")
+            seen.add(key)
+
+            # Same default as Ingredient.add_from_schema: append after the existing Ingredients
+            if row["ordinal"] is None:
+                row["ordinal"] = ordinals[row["recipe_id"]]
+            ordinals[row["recipe_id"]] += 1
+
+        # The IDs are reserved only so the ChangeLog can name the new rows
+        for ingredient_id, row in zip(BulkLoad._reserve_ids(Ingredient, len(rows)), rows):
+            row["id"] = ingredient_id
+        BulkLoad._insert(Ingredient, rows)
+        ChangeLog.record(user_id, {("ingredients", row["id"]): ChangeLog.UPSERT for row in rows})
+        return recipe_ids
+
+
+    @staticmethod
+    def _dependency_order(recipe_ids: set[int], ingredients_by_recipe: dict[int, list[Ingredient]]) -> list[int]:
+        """
+        Order Recipes so that every Recipe comes after the Recipes it uses as
+        Ingredients.  Raises ValueError if the Recipes use each other in a cycle.
+        """
+        uses: dict[int, set[int]] = {
+            recipe_id: {
+                ingredient.recipe_ingredient_id
+                for ingredient in ingredients_by_recipe.get(recipe_id, [])
+                if ingredient.recipe_ingredient_id in recipe_ids
+            }
+            for recipe_id in recipe_ids
+        }
+        users_of: dict[int, list[int]] = {}
+        for recipe_id, children in uses.items():
+            for child_id in children:
+                users_of.setdefault(child_id, []).append(recipe_id)
+
+        order: list[int] = []
+        ready = sorted(recipe_id for recipe_id, children in uses.items() if not children)
+        while ready:
+            recipe_id = ready.pop()
+            order.append(recipe_id)
+            for user_recipe_id in users_of.get(recipe_id, []):
+                uses[user_recipe_id].discard(recipe_id)
+                if not uses[user_recipe_id]:
+                    ready.append(user_recipe_id)
+
+        if len(order) != len(recipe_ids):
+            stuck = sorted(recipe_id for recipe_id in recipe_ids if recipe_id not in order)
+            raise ValueError(f"Recipes {stuck} use each other as ingredients")
+        return order
+
+
+    @staticmethod
+    def _reserve_ids(model: Any, count: int) -> list[int]:
+        """
+        Reserve <count> new primary keys for <model>, starting after the current
+        maximum.
+
+        MySQL can't hand back the IDs generated by a multi-row INSERT, so we assign
+        them ourselves.  The SELECT ... FOR UPDATE locks the end of the index until
+        the transaction ends, so every other INSERT into the table waits for the
+        whole load.  Nor does it coordinate with AUTO_INCREMENT: a request that
+        was given its ID before the lock can still INSERT it after we've taken
+        the same one, and one of the two fails with a duplicate key.
+
+        An admin route doesn't have the tables to itself on a running server
+        either, so this is only for loads that do: "flask load-data", with the
+        server stopped.  /api/db/load and the starter foods copied on login add
+        their records through the ORM, with AUTO_INCREMENT keys.
+        """
+        if count <= 0:
+            return []
+        max_id = db.session.scalar(db.select(db.func.max(model.id)).with_for_update()) or 0
+        return list(range(max_id + 1, max_id + 1 + count))
+
+
+    @staticmethod
+    def _insert(model: Any, rows: list[dict[str, Any]], chunk_size: int = BULK_CHUNK_SIZE) -> None:
+        """
+        INSERT rows into <model>'s table, chunk_size rows per statement.
+        """
+        for start in range(0, len(rows), chunk_size):
+            db.session.execute(db.insert(model), rows[start:start + chunk_size])
+
+
+    @staticmethod
+    def _select_in(model: Any, column: Any, values: set[int], *criteria: Any) -> list[Any]:
+        """
+        SELECT <model> WHERE <column> IN (<values>), BULK_CHUNK_SIZE values per query.
+        """
+        ordered = sorted(values)
+        results: list[Any] = []
+        for start in range(0, len(ordered), BULK_CHUNK_SIZE):
+            results.extend(db.session.scalars(
+                db.select(model).where(column.in_(ordered[start:start + BULK_CHUNK_SIZE])).where(*criteria)
+            ))
+        return results
+
+
+    @staticmethod
+    def _check_owned(model: Any, ids: set[int], user_id: int) -> None:
+        """
+        Raise ValueError (with the same message as <model>.get) if any of the IDs
+        isn't a <model> record owned by the user.
+        """
+        ordered = sorted(ids)
+        found: set[int] = set()
+        for start in range(0, len(ordered), BULK_CHUNK_SIZE):
+            found.update(db.session.scalars(
+                db.select(model.id)
+                .where(model.user_id == user_id)
+                .where(model.id.in_(ordered[start:start + BULK_CHUNK_SIZE]))
+            ))
+        missing = [record_id for record_id in ordered if record_id not in found]
+        if missing:
+            raise ValueError(f"{model.__name__} record not found for ID {missing[0]}")
+
+
+    @staticmethod
+    def _remap(keylists: dict[str, dict[int, int]] | None, kind: str, old_id: int | None) -> int | None:
+        """
+        Map an old key to a new one through keylists[kind].  Keys pass through
+        unchanged when there are no keylists.  A key with no mapping is an error.
+        """
+        if not old_id or keylists is None:
+            return old_id
+        new_id = keylists.get(kind, {}).get(old_id)
+        if new_id is None:
+            raise ValueError(f"No new key was assigned for {kind} ID {old_id}")
+        return new_id
+
+
+    @staticmethod
+    def _nutrition_row(user_id: int, nutrition_id: int, nutrition: dict[str, Any]) -> dict[str, Any]:
+        return {"id": nutrition_id, "user_id": user_id, **nutrition}
+
+
+    @staticmethod
+    def _food_row(user_id: int, food_id: int, nutrition_id: int, food: FoodRequest) -> dict[str, Any]:
+        """
+        The column values Food.from_schema would set, as an INSERT row.
+        """
+        return {
+            "id": food_id,
+            "user_id": user_id,
+            "group": FoodGroup[food.group],
+            "name": food.name,
+            "subtype": food.subtype,
+            "description": food.description,
+            "vendor": food.vendor,
+            "size_description": food.size_description,
+            "size_description_2": food.size_description_2,
+            "size_imperial": food.size_imperial,
+            "size_metric": food.size_metric,
+            "unit_type": food.unit_type,
+            "density": food.density,
+            "servings": food.servings,
+            "nutrition_id": nutrition_id,
+            "price": food.price,
+            "price_date": datetime.date.fromisoformat(food.price_date) if food.price_date else None,
+            "shelf_life": food.shelf_life,
+            "source": food.source,
+            "fdc_id": food.fdc_id,
+            "fdc_data_type": food.fdc_data_type,
+            "starter_food": food.starter_food,
+        }
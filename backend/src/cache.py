@@ -0,0 +1,244 @@
+from __future__ import annotations
+from collections import OrderedDict
+from typing import Any, Callable, TypeVar
+from metrics import Metrics
+import json
+import logging
+import os
+import threading
+import time
+
+# Some reads are made on nearly every request and hardly ever change: the user
+# ID behind the JWT's email address, the catalog user's ID, a user's
+# preferences.  Cache keeps them, for CACHE_TTL_SECONDS (default 300) at most.
+#
+#   Cache.cached(namespace, key, load, user_id=...)
+#
+# returns the cached value, or calls load() and caches what it returns (unless
+# it's None, so a miss is never remembered).  The values must be plain data
+# (numbers, strings, dicts and lists of them), not ORM objects.
+#
+# Entries are grouped in namespaces, and an entry can belong to one user.
+# Cache.invalidate(namespace, user_id) drops that user's entries in the
+# namespace, or everyone's if user_id is None.  The models call it when they
+# change what's cached: User.set_email_addr, Preferences.save, and
+# CollectionVersion.bump, through which every other write to a collection goes.
+# (The per-user namespaces are named after the collections for that reason.)
+#
+# Where the entries are kept depends on CACHE_URL:
+#
+#   memory://       (the default) an LRU of CACHE_MAX_ENTRIES entries (default
+#                   10000) in each process.  An invalidation only reaches the
+#                   process it happens in, so with WEB_WORKERS > 1 the others
+#                   can serve an old value until it expires.  Anything that
+#                   can't wait that long should have its version in the key,
+#                   or be cached with shared_only=True, which isn't cached at
+#                   all unless every process would see its invalidations.
+#   redis://...     a Redis server, shared by every process and host.  Needs
+#                   the redis package.
+#
+# Hits, misses, evictions and invalidations are counted, by namespace, at
+# /api/metrics.  Set CACHE_ENABLED=0 to turn caching off while debugging: every
+# read goes to the database, as if there were no cache.
+
+CACHE_REQUESTS_METRIC = "cache_requests_total"
+CACHE_EVICTIONS_METRIC = "cache_evictions_total"
+CACHE_INVALIDATIONS_METRIC = "cache_invalidations_total"
+
+DEFAULT_MAX_ENTRIES = 10000
+DEFAULT_TTL_SECONDS = 300
+
+T = TypeVar("T")
+
+
+class MemoryBackend:
+    """
+    A TTL and LRU cache in this process.
+    """
+    def __init__(self, max_entries: int) -> None:
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        # key -> (namespace, expires_at, value), least recently used first
+        self._entries: OrderedDict[str, tuple[str, float, Any]] = OrderedDict()
+        # Never evicted: forgetting one would bring its stale entries back
+        self._generations: dict[str, int] = {}
+
+
+    def get(self, key: str) -> Any | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            namespace, expires_at, value = entry
+            if expires_at <= time.time():
+                del self._entries[key]
+                Metrics.increment(CACHE_EVICTIONS_METRIC, namespace=namespace, reason="expired")
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+
+    def set(self, key: str, namespace: str, value: Any, ttl: float) -> None:
+        with self._lock:
+            self._entries[key] = (namespace, time.time() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                _, (evicted_namespace, _, _) = self._entries.popitem(last=False)
+                Metrics.increment(CACHE_EVICTIONS_METRIC, namespace=evicted_namespace, reason="capacity")
+
+
+    def generation(self, scope: str) -> int:
+        with self._lock:
+            return self._generations.get(scope, 0)
+
+
+    def next_generation(self, scope: str) -> None:
+        with self._lock:
+            self._generations[scope] = self._generations.get(scope, 0) + 1
+
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._generations.clear()
+
+
+class RedisBackend:
+    """
+    A Redis server, shared by every process.  Values are stored as JSON.
+    """
+    PREFIX = "trackeats:cache:"
+
+    def __init__(self, url: str) -> None:
+        try:
+            import redis
+        except ImportError:
+            raise ValueError("CACHE_URL is a Redis URL, but the redis package isn't installed")
+        self._redis = redis.Redis.from_url(url)
+
+
+    def get(self, key: str) -> Any | None:
+        value = self._redis.get(self.PREFIX + key)
+        return json.loads(value) if value is not None else None
+
+
+    def set(self, key: str, namespace: str, value: Any, ttl: float) -> None:
+        self._redis.set(self.PREFIX + key, json.dumps(value), px=int(ttl * 1000))
+
+
+    def generation(self, scope: str) -> int:
+        return int(self._redis.get(f"{self.PREFIX}generation:{scope}") or 0)
+
+
+    def next_generation(self, scope: str) -> None:
+        self._redis.incr(f"{self.PREFIX}generation:{scope}")
+
+
+    def clear(self) -> None:
+        keys = list(self._redis.scan_iter(match=self.PREFIX + "*"))
+        if keys:
+            self._redis.delete(*keys)
+
+
+class Cache:
+    _backend: MemoryBackend | RedisBackend = MemoryBackend(DEFAULT_MAX_ENTRIES)
+    _enabled = True
+    _ttl: float = DEFAULT_TTL_SECONDS
+    # Whether every process sees the same entries (and so the same invalidations)
+    _shared = True
+
+    @staticmethod
+    def configure() -> None:
+        """
+        Set the cache up from the environment.
+        """
+        Cache._enabled = os.environ.get("CACHE_ENABLED", "1") != "0"
+        Cache._ttl = float(os.environ.get("CACHE_TTL_SECONDS", DEFAULT_TTL_SECONDS))
+        url = os.environ.get("CACHE_URL", "memory://")
+        if url.startswith("memory://"):
+            Cache._backend = MemoryBackend(int(os.environ.get("CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES)))
+        elif url.startswith(("redis://", "rediss://", "unix://")):
+            Cache._backend = RedisBackend(url)
+        else:
+            raise ValueError(f"CACHE_URL {url!r} isn't memory:// or a Redis URL")
+        Cache._shared = not isinstance(Cache._backend, MemoryBackend) or int(os.environ.get("WEB_WORKERS", "1")) <= 1
+        if Cache._enabled:
+            logging.info(f"Cache: {url.split('://')[0]}, entries kept for {Cache._ttl:g}s")
+        else:
+            logging.info("Cache is off")
+
+
+    @staticmethod
+    def set_enabled(enabled: bool) -> None:
+        Cache._enabled = enabled
+
+
+    @staticmethod
+    def set_shared(shared: bool) -> None:
+        Cache._shared = shared
+
+
+    @staticmethod
+    def cached(
+        namespace: str,
+        key: str,
+        load: Callable[[], T],
+        user_id: int | None = None,
+        ttl: float | None = None,
+        shared_only: bool = False,
+    ) -> T:
+        """
+        The value cached under key in namespace (and user_id's part of it, if
+        given), or else the result of load(), which is cached for next time.
+
+        shared_only is for values that must not outlive an invalidation in any
+        process: they're only cached if the processes share the cache.
+        """
+        if not Cache._enabled or (shared_only and not Cache._shared):
+            return load()
+
+        full_key = Cache._key(namespace, key, user_id)
+        value = Cache._backend.get(full_key)
+        if value is not None:
+            Metrics.increment(CACHE_REQUESTS_METRIC, namespace=namespace, result="hit")
+            return value
+
+        Metrics.increment(CACHE_REQUESTS_METRIC, namespace=namespace, result="miss")
+        value = load()
+        if value is not None:
+            Cache._backend.set(full_key, namespace, value, Cache._ttl if ttl is None else ttl)
+        return value
+
+
+    @staticmethod
+    def invalidate(namespace: str, user_id: int | None = None) -> None:
+        """
+        Drop the entries in namespace for user_id, or, if it's None, for
+        everyone.
+        """
+        Metrics.increment(CACHE_INVALIDATIONS_METRIC, namespace=namespace)
+        # The entries aren't deleted: they're left unreachable, by a new
+        # generation in their keys, until they expire or are evicted
+        Cache._backend.next_generation(Cache._scope(namespace, user_id))
+
+
+    @staticmethod
+    def clear() -> None:
+        Cache._backend.clear()
+
+
+    @staticmethod
+    def _scope(namespace: str, user_id: int | None) -> str:
+        return namespace if user_id is None else f"{namespace}:{user_id}"
+
+
+    @staticmethod
+    def _key(namespace: str, key: str, user_id: int | None) -> str:
+        # Invalidating a user's entries moves on that user's generation.
+        # Invalidating a whole namespace moves on the namespace's, which is in
+        # every key in it.
+        generation = Cache._backend.generation(namespace)
+        if user_id is None:
+            return f"{namespace}:{generation}:{key}"
+        scope = Cache._scope(namespace, user_id)
+        return f"{scope}:{generation}.{Cache._backend.generation(scope)}:{key}"
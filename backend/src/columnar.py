@@ -0,0 +1,88 @@
+from __future__ import annotations
+from typing import Any
+from flask import Response, current_app, request
+
+# A list of foods as JSON spells out every key name for every food: "id",
+# "name", "vendor"..., plus around twenty for its nutrition, plus the same again
+# for each of its alternatives.  On a big list the key names are a large part of
+# the payload, and of the client's parsing time.
+#
+# A client that sends
+#   Accept: application/vnd.trackeats.columnar+json
+# gets the same records as a table instead, each key name sent once:
+#   {
+#     "columns": ["id", "name", "nutrition.calories", ...],
+#     "values": [[1, 2, ...], ["Milk", "Apple", ...], [120, 95, ...], ...],
+#     "present": {"nutrition": [true, false, ...]},
+#     "children": {
+#       "nutrition_alternatives": {"key": "food_id", "columns": [...], "values": [...]}
+#     }
+#   }
+#
+# values holds one array per column, in the same order as columns.  A nested
+# object (nutrition) is flattened into "<key>.<field>" columns, and present says
+# which records had one: a record whose nutrition was null has false there (and
+# nulls in its columns), which isn't the same as a nutrition whose fields are
+# all null.  A nested list of records (a food's alternatives, a recipe's
+# ingredients) becomes a child table, whose rows go back to the record with
+# id == row[key].
+#
+# The TypeScript clients' decodeColumnar() turns this back into the usual
+# records.
+
+COLUMNAR_MIMETYPE = "application/vnd.trackeats.columnar+json"
+
+class Columnar:
+    # Nested lists that become child tables, and the column that links each
+    # child row back to its parent's id
+    CHILDREN: dict[str, str] = {"nutrition_alternatives": "food_id", "ingredients": "recipe_id"}
+
+    @staticmethod
+    def wanted() -> bool:
+        """
+        Whether the client asked for the columnar format (and prefers it to
+        plain JSON).
+        """
+        return request.accept_mimetypes.best_match(["application/json", COLUMNAR_MIMETYPE]) == COLUMNAR_MIMETYPE
+
+
+    @staticmethod
+    def encode(records: list[dict[str, Any]]) -> dict[str, Any]:
+        columns: dict[str, tuple[str, str | None]] = {}
+        children: dict[str, list[dict[str, Any]]] = {}
+        nested: dict[str, None] = {}
+        for record in records:
+            for key, value in record.items():
+                if key in Columnar.CHILDREN and isinstance(value, list):
+                    children.setdefault(key, []).extend(value)
+                elif isinstance(value, dict):
+                    nested.setdefault(key)
+                    for field in value:
+                        columns.setdefault(f"{key}.{field}", (key, field))
+                else:
+                    columns.setdefault(key, (key, None))
+        # A nested object that's null in some records is still flattened
+        columns = {name: column for name, column in columns.items() if column[1] is not None or column[0] not in nested}
+
+        values: list[list[Any]] = []
+        for key, field in columns.values():
+            if field is None:
+                values.append([record.get(key) for record in records])
+            else:
+                values.append([(record.get(key) or {}).get(field) for record in records])
+
+        table: dict[str, Any] = {"columns": list(columns), "values": values}
+        if nested:
+            table["present"] = {key: [isinstance(record.get(key), dict) for record in records] for key in nested}
+        if children:
+            table["children"] = {
+                name: {"key": Columnar.CHILDREN[name], **Columnar.encode(rows)} for name, rows in children.items()
+            }
+        return table
+
+
+    @staticmethod
+    def response(records: list[dict[str, Any]]) -> Response:
+        response = current_app.json.response(Columnar.encode(records))
+        response.mimetype = COLUMNAR_MIMETYPE
+        return response
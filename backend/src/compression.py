@@ -0,0 +1,186 @@
+from __future__ import annotations
+from collections import OrderedDict
+from typing import Iterable, Iterator
+from flask import Flask, Response, request
+from metrics import Metrics
+import gzip
+import logging
+import os
+import threading
+import zlib
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli is optional
+    brotli = None
+
+# Waitress sends responses exactly as the app hands them over, so unless nginx
+# happens to be in front, the big JSON lists go out uncompressed.  They compress
+# very well (a food list shrinks by well over 90%), so the app does it itself:
+#
+#   - brotli if the client accepts it and the brotli package is installed,
+#     otherwise gzip
+#   - only for compressible types (JSON, text), and only for bodies of at least
+#     COMPRESSION_MIN_BYTES (default 1024); below that it isn't worth the CPU
+#   - a streamed response is compressed chunk by chunk as it goes out
+#
+# The collection lists carry an ETag that changes whenever their data does, so
+# the compressed body of each (ETag, encoding) is kept in a small LRU cache, and
+# an unchanged collection isn't compressed all over again on every request.
+#
+# Set RESPONSE_COMPRESSION=0 to turn all of this off (e.g. if nginx is doing it).
+
+COMPRESSION_METRIC = "compression_total"
+COMPRESSION_BYTES_METRIC = "compression_bytes_total"
+COMPRESSION_CACHE_BYTES = 16 * 1024 * 1024
+COMPRESSIBLE_MIMETYPES = ("application/json", "application/vnd.trackeats.columnar+json", "application/x-ndjson")
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+
+class Compression:
+    _lock = threading.Lock()
+    # (etag, encoding) -> compressed body
+    _cache: OrderedDict[tuple[str, str], bytes] = OrderedDict()
+    _cache_bytes = 0
+
+    @staticmethod
+    def init_app(app: Flask) -> None:
+        if os.environ.get("RESPONSE_COMPRESSION", "1") == "0":
+            logging.info("Response compression is off")
+            return
+        app.after_request(Compression.compress)
+        logging.info(f"Response compression: {', '.join(Compression.encodings())}")
+
+
+    @staticmethod
+    def encodings() -> list[str]:
+        """
+        The encodings we can produce, best first.
+        """
+        return ["br", "gzip"] if brotli is not None else ["gzip"]
+
+
+    @staticmethod
+    def min_bytes() -> int:
+        return int(os.environ.get("COMPRESSION_MIN_BYTES", "1024"))
+
+
+    @staticmethod
+    def compress(response: Response) -> Response:
+        """
+        after_request hook: compress the response if the client accepts it and
+        it's worth doing.
+        """
+        if response.status_code != 200 or "Content-Encoding" in response.headers:
+            return response
+        if response.mimetype not in COMPRESSIBLE_MIMETYPES and not response.mimetype.startswith("text/"):
+            return response
+        response.vary.add("Accept-Encoding")
+
+        encoding = Compression.negotiate()
+        if encoding is None:
+            return response
+
+        if response.is_streamed:
+            response.response = Compression.stream(response.response, encoding)
+            response.headers.pop("Content-Length", None)
+        else:
+            body = response.get_data()
+            if len(body) < Compression.min_bytes():
+                return response
+            response.set_data(Compression.compressed(body, encoding, response.get_etag()[0]))
+            Metrics.increment(COMPRESSION_BYTES_METRIC, len(body), encoding=encoding, size="original")
+            Metrics.increment(COMPRESSION_BYTES_METRIC, response.content_length or 0, encoding=encoding, size="compressed")
+
+        response.headers["Content-Encoding"] = encoding
+        # The compressed bytes differ from the uncompressed ones, so the same
+        # ETag can only be a weak one now.  Conditional GETs compare weakly.
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+        return response
+
+
+    @staticmethod
+    def negotiate() -> str | None:
+        """
+        The encoding to use for this request, or None for none at all.
+        """
+        accepted = request.accept_encodings
+        best = None
+        best_quality = 0.0
+        for encoding in Compression.encodings():
+            quality = accepted[encoding]
+            if quality > best_quality:
+                best, best_quality = encoding, quality
+        return best
+
+
+    @staticmethod
+    def compressed(body: bytes, encoding: str, etag: str | None) -> bytes:
+        """
+        body, compressed.  If it has an ETag, the result is cached against it.
+        """
+        if not etag:
+            Metrics.increment(COMPRESSION_METRIC, encoding=encoding, cache="none")
+            return Compression._compress(body, encoding)
+
+        key = (etag, encoding)
+        with Compression._lock:
+            cached = Compression._cache.get(key)
+            if cached is not None:
+                Compression._cache.move_to_end(key)
+        if cached is not None:
+            Metrics.increment(COMPRESSION_METRIC, encoding=encoding, cache="hit")
+            return cached
+
+        Metrics.increment(COMPRESSION_METRIC, encoding=encoding, cache="miss")
+        compressed = Compression._compress(body, encoding)
+        with Compression._lock:
+            if key not in Compression._cache and len(compressed) <= COMPRESSION_CACHE_BYTES // 4:
+                Compression._cache[key] = compressed
+                Compression._cache_bytes += len(compressed)
+                while Compression._cache_bytes > COMPRESSION_CACHE_BYTES:
+                    _, evicted = Compression._cache.popitem(last=False)
+                    Compression._cache_bytes -= len(evicted)
+        return compressed
+
+
+    @staticmethod
+    def stream(chunks: Iterable[bytes | str], encoding: str) -> Iterator[bytes]:
+        Metrics.increment(COMPRESSION_METRIC, encoding=encoding, cache="stream")
+        if encoding == "br":
+            assert brotli is not None
+            compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+            process, finish = compressor.process, compressor.finish
+        else:
+            # wbits 31 means a gzip header and trailer
+            gzipper = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+            process, finish = gzipper.compress, gzipper.flush
+        try:
+            for chunk in chunks:
+                out = process(chunk.encode() if isinstance(chunk, str) else chunk)
+                if out:
+                    yield out
+            yield finish()
+        finally:
+            # Pass the close on, e.g. so stream_with_context tears down its context
+            close = getattr(chunks, "close", None)
+            if close:
+                close()
+
+
+    @staticmethod
+    def _compress(body: bytes, encoding: str) -> bytes:
+        if encoding == "br":
+            assert brotli is not None
+            return brotli.compress(body, quality=BROTLI_QUALITY)
+        return gzip.compress(body, GZIP_LEVEL, mtime=0)
+
+
+    @staticmethod
+    def clear_cache() -> None:
+        with Compression._lock:
+            Compression._cache.clear()
+            Compression._cache_bytes = 0
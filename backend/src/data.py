@@ -1,8 +1,11 @@
-from flask_migrate import stamp
 from sqlalchemy import delete, inspect, text
+from cache import Cache
 from crypto import Crypto
 from models import db, User, UserStatus, Food, Recipe, Ingredient, Nutrition, DailyLogItem
 from schemas import FoodRequest, RecipeRequest, IngredientRequest
+from purge import Purge
+from bulk_load import BulkLoad, BULK_CHUNK_SIZE, PENDING_PARENTS_KEY
+from exporter import Exporter
 #from sqlalchemy import select
 import json
 import logging
@@ -67,6 +70,13 @@ class Data:
             db.drop_all()
             logging.warning("RECREATING DATABASE SCHEMA")
             db.create_all()
+            Cache.clear()
+            # Flask-Migrate (and Alembic) is only loaded for this, the first run
+            # against an empty database.  The server doesn't register it.
+            from flask import current_app
+            from flask_migrate import Migrate, stamp
+            if "migrate" not in current_app.extensions:
+                Migrate(current_app, db)
             stamp()
 
         # Always make sure the key user logins have been created
@@ -74,26 +84,106 @@ class Data:
 
 
     @staticmethod
-    def load(user_id: int):
+    def load(user_id: int, bulk: bool = False):
         """
         Load all the data in the /data subdirectory, overwriting the user_id fields 
         in the raw data so the stored data will be for this user only.
-        """
-        # Delete all Food and Recipe and Daiyl Log records for this User.
-        # The Recipe deletion code also deletes the associated Ingrdient records,
-        # and the child Nutrition records of the Foods and Recipes are deleted 
-        # automatically by SQLAlchemy as a result of the record setup.
-        DailyLogItem.delete_all_for_user(user_id)
-        Recipe.delete_all_for_user(user_id)
-        Food.delete_all_for_user(user_id)
 
-        db.session.flush()
+        By default the data is loaded one record at a time through the model
+        classes, the way the UI does, which is safe on a running server.  Pass
+        bulk=True to load it with BulkLoad (see bulk_load.py), which is much
+        faster, but locks the tables and can collide with other users' inserts:
+        that's for "flask load-data", with the server stopped.
+        """
+        # Delete all Food and Recipe and Daily Log records for this User, along
+        # with their Ingredient, NutritionAlternative and Nutrition records.
+        # The user's Preferences are left alone.
+        Purge.purge_user(user_id)
 
-        # Now add all the data
+        # Now add all the data.  If there's an export manifest, the data is in
+        # NDJSON files written by Data.export; otherwise it's in JSON arrays.
         keylists: dict[str, dict[int,int]] = {}
-        Data.import_foods(user_id, keylists)
-        Data.import_recipes(user_id, keylists)
-        Data.import_ingredients(user_id, keylists)
+        manifest = Exporter.read_manifest("./data")
+        if manifest:
+            Data.stream_import(user_id, manifest, keylists, bulk)
+        elif bulk:
+            Data.bulk_import(user_id, keylists)
+        else:
+            Data.import_foods(user_id, keylists)
+            Data.import_recipes(user_id, keylists)
+            BulkLoad.link_parents(keylists)
+            recipe_ids = Data.import_ingredients(user_id, keylists)
+            # Each Ingredient was added on top of the Nutrition the Recipe was
+            # exported with, and before the Recipes it uses were complete
+            BulkLoad.recalculate_recipes(user_id, recipe_ids)
+
+
+    @staticmethod
+    def bulk_import(user_id: int, keylists: dict[str, dict[int,int]]):
+        """
+        Import Foods, Recipes and Ingredients from JSON in bulk.  The Recipes are
+        recalculated once, after all the Ingredients are in.
+        """
+        logging.info("Bulk importing Food, Recipe and Ingredient records...")
+        foods = BulkLoad.validate(FoodRequest, Data.read_json("foods.json"))
+        recipes = BulkLoad.validate(RecipeRequest, Data.read_json("recipes.json"))
+        ingredients = BulkLoad.validate(IngredientRequest, Data.read_json("ingredients.json"))
+
+        BulkLoad.load_foods(user_id, foods, keylists)
+        BulkLoad.load_recipes(user_id, recipes, keylists, recalculate=False)
+        BulkLoad.link_parents(keylists)
+        recipe_ids = BulkLoad.load_ingredients(user_id, ingredients, keylists, recalculate=False)
+
+        # Recipes with no Ingredients keep the Nutrition they were exported with
+        BulkLoad.recalculate_recipes(user_id, recipe_ids)
+        logging.info("Food, Recipe and Ingredient records imported")
+
+
+    @staticmethod
+    def stream_import(user_id: int, manifest: dict[str,Any], keylists: dict[str, dict[int,int]], bulk: bool = False):
+        """
+        Import Foods, Recipes and Ingredients from the NDJSON files listed in an
+        export manifest, BULK_CHUNK_SIZE records at a time, so memory use doesn't
+        grow with the size of the files.  Each batch is written with BulkLoad if
+        bulk is True, or else one record at a time (see Data.load).
+        """
+        logging.info("Streaming Food, Recipe and Ingredient records from NDJSON...")
+        for batch in Exporter.iter_batches("./data", manifest, "foods", BULK_CHUNK_SIZE):
+            food_requests = BulkLoad.validate(FoodRequest, batch)
+            if bulk:
+                BulkLoad.load_foods(user_id, food_requests, keylists)
+            else:
+                for food_request in food_requests:
+                    Food.add(user_id, food_request, keylists)
+        for batch in Exporter.iter_batches("./data", manifest, "recipes", BULK_CHUNK_SIZE):
+            recipe_requests = BulkLoad.validate(RecipeRequest, batch)
+            if bulk:
+                BulkLoad.load_recipes(user_id, recipe_requests, keylists, recalculate=False)
+            else:
+                for recipe_request in recipe_requests:
+                    Data._add_recipe(user_id, recipe_request, keylists)
+        # A variation can come in an earlier batch than its parent
+        BulkLoad.link_parents(keylists)
+        recipe_ids: set[int] = set()
+        for batch in Exporter.iter_batches("./data", manifest, "ingredients", BULK_CHUNK_SIZE):
+            ingredient_requests = BulkLoad.validate(IngredientRequest, batch)
+            if bulk:
+                recipe_ids |= BulkLoad.load_ingredients(user_id, ingredient_requests, keylists, recalculate=False)
+            else:
+                for ingredient_request in ingredient_requests:
+                    recipe_ids.add(Ingredient.add_from_schema(user_id, ingredient_request, keylists).recipe_id)
+
+        BulkLoad.recalculate_recipes(user_id, recipe_ids)
+        logging.info("Food, Recipe and Ingredient records imported")
+
+
+    @staticmethod
+    def read_json(file_name: str) -> list[dict[str,Any]]:
+        """
+        Read one of the JSON files in the /data subdirectory
+        """
+        with open(os.path.join("./data", file_name)) as f:
+            return json.load(f)
         
 
     @staticmethod
@@ -136,8 +226,9 @@ class Data:
         if len(starter_foods) == 0:
             raise DatabaseError("No starter foods are flagged in the catalog")
 
+        payloads: list[dict[str,Any]] = []
         for starter_food in starter_foods:
-            payload = FoodRequest.model_validate(
+            payloads.append(
                 {
                     "id": None,
                     "group": starter_food.group.name,
@@ -160,7 +251,11 @@ class Data:
                     "nutrition": starter_food.nutrition.json(),
                 }
             )
-            Food.add(user_id, payload)
+        # Not BulkLoad.load_foods: this runs on login, alongside everyone else's
+        # writes, and BulkLoad's ID reservation is only safe for loads that don't
+        # (see BulkLoad._reserve_ids).  These are a few dozen rows anyway.
+        for food_request in BulkLoad.validate(FoodRequest, payloads):
+            Food.add(user_id, food_request)
 
 
     @staticmethod
@@ -285,15 +380,29 @@ class Data:
             recipes: list[dict[str,Any]] = json.load(f)
             for recipe in recipes:
                 recipe_request = RecipeRequest.model_validate(recipe)
-                Recipe.add_from_schema(user_id, recipe_request, keylists)
+                Data._add_recipe(user_id, recipe_request, keylists)
         logging.info("Recipe records imported")
 
 
     @staticmethod
-    def import_ingredients(user_id: int, keylists: dict[str, dict[int,int]]):
+    def _add_recipe(user_id: int, recipe_request: RecipeRequest, keylists: dict[str, dict[int,int]]) -> None:
+        """
+        Recipe.add_from_schema, leaving the link to the parent Recipe for
+        BulkLoad.link_parents: the parent may not have been added yet, and until
+        it has, its old ID could be anyone's Recipe.
+        """
+        parent_recipe_id = recipe_request.parent_recipe_id
+        recipe_dao = Recipe.add_from_schema(user_id, recipe_request.model_copy(update={"parent_recipe_id": None}), keylists)
+        if parent_recipe_id is not None:
+            keylists.setdefault(PENDING_PARENTS_KEY, {})[recipe_dao.id] = parent_recipe_id
+
+
+    @staticmethod
+    def import_ingredients(user_id: int, keylists: dict[str, dict[int,int]]) -> set[int]:
         """
-        Import Ingredients from JSON
+        Import Ingredients from JSON.  Returns the IDs of the Recipes they went in.
         """
+        recipe_ids: set[int] = set()
         logging.info("Importing Ingredient records...")
         with open("./data/ingredients.json") as f:
             ingredients: list[dict[str,Any]] = json.load(f)
@@ -309,8 +418,9 @@ class Data:
                         "summary": ingredient.get("summary"),
                     }
                 )
-                Ingredient.add_from_schema(user_id, ingredient_request, keylists)
+                recipe_ids.add(Ingredient.add_from_schema(user_id, ingredient_request, keylists).recipe_id)
         logging.info("Ingredient records imported")
+        return recipe_ids
 
 
     @staticmethod
@@ -332,67 +442,12 @@ class Data:
     # EXPORT DATA
     ###################
     @staticmethod
-    def serialize_data(obj: Any):
+    def export(user_id: int, compress: bool = True):
         """
-        Simple serializer
+        Save the user's data to streamed NDJSON files (see exporter.py), plus a
+        manifest that Data.load will pick up.
         """
-        if isinstance(obj, Recipe):
-            return obj.json()
-        elif isinstance(obj, Ingredient):
-            return obj.json()
-        elif isinstance(obj, Food):
-            return obj.json()
-        elif isinstance(obj, DailyLogItem):
-            return obj.json()
-        raise TypeError(f"Object of type {obj.__class__.__name__} is not JSON serializable")
-
-
-    @staticmethod
-    def export(user_id: int):
-        """
-        Save selected data to JSON files.
-        """
-        Data.export_foods(user_id)
-        Data.export_ingredients(user_id)
-        Data.export_recipes(user_id)
-        Data.export_daily_logs(user_id)
-
-
-    @staticmethod
-    def export_foods(user_id: int):
-        logging.info("Exporting Food records...")
-        foods = Food.get_all_for_user(user_id)
-        os.makedirs("./data", exist_ok=True)
-        with open(file="./data/foods.json", mode="w") as f:
-            json.dump(obj=foods, fp=f, indent=4, default=Data.serialize_data)
-        logging.info("Food records exported")
-
-
-    @staticmethod
-    def export_ingredients(user_id: int):
-        logging.info("Exporting Ingredient records...")
-        ingredients = Ingredient.get_all_for_user(user_id)
-        os.makedirs("./data", exist_ok=True)
-        with open(file="./data/ingredients.json", mode="w") as f:
-            json.dump(obj=ingredients, fp=f, indent=4, default=Data.serialize_data)
-        logging.info("Ingredient records exported")
-
-
-    @staticmethod
-    def export_recipes(user_id: int):
-        logging.info("Exporting Recipe records...")
-        recipes = Recipe.get_all_for_user(user_id)
-        os.makedirs("./data", exist_ok=True)
-        with open(file="./data/recipes.json", mode="w") as f:
-            json.dump(obj=recipes, fp=f, indent=4, default=Data.serialize_data)
-        logging.info("Recipe records exported")
-
-
-    @staticmethod
-    def export_daily_logs(user_id: int):
-        logging.info("Exporting Daily Log records...")
-        daily_logs = DailyLogItem.get_all_for_user(user_id)
-        os.makedirs("./data", exist_ok=True)
-        with open(file="./data/daily_logs.json", mode="w") as f:
-            json.dump(obj=daily_logs, fp=f, indent=4, default=Data.serialize_data)
-        logging.info("Daily Log records exported")        
\ No newline at end of file
+        logging.info("Exporting Food, Recipe, Ingredient and Daily Log records...")
+        manifest = Exporter.export_user(user_id, "./data", compress)
+        counts = ", ".join(f"{entity}={entry['rows']}" for entity, entry in manifest["files"].items())
+        logging.info(f"Records exported: {counts}")
@@ -0,0 +1,115 @@
+from __future__ import annotations
+from typing import Any
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+from metrics import Metrics
+import logging
+import os
+import time
+
+# The database connection pool.  SQLAlchemy's defaults (5 connections plus 10
+# overflow, never recycled, no liveness check) don't match the server: each
+# waitress thread holds one connection for the length of a request, so the pool
+# should have one per thread, and MySQL drops connections that sit idle longer
+# than its wait_timeout, which the first request to pick one up then fails on.
+#
+# DbPool.engine_options sizes the pool from the thread count, with these
+# overrides from the environment:
+#
+#   DB_POOL_SIZE            connections kept open (default: one per thread)
+#   DB_POOL_MAX_OVERFLOW    extra connections allowed under load (default 2)
+#   DB_POOL_TIMEOUT         seconds to wait for a connection before giving up (default 10)
+#   DB_POOL_RECYCLE         seconds after which a connection is replaced (default 1800)
+#   DB_POOL_PRE_PING        check a connection is alive before using it (default 1)
+#   DB_CONNECT_TIMEOUT      seconds to wait for MySQL to accept a connection (default 10)
+#
+# Each worker process (see prefork.py) has a pool of its own, so MySQL's
+# max_connections has to allow for WEB_WORKERS * (size + overflow).
+#
+# The pool reports to Metrics (so /api/metrics):
+#
+#   db_pool_checkout_seconds        how long getting a connection took, histogram
+#   db_pool_exhausted_total         checkouts that found every connection in use
+#                                   and had to wait for one
+#   db_pool_timeouts_total          checkouts that waited DB_POOL_TIMEOUT and failed
+#   db_pool_connections_total       connections opened, closed and invalidated
+#                                   (by event): churn, if it keeps climbing
+#   db_pool_checked_out             connections in use right now, gauge
+
+CHECKOUT_SECONDS_METRIC = "db_pool_checkout_seconds"
+EXHAUSTED_METRIC = "db_pool_exhausted_total"
+TIMEOUT_METRIC = "db_pool_timeouts_total"
+CONNECTIONS_METRIC = "db_pool_connections_total"
+CHECKED_OUT_METRIC = "db_pool_checked_out"
+
+# Getting an idle connection takes microseconds; anything in the upper buckets
+# was waiting for one
+CHECKOUT_BUCKETS = (0.0001, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0)
+
+
+class InstrumentedQueuePool(QueuePool):
+    """
+    A QueuePool that times its checkouts and counts the ones that found it
+    exhausted.
+    """
+    def _do_get(self) -> Any:
+        started = time.perf_counter()
+        if self._max_overflow > -1 and self.checkedout() >= self.size() + self._max_overflow:
+            Metrics.increment(EXHAUSTED_METRIC)
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            Metrics.increment(TIMEOUT_METRIC)
+            raise
+        finally:
+            Metrics.observe(CHECKOUT_SECONDS_METRIC, time.perf_counter() - started, CHECKOUT_BUCKETS)
+            Metrics.set(CHECKED_OUT_METRIC, self.checkedout())
+
+
+    def _do_return_conn(self, record: Any) -> None:
+        super()._do_return_conn(record)
+        Metrics.set(CHECKED_OUT_METRIC, self.checkedout())
+
+
+@event.listens_for(InstrumentedQueuePool, "connect")
+def _on_connect(dbapi_connection: Any, connection_record: Any) -> None:
+    Metrics.increment(CONNECTIONS_METRIC, event="opened")
+
+
+@event.listens_for(InstrumentedQueuePool, "close")
+def _on_close(dbapi_connection: Any, connection_record: Any) -> None:
+    Metrics.increment(CONNECTIONS_METRIC, event="closed")
+
+
+@event.listens_for(InstrumentedQueuePool, "invalidate")
+def _on_invalidate(dbapi_connection: Any, connection_record: Any, exception: BaseException | None) -> None:
+    Metrics.increment(CONNECTIONS_METRIC, event="invalidated")
+
+
+class DbPool:
+    @staticmethod
+    def engine_options(threads: int, db_protocol: str = "") -> dict[str, Any]:
+        """
+        SQLALCHEMY_ENGINE_OPTIONS for a server with threads threads per process.
+        """
+        options: dict[str, Any] = {
+            "poolclass": InstrumentedQueuePool,
+            "pool_size": int(os.environ.get("DB_POOL_SIZE", threads)),
+            "max_overflow": int(os.environ.get("DB_POOL_MAX_OVERFLOW", "2")),
+            # Whole seconds: Flask-SQLAlchemy's engine_from_config makes it an int anyway
+            "pool_timeout": int(os.environ.get("DB_POOL_TIMEOUT", "10")),
+            "pool_recycle": int(os.environ.get("DB_POOL_RECYCLE", "1800")),
+            "pool_pre_ping": os.environ.get("DB_POOL_PRE_PING", "1") != "0",
+        }
+        # The connect timeout is the driver's, and so is its name
+        if db_protocol.startswith("mysql+mysqlconnector"):
+            options["connect_args"] = {"connection_timeout": int(os.environ.get("DB_CONNECT_TIMEOUT", "10"))}
+        elif db_protocol.startswith("mysql+pymysql"):
+            options["connect_args"] = {"connect_timeout": int(os.environ.get("DB_CONNECT_TIMEOUT", "10"))}
+
+        logging.info(
+            f"Database pool: {options['pool_size']} connections, {options['max_overflow']} overflow, "
+            f"{options['pool_timeout']}s timeout, recycled after {options['pool_recycle']}s"
+        )
+        return options
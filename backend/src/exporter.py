@@ -0,0 +1,371 @@
+from __future__ import annotations
+from typing import IO, Any, Iterable, Iterator
+from sqlalchemy import Select
+from sqlalchemy.orm import joinedload, selectinload
+from models import db, Food, Recipe, Ingredient, DailyLogItem, NutritionAlternative, Preferences
+import datetime
+import gzip
+import hashlib
+import io
+import json
+import logging
+import os
+import tarfile
+import tempfile
+import time
+import zipfile
+import zlib
+
+# The original export code loaded every record for a user with get_all_for_user(),
+# then wrote it out as one big pretty-printed JSON array.  That holds the whole
+# account in memory (twice, counting the JSON text), and json() lazily loads each
+# record's Nutrition and NutritionAlternatives one row at a time.
+#
+# This module streams instead.  Each table is paged through with yield_per, with
+# its Nutrition eagerly loaded a page at a time, and written as NDJSON: one JSON
+# record per line, optionally gzipped.  Memory use depends on the page size, not
+# on the size of the account.  A manifest.json next to the data files records
+# each file's row count, size and SHA-256 checksum so the data can be verified
+# as it's read back.
+
+EXPORT_CHUNK_SIZE = 500
+EXPORT_FORMAT = "trackeats-ndjson"
+EXPORT_FORMAT_VERSION = 1
+MANIFEST_FILE_NAME = "manifest.json"
+
+# Archives are handed to the web server in pieces of about this many bytes
+ARCHIVE_CHUNK_SIZE = 64 * 1024
+# A tar member's size goes in its header, so each file is spooled first.  Files up
+# to this size are spooled in memory, bigger ones to a temporary file.
+ARCHIVE_SPOOL_SIZE = 1024 * 1024
+
+
+class _FileStats:
+    """
+    Running row count, size and checksum of an NDJSON file, for the manifest.
+    """
+    def __init__(self):
+        self.rows = 0
+        self.size = 0
+        self.checksum = hashlib.sha256()
+
+    def add(self, line: bytes) -> None:
+        self.rows += 1
+        self.size += len(line)
+        self.checksum.update(line)
+
+    def entry(self, file_name: str) -> dict[str, Any]:
+        return {"file": file_name, "rows": self.rows, "bytes": self.size, "sha256": self.checksum.hexdigest()}
+
+
+class _ChunkBuffer(io.RawIOBase):
+    """
+    A write-only, unseekable stream that collects what's written to it until it's
+    drained.  zipfile can write to unseekable streams, so this lets us hand a zip
+    archive to the client a piece at a time as it's built.
+    """
+    def __init__(self):
+        super().__init__()
+        self.chunks: list[bytes] = []
+        self.size = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, b: Any) -> int:
+        data = bytes(b)
+        self.chunks.append(data)
+        self.size += len(data)
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks = []
+        self.size = 0
+        return data
+
+
+class Exporter:
+    # In load order: each entity only refers to the ones before it
+    ENTITIES = ("foods", "recipes", "ingredients", "daily_logs")
+    # What a user gets when they download their data
+    ARCHIVE_ENTITIES = ENTITIES + ("preferences",)
+    # Archive format -> (MIME type, file extension)
+    ARCHIVE_FORMATS = {
+        "zip": ("application/zip", "zip"),
+        "tar": ("application/gzip", "tar.gz"),
+    }
+
+    ###################
+    # READING THE DATABASE
+    ###################
+    @staticmethod
+    def query(user_id: int, entity: str) -> Select[Any]:
+        """
+        The SELECT for one entity's records, ordered by ID, with the
+        relationships json() needs loaded eagerly.
+        """
+        if entity == "foods":
+            return (
+                db.select(Food)
+                .where(Food.user_id == user_id)
+                .order_by(Food.id)
+                .options(
+                    joinedload(Food.nutrition),
+                    selectinload(Food.nutrition_alternatives).joinedload(NutritionAlternative.nutrition),
+                )
+            )
+        if entity == "recipes":
+            return db.select(Recipe).where(Recipe.user_id == user_id).order_by(Recipe.id).options(joinedload(Recipe.nutrition))
+        if entity == "ingredients":
+            return db.select(Ingredient).where(Ingredient.user_id == user_id).order_by(Ingredient.id)
+        if entity == "daily_logs":
+            return db.select(DailyLogItem).where(DailyLogItem.user_id == user_id).order_by(DailyLogItem.id).options(joinedload(DailyLogItem.nutrition))
+        if entity == "preferences":
+            return db.select(Preferences).where(Preferences.user_id == user_id).order_by(Preferences.id)
+        raise ValueError(f"Unknown export entity '{entity}'")
+
+
+    @staticmethod
+    def iter_records(user_id: int, entity: str, chunk_size: int = EXPORT_CHUNK_SIZE) -> Iterator[dict[str, Any]]:
+        """
+        Yield one entity's records as JSON-ready dicts, fetching chunk_size rows
+        at a time.
+        """
+        result = db.session.scalars(Exporter.query(user_id, entity).execution_options(yield_per=chunk_size))
+        for dao in result:
+            yield Exporter.record(dao)
+
+
+    @staticmethod
+    def record(dao: Any) -> dict[str, Any]:
+        """
+        One record as a JSON-ready dict.  Preferences.json() leaves out the ID and
+        context, which a reload needs.
+        """
+        if isinstance(dao, Preferences):
+            return {"id": dao.id, "context": dao.context, "preferences": dao.preferences}
+        return dao.json()
+
+
+    @staticmethod
+    def iter_ndjson(records: Iterable[dict[str, Any]]) -> Iterator[bytes]:
+        """
+        Serialize records as NDJSON lines.
+        """
+        for record in records:
+            yield json.dumps(record, separators=(",", ":"), ensure_ascii=False).encode("utf-8") + b"\n"
+
+
+    ###################
+    # WRITING FILES
+    ###################
+    @staticmethod
+    def export_user(
+        user_id: int,
+        directory: str,
+        compress: bool = True,
+        entities: Iterable[str] = ENTITIES,
+    ) -> dict[str, Any]:
+        """
+        Write one NDJSON file per entity, plus a manifest, to the directory.
+        Returns the manifest.
+
+        Each file is written under a temporary name and renamed when complete, and
+        the manifest is written last, so a failed export never leaves a manifest
+        pointing at partial files.
+        """
+        os.makedirs(directory, exist_ok=True)
+        manifest = Exporter.new_manifest(user_id, compress)
+
+        for entity in entities:
+            file_name = f"{entity}.ndjson.gz" if compress else f"{entity}.ndjson"
+            path = os.path.join(directory, file_name)
+            with open(path + ".tmp", "wb") as raw:
+                # mtime=0 keeps the output byte-for-byte reproducible
+                out: IO[bytes] = gzip.GzipFile(fileobj=raw, mode="wb", mtime=0) if compress else raw
+                try:
+                    stats = Exporter.write_entity(out, user_id, entity)
+                finally:
+                    if out is not raw:
+                        out.close()
+            os.replace(path + ".tmp", path)
+
+            manifest["files"][entity] = stats.entry(file_name)
+            logging.info(f"Exported {stats.rows} {entity} records for user {user_id} to {path}")
+
+        manifest_path = os.path.join(directory, MANIFEST_FILE_NAME)
+        with open(manifest_path + ".tmp", "w") as f:
+            json.dump(manifest, f, indent=4)
+        os.replace(manifest_path + ".tmp", manifest_path)
+        return manifest
+
+
+    @staticmethod
+    def new_manifest(user_id: int, compressed: bool) -> dict[str, Any]:
+        return {
+            "format": EXPORT_FORMAT,
+            "version": EXPORT_FORMAT_VERSION,
+            "user_id": user_id,
+            "exported_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "compressed": compressed,
+            "files": {},
+        }
+
+
+    @staticmethod
+    def write_entity(out: IO[bytes], user_id: int, entity: str) -> _FileStats:
+        """
+        Write one entity's records to a stream as NDJSON.
+        """
+        stats = _FileStats()
+        for line in Exporter.iter_ndjson(Exporter.iter_records(user_id, entity)):
+            out.write(line)
+            stats.add(line)
+        return stats
+
+
+    ###################
+    # DOWNLOADABLE ARCHIVES
+    ###################
+    @staticmethod
+    def iter_archive(user_id: int, archive_format: str) -> Iterator[bytes]:
+        """
+        Yield a zip or gzipped tar archive of the user's data, a piece at a time:
+        one NDJSON file per entity in ARCHIVE_ENTITIES plus the manifest, in the
+        same layout Data.export writes (uncompressed, since the archive is).
+
+        Run this in one transaction so every file comes from the same snapshot.
+        """
+        if archive_format == "zip":
+            return Exporter._iter_zip(user_id)
+        if archive_format == "tar":
+            return Exporter._iter_tar(user_id)
+        raise ValueError(f"Unknown archive format '{archive_format}'. Must be one of {sorted(Exporter.ARCHIVE_FORMATS)}")
+
+
+    @staticmethod
+    def _iter_zip(user_id: int) -> Iterator[bytes]:
+        manifest = Exporter.new_manifest(user_id, False)
+        buffer = _ChunkBuffer()
+        with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+            for entity in Exporter.ARCHIVE_ENTITIES:
+                file_name = f"{entity}.ndjson"
+                stats = _FileStats()
+                with archive.open(file_name, "w", force_zip64=True) as member:
+                    for line in Exporter.iter_ndjson(Exporter.iter_records(user_id, entity)):
+                        member.write(line)
+                        stats.add(line)
+                        if buffer.size >= ARCHIVE_CHUNK_SIZE:
+                            yield buffer.drain()
+                manifest["files"][entity] = stats.entry(file_name)
+            archive.writestr(MANIFEST_FILE_NAME, json.dumps(manifest, indent=4))
+        yield buffer.drain()
+
+
+    @staticmethod
+    def _iter_tar(user_id: int) -> Iterator[bytes]:
+        # The tar stream is built by hand (headers from TarInfo, then the data,
+        # padded to a whole block) and gzipped on the fly, because tarfile wants
+        # to copy each member in one go, which would buffer it all in memory.
+        manifest = Exporter.new_manifest(user_id, False)
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        mtime = int(time.time())
+
+        def _member(file_name: str, data: IO[bytes], size: int) -> Iterator[bytes]:
+            info = tarfile.TarInfo(file_name)
+            info.size = size
+            info.mtime = mtime
+            info.mode = 0o644
+            yield compressor.compress(info.tobuf(tarfile.PAX_FORMAT))
+            data.seek(0)
+            while chunk := data.read(ARCHIVE_CHUNK_SIZE):
+                yield compressor.compress(chunk)
+            if size % tarfile.BLOCKSIZE:
+                yield compressor.compress(tarfile.NUL * (tarfile.BLOCKSIZE - size % tarfile.BLOCKSIZE))
+
+        def _pieces() -> Iterator[bytes]:
+            for entity in Exporter.ARCHIVE_ENTITIES:
+                file_name = f"{entity}.ndjson"
+                with tempfile.SpooledTemporaryFile(max_size=ARCHIVE_SPOOL_SIZE) as spool:
+                    stats = Exporter.write_entity(spool, user_id, entity)  # type: ignore[arg-type]
+                    yield from _member(file_name, spool, stats.size)  # type: ignore[arg-type]
+                manifest["files"][entity] = stats.entry(file_name)
+            manifest_bytes = json.dumps(manifest, indent=4).encode("utf-8")
+            yield from _member(MANIFEST_FILE_NAME, io.BytesIO(manifest_bytes), len(manifest_bytes))
+            yield compressor.compress(tarfile.NUL * tarfile.BLOCKSIZE * 2)
+            yield compressor.flush()
+
+        pending: list[bytes] = []
+        pending_size = 0
+        for piece in _pieces():
+            pending.append(piece)
+            pending_size += len(piece)
+            if pending_size >= ARCHIVE_CHUNK_SIZE:
+                yield b"".join(pending)
+                pending = []
+                pending_size = 0
+        if pending_size:
+            yield b"".join(pending)
+
+
+    ###################
+    # READING FILES
+    ###################
+    @staticmethod
+    def read_manifest(directory: str) -> dict[str, Any] | None:
+        """
+        Read the manifest in the directory, or return None if there isn't one.
+        """
+        path = os.path.join(directory, MANIFEST_FILE_NAME)
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            manifest: dict[str, Any] = json.load(f)
+        if manifest.get("format") != EXPORT_FORMAT or manifest.get("version") != EXPORT_FORMAT_VERSION:
+            raise ValueError(f"Unsupported export format {manifest.get('format')} version {manifest.get('version')}")
+        return manifest
+
+
+    @staticmethod
+    def iter_file(directory: str, manifest: dict[str, Any], entity: str) -> Iterator[dict[str, Any]]:
+        """
+        Yield the records in one entity's NDJSON file, one line at a time.
+
+        The row count and checksum are checked against the manifest at the end of
+        the file, so a load should run in a transaction that a ValueError here
+        will roll back.  An entity missing from the manifest yields nothing.
+        """
+        entry = manifest["files"].get(entity)
+        if not entry:
+            return
+        path = os.path.join(directory, entry["file"])
+        rows = 0
+        checksum = hashlib.sha256()
+        opener = gzip.open if entry["file"].endswith(".gz") else open
+        with opener(path, "rb") as f:
+            for line in f:
+                checksum.update(line)
+                if line.strip():
+                    rows += 1
+                    yield json.loads(line)
+
+        if rows != entry["rows"]:
+            raise ValueError(f"{entry['file']} has {rows} records but the manifest says {entry['rows']}")
+        if checksum.hexdigest() != entry["sha256"]:
+            raise ValueError(f"{entry['file']} does not match its checksum in the manifest")
+
+
+    @staticmethod
+    def iter_batches(directory: str, manifest: dict[str, Any], entity: str, batch_size: int) -> Iterator[list[dict[str, Any]]]:
+        """
+        Group iter_file's records into lists of at most batch_size.
+        """
+        batch: list[dict[str, Any]] = []
+        for record in Exporter.iter_file(directory, manifest, entity):
+            batch.append(record)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
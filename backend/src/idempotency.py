@@ -0,0 +1,227 @@
+from __future__ import annotations
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable
+from flask import Response, jsonify, make_response, request
+from sqlalchemy.exc import IntegrityError
+from metrics import Metrics
+from models import db, User, IdempotencyKey
+import datetime
+import logging
+import os
+import threading
+import time
+
+# Flaky mobile networks mean the same POST sometimes arrives twice, and the user
+# ends up with two copies of a daily log entry.  A client can prevent that by
+# sending a unique Idempotency-Key header with each write.  The first request
+# with a given key is handled normally and its response stored; a retry with the
+# same key gets the stored response back without the write being done again.
+#
+#   1. The key is reserved (an IdempotencyKey row with status PENDING) in its own
+#      transaction, so a duplicate that arrives while the first is still being
+#      handled is turned away with 409 rather than applied in parallel.
+#   2. The route runs as usual.
+#   3. A successful (2xx) response is stored against the key.  Anything else
+#      releases the key, so the client can retry.  So does a write that deleted
+#      the account itself (DELETE /api/user): its keys went with it, and there's
+#      no user left to store the response for.
+#
+# Stored responses are also kept in a small in-process LRU cache, so a replay
+# usually doesn't touch the database at all.  Keys are kept for
+# IDEMPOTENCY_KEY_TTL_HOURS (default 24); expired ones are deleted every few
+# minutes, piggybacking on the requests that store new keys.
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+IDEMPOTENCY_METRIC = "idempotency_total"
+IDEMPOTENCY_CACHE_SIZE = 1024
+# How long a PENDING key can sit before we decide its request died
+PENDING_TIMEOUT = datetime.timedelta(minutes=2)
+# How often each process deletes expired keys
+EXPIRE_INTERVAL_SECONDS = 600
+
+
+@dataclass
+class _StoredResponse:
+    request_hash: str
+    status: int
+    body: Any
+    expires_at: float
+
+
+class Idempotency:
+    _lock = threading.Lock()
+    _cache: OrderedDict[tuple[str, str], _StoredResponse] = OrderedDict()
+    _last_expired_at = 0.0
+
+    @staticmethod
+    def ttl() -> datetime.timedelta:
+        return datetime.timedelta(hours=float(os.environ.get("IDEMPOTENCY_KEY_TTL_HOURS", "24")))
+
+
+    @staticmethod
+    def handle(key: str, identity: str, get_user_id: Callable[[], int], view: Callable[[], Any]) -> Response:
+        """
+        Run view() at most once per (user, key), replaying the stored response for
+        repeats.  identity is the JWT identity, which keys the in-process cache;
+        get_user_id() is only called when the database has to be consulted.
+        """
+        if not 1 <= len(key) <= 64:
+            return Idempotency._error(f"{IDEMPOTENCY_HEADER} must be 1 to 64 characters", 400)
+        request_hash = IdempotencyKey.hash_request(request.method, request.path, request.get_data(as_text=True))
+
+        cached = Idempotency._cache_get(identity, key)
+        if cached:
+            return Idempotency._replay(cached.request_hash, request_hash, cached.status, cached.body)
+
+        with db.session.begin():
+            user_id = get_user_id()
+            key_dao = Idempotency._reserve(user_id, key, request_hash)
+        if key_dao:
+            if key_dao.status == IdempotencyKey.PENDING and key_dao.request_hash == request_hash:
+                Metrics.increment(IDEMPOTENCY_METRIC, result="in_progress")
+                return Idempotency._error(f"A request with this {IDEMPOTENCY_HEADER} is still being processed", 409)
+            # A reservation isn't a response: it may yet be released, and then the
+            # key is free again
+            if key_dao.status != IdempotencyKey.PENDING:
+                Idempotency._cache_put(identity, key, key_dao)
+            return Idempotency._replay(key_dao.request_hash, request_hash, key_dao.status, key_dao.response_body)
+
+        try:
+            response = make_response(view())
+        except BaseException:
+            Idempotency._release(user_id, identity, key)
+            raise
+
+        if 200 <= response.status_code < 300 and response.is_json:
+            with db.session.begin():
+                if db.session.get(User, user_id) is None:
+                    logging.info(f"User {user_id} was deleted; not storing the response for its {IDEMPOTENCY_HEADER}")
+                    return response
+                key_dao = IdempotencyKey.get(user_id, key) or IdempotencyKey.save(user_id, key, request_hash, IdempotencyKey.PENDING, None)
+                key_dao.status = response.status_code
+                key_dao.response_body = response.get_json()
+            Idempotency._cache_put(identity, key, key_dao)
+            Metrics.increment(IDEMPOTENCY_METRIC, result="stored")
+            Idempotency._expire_if_due()
+        else:
+            Idempotency._release(user_id, identity, key)
+        return response
+
+
+    @staticmethod
+    def _reserve(user_id: int, key: str, request_hash: str) -> IdempotencyKey | None:
+        """
+        Reserve the key for this request and return None, or return the existing
+        record if the key is already taken.  Call in a transaction.
+        """
+        key_dao = IdempotencyKey.get(user_id, key)
+        if key_dao and key_dao.status == IdempotencyKey.PENDING:
+            reserved_at = key_dao.created_at.replace(tzinfo=datetime.timezone.utc)
+            if datetime.datetime.now(datetime.timezone.utc) - reserved_at > PENDING_TIMEOUT:
+                logging.warning(f"Reclaiming abandoned {IDEMPOTENCY_HEADER} for user {user_id}")
+                db.session.delete(key_dao)
+                db.session.flush()
+                key_dao = None
+        if key_dao:
+            return key_dao
+
+        try:
+            with db.session.begin_nested():
+                IdempotencyKey.save(user_id, key, request_hash, IdempotencyKey.PENDING, None)
+        except IntegrityError:
+            # Another request reserved it between our SELECT and INSERT.  Its row
+            # says whether that was the same request (409) or a different one (422).
+            key_dao = IdempotencyKey.get(user_id, key, for_update=True)
+            if key_dao is None:
+                # ...and has released it again since
+                return IdempotencyKey(user_id=user_id, key=key, request_hash=request_hash, status=IdempotencyKey.PENDING)
+            return key_dao
+        return None
+
+
+    @staticmethod
+    def _release(user_id: int, identity: str, key: str) -> None:
+        with Idempotency._lock:
+            Idempotency._cache.pop((identity, key), None)
+        with db.session.begin():
+            key_dao = IdempotencyKey.get(user_id, key)
+            if key_dao and key_dao.status == IdempotencyKey.PENDING:
+                db.session.delete(key_dao)
+
+
+    @staticmethod
+    def _replay(stored_hash: str, request_hash: str, status: int, body: Any) -> Response:
+        if stored_hash != request_hash:
+            Metrics.increment(IDEMPOTENCY_METRIC, result="mismatch")
+            return Idempotency._error(f"{IDEMPOTENCY_HEADER} was already used for a different request", 422)
+        Metrics.increment(IDEMPOTENCY_METRIC, result="replayed")
+        logging.info(f"Replaying stored response for {IDEMPOTENCY_HEADER}")
+        response = jsonify(body)
+        response.status_code = status
+        response.headers["Idempotent-Replayed"] = "true"
+        return response
+
+
+    @staticmethod
+    def _error(msg: str, status: int) -> Response:
+        logging.error(msg)
+        response = jsonify({"msg": msg})
+        response.status_code = status
+        return response
+
+
+    @staticmethod
+    def _expire_if_due() -> None:
+        """
+        Delete expired keys, if this process hasn't done so in the last
+        EXPIRE_INTERVAL_SECONDS.
+        """
+        now = time.monotonic()
+        with Idempotency._lock:
+            if now - Idempotency._last_expired_at < EXPIRE_INTERVAL_SECONDS:
+                return
+            Idempotency._last_expired_at = now
+        created_before = (datetime.datetime.now(datetime.timezone.utc) - Idempotency.ttl()).replace(tzinfo=None)
+        with db.session.begin():
+            deleted = IdempotencyKey.expire(created_before)
+        if deleted:
+            logging.info(f"Deleted {deleted} expired idempotency keys")
+
+
+    ###################
+    # IN-PROCESS CACHE
+    ###################
+    @staticmethod
+    def _cache_get(identity: str, key: str) -> _StoredResponse | None:
+        with Idempotency._lock:
+            stored = Idempotency._cache.get((identity, key))
+            if stored is None:
+                return None
+            if stored.expires_at < time.time():
+                del Idempotency._cache[(identity, key)]
+                return None
+            Idempotency._cache.move_to_end((identity, key))
+            return stored
+
+
+    @staticmethod
+    def _cache_put(identity: str, key: str, key_dao: IdempotencyKey) -> None:
+        created_at = key_dao.created_at.replace(tzinfo=datetime.timezone.utc)
+        stored = _StoredResponse(
+            request_hash=key_dao.request_hash,
+            status=key_dao.status,
+            body=key_dao.response_body,
+            expires_at=(created_at + Idempotency.ttl()).timestamp(),
+        )
+        with Idempotency._lock:
+            Idempotency._cache[(identity, key)] = stored
+            Idempotency._cache.move_to_end((identity, key))
+            while len(Idempotency._cache) > IDEMPOTENCY_CACHE_SIZE:
+                Idempotency._cache.popitem(last=False)
+
+
+    @staticmethod
+    def clear_cache() -> None:
+        with Idempotency._lock:
+            Idempotency._cache.clear()
@@ -0,0 +1,106 @@
+from __future__ import annotations
+from typing import Any
+from flask import Flask, Response, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from metrics import Metrics
+import logging
+import os
+import threading
+import time
+
+# Per-route numbers for finding the slow and chatty endpoints:
+#
+#   http_requests_total                 requests, by route, method and status
+#   http_request_duration_seconds       latency histogram, by route and method
+#   http_response_bytes                 response size histogram (as sent, so
+#                                       after compression), by route and method
+#   http_request_db_statements          SQL statements per request, histogram
+#   db_statements_total                 SQL statements, by route
+#   db_statement_seconds_total          time spent in SQL, by route
+#
+# The route is the URL rule (/api/food/<int:food_id>), not the path, so the
+# number of label values stays small.  An admin can read everything, along with
+# the other counters in Metrics, at /api/metrics.
+#
+# Set REQUEST_METRICS=0 to turn it off.  Nothing is hooked in at all then, so it
+# costs nothing.
+
+REQUEST_COUNT_METRIC = "http_requests_total"
+REQUEST_DURATION_METRIC = "http_request_duration_seconds"
+RESPONSE_BYTES_METRIC = "http_response_bytes"
+REQUEST_STATEMENTS_METRIC = "http_request_db_statements"
+STATEMENT_COUNT_METRIC = "db_statements_total"
+STATEMENT_SECONDS_METRIC = "db_statement_seconds_total"
+
+RESPONSE_BYTES_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+STATEMENT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 500)
+
+
+class _RequestStats(threading.local):
+    started: float | None = None
+    statements = 0
+    statement_seconds = 0.0
+
+
+class Instrumentation:
+    _current = _RequestStats()
+
+    @staticmethod
+    def init_app(app: Flask) -> None:
+        if os.environ.get("REQUEST_METRICS", "1") == "0":
+            logging.info("Request metrics are off")
+            return
+        app.before_request(Instrumentation._start)
+        app.after_request(Instrumentation._finish)
+        if not event.contains(Engine, "before_cursor_execute", Instrumentation._before_cursor_execute):
+            event.listen(Engine, "before_cursor_execute", Instrumentation._before_cursor_execute)
+            event.listen(Engine, "after_cursor_execute", Instrumentation._after_cursor_execute)
+
+
+    @staticmethod
+    def _start() -> None:
+        stats = Instrumentation._current
+        stats.started = time.perf_counter()
+        stats.statements = 0
+        stats.statement_seconds = 0.0
+
+
+    @staticmethod
+    def _finish(response: Response) -> Response:
+        stats = Instrumentation._current
+        if stats.started is None:
+            return response
+        elapsed = time.perf_counter() - stats.started
+        stats.started = None
+
+        route = request.url_rule.rule if request.url_rule else "unmatched"
+        method = request.method
+        Metrics.increment(REQUEST_COUNT_METRIC, route=route, method=method, status=str(response.status_code))
+        Metrics.observe(REQUEST_DURATION_METRIC, elapsed, route=route, method=method)
+        # A streamed response's size isn't known until it's been sent
+        if response.content_length is not None:
+            Metrics.observe(RESPONSE_BYTES_METRIC, response.content_length, RESPONSE_BYTES_BUCKETS, route=route, method=method)
+        Metrics.observe(REQUEST_STATEMENTS_METRIC, stats.statements, STATEMENT_BUCKETS, route=route, method=method)
+        if stats.statements:
+            Metrics.increment(STATEMENT_COUNT_METRIC, stats.statements, route=route)
+            Metrics.increment(STATEMENT_SECONDS_METRIC, stats.statement_seconds, route=route)
+        return response
+
+
+    @staticmethod
+    def _before_cursor_execute(conn: Any, cursor: Any, statement: str, parameters: Any, context: Any, executemany: bool) -> None:
+        if Instrumentation._current.started is not None:
+            conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+    @staticmethod
+    def _after_cursor_execute(conn: Any, cursor: Any, statement: str, parameters: Any, context: Any, executemany: bool) -> None:
+        started = conn.info.get("query_started")
+        if not started:
+            return
+        elapsed = time.perf_counter() - started.pop()
+        stats = Instrumentation._current
+        if stats.started is not None:
+            stats.statements += 1
+            stats.statement_seconds += elapsed
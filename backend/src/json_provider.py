@@ -0,0 +1,63 @@
+from __future__ import annotations
+from typing import Any
+from flask import Response
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is optional
+    orjson = None
+
+# Encoding the responses of the list endpoints (every food, with its nutrition
+# and alternatives) is one of the more expensive things the backend does, and
+# Python's json module does it in a mix of C and pure Python.  orjson does the
+# whole thing in native code, several times faster.
+#
+# FastJSONProvider produces the same JSON Flask's default provider does, so the
+# clients can't tell the difference: keys sorted, dates and datetimes in HTTP
+# date format, Decimals and anything else odd converted by Flask's default().
+# The one visible change is that non-ASCII text is sent as UTF-8 rather than as
+# \u escapes, which any JSON parser reads back the same.
+#
+# Anything orjson can't encode the way the stdlib would (e.g. non-string keys,
+# or integers too big for 64 bits) is handed to the stdlib instead.  So is
+# everything, if orjson isn't installed.
+
+class FastJSONProvider(DefaultJSONProvider):
+    # Keyword arguments that mean the caller wants the stdlib's json.dumps()
+    _STDLIB_ONLY = frozenset(("cls", "skipkeys", "check_circular", "allow_nan", "separators"))
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        if orjson is None or self._STDLIB_ONLY.intersection(kwargs) or kwargs.get("indent") not in (None, 2):
+            return super().dumps(obj, **kwargs)
+        encoded = self._encode(obj, indent=kwargs.get("indent") == 2)
+        return encoded.decode() if encoded is not None else super().dumps(obj, **kwargs)
+
+
+    def response(self, *args: Any, **kwargs: Any) -> Response:
+        if orjson is None:
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        body = self._encode(obj, indent)
+        if body is None:
+            return super().response(obj)
+        return self._app.response_class(body + b"\n", mimetype=self.mimetype)
+
+
+    def _encode(self, obj: Any, indent: bool) -> bytes | None:
+        """
+        obj as UTF-8 JSON, or None if orjson can't encode it.
+        """
+        assert orjson is not None
+        # Dates and datetimes go to default() so they come out in the same format
+        # as from the stdlib provider, not orjson's ISO 8601.  So do dataclasses,
+        # because orjson doesn't sort their fields.
+        option = orjson.OPT_SORT_KEYS | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        try:
+            return orjson.dumps(obj, default=self.default, option=option)
+        except TypeError:
+            # orjson.JSONEncodeError is a TypeError
+            return None
@@ -0,0 +1,226 @@
+from __future__ import annotations
+from typing import Any, TextIO
+from flask import Flask, Response, g, has_request_context, request
+from metrics import Metrics
+import atexit
+import datetime
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import re
+import sys
+import uuid
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is optional
+    orjson = None
+
+# Every route logs a line or two, and under load writing them to stderr on the
+# request thread is slow: the Docker log driver falls behind, the pipe fills up
+# and the request threads block on it.  So a request thread only puts its log
+# records on a queue, and one background thread (a QueueListener) writes them.
+#
+#   - The queue holds LOG_QUEUE_SIZE records (default 10000).  If it's full the
+#     record is dropped rather than waited for, and counted in
+#     log_records_dropped_total.
+#   - Records are written one JSON object per line: time, level, logger,
+#     message, the request ID (for a record logged during a request) and the
+#     traceback, if any.  LOG_FORMAT=text writes the old plain lines instead,
+#     which are easier to read in a terminal.
+#   - LOG_LEVEL sets the level (default INFO; DEBUG is very chatty).
+#   - LOG_SAMPLE_RATES keeps only a fraction of the records at the busy levels,
+#     e.g. "INFO=0.1,DEBUG=0.01".  Warnings and errors are always kept.  The
+#     records left out are counted in log_records_sampled_total, by level.
+#
+# Each request gets an ID: the caller's X-Request-ID header, if it sent a
+# sensible one (so a proxy's ID carries through), or a new one.  It's added to
+# every record logged while handling the request, and sent back in the
+# response's X-Request-ID header.
+#
+# The listener thread doesn't survive a fork, so Prefork calls after_fork() in
+# each worker to start it again.
+
+REQUEST_ID_HEADER = "X-Request-ID"
+DROPPED_METRIC = "log_records_dropped_total"
+SAMPLED_METRIC = "log_records_sampled_total"
+
+DEFAULT_QUEUE_SIZE = 10000
+TEXT_FORMAT = "%(asctime)s %(levelname)s: %(message)s"
+
+_REQUEST_ID_PATTERN = re.compile(r"^[A-Za-z0-9._:-]{1,128}$")
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Formats a record as one line of JSON.
+    """
+    def format(self, record: logging.LogRecord) -> str:
+        entry: dict[str, Any] = {
+            "time": datetime.datetime.fromtimestamp(record.created, datetime.timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        request_id = getattr(record, "request_id", None)
+        if request_id:
+            entry["request_id"] = request_id
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        if orjson is not None:
+            return orjson.dumps(entry, default=str).decode()
+        return json.dumps(entry, default=str)
+
+
+class RequestContextFilter(logging.Filter):
+    """
+    Samples the records at the levels in rates, and tags the rest with the
+    current request's ID.  Runs on the thread that logged the record.
+    """
+    def __init__(self, rates: dict[int, float]) -> None:
+        super().__init__()
+        self.rates = rates
+
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        rate = self.rates.get(record.levelno)
+        if rate is not None and random.random() >= rate:
+            Metrics.increment(SAMPLED_METRIC, level=record.levelname)
+            return False
+        record.request_id = g.get("request_id") if has_request_context() else None
+        return True
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """
+    A QueueHandler that drops a record, rather than waiting, when the queue is
+    full.
+    """
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            Metrics.increment(DROPPED_METRIC)
+
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Unlike the stock prepare(), leave the formatting to the listener: just
+        # fix the message (its arguments might change before it's written) and
+        # the traceback (the frames will be gone)
+        prepared = logging.makeLogRecord(record.__dict__)
+        prepared.msg = record.getMessage()
+        prepared.args = None
+        if record.exc_info:
+            prepared.exc_text = record.exc_text or logging.Formatter().formatException(record.exc_info)
+            prepared.exc_info = None
+        return prepared
+
+
+class Logs:
+    _handler: DroppingQueueHandler | None = None
+    _listener: logging.handlers.QueueListener | None = None
+
+    @staticmethod
+    def configure(stream: TextIO | None = None) -> None:
+        """
+        Send the root logger's records through the queue, configured from the
+        environment, to stream (stderr by default).  Calling it again replaces
+        the previous configuration.
+        """
+        Logs.shutdown()
+
+        level_name = os.environ.get("LOG_LEVEL", "INFO").upper()
+        level = logging.getLevelName(level_name)
+        if not isinstance(level, int):
+            raise ValueError(f"LOG_LEVEL {level_name!r} is not a logging level")
+
+        output = logging.StreamHandler(stream or sys.stderr)
+        if os.environ.get("LOG_FORMAT", "json").lower() == "text":
+            output.setFormatter(logging.Formatter(TEXT_FORMAT))
+        else:
+            output.setFormatter(JsonFormatter())
+
+        records: queue.Queue[logging.LogRecord] = queue.Queue(int(os.environ.get("LOG_QUEUE_SIZE", DEFAULT_QUEUE_SIZE)))
+        handler = DroppingQueueHandler(records)
+        handler.addFilter(RequestContextFilter(Logs.sample_rates(os.environ.get("LOG_SAMPLE_RATES", ""))))
+
+        root = logging.getLogger()
+        root.setLevel(level)
+        root.addHandler(handler)
+        Logs._handler = handler
+        Logs._listener = logging.handlers.QueueListener(records, output, respect_handler_level=True)
+        Logs._listener.start()
+
+
+    @staticmethod
+    def sample_rates(spec: str) -> dict[int, float]:
+        """
+        Parse LOG_SAMPLE_RATES ("INFO=0.1,DEBUG=0.01") into {level: rate}.
+        """
+        rates: dict[int, float] = {}
+        for part in filter(None, (part.strip() for part in spec.split(","))):
+            name, _, value = part.partition("=")
+            level = logging.getLevelName(name.strip().upper())
+            if not isinstance(level, int):
+                raise ValueError(f"LOG_SAMPLE_RATES: {name!r} is not a logging level")
+            if level >= logging.WARNING:
+                raise ValueError(f"LOG_SAMPLE_RATES: {name.strip().upper()} records are never sampled")
+            rate = float(value)
+            if not 0 <= rate <= 1:
+                raise ValueError(f"LOG_SAMPLE_RATES: the rate for {name.strip().upper()} must be between 0 and 1")
+            rates[level] = rate
+        return rates
+
+
+    @staticmethod
+    def after_fork() -> None:
+        """
+        In a forked worker: give the handler a new queue (the parent's might
+        have been locked mid-use) and start a listener thread to empty it.
+        """
+        if Logs._handler is None or Logs._listener is None:
+            return
+        records: queue.Queue[logging.LogRecord] = queue.Queue(Logs._handler.queue.maxsize)
+        Logs._handler.queue = records
+        Logs._listener = logging.handlers.QueueListener(records, *Logs._listener.handlers, respect_handler_level=True)
+        Logs._listener.start()
+
+
+    @staticmethod
+    def shutdown() -> None:
+        """
+        Write out whatever is still queued, and go back to logging nowhere.
+        """
+        if Logs._listener is not None:
+            Logs._listener.stop()
+            Logs._listener = None
+        if Logs._handler is not None:
+            logging.getLogger().removeHandler(Logs._handler)
+            Logs._handler = None
+
+
+    @staticmethod
+    def init_app(app: Flask) -> None:
+        app.before_request(Logs._start_request)
+        app.after_request(Logs._finish_request)
+
+
+    @staticmethod
+    def _start_request() -> None:
+        request_id = request.headers.get(REQUEST_ID_HEADER, "")
+        g.request_id = request_id if _REQUEST_ID_PATTERN.match(request_id) else uuid.uuid4().hex
+
+
+    @staticmethod
+    def _finish_request(response: Response) -> Response:
+        if "request_id" in g:
+            response.headers[REQUEST_ID_HEADER] = g.request_id
+        return response
+
+
+atexit.register(Logs.shutdown)
@@ -0,0 +1,192 @@
+from __future__ import annotations
+from dataclasses import dataclass, field
+import bisect
+import threading
+
+_Key = tuple[str, tuple[tuple[str, str], ...]]
+
+# Upper bounds of the histogram buckets, Prometheus' defaults.  Suits anything
+# measured in seconds.
+DEFAULT_BUCKETS: tuple[float, ...] = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+@dataclass
+class _Histogram:
+    buckets: tuple[float, ...]
+    # counts[i] is the number of observations in bucket i alone (the last one
+    # being +Inf); they're made cumulative when rendered
+    counts: list[int] = field(default_factory=list)
+    total: float = 0.0
+    count: int = 0
+
+
+class Metrics:
+    """
+    In-process counters and histograms for keeping an eye on how the backend is
+    behaving, e.g. how often a conditional GET saves us a full response, or how
+    long each route takes.
+
+    Each metric is identified by a name plus a set of labels, Prometheus-style:
+        Metrics.increment("conditional_get_total", route="/api/food", result="hit")
+        Metrics.observe("http_request_duration_seconds", 0.012, route="/api/food")
+        Metrics.set("db_pool_checked_out", 3)
+
+    The values live in this process only and start from zero on every restart.
+    """
+    _lock = threading.Lock()
+    _counters: dict[_Key, float] = {}
+    _histograms: dict[_Key, _Histogram] = {}
+    _gauges: dict[_Key, float] = {}
+
+    @staticmethod
+    def increment(name: str, amount: float = 1, **labels: str) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        with Metrics._lock:
+            Metrics._counters[key] = Metrics._counters.get(key, 0) + amount
+
+
+    @staticmethod
+    def observe(name: str, value: float, buckets: tuple[float, ...] = DEFAULT_BUCKETS, **labels: str) -> None:
+        """
+        Add an observation to a histogram.  The buckets are fixed by the first
+        observation of each name and label set.
+        """
+        key = (name, tuple(sorted(labels.items())))
+        with Metrics._lock:
+            histogram = Metrics._histograms.get(key)
+            if histogram is None:
+                histogram = Metrics._histograms[key] = _Histogram(buckets, [0] * (len(buckets) + 1))
+            histogram.counts[bisect.bisect_left(histogram.buckets, value)] += 1
+            histogram.total += value
+            histogram.count += 1
+
+
+    @staticmethod
+    def set(name: str, value: float, **labels: str) -> None:
+        """
+        Set a gauge: a value that goes up and down, like a number in use.
+        """
+        key = (name, tuple(sorted(labels.items())))
+        with Metrics._lock:
+            Metrics._gauges[key] = value
+
+
+    @staticmethod
+    def gauge(name: str, **labels: str) -> float | None:
+        """
+        A gauge's current value, or None if it's never been set.
+        """
+        with Metrics._lock:
+            return Metrics._gauges.get((name, tuple(sorted(labels.items()))))
+
+
+    @staticmethod
+    def get(name: str, **labels: str) -> float:
+        """
+        The total of every counter with this name whose labels include the ones
+        given, so get("x") is the total across all labels.
+        """
+        wanted = set(labels.items())
+        with Metrics._lock:
+            return sum(
+                count for (counter_name, counter_labels), count in Metrics._counters.items()
+                if counter_name == name and wanted <= set(counter_labels)
+            )
+
+
+    @staticmethod
+    def ratio(name: str, numerator: dict[str, str], **labels: str) -> float | None:
+        """
+        The share of a counter's total that carries the numerator labels, e.g. a
+        hit rate.  None if the counter hasn't been incremented yet.
+        """
+        total = Metrics.get(name, **labels)
+        if not total:
+            return None
+        return Metrics.get(name, **labels, **numerator) / total
+
+
+    @staticmethod
+    def histogram(name: str, **labels: str) -> tuple[int, float]:
+        """
+        The (count, sum) of every histogram with this name whose labels include
+        the ones given.
+        """
+        wanted = set(labels.items())
+        count, total = 0, 0.0
+        with Metrics._lock:
+            for (histogram_name, histogram_labels), histogram in Metrics._histograms.items():
+                if histogram_name == name and wanted <= set(histogram_labels):
+                    count += histogram.count
+                    total += histogram.total
+        return count, total
+
+
+    @staticmethod
+    def counters() -> dict[_Key, float]:
+        """
+        A snapshot of every counter, keyed by (name, sorted label pairs).
+        """
+        with Metrics._lock:
+            return dict(Metrics._counters)
+
+
+    @staticmethod
+    def prometheus() -> str:
+        """
+        Every metric in the Prometheus text exposition format.
+        """
+        with Metrics._lock:
+            counters = sorted(Metrics._counters.items())
+            gauges = sorted(Metrics._gauges.items())
+            histograms = [
+                (key, _Histogram(h.buckets, list(h.counts), h.total, h.count))
+                for key, h in sorted(Metrics._histograms.items(), key=lambda item: item[0])
+            ]
+
+        lines: list[str] = []
+        typed: set[str] = set()
+        for (name, labels), value in counters:
+            if name not in typed:
+                typed.add(name)
+                lines.append(f"# TYPE {name} counter")
+            lines.append(f"{name}{_labels(labels)} {_number(value)}")
+        for (name, labels), value in gauges:
+            if name not in typed:
+                typed.add(name)
+                lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name}{_labels(labels)} {_number(value)}")
+        for (name, labels), histogram in histograms:
+            if name not in typed:
+                typed.add(name)
+                lines.append(f"# TYPE {name} histogram")
+            cumulative = 0
+            for bound, count in zip((*histogram.buckets, "+Inf"), histogram.counts):
+                cumulative += count
+                le = bound if isinstance(bound, str) else _number(bound)
+                lines.append(f"{name}_bucket{_labels((*labels, ('le', le)))} {cumulative}")
+            lines.append(f"{name}_sum{_labels(labels)} {_number(histogram.total)}")
+            lines.append(f"{name}_count{_labels(labels)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+
+    @staticmethod
+    def reset() -> None:
+        with Metrics._lock:
+            Metrics._counters.clear()
+            Metrics._histograms.clear()
+            Metrics._gauges.clear()
+
+
+def _labels(labels: tuple[tuple[str, str], ...]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels) + "}"
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
@@ -1,12 +1,18 @@
 from __future__ import annotations
 from typing import Any
 from flask_sqlalchemy import SQLAlchemy
-from sqlalchemy import func, select
-from sqlalchemy.orm import Mapped, mapped_column, relationship
+from sqlalchemy import Connection, Select, event, func, select
+from sqlalchemy.dialects import mysql, sqlite
+from sqlalchemy.orm import Mapped, Session, mapped_column, relationship, selectinload
 from email_validator import validate_email
+from cache import Cache
 from crypto import Crypto
+from replica import RoutingSession
+from serializers import ColumnSerializer
 from schemas import FoodRequest, RecipeRequest, IngredientRequest, DailyLogItemRequest, DailyLogItemUpdateRequest, NutritionRequest
 import enum
+import hashlib
+import json
 import datetime
 import re
 import unicodedata
@@ -86,7 +92,8 @@ import logging
 # Disable "expire on commit".  By default SQLAlchemy does lazy reads on DAO objects
 # when you access their fields outside of a trandaction to ensure they're "up to date".
 # This is exactly the kind of behavior I *don't* want in a DAO layer.  No thanks.
-db = SQLAlchemy(session_options={ "expire_on_commit": False })
+# The session class can send a request's reads to a read replica (see replica.py).
+db = SQLAlchemy(session_options={ "expire_on_commit": False, "class_": RoutingSession })
 
 
 ##############################
@@ -106,6 +113,9 @@ class User(db.Model):
     """
     __tablename__ = "user"
 
+    # The Cache namespace of the username and email address to user ID lookups
+    ID_CACHE = "user_ids"
+
     id: Mapped[int] = mapped_column(primary_key=True)
     username: Mapped[str] = mapped_column(db.String(100), index=True, nullable=True)
     status: Mapped[UserStatus] = mapped_column(db.Enum(UserStatus), nullable=False)
@@ -230,8 +240,14 @@ class User(db.Model):
         """
         Get the user_id for the given email address (used for JWT identity lookup)
         """
-        user = User.get_by_email(email_addr)
-        return user.id if user else None
+        # Cached by the hash, so the email address never goes into the cache.
+        # A deleted user's ID mustn't be served for a re-registered address by
+        # another worker, so this is only cached where every worker sees the
+        # invalidation.
+        email_addr_hash = Crypto.hash(email_addr)
+        return Cache.cached(User.ID_CACHE, f"email:{email_addr_hash}", lambda: db.session.scalar(
+            db.select(User.id).where(User.email_addr_hash == email_addr_hash)
+        ), shared_only=True)
 
 
     @staticmethod
@@ -239,8 +255,9 @@ class User(db.Model):
         """
         Get the user_id for the given username
         """
-        user = db.session.scalar(db.select(User).where(User.username == username))
-        return user.id if user else None
+        return Cache.cached(User.ID_CACHE, f"username:{username}", lambda: db.session.scalar(
+            db.select(User.id).where(User.username == username)
+        ), shared_only=True)
 
 
     @staticmethod
@@ -468,8 +485,12 @@ class User(db.Model):
         """
         Encrypts and hashes the email address and stores those values.
         """
+        previous_hash = self.email_addr_hash
         self.encrypted_email_addr = Crypto.encrypt(email_addr)
         self.email_addr_hash = Crypto.hash(email_addr)
+        # A new user's address can't have been looked up yet (misses aren't cached)
+        if previous_hash is not None and previous_hash != self.email_addr_hash:
+            Cache.invalidate(User.ID_CACHE)
 
 
 ##############################
@@ -491,11 +512,27 @@ class Preferences(db.Model):
 
 
     @staticmethod
-    def get(user_id: int, context: str) -> dict[str,Any] | None:
-        prefs_dao = db.session.scalar(select(Preferences).where(Preferences.user_id == user_id).where(Preferences.context == context))
-        if not prefs_dao:
-            return None;
-        return prefs_dao.preferences;
+    def get(user_id: int, context: str, version: str = "") -> dict[str,Any] | None:
+        """
+        The user's preferences for context.  They're cached, under version if
+        it's given: pass the collection's ETag, and a change made by another
+        worker process can't be missed.
+        """
+        def _load() -> dict[str,Any] | None:
+            prefs_dao = db.session.scalar(select(Preferences).where(Preferences.user_id == user_id).where(Preferences.context == context))
+            if not prefs_dao:
+                return None;
+            return prefs_dao.preferences;
+        return Cache.cached(CollectionVersion.PREFERENCES, f"{context}@{version}", _load, user_id=user_id)
+
+
+    @staticmethod
+    def get_all(user_id: int) -> dict[str,dict[str,Any]]:
+        """
+        All of the user's preferences, by context.
+        """
+        prefs_daos = db.session.scalars(select(Preferences).where(Preferences.user_id == user_id).order_by(Preferences.context))
+        return {prefs_dao.context: prefs_dao.preferences for prefs_dao in prefs_daos}
 
 
     @staticmethod
@@ -509,6 +546,376 @@ class Preferences(db.Model):
             prefs_dao.context = context
             prefs_dao.preferences = prefs
         db.session.add(prefs_dao)
+        Cache.invalidate(CollectionVersion.PREFERENCES, user_id)
+
+
+##############################
+# COLLECTION VERSION
+##############################
+class CollectionVersion(db.Model):
+    """
+    A change counter for each of a user's collections of app data.  Every write
+    to a collection bumps its version and stamps modified_at (UTC), so a client's
+    cached copy of the collection can be checked without loading any records.
+
+    ORM writes are counted automatically by the after_flush listener at the bottom
+    of this file.  Code that writes with bulk SQL statements instead (purge.py,
+    bulk_load.py) bypasses the ORM, so it has to call CollectionVersion.bump() itself.
+    """
+    __tablename__ = "collection_version"
+
+    FOODS = "foods"
+    RECIPES = "recipes"
+    DAILY_LOGS = "daily_logs"
+    PREFERENCES = "preferences"
+    COLLECTIONS = (FOODS, RECIPES, DAILY_LOGS, PREFERENCES)
+    # Not a collection the clients see.  Bumped along with every ChangeLog write,
+    # which makes it a per-user lock that keeps the ChangeLog in commit order.
+    CHANGE_LOG = "change_log"
+
+    user_id: Mapped[int] = mapped_column(db.Integer, db.ForeignKey("user.id"), primary_key=True)
+    collection: Mapped[str] = mapped_column(db.String(30), primary_key=True)
+    version: Mapped[int] = mapped_column(db.BigInteger, nullable=False, default=0)
+    modified_at: Mapped[datetime.datetime] = mapped_column(db.DateTime, nullable=False)
+
+
+    @staticmethod
+    def get(user_id: int, collection: str) -> CollectionVersion | None:
+        return db.session.get(CollectionVersion, (user_id, collection))
+
+
+    @staticmethod
+    def last_modified(user_id: int) -> datetime.datetime | None:
+        """
+        When any of the user's collections last changed (UTC), or None if none of
+        them has changed since version tracking began.
+        """
+        modified_at = db.session.scalar(
+            select(func.max(CollectionVersion.modified_at)).where(CollectionVersion.user_id == user_id)
+        )
+        return modified_at.replace(tzinfo=datetime.timezone.utc) if modified_at else None
+
+
+    @staticmethod
+    def etag(user_id: int, collections: tuple[str, ...], variant: str = "") -> str:
+        """
+        A strong ETag for a response built from these collections of the user's
+        data, computed from their counters alone (one small query, no records).
+
+        The variant distinguishes different representations of the same data
+        (e.g. different query parameters).  modified_at goes into the hash along
+        with the version so a counter that's deleted and recreated can't repeat
+        an old tag.
+        """
+        return CollectionVersion.etags(user_id, {"": (collections, variant)})[""]
+
+
+    @staticmethod
+    def etags(user_id: int, responses: dict[str, tuple[tuple[str, ...], str]]) -> dict[str, str]:
+        """
+        etag() for several responses at once, given as {name: (collections,
+        variant)}, from one query.  Returns {name: ETag}.
+        """
+        wanted = sorted({collection for collections, _ in responses.values() for collection in collections})
+        rows = db.session.execute(
+            select(CollectionVersion.collection, CollectionVersion.version, CollectionVersion.modified_at)
+            .where(CollectionVersion.user_id == user_id)
+            .where(CollectionVersion.collection.in_(wanted))
+        ).all()
+        stamps = {collection: f"{version}@{modified_at.isoformat()}" for collection, version, modified_at in rows}
+        etags: dict[str, str] = {}
+        for name, (collections, variant) in responses.items():
+            parts = [str(user_id), variant] + [f"{collection}={stamps.get(collection, '0')}" for collection in sorted(collections)]
+            etags[name] = hashlib.sha256("|".join(parts).encode()).hexdigest()[:32]
+        return etags
+
+
+    @staticmethod
+    def bump(user_id: int, collections: set[str], connection: Connection | None = None) -> None:
+        """
+        Add one to the version of each of the user's collections, creating the
+        counters if need be.  One INSERT ... ON DUPLICATE KEY UPDATE (or the
+        SQLite equivalent) per call, so concurrent writers can't lose a bump.
+        """
+        if not collections:
+            return
+        # Whatever is cached from these collections is out of date now
+        for collection in collections.intersection(CollectionVersion.COLLECTIONS):
+            Cache.invalidate(collection, user_id)
+        connection = connection or db.session.connection()
+        now = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+        rows = [
+            {"user_id": user_id, "collection": collection, "version": 1, "modified_at": now}
+            for collection in sorted(collections)
+        ]
+        table = CollectionVersion.__table__
+        if connection.dialect.name == "mysql":
+            mysql_stmt = mysql.insert(table).values(rows)
+            stmt: Any = mysql_stmt.on_duplicate_key_update(
+                version=table.c.version + 1,
+                modified_at=mysql_stmt.inserted.modified_at,
+            )
+        else:
+            sqlite_stmt = sqlite.insert(table).values(rows)
+            stmt = sqlite_stmt.on_conflict_do_update(
+                index_elements=[table.c.user_id, table.c.collection],
+                set_={"version": table.c.version + 1, "modified_at": sqlite_stmt.excluded.modified_at},
+            )
+        connection.execute(stmt)
+
+
+##############################
+# CHANGE LOG
+##############################
+class ChangeLog(db.Model):
+    """
+    An append-only log of changes to each user's records, so a client can ask for
+    just what changed since it last synced (see sync.py) instead of pulling whole
+    collections again.
+
+    Each entry says a record was upserted or deleted; the record itself is read
+    from its own table at sync time.  A "reset" entry (entity_id NULL) means every
+    record of that entity was deleted at once, e.g. by Purge.
+
+    The version is the sync cursor.  Every write also bumps the user's
+    CollectionVersion.CHANGE_LOG counter first, and the row lock that takes is
+    held until commit, so a user's entries get their versions in commit order
+    and a client can never skip past one that's committed late.
+
+    ORM writes are logged by the after_flush listener at the bottom of this file.
+    Code that writes with bulk SQL statements (purge.py, bulk_load.py) has to call
+    record() or reset() itself.
+    """
+    __tablename__ = "change_log"
+    # Versions must never be reused, even after the newest entries are deleted.
+    # MySQL's AUTO_INCREMENT guarantees that; SQLite needs AUTOINCREMENT for it.
+    __table_args__ = (db.Index("ix_change_log_user_id_version", "user_id", "version"), {"sqlite_autoincrement": True})
+
+    UPSERT = "upsert"
+    DELETE = "delete"
+    RESET = "reset"
+
+    # Entity -> the CollectionVersion it belongs to
+    ENTITY_COLLECTIONS = {
+        "foods": CollectionVersion.FOODS,
+        "recipes": CollectionVersion.RECIPES,
+        "ingredients": CollectionVersion.RECIPES,
+        "daily_logs": CollectionVersion.DAILY_LOGS,
+        "preferences": CollectionVersion.PREFERENCES,
+    }
+    ENTITIES = tuple(ENTITY_COLLECTIONS)
+
+    # SQLite only autoincrements an INTEGER PRIMARY KEY
+    version: Mapped[int] = mapped_column(db.BigInteger().with_variant(db.Integer, "sqlite"), primary_key=True, autoincrement=True)
+    user_id: Mapped[int] = mapped_column(db.Integer, db.ForeignKey("user.id"), nullable=False)
+    entity: Mapped[str] = mapped_column(db.String(20), nullable=False)
+    entity_id: Mapped[int | None] = mapped_column(db.Integer, nullable=True)
+    op: Mapped[str] = mapped_column(db.String(10), nullable=False)
+
+
+    @staticmethod
+    def record(user_id: int, changes: dict[tuple[str, int], str], connection: Connection | None = None) -> None:
+        """
+        Log a set of changes, given as {(entity, entity_id): op}, and bump the
+        CollectionVersions they touch.  One INSERT for the lot.
+        """
+        if not changes:
+            return
+        connection = connection or db.session.connection()
+        collections = {ChangeLog.ENTITY_COLLECTIONS[entity] for entity, _ in changes}
+        CollectionVersion.bump(user_id, collections | {CollectionVersion.CHANGE_LOG}, connection)
+        connection.execute(
+            ChangeLog.__table__.insert(),
+            [
+                {"user_id": user_id, "entity": entity, "entity_id": entity_id, "op": op}
+                for (entity, entity_id), op in sorted(changes.items())
+            ],
+        )
+
+
+    @staticmethod
+    def reset(user_id: int, entities: set[str], connection: Connection | None = None) -> None:
+        """
+        Log that ALL of the user's records of these entities were deleted.  The
+        reset supersedes every earlier entry for those entities, so they're
+        dropped on the spot.
+        """
+        if not entities:
+            return
+        connection = connection or db.session.connection()
+        collections = {ChangeLog.ENTITY_COLLECTIONS[entity] for entity in entities}
+        CollectionVersion.bump(user_id, collections | {CollectionVersion.CHANGE_LOG}, connection)
+        table = ChangeLog.__table__
+        connection.execute(table.delete().where(table.c.user_id == user_id).where(table.c.entity.in_(sorted(entities))))
+        connection.execute(
+            table.insert(),
+            [{"user_id": user_id, "entity": entity, "entity_id": None, "op": ChangeLog.RESET} for entity in sorted(entities)],
+        )
+
+
+    @staticmethod
+    def latest(user_id: int) -> int:
+        """
+        The user's most recent version, or 0 if nothing has been logged.
+        """
+        return db.session.scalar(select(func.max(ChangeLog.version)).where(ChangeLog.user_id == user_id)) or 0
+
+
+    @staticmethod
+    def since(user_id: int, version: int, limit: int) -> list[Any]:
+        """
+        Up to <limit> of the user's entries after the given version, oldest first,
+        as (version, entity, entity_id, op) rows.
+        """
+        return list(db.session.execute(
+            select(ChangeLog.version, ChangeLog.entity, ChangeLog.entity_id, ChangeLog.op)
+            .where(ChangeLog.user_id == user_id)
+            .where(ChangeLog.version > version)
+            .order_by(ChangeLog.version)
+            .limit(limit)
+        ).all())
+
+
+    @staticmethod
+    def compact(user_id: int | None = None, chunk_size: int = 500) -> int:
+        """
+        Delete the entries that a later entry for the same record supersedes, for
+        one user or for everyone.  Returns the number of entries deleted.
+
+        This is always safe: a client syncing from any cursor still sees the
+        latest entry for every record that changed after it, which is all it
+        needs.  (Entries superseded by a reset are already gone.)
+
+        MySQL won't let a DELETE select from its own table, so each chunk selects
+        its versions first and then deletes them by primary key.
+        """
+        newest = select(
+            ChangeLog.user_id, ChangeLog.entity, ChangeLog.entity_id, func.max(ChangeLog.version).label("version")
+        ).where(ChangeLog.entity_id.is_not(None))
+        if user_id is not None:
+            newest = newest.where(ChangeLog.user_id == user_id)
+        newest_subquery = newest.group_by(ChangeLog.user_id, ChangeLog.entity, ChangeLog.entity_id).subquery()
+        superseded = (
+            select(ChangeLog.version)
+            .join(newest_subquery, (ChangeLog.user_id == newest_subquery.c.user_id)
+                  & (ChangeLog.entity == newest_subquery.c.entity)
+                  & (ChangeLog.entity_id == newest_subquery.c.entity_id))
+            .where(ChangeLog.version < newest_subquery.c.version)
+            .limit(chunk_size)
+        )
+
+        deleted = 0
+        while True:
+            versions = list(db.session.scalars(superseded))
+            if not versions:
+                break
+            result = db.session.execute(
+                db.delete(ChangeLog).where(ChangeLog.version.in_(versions)).execution_options(synchronize_session=False)
+            )
+            deleted += int(result.rowcount)  # type: ignore[attr-defined]
+        return deleted
+
+
+##############################
+# IDEMPOTENCY KEY
+##############################
+class IdempotencyKey(db.Model):
+    """
+    The stored outcome of a write that came with a client-generated idempotency
+    key, so a retry of the same write returns the original response instead of
+    being applied twice.
+
+    Batch operations (/api/batch) save their key in the same transaction as the
+    write it guards, so either both are committed or neither is.  Whole requests
+    with an Idempotency-Key header (see idempotency.py) reserve the key with
+    status PENDING before the write and fill in the outcome after it.  The
+    request_hash catches a client reusing a key for a different request.
+
+    Keys are kept for a limited time; expire() deletes the old ones.
+    """
+    __tablename__ = "idempotency_key"
+    __table_args__ = (db.Index("ix_idempotency_key_created_at", "created_at"),)
+
+    # The request is still being handled (or died while it was)
+    PENDING = 0
+
+    user_id: Mapped[int] = mapped_column(db.Integer, db.ForeignKey("user.id"), primary_key=True)
+    key: Mapped[str] = mapped_column(db.String(64), primary_key=True)
+    request_hash: Mapped[str] = mapped_column(db.String(64), nullable=False)
+    status: Mapped[int] = mapped_column(db.Integer, nullable=False)
+    response_body: Mapped[Any] = mapped_column(db.JSON, nullable=True)
+    created_at: Mapped[datetime.datetime] = mapped_column(db.DateTime, nullable=False)
+
+
+    @staticmethod
+    def hash_request(*parts: Any) -> str:
+        """
+        A fingerprint of a request, for telling whether a replayed key really is
+        the same request.
+        """
+        return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()
+
+
+    @staticmethod
+    def get_many(user_id: int, keys: list[str]) -> dict[str, IdempotencyKey]:
+        """
+        The stored outcomes for any of these keys, in one query.
+        """
+        if not keys:
+            return {}
+        key_daos = db.session.scalars(
+            select(IdempotencyKey).where(IdempotencyKey.user_id == user_id).where(IdempotencyKey.key.in_(keys))
+        )
+        return {key_dao.key: key_dao for key_dao in key_daos}
+
+
+    @staticmethod
+    def get(user_id: int, key: str, for_update: bool = False) -> IdempotencyKey | None:
+        """
+        for_update reads the latest committed row (and locks it), rather than the
+        one in this transaction's snapshot.
+        """
+        return db.session.get(IdempotencyKey, (user_id, key), with_for_update=for_update or None, populate_existing=for_update)
+
+
+    @staticmethod
+    def expire(created_before: datetime.datetime, chunk_size: int = 500) -> int:
+        """
+        Delete the keys created before the given (naive UTC) time, chunk_size at a
+        time.  Returns the number deleted.
+        """
+        deleted = 0
+        while True:
+            rows = db.session.execute(
+                select(IdempotencyKey.user_id, IdempotencyKey.key)
+                .where(IdempotencyKey.created_at < created_before)
+                .limit(chunk_size)
+            ).all()
+            if not rows:
+                break
+            for user_id in {row.user_id for row in rows}:
+                result = db.session.execute(
+                    db.delete(IdempotencyKey)
+                    .where(IdempotencyKey.user_id == user_id)
+                    .where(IdempotencyKey.key.in_([row.key for row in rows if row.user_id == user_id]))
+                    .execution_options(synchronize_session=False)
+                )
+                deleted += int(result.rowcount)  # type: ignore[attr-defined]
+        return deleted
+
+
+    @staticmethod
+    def save(user_id: int, key: str, request_hash: str, status: int, response_body: Any) -> IdempotencyKey:
+        key_dao = IdempotencyKey(
+            user_id=user_id,
+            key=key,
+            request_hash=request_hash,
+            status=status,
+            response_body=response_body,
+            created_at=datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None),
+        )
+        db.session.add(key_dao)
+        return key_dao
 
 
 ##############################
@@ -601,28 +1008,7 @@ class Nutrition(db.Model):
         return str(vars(self))
 
     def json(self) -> dict[str,Any]:
-        return {
-            "id": self.id,
-            "user_id": self.user_id,
-            "serving_size_description": self.serving_size_description,
-            "serving_size_oz": self.serving_size_oz,
-            "serving_size_g": self.serving_size_g,
-            "calories": self.calories,
-            "total_fat_g": self.total_fat_g,
-            "saturated_fat_g": self.saturated_fat_g,
-            "trans_fat_g": self.trans_fat_g,
-            "cholesterol_mg": self.cholesterol_mg,
-            "sodium_mg": self.sodium_mg,
-            "total_carbs_g": self.total_carbs_g,
-            "fiber_g": self.fiber_g,
-            "total_sugar_g": self.total_sugar_g,
-            "added_sugar_g": self.added_sugar_g,
-            "protein_g": self.protein_g,
-            "vitamin_d_mcg": self.vitamin_d_mcg,
-            "calcium_mg": self.calcium_mg,
-            "iron_mg": self.iron_mg,
-            "potassium_mg": self.potassium_mg
-        }
+        return _NUTRITION_COLUMNS(self)
     
 
     @staticmethod
@@ -631,6 +1017,19 @@ class Nutrition(db.Model):
         return nutrition
 
 
+    @staticmethod
+    def get_many(user_id: int, nutrition_ids: set[int]) -> dict[int, Nutrition]:
+        """
+        The user's Nutrition records with these IDs, by ID, in one query.  Any
+        that aren't found are left out.
+        """
+        if not nutrition_ids:
+            return {}
+        return {dao.id: dao for dao in db.session.scalars(
+            db.select(Nutrition).where(Nutrition.user_id == user_id).where(Nutrition.id.in_(nutrition_ids))
+        )}
+
+
     def sum(self, nutrition2: Nutrition, servings: float, modifier: float = 1) -> Nutrition:
         """
         Add one Nutrition record to another.
@@ -974,44 +1373,29 @@ class Food(db.Model):
     def __str__(self):
         return str(vars(self))
     
-    def json(self) -> dict[str,Any]:
-        # Compute derived weight fields for backward compatibility
-        if self.unit_type == "liquid" and self.size_metric is not None and self.density is not None:
-            computed_weight_g = round(self.size_metric * self.density)
-            computed_weight_oz = round(computed_weight_g / 28.3495, 2)
-        else:
-            computed_weight_g = self.size_metric
-            computed_weight_oz = self.size_imperial
+    @staticmethod
+    def computed_weights(unit_type: str | None, size_metric: float | None, density: float | None, size_imperial: float | None) -> tuple[float | None, float | None]:
+        """
+        The derived (size_oz, size_g) fields, kept for backward compatibility.
+        A liquid's weight comes from its volume and density.
+        """
+        if unit_type == "liquid" and size_metric is not None and density is not None:
+            computed_weight_g = round(size_metric * density)
+            return round(computed_weight_g / 28.3495, 2), computed_weight_g
+        return size_imperial, size_metric
 
-        return {
-            "id": self.id,
-            "user_id": self.user_id,
-            "group": self.group.name,
-            "name": self.name,
-            "subtype": self.subtype,
-            "description": self.description,
-            "vendor": self.vendor,
-            "size_description": self.size_description,
-            "size_description_2": self.size_description_2,
-            "size_imperial": self.size_imperial,
-            "size_metric": self.size_metric,
-            "unit_type": self.unit_type,
-            "density": self.density,
-            "size_oz": computed_weight_oz,
-            "size_g": computed_weight_g,
-            "servings": self.servings,
-            "nutrition_id": self.nutrition_id,
-            "nutrition": self.nutrition.json(),
-            "nutrition_alternatives": [alt.json() for alt in (self.nutrition_alternatives or [])],
-            "price": self.price,
-            "price_date": self.price_date.strftime("%Y-%m-%d") if self.price_date else None,
-            "shelf_life": self.shelf_life,
-            "source": self.source,
-            "fdc_id": self.fdc_id,
-            "fdc_data_type": self.fdc_data_type,
-            "starter_food": self.starter_food,
-            "last_synced_at": self.last_synced_at.isoformat() if self.last_synced_at else None,
-            }
+    def json(self) -> dict[str,Any]:
+        computed_weight_oz, computed_weight_g = Food.computed_weights(self.unit_type, self.size_metric, self.density, self.size_imperial)
+
+        data = _FOOD_COLUMNS(self)
+        data["group"] = self.group.name
+        data["size_oz"] = computed_weight_oz
+        data["size_g"] = computed_weight_g
+        data["nutrition"] = self.nutrition.json()
+        data["nutrition_alternatives"] = [alt.json() for alt in (self.nutrition_alternatives or [])]
+        data["price_date"] = self.price_date.strftime("%Y-%m-%d") if self.price_date else None
+        data["last_synced_at"] = self.last_synced_at.isoformat() if self.last_synced_at else None
+        return data
 
     
 
@@ -1021,13 +1405,27 @@ class Food(db.Model):
         return list(food_daos)
 
 
+    @staticmethod
+    def query_for_user(user_id: int) -> Select[tuple[Food]]:
+        return db.select(Food).where(Food.user_id == user_id).order_by(Food.group, Food.name, Food.subtype)
+
+
+    @staticmethod
+    def with_relations(statement: Select[tuple[Food]]) -> Select[tuple[Food]]:
+        """
+        statement, also loading what json() reads: each Food's Nutrition and
+        NutritionAlternatives (and theirs), in a query per kind of record rather
+        than per Food.
+        """
+        return statement.options(
+            selectinload(Food.nutrition),
+            selectinload(Food.nutrition_alternatives).selectinload(NutritionAlternative.nutrition),
+        )
+
+
     @staticmethod
     def get_all_for_user(user_id: int) -> list[Food]:
-        food_daos = db.session.scalars(
-            db.select(Food)
-            .where(Food.user_id == user_id)
-            .order_by(Food.group, Food.name, Food.subtype)
-        ).all()
+        food_daos = db.session.scalars(Food.with_relations(Food.query_for_user(user_id))).all()
         return list(food_daos)
 
 
@@ -1050,6 +1448,19 @@ class Food(db.Model):
         return food_dao
 
 
+    @staticmethod
+    def get_many(user_id: int, food_ids: set[int]) -> dict[int, Food]:
+        """
+        The user's Foods with these IDs, by ID, in one query.  Any that aren't
+        found are left out.
+        """
+        if not food_ids:
+            return {}
+        return {dao.id: dao for dao in db.session.scalars(
+            db.select(Food).where(Food.user_id == user_id).where(Food.id.in_(food_ids))
+        )}
+
+
     @staticmethod
     def get_by_source_fdc_id(source: str, fdc_id: int) -> Food | None:
         return db.session.scalar(
@@ -1101,12 +1512,11 @@ class Food(db.Model):
                     else:
                         alt_nutrition = Nutrition(user_id)
                         alt_nutrition.from_schema(user_id, alt_request.nutrition)
-                        db.session.add(alt_nutrition)
-                        db.session.flush()
 
+                    # Flushed with its Nutrition, so that's never seen without an owner
                     alt_dao = NutritionAlternative()
                     alt_dao.food_id = new_food_dao.id
-                    alt_dao.nutrition_id = alt_nutrition.id
+                    alt_dao.nutrition = alt_nutrition
                     alt_dao.serving_value = alt_request.serving_value
                     alt_dao.serving_unit = alt_request.serving_unit
                     alt_dao.serving_unit_kind = alt_request.serving_unit_kind
@@ -1227,25 +1637,16 @@ class Food(db.Model):
     @staticmethod
     def delete_all_for_user(user_id: int) -> None:
         """
-        Delete all Food records for a particular User
+        Delete all Food records for a particular User, along with their
+        NutritionAlternatives and Nutrition records.  See purge.py.
         """
         logging.info(f"Deleting Food records for user {user_id}")
         try:
-            food_daos = db.session.scalars(db.select(Food).where(Food.user_id == user_id)).all()
-            for food_dao in food_daos:
-                # Food has a foreign key on Nutrition so it must be deleted first
-                nutrition_id = food_dao.nutrition_id
-                db.session.delete(food_dao)
-
-                # Delete its associated Nutrition record if it exists
-                if nutrition_id:
-                    nutrition_dao = db.session.get(Nutrition, nutrition_id)
-                    if nutrition_dao:
-                        db.session.delete(nutrition_dao)
-
+            from purge import Purge
+            report = Purge.delete_foods(user_id)
         except Exception as e:
             raise ValueError(f"Food records could not be deleted for user {user_id}: {str(e)}")
-        logging.info("Food records deleted")
+        logging.info(f"Food records deleted: {report}")
 
 
 ##############################
@@ -1309,19 +1710,9 @@ class Recipe(db.Model):
 
     # Return a JSON representation of this Recipe object
     def json(self) -> dict[str,Any]:
-        return {
-            "id": self.id,
-            "cuisine": self.cuisine,
-            "name": self.name,
-            "total_yield": self.total_yield,
-            "servings": self.servings,
-            "size_oz": self.size_oz,
-            "size_g": self.size_g,
-            "nutrition_id": self.nutrition_id,
-            "nutrition": self.nutrition.json(),
-            "price": self.price,
-            "parent_recipe_id": self.parent_recipe_id
-            }
+        data = _RECIPE_COLUMNS(self)
+        data["nutrition"] = self.nutrition.json()
+        return data
     
 
     @staticmethod
@@ -1333,13 +1724,14 @@ class Recipe(db.Model):
         return list(recipe_daos)
 
 
+    @staticmethod
+    def query_for_user(user_id: int) -> Select[tuple[Recipe]]:
+        return db.select(Recipe).where(Recipe.user_id == user_id).order_by(Recipe.cuisine, Recipe.name)
+
+
     @staticmethod
     def get_all_for_user(user_id: int) -> list[Recipe]:
-        recipe_daos = db.session.scalars(
-            db.select(Recipe)
-            .where(Recipe.user_id == user_id)
-            .order_by(Recipe.cuisine, Recipe.name)
-        ).all()
+        recipe_daos = db.session.scalars(Recipe.query_for_user(user_id).options(selectinload(Recipe.nutrition))).all()
         return list(recipe_daos)
 
 
@@ -1351,6 +1743,19 @@ class Recipe(db.Model):
         return recipe_dao
 
 
+    @staticmethod
+    def get_many(user_id: int, recipe_ids: set[int]) -> dict[int, Recipe]:
+        """
+        The user's Recipes with these IDs, by ID, in one query.  Any that aren't
+        found are left out.
+        """
+        if not recipe_ids:
+            return {}
+        return {dao.id: dao for dao in db.session.scalars(
+            db.select(Recipe).where(Recipe.user_id == user_id).where(Recipe.id.in_(recipe_ids))
+        )}
+
+
     @staticmethod
     def add_from_schema(user_id: int, recipe_request: RecipeRequest, keylists: dict[str,dict[int,int]] | None = None) -> Recipe:
         """Add a Recipe from a validated RecipeRequest schema."""
@@ -1530,39 +1935,17 @@ class Recipe(db.Model):
 
         This is a little tricky because an Ingredient in one Recipe can reference
         another Recipe, so we can't necessarily delete a Recipe even when all its 
-        own Ingredients have been removed.  So first we loop through all a User's
-        Recipes and delete their Ingredients, and THEN we loop through the Recipes
-        and delete them in a second pass.
+        own Ingredients have been removed.  So first we delete ALL the User's
+        Ingredients, and THEN we delete the Recipes.  The purge engine (see
+        purge.py) does this with set-based DELETEs rather than row by row.
         """
         logging.info(f"Deleting Recipe records for User {user_id}")
         try:
-            # Get all the Recipe records
-            recipe_daos = db.session.scalars(db.select(Recipe).where(Recipe.user_id == user_id)).all()
-            for recipe_dao in recipe_daos:
-                # Delete its child Ingredient records
-                ingredient_daos: list[Ingredient] = Ingredient.get_all_for_recipe(user_id, recipe_dao.id)
-                for ingredient_dao in ingredient_daos:
-                    db.session.delete(ingredient_dao)
-
-            # Flush so referential integrity won't be violated
-            db.session.flush()
-
-            # Now loop through the Recipes again and delete THEM this time, along 
-            # with their associated Nutrition record
-            for recipe_dao in recipe_daos:
-                # Recipe has a foreign key on Nutrition so it must be deleted first
-                nutrition_id = recipe_dao.nutrition_id
-                db.session.delete(recipe_dao)
-
-                # Delete its associated Nutrition record if it exists
-                if nutrition_id:
-                    nutrition_dao = db.session.get(Nutrition, nutrition_id)
-                    if nutrition_dao:
-                        db.session.delete(nutrition_dao)
-
+            from purge import Purge
+            report = Purge.delete_recipes(user_id)
         except Exception as e:
             raise ValueError(f"Recipe records could not be deleted for user {user_id}: {str(e)}")
-        logging.info("Recipe records deleted")
+        logging.info(f"Recipe records deleted: {report}")
 
 
     @staticmethod
@@ -1584,27 +1967,29 @@ class Recipe(db.Model):
                 if not recipe_nutrition_dao:
                     raise ValueError(f"Nutrition record {recipe_id}/{recipe_dao.nutrition_id} not found")
 
-            # Reset the nutrition and price otals
-            recipe_nutrition_dao.reset()
-            recipe_dao.price = 0
-            recipe_size_oz = 0.0
-            recipe_size_g = 0
-            modifier = 1
-
-            # Get the Recipe's Ingredients
+            # Get the Recipe's Ingredients, then the Foods and Recipes they refer to
+            # and those records' Nutrition, in one query each rather than per Ingredient
+            resolved_ingredients: list[tuple[Ingredient, Food | None, Recipe | None, Nutrition]] = []
             ingredient_daos: list[Ingredient] = Ingredient.get_all_for_recipe(user_id, recipe_id)
+            food_ids = {ingredient_dao.food_ingredient_id for ingredient_dao in ingredient_daos if ingredient_dao.food_ingredient_id}
+            recipe_ids = {ingredient_dao.recipe_ingredient_id for ingredient_dao in ingredient_daos if ingredient_dao.recipe_ingredient_id}
+            food_daos = Food.get_many(user_id, food_ids)
+            recipe_daos = Recipe.get_many(user_id, recipe_ids)
+            nutrition_ids = {dao.nutrition_id for dao in [*food_daos.values(), *recipe_daos.values()] if dao.nutrition_id}
+            nutrition_daos = Nutrition.get_many(user_id, nutrition_ids)
+
             for ingredient_dao in ingredient_daos:
                 # Get the corresponding Food or Recipe record
                 ingredient_nutrition_id = None
                 food_ingredient_dao = None
                 recipe_ingredient_dao = None
                 if ingredient_dao.food_ingredient_id and not ingredient_dao.recipe_ingredient_id:
-                    food_ingredient_dao = Food.get(user_id, ingredient_dao.food_ingredient_id)
+                    food_ingredient_dao = food_daos.get(ingredient_dao.food_ingredient_id)
                     if not food_ingredient_dao:
                         raise ValueError(f"Food Ingedient record {ingredient_dao.food_ingredient_id} not found")
                     ingredient_nutrition_id = food_ingredient_dao.nutrition_id
                 elif ingredient_dao.recipe_ingredient_id and not ingredient_dao.food_ingredient_id:
-                    recipe_ingredient_dao = Recipe.get(user_id, ingredient_dao.recipe_ingredient_id)
+                    recipe_ingredient_dao = recipe_daos.get(ingredient_dao.recipe_ingredient_id)
                     if not recipe_ingredient_dao:
                         raise ValueError(f"Recipe Ingedient record {ingredient_dao.recipe_ingredient_id} not found")
                     ingredient_nutrition_id = recipe_ingredient_dao.nutrition_id
@@ -1614,66 +1999,92 @@ class Recipe(db.Model):
                     raise ValueError(f"Nutrition ID for Ingredient record {ingredient_dao.id} could not be determined")
 
                 # Get the Food or Recipe's Nutrition record
-                ingredient_nutrition_dao = Nutrition.get(user_id, ingredient_nutrition_id)
+                ingredient_nutrition_dao = nutrition_daos.get(ingredient_nutrition_id)
                 if not ingredient_nutrition_dao:
                     raise ValueError(f"Nutrition record {ingredient_nutrition_id} not found")
 
-                # Add its nutrition data to the total. Recipe ingredients store
-                # whole-recipe nutrition, so scale by 1 / child servings first.
-                if recipe_ingredient_dao:
-                    modifier = 1 / recipe_ingredient_dao.servings if recipe_ingredient_dao.servings else 0
-                    recipe_nutrition_dao.sum(ingredient_nutrition_dao, ingredient_dao.servings, modifier)
-                else:
-                    modifier = 1
-                    recipe_nutrition_dao.sum(ingredient_nutrition_dao, ingredient_dao.servings)
-
-                recipe_size_oz += (getattr(ingredient_nutrition_dao, "serving_size_oz", 0) or 0) * ingredient_dao.servings * modifier
-                recipe_size_g += (getattr(ingredient_nutrition_dao, "serving_size_g", 0) or 0) * ingredient_dao.servings * modifier
-
-                # Add its price total
-                if food_ingredient_dao and food_ingredient_dao.price:
-                    recipe_dao.price = round(
-                        recipe_dao.price + (food_ingredient_dao.price/food_ingredient_dao.servings * ingredient_dao.servings),
-                        2,
-                    )
-                elif recipe_ingredient_dao and recipe_ingredient_dao.price:
-                    recipe_dao.price = round(
-                        recipe_dao.price + (recipe_ingredient_dao.price/recipe_ingredient_dao.servings * ingredient_dao.servings),
-                        2,
-                    )
-
-            recipe_dao.price = round(recipe_dao.price, 2)
-
-            # Store the calculated totals as-is (not per-serving). The frontend calculates
-            # and sends totals when manually editing recipes, and RecipesTable displays
-            # per-serving values by dividing by servings. So the database should store totals.
-            recipe_nutrition_dao.calories = round(getattr(recipe_nutrition_dao, "calories", 0) or 0)
-            recipe_nutrition_dao.total_fat_g = round(getattr(recipe_nutrition_dao, "total_fat_g", 0) or 0, 1)
-            recipe_nutrition_dao.saturated_fat_g = round(getattr(recipe_nutrition_dao, "saturated_fat_g", 0) or 0, 1)
-            recipe_nutrition_dao.trans_fat_g = round(getattr(recipe_nutrition_dao, "trans_fat_g", 0) or 0, 1)
-            recipe_nutrition_dao.cholesterol_mg = round(getattr(recipe_nutrition_dao, "cholesterol_mg", 0) or 0)
-            recipe_nutrition_dao.sodium_mg = round(getattr(recipe_nutrition_dao, "sodium_mg", 0) or 0)
-            recipe_nutrition_dao.total_carbs_g = round(getattr(recipe_nutrition_dao, "total_carbs_g", 0) or 0)
-            recipe_nutrition_dao.fiber_g = round(getattr(recipe_nutrition_dao, "fiber_g", 0) or 0)
-            recipe_nutrition_dao.total_sugar_g = round(getattr(recipe_nutrition_dao, "total_sugar_g", 0) or 0)
-            recipe_nutrition_dao.added_sugar_g = round(getattr(recipe_nutrition_dao, "added_sugar_g", 0) or 0)
-            recipe_nutrition_dao.protein_g = round(getattr(recipe_nutrition_dao, "protein_g", 0) or 0)
-            recipe_nutrition_dao.vitamin_d_mcg = round(getattr(recipe_nutrition_dao, "vitamin_d_mcg", 0) or 0)
-            recipe_nutrition_dao.calcium_mg = round(getattr(recipe_nutrition_dao, "calcium_mg", 0) or 0)
-            recipe_nutrition_dao.iron_mg = round(getattr(recipe_nutrition_dao, "iron_mg", 0) or 0, 1)
-            recipe_nutrition_dao.potassium_mg = round(getattr(recipe_nutrition_dao, "potassium_mg", 0) or 0)
-            recipe_nutrition_dao.serving_size_oz = round(getattr(recipe_nutrition_dao, "serving_size_oz", 0) or 0, 2)
-            recipe_nutrition_dao.serving_size_g = round(getattr(recipe_nutrition_dao, "serving_size_g", 0) or 0)
-
-            recipe_dao.size_oz = round(recipe_size_oz, 2)
-            recipe_dao.size_g = round(recipe_size_g)
+                resolved_ingredients.append((ingredient_dao, food_ingredient_dao, recipe_ingredient_dao, ingredient_nutrition_dao))
 
+            Recipe.apply_ingredient_totals(recipe_dao, recipe_nutrition_dao, resolved_ingredients)
             return recipe_dao
         
         except Exception as e:
             raise ValueError(f"Unable to recalculate Nutrition for recipe {recipe_id}: {str(e)}")
 
 
+    @staticmethod
+    def apply_ingredient_totals(
+        recipe_dao: Recipe,
+        recipe_nutrition_dao: Nutrition,
+        ingredients: list[tuple[Ingredient, Food | None, Recipe | None, Nutrition]],
+    ) -> Recipe:
+        """
+        Reset a Recipe's Nutrition, price and size totals and re-sum them from its
+        Ingredients.  Each Ingredient comes with the Food OR Recipe it refers to
+        and that record's Nutrition, already loaded -- this does no database access,
+        so bulk callers can load everything up front and call this once per Recipe.
+        """
+        # Reset the nutrition and price otals
+        recipe_nutrition_dao.reset()
+        recipe_dao.price = 0
+        recipe_size_oz = 0.0
+        recipe_size_g = 0
+        modifier = 1
+
+        for ingredient_dao, food_ingredient_dao, recipe_ingredient_dao, ingredient_nutrition_dao in ingredients:
+            # Add its nutrition data to the total. Recipe ingredients store
+            # whole-recipe nutrition, so scale by 1 / child servings first.
+            if recipe_ingredient_dao:
+                modifier = 1 / recipe_ingredient_dao.servings if recipe_ingredient_dao.servings else 0
+                recipe_nutrition_dao.sum(ingredient_nutrition_dao, ingredient_dao.servings, modifier)
+            else:
+                modifier = 1
+                recipe_nutrition_dao.sum(ingredient_nutrition_dao, ingredient_dao.servings)
+
+            recipe_size_oz += (getattr(ingredient_nutrition_dao, "serving_size_oz", 0) or 0) * ingredient_dao.servings * modifier
+            recipe_size_g += (getattr(ingredient_nutrition_dao, "serving_size_g", 0) or 0) * ingredient_dao.servings * modifier
+
+            # Add its price total
+            if food_ingredient_dao and food_ingredient_dao.price:
+                recipe_dao.price = round(
+                    recipe_dao.price + (food_ingredient_dao.price/food_ingredient_dao.servings * ingredient_dao.servings),
+                    2,
+                )
+            elif recipe_ingredient_dao and recipe_ingredient_dao.price:
+                recipe_dao.price = round(
+                    recipe_dao.price + (recipe_ingredient_dao.price/recipe_ingredient_dao.servings * ingredient_dao.servings),
+                    2,
+                )
+
+        recipe_dao.price = round(recipe_dao.price, 2)
+
+        # Store the calculated totals as-is (not per-serving). The frontend calculates
+        # and sends totals when manually editing recipes, and RecipesTable displays
+        # per-serving values by dividing by servings. So the database should store totals.
+        recipe_nutrition_dao.calories = round(getattr(recipe_nutrition_dao, "calories", 0) or 0)
+        recipe_nutrition_dao.total_fat_g = round(getattr(recipe_nutrition_dao, "total_fat_g", 0) or 0, 1)
+        recipe_nutrition_dao.saturated_fat_g = round(getattr(recipe_nutrition_dao, "saturated_fat_g", 0) or 0, 1)
+        recipe_nutrition_dao.trans_fat_g = round(getattr(recipe_nutrition_dao, "trans_fat_g", 0) or 0, 1)
+        recipe_nutrition_dao.cholesterol_mg = round(getattr(recipe_nutrition_dao, "cholesterol_mg", 0) or 0)
+        recipe_nutrition_dao.sodium_mg = round(getattr(recipe_nutrition_dao, "sodium_mg", 0) or 0)
+        recipe_nutrition_dao.total_carbs_g = round(getattr(recipe_nutrition_dao, "total_carbs_g", 0) or 0)
+        recipe_nutrition_dao.fiber_g = round(getattr(recipe_nutrition_dao, "fiber_g", 0) or 0)
+        recipe_nutrition_dao.total_sugar_g = round(getattr(recipe_nutrition_dao, "total_sugar_g", 0) or 0)
+        recipe_nutrition_dao.added_sugar_g = round(getattr(recipe_nutrition_dao, "added_sugar_g", 0) or 0)
+        recipe_nutrition_dao.protein_g = round(getattr(recipe_nutrition_dao, "protein_g", 0) or 0)
+        recipe_nutrition_dao.vitamin_d_mcg = round(getattr(recipe_nutrition_dao, "vitamin_d_mcg", 0) or 0)
+        recipe_nutrition_dao.calcium_mg = round(getattr(recipe_nutrition_dao, "calcium_mg", 0) or 0)
+        recipe_nutrition_dao.iron_mg = round(getattr(recipe_nutrition_dao, "iron_mg", 0) or 0, 1)
+        recipe_nutrition_dao.potassium_mg = round(getattr(recipe_nutrition_dao, "potassium_mg", 0) or 0)
+        recipe_nutrition_dao.serving_size_oz = round(getattr(recipe_nutrition_dao, "serving_size_oz", 0) or 0, 2)
+        recipe_nutrition_dao.serving_size_g = round(getattr(recipe_nutrition_dao, "serving_size_g", 0) or 0)
+
+        recipe_dao.size_oz = round(recipe_size_oz, 2)
+        recipe_dao.size_g = round(recipe_size_g)
+
+        return recipe_dao
+
+
 
 ##############################
 # DAILY LOG
@@ -1752,19 +2163,10 @@ class DailyLogItem(db.Model):
         return round((recipe_price / recipe_servings) * consumed_servings, 2)
 
     def json(self) -> dict[str, Any]:
-        return {
-            "id": self.id,
-            "user_id": self.user_id,
-            "date": self.date.isoformat(),
-            "recipe_id": self.recipe_id,
-            "food_id": self.food_id,
-            "servings": self.servings,
-            "ordinal": self.ordinal,
-            "notes": self.notes,
-            "nutrition_id": self.nutrition_id,
-            "nutrition": self.nutrition.json() if self.nutrition else None,
-            "price": self.price,
-        }
+        data = _DAILY_LOG_ITEM_COLUMNS(self)
+        data["date"] = self.date.isoformat()
+        data["nutrition"] = self.nutrition.json() if self.nutrition else None
+        return data
 
 
     # ------------------------------------------------------------------
@@ -1808,32 +2210,44 @@ class DailyLogItem(db.Model):
 
 
     @staticmethod
-    def get_by_date(user_id: int, date: datetime.date) -> list[DailyLogItem]:
-        """
-        Return all DailyLogItem entries for a specific date, ordered by ordinal.
-        """
-        entries = db.session.scalars(
+    def query_by_date(user_id: int, date: datetime.date) -> Select[tuple[DailyLogItem]]:
+        return (
             db.select(DailyLogItem)
             .where(DailyLogItem.user_id == user_id)
             .where(DailyLogItem.date == date)
             .order_by(DailyLogItem.ordinal)
-        ).all()
-        return list(entries)
+        )
 
 
     @staticmethod
-    def get_by_range(user_id: int, start: datetime.date, end: datetime.date) -> list[DailyLogItem]:
+    def get_by_date(user_id: int, date: datetime.date) -> list[DailyLogItem]:
         """
-        Return all DailyLogItem entries within an inclusive date range, ordered
-        by date then ordinal.  Used for weekly and monthly summary views.
+        Return all DailyLogItem entries for a specific date, ordered by ordinal,
+        with their Nutrition.
         """
-        entries = db.session.scalars(
+        entries = db.session.scalars(DailyLogItem.query_by_date(user_id, date).options(selectinload(DailyLogItem.nutrition))).all()
+        return list(entries)
+
+
+    @staticmethod
+    def query_by_range(user_id: int, start: datetime.date, end: datetime.date) -> Select[tuple[DailyLogItem]]:
+        return (
             db.select(DailyLogItem)
             .where(DailyLogItem.user_id == user_id)
             .where(DailyLogItem.date >= start)
             .where(DailyLogItem.date <= end)
             .order_by(DailyLogItem.date, DailyLogItem.ordinal)
-        ).all()
+        )
+
+
+    @staticmethod
+    def get_by_range(user_id: int, start: datetime.date, end: datetime.date) -> list[DailyLogItem]:
+        """
+        Return all DailyLogItem entries within an inclusive date range, ordered
+        by date then ordinal, with their Nutrition.  Used for weekly and monthly
+        summary views.
+        """
+        entries = db.session.scalars(DailyLogItem.query_by_range(user_id, start, end).options(selectinload(DailyLogItem.nutrition))).all()
         return list(entries)
 
 
@@ -1925,7 +2339,7 @@ class DailyLogItem(db.Model):
 
             if new_date != old_date:
                 # Close the ordinal gap on the old date.
-                siblings_on_old_date = DailyLogItem.get_by_date(user_id, old_date)
+                siblings_on_old_date = db.session.scalars(DailyLogItem.query_by_date(user_id, old_date))
                 for sibling in siblings_on_old_date:
                     if sibling.id != log_id and sibling.ordinal > log_dao.ordinal:
                         sibling.ordinal -= 1
@@ -1992,20 +2406,20 @@ class DailyLogItem(db.Model):
         """
         try:
             log_dao = DailyLogItem.get(user_id, daily_log_id)
+            # Get the snapshot now, so it's deleted in the same flush as the entry
+            # (and the change tracking doesn't have to go looking for its owner)
+            nutrition_dao = db.session.get(Nutrition, log_dao.nutrition_id) if log_dao.nutrition_id else None
 
             # Close the ordinal gap left by this deletion
-            siblings = DailyLogItem.get_by_date(user_id, log_dao.date)
+            siblings = db.session.scalars(DailyLogItem.query_by_date(user_id, log_dao.date))
             for sibling in siblings:
                 if sibling.id != daily_log_id and sibling.ordinal > log_dao.ordinal:
                     sibling.ordinal -= 1
 
             # Delete the entry and its snapshot
-            nutrition_id = log_dao.nutrition_id
             db.session.delete(log_dao)
-            if nutrition_id:
-                nutrition_dao = db.session.get(Nutrition, nutrition_id)
-                if nutrition_dao:
-                    db.session.delete(nutrition_dao)
+            if nutrition_dao:
+                db.session.delete(nutrition_dao)
 
         except Exception as e:
             raise ValueError(f"DailyLogItem entry {daily_log_id} could not be deleted: {str(e)}")
@@ -2015,20 +2429,11 @@ class DailyLogItem(db.Model):
     def delete_all_for_user(user_id: int) -> None:
         """
         Delete all DailyLogItem entries for a user, including their Nutrition
-        snapshots.  Called during account deletion.
+        snapshots.  See purge.py.
         """
         try:
-            daily_log_daos = db.session.scalars(
-                db.select(DailyLogItem).where(DailyLogItem.user_id == user_id)
-            ).all()
-            for daily_log_dao in daily_log_daos:
-                nutrition_id = daily_log_dao.nutrition_id
-                db.session.delete(daily_log_dao)
-                if nutrition_id:
-                    nutrition_dao = db.session.get(Nutrition, nutrition_id)
-                    if nutrition_dao:
-                        db.session.delete(nutrition_dao)
-
+            from purge import Purge
+            Purge.delete_daily_logs(user_id)
         except Exception as e:
             raise ValueError(f"DailyLogItem records could not be deleted for user {user_id}: {str(e)}")
 
@@ -2154,15 +2559,112 @@ class NutritionAlternative(db.Model):
         return round(weight_g / 28.3495, 2)
 
     def json(self) -> dict[str, Any]:
-        return {
-            "id": self.id,
-            "food_id": self.food_id,
-            "nutrition_id": self.nutrition_id,
-            "serving_value": self.serving_value,
-            "serving_unit": self.serving_unit,
-            "serving_unit_kind": self.serving_unit_kind,
-            "household_weight_g": self.household_weight_g,
-            "ordinal": self.ordinal,
-            "is_primary": self.is_primary,
-            "nutrition": self.nutrition.json() if self.nutrition else None,
-        }
+        data = _NUTRITION_ALTERNATIVE_COLUMNS(self)
+        data["nutrition"] = self.nutrition.json() if self.nutrition else None
+        return data
+
+
+
+##############################
+# SERIALIZERS
+##############################
+# The plain-column part of each json() method.  Columns that need converting or
+# that the API doesn't expose are excluded here and handled in json() itself.
+_NUTRITION_COLUMNS = ColumnSerializer(Nutrition)
+_FOOD_COLUMNS = ColumnSerializer(Food, exclude=("group", "price_date", "last_synced_at"))
+_RECIPE_COLUMNS = ColumnSerializer(Recipe, exclude=("user_id",))
+_DAILY_LOG_ITEM_COLUMNS = ColumnSerializer(DailyLogItem, exclude=("date",))
+_NUTRITION_ALTERNATIVE_COLUMNS = ColumnSerializer(NutritionAlternative)
+
+
+
+##############################
+# CHANGE TRACKING
+##############################
+# Which ChangeLog entity each kind of record is logged as.  A change to a
+# NutritionAlternative is logged as a change to its Food, since that's where the
+# clients see it.
+_MODEL_ENTITIES: dict[type, str] = {
+    Food: "foods",
+    NutritionAlternative: "foods",
+    Recipe: "recipes",
+    Ingredient: "ingredients",
+    DailyLogItem: "daily_logs",
+    Preferences: "preferences",
+}
+
+# The records that point at a Nutrition record, and so own it
+_NUTRITION_OWNERS: tuple[type, ...] = (Food, Recipe, DailyLogItem)
+
+
+@event.listens_for(Session, "after_flush")
+def _track_changes(session: Session, flush_context: Any) -> None:
+    """
+    Log every record changed by this flush in the ChangeLog, which also bumps the
+    CollectionVersion of every collection touched.
+
+    A Nutrition record doesn't know what it belongs to.  Usually its owner is in
+    the same flush (a new Food and its Nutrition, say) and that's enough.  When it
+    isn't (e.g. only a Food's calories changed) we look the owner up.  Likewise a
+    NutritionAlternative only knows its Food's ID, not whose Food it is.
+    """
+    changes: dict[int, dict[tuple[str, int], str]] = {}
+    nutrition_daos: dict[int, Nutrition] = {}
+    alt_food_ids: set[int] = set()
+    claimed_nutrition_ids: set[int] = set()
+
+    def _log(user_id: int, entity: str, entity_id: int, op: str) -> None:
+        # A deletion wins over any other change to the same record
+        user_changes = changes.setdefault(user_id, {})
+        if user_changes.get((entity, entity_id)) != ChangeLog.DELETE:
+            user_changes[(entity, entity_id)] = op
+
+    for instance in [*session.new, *session.dirty, *session.deleted]:
+        if instance in session.dirty and not session.is_modified(instance):
+            continue
+        if isinstance(instance, Nutrition):
+            nutrition_daos[instance.id] = instance
+            continue
+        if isinstance(instance, _NUTRITION_OWNERS + (NutritionAlternative,)) and instance.nutrition_id:
+            claimed_nutrition_ids.add(instance.nutrition_id)
+        entity = _MODEL_ENTITIES.get(type(instance))
+        if not entity:
+            continue
+        if isinstance(instance, NutritionAlternative):
+            alt_food_ids.add(instance.food_id)
+        elif instance.user_id is not None:
+            op = ChangeLog.DELETE if instance in session.deleted else ChangeLog.UPSERT
+            _log(instance.user_id, entity, instance.id, op)
+
+    orphan_ids = set(nutrition_daos) - claimed_nutrition_ids
+    if not changes and not alt_food_ids and not orphan_ids:
+        return
+    connection = session.connection()
+
+    if alt_food_ids:
+        # The Foods are usually loaded already (e.g. a new Food and its
+        # alternatives), so only look up the ones that aren't.  A Food deleted in
+        # this flush won't be found, and is already logged.
+        unloaded_food_ids: set[int] = set()
+        for food_id in alt_food_ids:
+            food_dao = session.identity_map.get(Session.identity_key(Food, food_id))
+            food_user_id = food_dao.__dict__.get("user_id") if food_dao is not None else None
+            if food_user_id is not None:
+                _log(food_user_id, "foods", food_id, ChangeLog.UPSERT)
+            else:
+                unloaded_food_ids.add(food_id)
+        if unloaded_food_ids:
+            for food_id, user_id in connection.execute(select(Food.id, Food.user_id).where(Food.id.in_(unloaded_food_ids))):
+                _log(user_id, "foods", food_id, ChangeLog.UPSERT)
+
+    for model in _NUTRITION_OWNERS + (NutritionAlternative,):
+        if not orphan_ids:
+            break
+        owner_id = model.food_id if model is NutritionAlternative else model.id
+        owners = connection.execute(select(owner_id, model.nutrition_id).where(model.nutrition_id.in_(sorted(orphan_ids)))).all()
+        for entity_id, nutrition_id in owners:
+            _log(nutrition_daos[nutrition_id].user_id, _MODEL_ENTITIES[model], entity_id, ChangeLog.UPSERT)
+        orphan_ids -= {nutrition_id for _, nutrition_id in owners}
+
+    for user_id, user_changes in changes.items():
+        ChangeLog.record(user_id, user_changes, connection)
@@ -0,0 +1,136 @@
+from __future__ import annotations
+from flask import Flask
+from models import db
+from logs import Logs
+import logging
+import os
+import signal
+import socket
+import sys
+import time
+
+# A single waitress process serves every request on one core: its threads take
+# turns holding the GIL, so bcrypt, JSON encoding and recipe recalculation
+# can't run side by side.  Prefork runs WEB_WORKERS waitress processes instead,
+# each with WEB_THREADS threads, all accepting on one listening socket:
+#
+#   - The app is built, and the startup work (checking the database connection,
+#     creating the schema) done, once, in the parent, before it forks.
+#   - Each worker throws away the database connections it inherited (they're
+#     the parent's sockets) and opens its own, and starts its own log writer
+#     thread (see logs.py).
+#   - A worker that dies is replaced.  SIGTERM or SIGINT to the parent stops
+#     them all.
+#
+# Anything a worker keeps in memory is its own: the response caches, and the
+# counters at /api/metrics (which are one worker's view).  The rate limits have
+# to be shared, or each worker would allow the full limit: they're in a SQLite
+# file by default (see ratelimit_storage.py), and Prefork won't start with
+# RATELIMIT_STORAGE_URI=memory://.
+#
+# Fork doesn't exist on Windows; there it's one waitress process, as before.
+
+RESPAWN_DELAY_SECONDS = 1.0
+
+
+class Prefork:
+    _workers: dict[int, int] = {}
+    _stopping = False
+
+    @staticmethod
+    def run(app: Flask, port: int, workers: int, threads: int) -> None:
+        """
+        Serve app on port, in workers processes of threads threads each.
+        """
+        from waitress import serve
+
+        if workers <= 1 or not hasattr(os, "fork"):
+            if workers > 1:
+                logging.warning("This platform can't fork; serving in one process")
+            serve(app, listen=f"*:{port}", threads=threads)
+            return
+
+        storage_uri = str(app.config.get("RATELIMIT_STORAGE_URI", "memory://"))
+        if storage_uri.startswith("memory://"):
+            logging.error(f"WEB_WORKERS is {workers}, but RATELIMIT_STORAGE_URI is {storage_uri}, "
+                          "so each worker would enforce the rate limits separately -- exiting.")
+            sys.exit(0)
+
+        if socket.has_dualstack_ipv6():
+            listener = socket.create_server(("", port), family=socket.AF_INET6, dualstack_ipv6=True)
+        else:
+            listener = socket.create_server(("", port))
+
+        # The workers mustn't share the parent's pooled connections
+        Prefork.reset_after_fork(app, close=True)
+
+        logging.info(f"Starting {workers} workers with {threads} threads each on port {port}")
+        signal.signal(signal.SIGTERM, Prefork._stop)
+        signal.signal(signal.SIGINT, Prefork._stop)
+        for worker in range(workers):
+            Prefork._spawn(app, listener, worker, threads)
+
+        while Prefork._workers:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+            except InterruptedError:
+                continue
+            worker = Prefork._workers.pop(pid, None)
+            if worker is None or Prefork._stopping:
+                continue
+            logging.error(f"Worker {worker} (pid {pid}) exited with status {os.waitstatus_to_exitcode(status)}; replacing it")
+            time.sleep(RESPAWN_DELAY_SECONDS)
+            Prefork._spawn(app, listener, worker, threads)
+        listener.close()
+
+
+    @staticmethod
+    def _spawn(app: Flask, listener: socket.socket, worker: int, threads: int) -> None:
+        pid = os.fork()
+        if pid:
+            Prefork._workers[pid] = worker
+            return
+
+        # In the worker.  Exit without unwinding into the parent's loop.
+        exit_code = 0
+        try:
+            from waitress import serve
+
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            Prefork._workers.clear()
+            Logs.after_fork()
+            Prefork.reset_after_fork(app)
+            logging.info(f"Worker {worker} started (pid {os.getpid()})")
+            serve(app, sockets=[listener], threads=threads)
+        except BaseException as e:
+            logging.exception(f"Worker {worker} failed: {e!r}")
+            exit_code = 1
+        finally:
+            os._exit(exit_code)
+
+
+    @staticmethod
+    def reset_after_fork(app: Flask, close: bool = False) -> None:
+        """
+        Replace the connection pools of app's engines with empty ones.  In a
+        forked worker close is False, so the connections are dropped without
+        closing them: they belong to the parent, and closing them here would
+        close them for it too.
+        """
+        with app.app_context():
+            for engine in db.engines.values():
+                engine.dispose(close=close)
+
+
+    @staticmethod
+    def _stop(signum: int, frame: object) -> None:
+        Prefork._stopping = True
+        logging.info(f"Stopping {len(Prefork._workers)} workers")
+        for pid in list(Prefork._workers):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
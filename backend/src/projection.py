@@ -0,0 +1,250 @@
+from __future__ import annotations
+from dataclasses import dataclass
+from typing import Any, Callable
+from sqlalchemy import Select, inspect
+from models import db, Food, Recipe, DailyLogItem, Ingredient, Nutrition, NutritionAlternative
+
+# The list endpoints return every field of every record, with its nutrition (and
+# for foods, every serving-size alternative) nested inside.  A screen that only
+# shows a few columns doesn't need most of that, so these endpoints also take:
+#
+#   ?fields=name,vendor,price      just these fields (plus id, always)
+#   ?fields=name,nutrition.calories     ...and just these nutrition fields
+#   ?include=nutrition             these related records, in full
+#   ?include=                      no related records at all
+#
+# Recipes can also include their ingredients, so a recipe screen doesn't need a
+# request per recipe to /api/recipe/<id>/ingredient:
+#
+#   ?include=ingredients           each recipe's Ingredient rows, by ordinal
+#   ?include=ingredient_names      ...with the name of each ingredient's food
+#                                  or recipe too (food_name, recipe_name)
+#
+# fields on its own means no related records, except the nutrition fields asked
+# for; include on its own means every field.  With neither, the records come back
+# exactly as they always have.
+#
+# This isn't a filter applied to the full records.  Only the columns needed for
+# the requested fields are SELECTed, and related records are only queried for if
+# they're included, in one query per kind of record (not one per row).
+
+@dataclass(frozen=True)
+class _Field:
+    columns: tuple[str, ...]
+    convert: Callable[..., Any] | None = None
+
+
+def _columns(model: Any, exclude: tuple[str, ...] = ()) -> dict[str, _Field]:
+    return {
+        attr.key: _Field((attr.key,)) for attr in inspect(model).column_attrs if attr.key not in exclude
+    }
+
+
+@dataclass(frozen=True)
+class _Entity:
+    model: Any
+    fields: dict[str, _Field]
+    relations: tuple[str, ...]
+
+
+@dataclass(frozen=True)
+class FieldSet:
+    entity: str
+    fields: tuple[str, ...]
+    include: frozenset[str]
+    # Which nutrition fields to send, if nutrition is included.  Empty means all.
+    nutrition_fields: tuple[str, ...] = ()
+
+
+class Projection:
+    # The fields match the keys of each model's json(), computed ones included
+    ENTITIES: dict[str, _Entity] = {
+        "foods": _Entity(
+            Food,
+            _columns(Food, exclude=("group", "price_date", "last_synced_at")) | {
+                "group": _Field(("group",), lambda group: group.name),
+                "size_oz": _Field(
+                    ("unit_type", "size_metric", "density", "size_imperial"),
+                    lambda *values: Food.computed_weights(*values)[0],
+                ),
+                "size_g": _Field(
+                    ("unit_type", "size_metric", "density", "size_imperial"),
+                    lambda *values: Food.computed_weights(*values)[1],
+                ),
+                "price_date": _Field(("price_date",), lambda value: value.strftime("%Y-%m-%d") if value else None),
+                "last_synced_at": _Field(("last_synced_at",), lambda value: value.isoformat() if value else None),
+            },
+            ("nutrition", "nutrition_alternatives"),
+        ),
+        "recipes": _Entity(
+            Recipe, _columns(Recipe, exclude=("user_id",)), ("nutrition", "ingredients", "ingredient_names"),
+        ),
+        "daily_logs": _Entity(
+            DailyLogItem,
+            _columns(DailyLogItem, exclude=("date",)) | {
+                "date": _Field(("date",), lambda value: value.isoformat()),
+            },
+            ("nutrition",),
+        ),
+    }
+    NUTRITION_FIELDS: tuple[str, ...] = tuple(_columns(Nutrition))
+    ALTERNATIVE_FIELDS: tuple[str, ...] = tuple(_columns(NutritionAlternative))
+    # The keys of Ingredient.json(), less user_id
+    INGREDIENT_FIELDS: tuple[str, ...] = (
+        "id", "recipe_id", "food_ingredient_id", "recipe_ingredient_id", "ordinal", "servings",
+    )
+
+    @staticmethod
+    def parse(entity: str, fields: str | None, include: str | None) -> FieldSet | None:
+        """
+        Turn the ?fields= and ?include= values into a FieldSet, or None if neither
+        was given (so the full records should be sent).
+        """
+        if fields is None and include is None:
+            return None
+        spec = Projection.ENTITIES[entity]
+
+        names: list[str] = ["id"]
+        nutrition_fields: list[str] = []
+        for name in Projection._split(fields) if fields is not None else list(spec.fields):
+            if name.startswith("nutrition.") and "nutrition" in spec.relations:
+                nutrition_field = name.removeprefix("nutrition.")
+                if nutrition_field not in Projection.NUTRITION_FIELDS:
+                    raise ValueError(f"Unknown field '{name}'")
+                if nutrition_field not in nutrition_fields:
+                    nutrition_fields.append(nutrition_field)
+            elif name not in spec.fields:
+                raise ValueError(f"Unknown field '{name}'")
+            elif name not in names:
+                names.append(name)
+
+        includes = set(Projection._split(include)) if include is not None else set()
+        for relation in sorted(includes):
+            if relation not in spec.relations:
+                raise ValueError(f"Unknown include '{relation}'")
+        if nutrition_fields:
+            includes.add("nutrition")
+        if "ingredient_names" in includes:
+            includes.add("ingredients")
+        return FieldSet(entity, tuple(names), frozenset(includes), tuple(nutrition_fields))
+
+
+    @staticmethod
+    def load(fieldset: FieldSet, statement: Select[Any]) -> list[dict[str, Any]]:
+        """
+        Run statement (a SELECT of the entity's model, with whatever WHERE, ORDER
+        BY and LIMIT the route needs), reading just the columns the fieldset needs.
+        """
+        spec = Projection.ENTITIES[fieldset.entity]
+        model = spec.model
+        fields = [(name, spec.fields[name]) for name in fieldset.fields]
+
+        columns = list(dict.fromkeys(column for _, field in fields for column in field.columns))
+        if "nutrition" in fieldset.include and "nutrition_id" not in columns:
+            columns.append("nutrition_id")
+        rows = db.session.execute(
+            statement.with_only_columns(*(getattr(model, column) for column in columns))
+        ).all()
+
+        records: list[dict[str, Any]] = []
+        for row in rows:
+            values = row._mapping
+            records.append({
+                name: field.convert(*(values[column] for column in field.columns)) if field.convert else values[field.columns[0]]
+                for name, field in fields
+            })
+
+        alternatives: dict[int, list[dict[str, Any]]] = {}
+        if "nutrition_alternatives" in fieldset.include:
+            alternatives = Projection._load_alternatives([record["id"] for record in records])
+
+        # One query for the nutrition of the records and of their alternatives.
+        # The alternatives always send all of theirs.
+        nutrition_ids = {alt["nutrition_id"] for alts in alternatives.values() for alt in alts}
+        if "nutrition" in fieldset.include:
+            nutrition_ids.update(row._mapping["nutrition_id"] for row in rows)
+        nutrition_columns = Projection.NUTRITION_FIELDS
+        if fieldset.nutrition_fields and not alternatives:
+            nutrition_columns = ("id", *fieldset.nutrition_fields)
+        nutrition = Projection._load_nutrition(nutrition_ids - {None}, nutrition_columns)
+
+        if "nutrition" in fieldset.include:
+            for record, row in zip(records, rows):
+                found = nutrition.get(row._mapping["nutrition_id"])
+                if found is not None and fieldset.nutrition_fields:
+                    found = {name: found[name] for name in fieldset.nutrition_fields}
+                record["nutrition"] = found
+        if "nutrition_alternatives" in fieldset.include:
+            for record in records:
+                for alt in alternatives.get(record["id"], []):
+                    alt["nutrition"] = nutrition.get(alt["nutrition_id"])
+                record["nutrition_alternatives"] = alternatives.get(record["id"], [])
+        if "ingredients" in fieldset.include:
+            ingredients = Projection._load_ingredients(
+                [record["id"] for record in records], "ingredient_names" in fieldset.include,
+            )
+            for record in records:
+                record["ingredients"] = ingredients.get(record["id"], [])
+        return records
+
+
+    @staticmethod
+    def _load_alternatives(food_ids: list[int]) -> dict[int, list[dict[str, Any]]]:
+        """
+        The NutritionAlternatives of these foods, by food ID, without their
+        nutrition.
+        """
+        alternatives: dict[int, list[dict[str, Any]]] = {}
+        if not food_ids:
+            return alternatives
+        rows = db.session.execute(
+            db.select(*(getattr(NutritionAlternative, column) for column in Projection.ALTERNATIVE_FIELDS))
+            .where(NutritionAlternative.food_id.in_(food_ids))
+            .order_by(NutritionAlternative.food_id, NutritionAlternative.ordinal, NutritionAlternative.id)
+        ).all()
+        for row in rows:
+            alternatives.setdefault(row.food_id, []).append(dict(row._mapping))
+        return alternatives
+
+
+    @staticmethod
+    def _load_ingredients(recipe_ids: list[int], with_names: bool) -> dict[int, list[dict[str, Any]]]:
+        """
+        The Ingredients of these recipes, by recipe ID, in one query however many
+        recipes there are.  with_names joins in the name of each ingredient's
+        food or recipe.
+        """
+        ingredients: dict[int, list[dict[str, Any]]] = {}
+        if not recipe_ids:
+            return ingredients
+        statement = (
+            db.select(*(getattr(Ingredient, column) for column in Projection.INGREDIENT_FIELDS))
+            .where(Ingredient.recipe_id.in_(recipe_ids))
+            .order_by(Ingredient.recipe_id, Ingredient.ordinal, Ingredient.id)
+        )
+        if with_names:
+            statement = (
+                statement
+                .add_columns(Food.name.label("food_name"), Recipe.name.label("recipe_name"))
+                .outerjoin(Food, Food.id == Ingredient.food_ingredient_id)
+                .outerjoin(Recipe, Recipe.id == Ingredient.recipe_ingredient_id)
+            )
+        for row in db.session.execute(statement).all():
+            ingredients.setdefault(row.recipe_id, []).append(dict(row._mapping))
+        return ingredients
+
+
+    @staticmethod
+    def _load_nutrition(nutrition_ids: set[int], columns: tuple[str, ...]) -> dict[int, dict[str, Any]]:
+        if not nutrition_ids:
+            return {}
+        rows = db.session.execute(
+            db.select(*(getattr(Nutrition, column) for column in dict.fromkeys(columns)))
+            .where(Nutrition.id.in_(nutrition_ids))
+        ).all()
+        return {row.id: dict(row._mapping) for row in rows}
+
+
+    @staticmethod
+    def _split(value: str) -> list[str]:
+        return [name.strip() for name in value.split(",") if name.strip()]
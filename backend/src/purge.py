@@ -0,0 +1,271 @@
+from __future__ import annotations
+from typing import Any
+from sqlalchemy import ColumnElement
+from cache import Cache
+from models import db, User, ChangeLog, CollectionVersion, IdempotencyKey, Food, Recipe, Ingredient, Nutrition, NutritionAlternative, DailyLogItem, Preferences
+import logging
+import time
+
+# The ORM way of deleting a user's data is to load every record, then call
+# db.session.delete() on each one, then db.session.get() its Nutrition record
+# and delete that too.  That's three or four round trips per row, and for a
+# user with a few thousand daily log entries it takes forever.
+#
+# This module does the same job with set-based DELETE statements instead.  The
+# tables are purged in foreign key dependency order (children first), and each
+# table is processed in chunks of at most PURGE_CHUNK_SIZE rows so that no single
+# statement has to lock (or log undo data for) an entire account's worth of rows.
+#
+# Note that the chunks all run inside the caller's transaction.  We don't commit
+# between chunks, because a half-purged account is worse than a slow purge.
+
+PURGE_CHUNK_SIZE = 500
+
+
+class PurgeReport:
+    """
+    What a purge did: how many rows were deleted from each table, and how long
+    it took.
+    """
+    def __init__(self, user_id: int):
+        self.user_id = user_id
+        self.rows: dict[str, int] = {}
+        self.elapsed_seconds: float = 0.0
+
+    def add(self, table_name: str, count: int) -> None:
+        self.rows[table_name] = self.rows.get(table_name, 0) + max(count, 0)
+
+    @property
+    def total_rows(self) -> int:
+        return sum(self.rows.values())
+
+    def __str__(self):
+        counts = ", ".join(f"{table}={count}" for table, count in self.rows.items())
+        return f"<PurgeReport user {self.user_id}: {counts} in {self.elapsed_seconds:.3f}s>"
+
+    def json(self) -> dict[str, Any]:
+        return {
+            "user_id": self.user_id,
+            "rows": dict(self.rows),
+            "total_rows": self.total_rows,
+            "elapsed_seconds": round(self.elapsed_seconds, 4),
+        }
+
+
+class Purge:
+    ###################
+    # WHOLE ACCOUNT
+    ###################
+    @staticmethod
+    def purge_user(user_id: int, include_preferences: bool = False, chunk_size: int = PURGE_CHUNK_SIZE) -> PurgeReport:
+        """
+        Delete all of a user's app data: DailyLogItems, Ingredients, Recipes,
+        Foods, NutritionAlternatives and every Nutrition record they own.
+        Preferences are only deleted when asked for, since reloading a user's
+        data shouldn't reset their column layout.  Asking for that means the
+        account itself is going, so the user's CollectionVersion counters,
+        ChangeLog and IdempotencyKeys are deleted too.
+
+        The User record itself is NOT deleted.  That's the caller's job.
+        """
+        report = PurgeReport(user_id)
+        started = time.perf_counter()
+
+        Purge.delete_daily_logs(user_id, report, chunk_size)
+        Purge.delete_recipes(user_id, report, chunk_size)
+        Purge.delete_foods(user_id, report, chunk_size)
+        if include_preferences:
+            Purge.delete_preferences(user_id, report)
+
+        # Sweep up any Nutrition records still owned by this user.  Everything that
+        # could reference them is gone by now, so what's left are orphans (e.g.
+        # leftovers from the old row-by-row deletion code, which didn't always
+        # find them).
+        Purge._delete_chunked(
+            Nutrition,
+            Nutrition.user_id == user_id,
+            report,
+            chunk_size,
+        )
+
+        if include_preferences:
+            for model in (ChangeLog, CollectionVersion, IdempotencyKey):
+                db.session.execute(
+                    db.delete(model)
+                    .where(model.user_id == user_id)
+                    .execution_options(synchronize_session=False)
+                )
+            # Its username and email address may be registered again, by a new user
+            Cache.invalidate(User.ID_CACHE)
+
+        report.elapsed_seconds = time.perf_counter() - started
+        logging.info(f"Purged data for user {user_id}: {report}")
+        return report
+
+
+    ###################
+    # PER ENTITY
+    ###################
+    @staticmethod
+    def delete_daily_logs(user_id: int, report: PurgeReport | None = None, chunk_size: int = PURGE_CHUNK_SIZE) -> PurgeReport:
+        """
+        Delete all DailyLogItem records for a user, along with their Nutrition
+        snapshots.
+        """
+        report = report or PurgeReport(user_id)
+        while True:
+            rows = db.session.execute(
+                db.select(DailyLogItem.id, DailyLogItem.nutrition_id)
+                .where(DailyLogItem.user_id == user_id)
+                .order_by(DailyLogItem.id)
+                .limit(chunk_size)
+            ).all()
+            if not rows:
+                break
+            log_ids = [row.id for row in rows]
+            nutrition_ids = [row.nutrition_id for row in rows if row.nutrition_id]
+
+            # DailyLogItem has a foreign key on Nutrition so it must be deleted first
+            report.add(DailyLogItem.__tablename__, Purge._delete_ids(DailyLogItem, log_ids))
+            report.add(Nutrition.__tablename__, Purge._delete_ids(Nutrition, nutrition_ids))
+        Purge._reset(user_id, report, {DailyLogItem: "daily_logs"})
+        return report
+
+
+    @staticmethod
+    def delete_recipes(user_id: int, report: PurgeReport | None = None, chunk_size: int = PURGE_CHUNK_SIZE) -> PurgeReport:
+        """
+        Delete all Recipe records for a user, along with their Ingredients and
+        Nutrition records.
+
+        Ingredients can point at other Recipes, and Recipe variations point at
+        their parent Recipe, so ALL the Ingredients go first and all the parent
+        links are severed before ANY Recipe is deleted.
+        """
+        report = report or PurgeReport(user_id)
+        Purge._delete_chunked(Ingredient, Ingredient.user_id == user_id, report, chunk_size)
+
+        db.session.execute(
+            db.update(Recipe)
+            .where(Recipe.user_id == user_id)
+            .where(Recipe.parent_recipe_id.is_not(None))
+            .values(parent_recipe_id=None)
+            .execution_options(synchronize_session=False)
+        )
+
+        while True:
+            rows = db.session.execute(
+                db.select(Recipe.id, Recipe.nutrition_id)
+                .where(Recipe.user_id == user_id)
+                .order_by(Recipe.id)
+                .limit(chunk_size)
+            ).all()
+            if not rows:
+                break
+            recipe_ids = [row.id for row in rows]
+            nutrition_ids = [row.nutrition_id for row in rows if row.nutrition_id]
+
+            report.add(Recipe.__tablename__, Purge._delete_ids(Recipe, recipe_ids))
+            report.add(Nutrition.__tablename__, Purge._delete_ids(Nutrition, nutrition_ids))
+        Purge._reset(user_id, report, {Recipe: "recipes", Ingredient: "ingredients"})
+        return report
+
+
+    @staticmethod
+    def delete_foods(user_id: int, report: PurgeReport | None = None, chunk_size: int = PURGE_CHUNK_SIZE) -> PurgeReport:
+        """
+        Delete all Food records for a user, along with their NutritionAlternatives
+        and all the Nutrition records behind both.
+
+        The caller must already have removed any DailyLogItems and Ingredients
+        that reference these Foods.
+        """
+        report = report or PurgeReport(user_id)
+        while True:
+            rows = db.session.execute(
+                db.select(Food.id, Food.nutrition_id)
+                .where(Food.user_id == user_id)
+                .order_by(Food.id)
+                .limit(chunk_size)
+            ).all()
+            if not rows:
+                break
+            food_ids = [row.id for row in rows]
+            nutrition_ids = {row.nutrition_id for row in rows if row.nutrition_id}
+
+            # The primary alternative shares the Food's own Nutrition record, hence the set
+            alt_rows = db.session.execute(
+                db.select(NutritionAlternative.id, NutritionAlternative.nutrition_id)
+                .where(NutritionAlternative.food_id.in_(food_ids))
+            ).all()
+            nutrition_ids.update(row.nutrition_id for row in alt_rows if row.nutrition_id)
+
+            report.add(NutritionAlternative.__tablename__, Purge._delete_ids(NutritionAlternative, [row.id for row in alt_rows]))
+            report.add(Food.__tablename__, Purge._delete_ids(Food, food_ids))
+            report.add(Nutrition.__tablename__, Purge._delete_ids(Nutrition, sorted(nutrition_ids)))
+        Purge._reset(user_id, report, {Food: "foods"})
+        return report
+
+
+    @staticmethod
+    def delete_preferences(user_id: int, report: PurgeReport | None = None) -> PurgeReport:
+        """
+        Delete all Preferences records for a user.  There are only ever a handful,
+        so no chunking.
+        """
+        report = report or PurgeReport(user_id)
+        result = db.session.execute(
+            db.delete(Preferences)
+            .where(Preferences.user_id == user_id)
+            .execution_options(synchronize_session=False)
+        )
+        report.add(Preferences.__tablename__, result.rowcount)  # type: ignore[attr-defined]
+        Purge._reset(user_id, report, {Preferences: "preferences"})
+        return report
+
+
+    ###################
+    # HELPERS
+    ###################
+    @staticmethod
+    def _delete_ids(model: Any, ids: list[int]) -> int:
+        """
+        DELETE FROM <model> WHERE id IN (<ids>).  Returns the number of rows deleted.
+        """
+        if not ids:
+            return 0
+        result = db.session.execute(
+            db.delete(model)
+            .where(model.id.in_(ids))
+            .execution_options(synchronize_session=False)
+        )
+        return int(result.rowcount)  # type: ignore[attr-defined]
+
+
+    @staticmethod
+    def _reset(user_id: int, report: PurgeReport, entities: dict[Any, str]) -> None:
+        """
+        These DELETEs bypass the ORM, so log a ChangeLog reset (which also bumps
+        the CollectionVersion) by hand for each {model: entity} that had rows deleted.
+        """
+        ChangeLog.reset(user_id, {entity for model, entity in entities.items() if report.rows.get(model.__tablename__)})
+
+
+    @staticmethod
+    def _delete_chunked(model: Any, criteria: ColumnElement[bool], report: PurgeReport, chunk_size: int) -> None:
+        """
+        Delete every row of <model> matching the criteria, chunk_size rows at a time.
+
+        MySQL won't let you put a LIMIT inside an IN (...) subquery, so each chunk
+        selects its IDs first and then deletes them by primary key.
+        """
+        while True:
+            ids = list(db.session.scalars(
+                db.select(model.id)
+                .where(criteria)
+                .order_by(model.id)
+                .limit(chunk_size)
+            ).all())
+            if not ids:
+                break
+            report.add(model.__tablename__, Purge._delete_ids(model, ids))
@@ -0,0 +1,101 @@
+from __future__ import annotations
+from collections import Counter
+from typing import Any
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+import re
+
+# A list endpoint that reads a relationship of each record it returns (say
+# food.nutrition in Food.json) runs one query for the list and then one more per
+# record: the "N+1" pattern.  It looks fine with the handful of records in a
+# test and falls over with a real user's thousand.
+#
+# QueryCapture records every SQL statement run while it's active:
+#
+#   with QueryCapture() as queries:
+#       ...
+#   queries.assert_budget(max_queries=4)
+#
+# and flags the N+1 pattern by its shape: the same SELECT, give or take its
+# parameters, run REPEAT_THRESHOLD or more times.  A test that sets up a few
+# more records than that will catch a query in a loop whatever its budget.
+#
+# The tests get it through the query_budget fixture (see tests/conftest.py).
+
+REPEAT_THRESHOLD = 3
+
+_LITERALS = (
+    (re.compile(r"'(?:[^']|'')*'"), "?"),
+    (re.compile(r"%\(\w+\)s|%s|:\w+"), "?"),
+    (re.compile(r"\b\d+(?:\.\d+)?\b"), "?"),
+    (re.compile(r"\bIN \((?:\?(?:, )?)+\)", re.IGNORECASE), "IN (...)"),
+    (re.compile(r"\s+"), " "),
+)
+
+
+class QueryCapture:
+    def __init__(self, engine: Engine | None = None) -> None:
+        # Default to the app's engine, when entered (so inside an app context)
+        self.engine = engine
+        self.statements: list[str] = []
+
+
+    def __enter__(self) -> QueryCapture:
+        if self.engine is None:
+            from models import db
+            self.engine = db.engine
+        event.listen(self.engine, "before_cursor_execute", self._record)
+        return self
+
+
+    def __exit__(self, *exc_info: Any) -> None:
+        event.remove(self.engine, "before_cursor_execute", self._record)
+
+
+    def _record(self, conn: Any, cursor: Any, statement: str, parameters: Any, context: Any, executemany: bool) -> None:
+        self.statements.append(statement)
+
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+
+    @staticmethod
+    def shape(statement: str) -> str:
+        """
+        statement with its literals and parameters (and IN lists of them)
+        replaced, so the same query with different values has the same shape.
+        """
+        shape = statement.strip()
+        for pattern, replacement in _LITERALS:
+            shape = pattern.sub(replacement, shape)
+        return shape
+
+
+    def repeated(self, threshold: int = REPEAT_THRESHOLD) -> dict[str, int]:
+        """
+        The SELECT shapes run at least threshold times, with how many times.
+        Writes aren't counted: a loop of INSERTs or UPDATEs is usually one per
+        record changed, and the ORM batches them where it can.
+        """
+        shapes = Counter(
+            QueryCapture.shape(statement) for statement in self.statements
+            if statement.lstrip()[:6].upper() == "SELECT"
+        )
+        return {shape: count for shape, count in shapes.most_common() if count >= threshold}
+
+
+    def assert_budget(self, max_queries: int | None = None, threshold: int = REPEAT_THRESHOLD) -> None:
+        """
+        Fail if more than max_queries statements were run, or if any SELECT was
+        repeated threshold or more times.
+        """
+        problems: list[str] = []
+        if max_queries is not None and self.count > max_queries:
+            problems.append(f"{self.count} SQL statements, over the budget of {max_queries}")
+        for shape, count in self.repeated(threshold).items():
+            problems.append(f"SELECT run {count} times (a query in a loop?): {shape}")
+        if problems:
+            statements = "\n".join(f"  {n}. {statement}" for n, statement in enumerate(self.statements, 1))
+            raise AssertionError("\n".join(problems) + "\nStatements run:\n" + statements)
@@ -0,0 +1,198 @@
+from __future__ import annotations
+from math import floor
+from typing import Any
+from limits.storage import SlidingWindowCounterSupport, Storage
+from limits.storage.base import TimestampedSlidingWindow
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+# Flask-Limiter keeps its counters in memory by default, so with WEB_WORKERS > 1
+# each worker counts separately and every limit ("3/hour" on register, contact,
+# resend_confirmation...) is really WEB_WORKERS times as much.  Redis would fix
+# that, but it's one more service to run for a handful of counters.
+#
+# SqliteStorage keeps them in a SQLite file instead, which every process on the
+# host can share.  It's registered with the limits library under the sqlite://
+# scheme, so it's chosen with
+#
+#   RATELIMIT_STORAGE_URI=sqlite:///path/to/ratelimit.db
+#
+# and app.py uses it, with a file in the temp directory, when
+# RATELIMIT_STORAGE_URI isn't set.  (Still set it to a Redis URI if you run
+# backend instances on more than one host.)
+#
+#   - The database is in WAL mode, memory-mapped, and not synced to disk on
+#     every write: losing the last few counters in a power cut doesn't matter.
+#   - Each check is one statement, or one short IMMEDIATE transaction for the
+#     sliding window, so concurrent checks from any number of processes can't
+#     both take the last slot.
+#   - Every EXPIRE_INTERVAL_SECONDS one check also deletes the expired counters.
+#
+# It supports the fixed window and sliding window counter strategies (not the
+# moving window, which keeps a row per hit); app.py uses the sliding window
+# counter, so a caller can't get twice the limit through by straddling the
+# boundary between two windows.  bench/bench_ratelimit.py times a check.
+
+SCHEME = "sqlite"
+EXPIRE_INTERVAL_SECONDS = 60
+BUSY_TIMEOUT_MS = 5000
+MMAP_SIZE = 16 * 1024 * 1024
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS ratelimit_counter (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL,
+    expires_at REAL NOT NULL
+) WITHOUT ROWID
+"""
+
+# Add to a live counter, or start a new one in place of an expired (or missing)
+# one, and return the new value
+_INCR = """
+INSERT INTO ratelimit_counter (key, value, expires_at) VALUES (:key, :amount, :expires_at)
+ON CONFLICT (key) DO UPDATE SET
+    value = CASE WHEN expires_at <= :now THEN excluded.value ELSE value + excluded.value END,
+    expires_at = CASE WHEN expires_at <= :now THEN excluded.expires_at ELSE expires_at END
+RETURNING value
+"""
+
+
+def default_uri() -> str:
+    return f"{SCHEME}:///{os.path.join(tempfile.gettempdir(), 'trackeats-ratelimit.db')}"
+
+
+class SqliteStorage(Storage, SlidingWindowCounterSupport, TimestampedSlidingWindow):
+    """
+    Rate limit storage in a SQLite database file, shared by every process that
+    opens it.
+    """
+    STORAGE_SCHEME = [SCHEME]
+
+    def __init__(self, uri: str | None = None, wrap_exceptions: bool = False, **options: Any) -> None:
+        path = (uri or default_uri()).split("://", 1)[1]
+        # sqlite:///relative or sqlite:////absolute, as SQLAlchemy has it
+        self.path = path[1:] if path.startswith("/") else path
+        if not self.path:
+            raise ValueError(f"No database file in rate limit storage URI {uri!r}")
+        self._local = threading.local()
+        self._next_expiry = 0.0
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+        with self._connection() as conn:
+            conn.execute(_SCHEMA)
+
+
+    @property
+    def base_exceptions(self) -> type[Exception] | tuple[type[Exception], ...]:
+        return sqlite3.Error
+
+
+    def _connection(self) -> sqlite3.Connection:
+        # One connection per thread, opened again in a forked worker (sqlite3
+        # connections can't be used across a fork)
+        local = self._local
+        conn = getattr(local, "conn", None)
+        if conn is None or local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT_MS / 1000, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")
+            conn.execute(f"PRAGMA mmap_size={MMAP_SIZE}")
+            conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+            local.conn = conn
+            local.pid = os.getpid()
+        return conn
+
+
+    def _expire(self, conn: sqlite3.Connection, now: float) -> None:
+        if now < self._next_expiry:
+            return
+        self._next_expiry = now + EXPIRE_INTERVAL_SECONDS
+        conn.execute("DELETE FROM ratelimit_counter WHERE expires_at <= ?", (now,))
+
+
+    def incr(self, key: str, expiry: int, amount: int = 1) -> int:
+        now = time.time()
+        conn = self._connection()
+        self._expire(conn, now)
+        return int(conn.execute(_INCR, {"key": key, "amount": amount, "expires_at": now + expiry, "now": now}).fetchone()[0])
+
+
+    def get(self, key: str) -> int:
+        row = self._connection().execute(
+            "SELECT value FROM ratelimit_counter WHERE key = ? AND expires_at > ?", (key, time.time())
+        ).fetchone()
+        return int(row[0]) if row else 0
+
+
+    def get_expiry(self, key: str) -> float:
+        now = time.time()
+        row = self._connection().execute(
+            "SELECT expires_at FROM ratelimit_counter WHERE key = ? AND expires_at > ?", (key, now)
+        ).fetchone()
+        return float(row[0]) if row else now
+
+
+    def check(self) -> bool:
+        try:
+            self._connection().execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+
+    def reset(self) -> int | None:
+        return self._connection().execute("DELETE FROM ratelimit_counter").rowcount
+
+
+    def clear(self, key: str) -> None:
+        self._connection().execute("DELETE FROM ratelimit_counter WHERE key = ?", (key,))
+
+
+    def acquire_sliding_window_entry(self, key: str, limit: int, expiry: int, amount: int = 1) -> bool:
+        if amount > limit:
+            return False
+        now = time.time()
+        previous_key, current_key = self.sliding_window_keys(key, expiry, now)
+        conn = self._connection()
+        self._expire(conn, now)
+        # Read both windows and take the slot in one write transaction, so no
+        # other process can take it in between
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            previous_count, previous_ttl, current_count, _ = self._window(conn, previous_key, current_key, expiry, now)
+            if floor(previous_count * previous_ttl / expiry + current_count) + amount > limit:
+                acquired = False
+            else:
+                # Twice the expiry: it's the previous window for the next one
+                conn.execute(_INCR, {"key": current_key, "amount": amount, "expires_at": now + 2 * expiry, "now": now}).fetchone()
+                acquired = True
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return acquired
+
+
+    def get_sliding_window(self, key: str, expiry: int) -> tuple[int, float, int, float]:
+        now = time.time()
+        previous_key, current_key = self.sliding_window_keys(key, expiry, now)
+        return self._window(self._connection(), previous_key, current_key, expiry, now)
+
+
+    def clear_sliding_window(self, key: str, expiry: int) -> None:
+        previous_key, current_key = self.sliding_window_keys(key, expiry, time.time())
+        self._connection().execute("DELETE FROM ratelimit_counter WHERE key IN (?, ?)", (previous_key, current_key))
+
+
+    def _window(self, conn: sqlite3.Connection, previous_key: str, current_key: str, expiry: int, now: float) -> tuple[int, float, int, float]:
+        counts = dict(conn.execute(
+            "SELECT key, value FROM ratelimit_counter WHERE key IN (?, ?) AND expires_at > ?", (previous_key, current_key, now)
+        ).fetchall())
+        previous_count = int(counts.get(previous_key, 0))
+        current_count = int(counts.get(current_key, 0))
+        # The same arithmetic as the limits library's own storages
+        previous_ttl = (1 - (((now - expiry) / expiry) % 1)) * expiry if previous_count else 0.0
+        current_ttl = (1 - ((now / expiry) % 1)) * expiry + expiry
+        return previous_count, previous_ttl, current_count, current_ttl
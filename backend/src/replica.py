@@ -0,0 +1,94 @@
+from __future__ import annotations
+from typing import Any
+from flask import current_app, g, has_app_context
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event, func, select
+from metrics import Metrics
+import datetime
+import os
+
+# Reads far outnumber writes, so they can be spread onto a MySQL read replica.
+# Set DB_REPLICA_HOSTNAME and app.py binds a second engine, "replica", to it
+# (same database name and credentials as the primary).
+#
+# Which queries go there: those of a GET request to a route behind jwt_required
+# (see routes.py), i.e. the signed-in user reading their foods, recipes, daily
+# log, the catalog...  Everything else -- writes, the admin and auth routes,
+# anything outside a request -- uses the primary, as before.  Inside a replica
+# request the session still sends a flush, and every query after it, to the
+# primary.
+#
+# A replica lags the primary a little, so a user who has just saved something
+# could read their old data back.  To stop that, a user who has written in the
+# last REPLICA_READ_YOUR_WRITES_SECONDS (default 10) reads from the primary.
+# "Written" comes from their CollectionVersion stamps, which every write bumps,
+# and which are checked on the primary: one small query, and it works across
+# worker processes, and for writes from the user's other devices.
+#
+# db_replica_requests_total counts the requests by where they read from, and
+# why: target="replica", or target="primary" with reason="recent_write".
+
+REPLICA_BIND = "replica"
+REPLICA_REQUESTS_METRIC = "db_replica_requests_total"
+
+# Set on flask.g for a request whose reads may use the replica
+_USE_REPLICA = "db_use_replica"
+
+
+class RoutingSession(Session):
+    """
+    Flask-SQLAlchemy's session, sending the reads of a request marked by
+    Replica.route_reads to the replica engine.
+    """
+    def get_bind(self, mapper: Any | None = None, clause: Any | None = None, bind: Any | None = None, **kwargs: Any) -> Any:
+        if bind is None and not self._flushing and not self.info.get("wrote") and has_app_context() and g.get(_USE_REPLICA):
+            return self._db.engines[REPLICA_BIND]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+@event.listens_for(RoutingSession, "after_flush")
+def _after_flush(session: RoutingSession, flush_context: Any) -> None:
+    # Read what was just written from where it was written, for the rest of the
+    # request (the session is thrown away at the end of it)
+    session.info["wrote"] = True
+
+
+class Replica:
+    @staticmethod
+    def enabled() -> bool:
+        return REPLICA_BIND in (current_app.config.get("SQLALCHEMY_BINDS") or {})
+
+
+    @staticmethod
+    def read_your_writes_window() -> datetime.timedelta:
+        return datetime.timedelta(seconds=float(os.environ.get("REPLICA_READ_YOUR_WRITES_SECONDS", "10")))
+
+
+    @staticmethod
+    def route_reads(identity: str) -> bool:
+        """
+        Send the current request's reads to the replica, unless the user with
+        this JWT identity has written too recently.  Returns whether it did.
+        """
+        from crypto import Crypto
+        from models import db, User, CollectionVersion
+
+        if not Replica.enabled():
+            return False
+
+        # On the primary, and on a connection of its own, so the route's session
+        # hasn't started a transaction yet
+        with db.engine.connect() as conn:
+            last_write = conn.scalar(
+                select(func.max(CollectionVersion.modified_at))
+                .join(User, User.id == CollectionVersion.user_id)
+                .where(User.email_addr_hash == Crypto.hash(identity))
+            )
+        now = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+        if last_write is not None and now - last_write < Replica.read_your_writes_window():
+            Metrics.increment(REPLICA_REQUESTS_METRIC, target="primary", reason="recent_write")
+            return False
+
+        setattr(g, _USE_REPLICA, True)
+        Metrics.increment(REPLICA_REQUESTS_METRIC, target="replica")
+        return True
@@ -3,9 +3,9 @@ import logging
 from functools import wraps
 from datetime import datetime, timedelta, timezone
 from typing import Any, Callable, ParamSpec, TypeVar, cast
-from flask import Blueprint, abort, jsonify, make_response, redirect, request
+from flask import Blueprint, Response, abort, jsonify, make_response, redirect, request, stream_with_context
 from flask_jwt_extended import (
-    jwt_required,  # type:ignore
+    jwt_required as _jwt_required,  # type:ignore
     create_access_token,  # type:ignore
     get_jwt_identity,  # type:ignore
     verify_jwt_in_request, # type:ignore
@@ -13,24 +13,31 @@ from flask_jwt_extended import (
 )
 from pydantic import ValidationError
 from sendmail import Sendmail
-from models import db, User, Preferences, UserStatus, Food, Recipe, Ingredient, DailyLogItem
+from models import db, User, Preferences, UserStatus, Food, Recipe, Ingredient, DailyLogItem, CollectionVersion, ChangeLog, IdempotencyKey
 from schemas import (
     RegistrationRequest, ResendConfirmationRequest, LoginRequest, SocialLoginRequest, SocialIdentityClaims,
     ContactRequest,
     FoodRequest, RecipeRequest,
-    DailyLogItemRequest, DailyLogItemUpdateRequest, PreferencesRequest
+    DailyLogItemRequest, DailyLogItemUpdateRequest, PreferencesRequest,
+    BatchOperation, BatchRequest,
 )
+from cache import Cache
 from crypto import Crypto
 from data import Data
+from exporter import Exporter
+from idempotency import Idempotency, IDEMPOTENCY_HEADER
+from metrics import Metrics
+from replica import Replica
+from purge import Purge
+from sync import Sync, SYNC_PAGE_SIZE
+from projection import Projection, FieldSet
+from columnar import Columnar, COLUMNAR_MIMETYPE
 from sqlalchemy.sql import text
 from sqlalchemy import or_, func
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.exc import IntegrityError
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
-from google.oauth2 import id_token as google_id_token
-from google.auth.transport import requests as grequests
-import requests as req
 
 from usda_fdc_importer import USDAFdcImporter, USDAFdcImporterError, USDA_SOURCE
 
@@ -115,9 +122,27 @@ def role_required(*allowed_roles: str) -> Callable[[F], F]:
     return decorator
 
 
+def jwt_required(*args: Any, **kwargs: Any) -> Callable[[F], F]:
+    """
+    flask_jwt_extended's jwt_required.  A GET behind it only reads the user's
+    own data, so its queries may go to the read replica (see replica.py).
+    """
+    def decorator(f: F) -> F:
+        @wraps(f)
+        def decorated(*f_args: Any, **f_kwargs: Any) -> Any:
+            if request.method == "GET" and Replica.enabled():
+                Replica.route_reads(str(get_jwt_identity()))
+            return f(*f_args, **f_kwargs)
+        return cast(F, _jwt_required(*args, **kwargs)(decorated))
+    return decorator
+
+
 def write_required(f: F) -> F:
     """
     Allow authenticated writes for all roles except readonly.
+
+    A write sent with an Idempotency-Key header is applied at most once; repeats
+    get the stored response (see idempotency.py).
     """
     @wraps(f)
     def decorated(*args: Any, **kwargs: Any) -> Any:
@@ -126,6 +151,9 @@ def write_required(f: F) -> F:
         roles = _roles_from_claims(claims)
         if Data.ROLE_READONLY in roles:
             abort(403, description="Forbidden: readonly role cannot modify data")
+        idempotency_key = request.headers.get(IDEMPOTENCY_HEADER)
+        if idempotency_key is not None:
+            return Idempotency.handle(idempotency_key, str(get_jwt_identity()), _get_request_user_id, lambda: f(*args, **kwargs))
         return f(*args, **kwargs)
     return cast(F, decorated)
 
@@ -210,6 +238,22 @@ def _is_admin_request() -> bool:
     return Data.ROLE_ADMIN in roles
 
 
+def _apply_starter_policy(owner_id: int, food_data: FoodRequest, is_admin: bool, update: bool) -> FoodRequest:
+    """
+    Only admins can set or change a Food's starter flag.  Non-admin user-created
+    Foods are always non-starter records, and a non-admin update preserves
+    whatever value is currently stored on the record.
+    """
+    if is_admin:
+        return food_data
+    if not update:
+        return food_data.model_copy(update={"starter_food": False})
+    if food_data.id is None:
+        raise ValueError("Food ID is required for update")
+    current_food = Food.get(owner_id, food_data.id)
+    return food_data.model_copy(update={"starter_food": current_food.starter_food})
+
+
 def _get_json_payload() -> dict[str, Any]:
     payload = request.get_json(silent=True)
     if isinstance(payload, dict):
@@ -325,6 +369,7 @@ def verify_turnstile(token: str, ip: str) -> bool:
     if not normalized_token:
         return False
 
+    import requests as req  # type: ignore
     res = req.post(
         "https://challenges.cloudflare.com/turnstile/v0/siteverify",
         data={
@@ -482,8 +527,8 @@ def db_load():
 @log_route
 def db_export():
     """
-    EXPORT (Admin only) - Export selected data to JSON files for long-term storage
-    and reloading purposes.
+    EXPORT (Admin only) - Export selected data to NDJSON files in ./data for
+    long-term storage and reloading purposes.
     """
     try:
         with db.session.begin():
@@ -506,6 +551,198 @@ def db_export():
         return {"msg": msg}, 200
 
 
+@bp.route("/api/db/compact", methods=["GET"])
+@admin_required
+@log_route
+def db_compact():
+    """
+    COMPACT (Admin only) - Drop ChangeLog entries that a later entry for the same
+    record supersedes.  Clients syncing from any cursor are unaffected.
+    """
+    try:
+        with db.session.begin():
+            deleted = ChangeLog.compact()
+    except Exception as e:
+        msg = "Change log compaction failed: " + str(e)
+        logging.error(msg)
+        return {"msg": msg}, 500
+    else:
+        msg = f"Change log compaction complete: {deleted} entries deleted"
+        logging.info(msg)
+        return {"msg": msg}, 200
+
+
+@bp.route("/api/metrics", methods=["GET"])
+@admin_required
+@log_route
+def get_metrics():
+    """
+    METRICS (Admin only) - Every counter and histogram this process has collected
+    (per-route latency, SQL statements and response sizes, cache hit rates...) in
+    the Prometheus text format.  See instrumentation.py.
+    """
+    return Response(Metrics.prometheus(), mimetype="text/plain; version=0.0.4"), 200
+
+
+##############################
+# CONDITIONAL GET
+##############################
+# The clients re-fetch whole collections (all Foods, all Recipes...) every time
+# a screen mounts.  To make that cheap when nothing has changed, those responses
+# carry an ETag derived from the user's CollectionVersion counters, and a request
+# whose If-None-Match still matches gets a 304 before any records are loaded.
+CONDITIONAL_GET_METRIC = "conditional_get_total"
+
+def _collection_etag(user_id: int, collections: tuple[str, ...]) -> str:
+    """
+    The ETag for this request's response.  The query string and the format
+    asked for are part of the variant, so different representations of the
+    same data get different tags.
+    """
+    variant = request.full_path
+    if Columnar.wanted():
+        variant += f" {COLUMNAR_MIMETYPE}"
+    return CollectionVersion.etag(user_id, collections, variant=variant)
+
+
+def _not_modified(etag: str) -> Response | None:
+    """
+    Return a 304 response if the client's cached copy is still current, or None
+    if the full response is needed.  Either way, count the outcome, so we can see
+    how often the cache is paying off:
+        hit   - the client's copy was current (304)
+        stale - the client had a copy, but it was out of date
+        none  - the client didn't send If-None-Match
+    """
+    route = request.url_rule.rule if request.url_rule else request.path
+    if not request.if_none_match:
+        result = "none"
+    elif request.if_none_match.contains_weak(etag):
+        result = "hit"
+    else:
+        result = "stale"
+    Metrics.increment(CONDITIONAL_GET_METRIC, route=route, result=result)
+
+    if result != "hit":
+        return None
+    logging.info("Not modified")
+    return _with_etag(Response(status=304), etag)
+
+
+def _with_etag(response: Response, etag: str) -> Response:
+    # no-cache means "cache it, but always check with us first", which is what
+    # makes the client send If-None-Match next time.
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "private, no-cache"
+    response.vary.add("Accept")
+    return response
+
+
+##############################
+# USER DATA EXPORT
+##############################
+def _http_last_modified(modified_at: datetime | None) -> datetime | None:
+    """
+    Turn a CollectionVersion timestamp into a Last-Modified value.
+
+    HTTP dates only have whole-second resolution, so a change later in the same
+    second would look unchanged to a client that got the truncated time.  We
+    therefore only hand out a Last-Modified once its second is over; any later
+    change is then guaranteed to land in a later second.
+    """
+    if modified_at is None:
+        return None
+    truncated = modified_at.replace(microsecond=0)
+    if datetime.now(timezone.utc) < truncated + timedelta(seconds=1):
+        return None
+    return truncated
+
+
+@bp.route("/api/export", methods=["GET"])
+@jwt_required()
+@rate_limited("10/hour")
+@log_route
+def export_user_data():
+    """
+    EXPORT - Download all of this user's data (Foods, Recipes, Ingredients, Daily
+    Log entries and Preferences) as NDJSON files in a zip (?format=zip, the
+    default) or gzipped tar (?format=tar) archive.
+
+    The archive is streamed to the client as it's built, with the rows read a page
+    at a time, so memory use doesn't grow with the size of the account.  Supports
+    If-Modified-Since: if nothing has changed, the response is 304 with no body.
+    """
+    try:
+        archive_format = str(request.args.get("format", "zip")).lower()
+        if archive_format not in Exporter.ARCHIVE_FORMATS:
+            raise ValueError(f"format must be one of: {', '.join(Exporter.ARCHIVE_FORMATS)}")
+
+        with db.session.begin():
+            user_id = _get_request_user_id()
+            last_modified = _http_last_modified(CollectionVersion.last_modified(user_id))
+    except Exception as e:
+        msg = f"Data export failed: {str(e)}"
+        logging.error(msg)
+        return jsonify({"msg": msg}), 400
+
+    if last_modified and request.if_modified_since and last_modified <= request.if_modified_since:
+        logging.info("Data export not modified")
+        not_modified = Response(status=304)
+        not_modified.last_modified = last_modified
+        return not_modified
+
+    def _generate():
+        # One transaction for the whole archive, so every file comes from the same snapshot
+        try:
+            with db.session.begin():
+                yield from Exporter.iter_archive(user_id, archive_format)
+        except Exception as e:
+            # The status line has already gone out, so all we can do is cut the
+            # download short; the client will see a truncated archive.
+            logging.error(f"Data export failed mid-stream: {str(e)}")
+            raise
+        else:
+            logging.info("Data export complete")
+
+    mimetype, extension = Exporter.ARCHIVE_FORMATS[archive_format]
+    response = Response(stream_with_context(_generate()), mimetype=mimetype)
+    response.headers["Content-Disposition"] = f'attachment; filename="trackeats-export.{extension}"'
+    response.headers["Cache-Control"] = "private, no-cache"
+    if last_modified:
+        response.last_modified = last_modified
+    return response
+
+
+##############################
+# DELTA SYNC
+##############################
+@bp.route("/api/sync", methods=["GET"])
+@jwt_required()
+@log_route
+def sync_changes():
+    """
+    SYNC - Return what changed in this user's data since the client's cursor
+    (?since=<cursor>), or everything if there's no cursor.  See sync.py for the
+    response format.
+    """
+    try:
+        since = Sync.parse_cursor(request.args.get("since"))
+        limit = min(int(request.args.get("limit", SYNC_PAGE_SIZE)), SYNC_PAGE_SIZE)
+        if limit < 1:
+            raise ValueError("limit must be at least 1")
+
+        with db.session.begin():
+            user_id = _get_request_user_id()
+            changes = Sync.changes(user_id, since, limit)
+    except Exception as e:
+        msg = f"Sync failed: {str(e)}"
+        logging.error(msg)
+        return jsonify({"msg": msg}), 400
+    else:
+        logging.info(f"Sync from {since} to {changes['cursor']} complete")
+        return jsonify(changes), 200
+
+
 ##############################
 # REGISTRATION ^& LOGIN
 ##############################
@@ -540,6 +777,8 @@ def _verify_google_token(token: str, platform: str) -> dict[str, Any]:
     is_id_token = token.count('.') == 2
 
     if is_id_token:
+        from google.oauth2 import id_token as google_id_token
+        from google.auth.transport import requests as grequests
         verified = cast(Any, google_id_token).verify_oauth2_token(
             token,
             cast(Any, grequests).Request(),
@@ -1221,8 +1460,7 @@ def delete_user():
             if user_dao.id in (Data.GUEST_USER_ID, Data.ADMIN_USER_ID, Data.TEST_USER_ID):
                 raise ValueError(f"The account '{user_dao.username}' may not be deleted.")
             
-            Recipe.delete_all_for_user(user_id)
-            Food.delete_all_for_user(user_id)
+            Purge.purge_user(user_id, include_preferences=True)
             db.session.delete(user_dao)
 
     except Exception as e:
@@ -1230,6 +1468,9 @@ def delete_user():
         logging.error(msg)
         return jsonify({"msg": msg}), 500
     else:
+        # Now that the user is gone for good, so are its cached ID lookups (a
+        # lookup made during the deletion could have cached the ID again)
+        Cache.invalidate(User.ID_CACHE)
         msg = f"User record deleted for user {user_id} '{email}'"
         logging.info(msg)
         return jsonify({"msg": msg}), 200
@@ -1253,8 +1494,7 @@ def admin_delete_user(username: str):
             if user_id in (Data.GUEST_USER_ID, Data.ADMIN_USER_ID, Data.TEST_USER_ID):
                 raise ValueError(f"The account '{username}' may not be deleted.")
 
-            Recipe.delete_all_for_user(user_id)
-            Food.delete_all_for_user(user_id)
+            Purge.purge_user(user_id, include_preferences=True)
             db.session.delete(user_dao)
 
     except Exception as e:
@@ -1262,6 +1502,9 @@ def admin_delete_user(username: str):
         logging.error(msg)
         return jsonify({"msg": msg}), 500
     else:
+        # Now that the user is gone for good, so are its cached ID lookups (a
+        # lookup made during the deletion could have cached the ID again)
+        Cache.invalidate(User.ID_CACHE)
         msg = f"Admin deleted user {user_id} '{username}'"
         logging.info(msg)
         return jsonify({"msg": msg}), 200
@@ -1285,7 +1528,12 @@ def get_preferences(context: str):
             if not user_id:
                 raise ValueError(f"Could not retrieve user record for email '{email}'")
 
-            prefs = Preferences.get(user_id, context) or {}
+            etag = _collection_etag(user_id, (CollectionVersion.PREFERENCES,))
+            not_modified = _not_modified(etag)
+            if not_modified:
+                return not_modified
+
+            prefs = Preferences.get(user_id, context, version=etag) or {}
     except Exception as e:
         msg = f"Preference records could not be retrieved: {str(e)}"
         logging.error(msg)
@@ -1293,7 +1541,7 @@ def get_preferences(context: str):
     else:
         msg = "Preferences retrieved"
         logging.info(msg)
-        return jsonify({"context": context, "preferences": prefs}), 200
+        return _with_etag(jsonify({"context": context, "preferences": prefs}), etag), 200
 
 
 @bp.route("/api/preferences/<string:context>", methods = ["PUT"])
@@ -1354,6 +1602,28 @@ def whoami():
         return jsonify(logged_in_as=email), 200
 
 
+##############################
+# LIST REPRESENTATIONS
+##############################
+def _requested_fieldset(entity: str) -> FieldSet | None:
+    """
+    The ?fields= and ?include= of a list request (see projection.py), or None
+    if the client wants the full records.
+    """
+    return Projection.parse(entity, request.args.get("fields"), request.args.get("include"))
+
+
+def _list_response(records: list[dict[str, Any]]) -> Response:
+    """
+    The records as a JSON list, or as a columnar table if the client asked for
+    one (see columnar.py).  Either way the response says it depends on Accept,
+    so a cache doesn't hand one format to a client that asked for the other.
+    """
+    response = Columnar.response(records) if Columnar.wanted() else jsonify(records)
+    response.vary.add("Accept")
+    return response
+
+
 ##############################
 # FOOD
 ##############################
@@ -1369,10 +1639,20 @@ def get_foods():
         with db.session.begin():
             owner_id = _get_effective_food_owner_id()
 
+            # If the client's copy is current, don't bother loading anything
+            etag = _collection_etag(owner_id, (CollectionVersion.FOODS,))
+            not_modified = _not_modified(etag)
+            if not_modified:
+                return not_modified
+
             # Get all the Foods associated with that owner_id
-            food_daos = Food.get_all_for_user(owner_id)
-            for food_dao in food_daos:
-                foods.append(food_dao.json())
+            fieldset = _requested_fieldset("foods")
+            if fieldset:
+                foods = Projection.load(fieldset, Food.query_for_user(owner_id))
+            else:
+                food_daos = Food.get_all_for_user(owner_id)
+                for food_dao in food_daos:
+                    foods.append(food_dao.json())
     except Exception as e:
         msg = f"Food records could not be retrieved: {str(e)}"
         logging.error(msg)
@@ -1380,7 +1660,7 @@ def get_foods():
     else:
         msg = "Food records retrieved"
         logging.info(msg)
-        return jsonify(foods), 200
+        return _with_etag(_list_response(foods), etag), 200
 
 
 @bp.route("/api/food/<int:food_id>", methods = ["GET"])
@@ -1420,10 +1700,7 @@ def add_food():
             # Validate food request
             food_data = FoodRequest.model_validate(request.json)
 
-            # Only admins can set starter flag values. Non-admin user-created foods
-            # are always non-starter records.
-            if not _is_admin_request():
-                food_data = food_data.model_copy(update={"starter_food": False})
+            food_data = _apply_starter_policy(owner_id, food_data, _is_admin_request(), update=False)
 
             # Add the food to the database
             new_food_dao = Food.add(owner_id, food_data)
@@ -1459,13 +1736,7 @@ def update_food():
             # Validate food request
             food_data = FoodRequest.model_validate(request.json)
 
-            # Only admins can mutate starter flag values. For non-admin requests,
-            # preserve whatever value is currently stored on the record.
-            if not _is_admin_request():
-                if food_data.id is None:
-                    raise ValueError("Food ID is required for update")
-                current_food = Food.get(owner_id, food_data.id)
-                food_data = food_data.model_copy(update={"starter_food": current_food.starter_food})
+            food_data = _apply_starter_policy(owner_id, food_data, _is_admin_request(), update=True)
 
             # Replace the database's record with the data in the request
             updated_food_dao = Food.update(owner_id, food_data)
@@ -1555,7 +1826,11 @@ def get_catalog_foods():
                 .limit(page_size)
             )
 
-            items = [food.json() for food in db.session.scalars(paged_query).all()]
+            fieldset = _requested_fieldset("foods")
+            if fieldset:
+                items = Projection.load(fieldset, paged_query)
+            else:
+                items = [food.json() for food in db.session.scalars(Food.with_relations(paged_query)).all()]
     except ValueError as e:
         return jsonify({"msg": str(e)}), 400
     except Exception as e:
@@ -1607,19 +1882,33 @@ def copy_catalog_foods():
 
             catalog_user_id = _get_catalog_user_id()
 
+            # Load the catalog foods, and the user's copies of any that came from a
+            # source system, up front rather than a few queries per food
+            catalog_foods: dict[int, Food] = {
+                food.id: food for food in db.session.scalars(Food.with_relations(
+                    db.select(Food).where(Food.user_id == catalog_user_id).where(Food.id.in_(food_ids))
+                ))
+            }
+            source_fdc_ids = {food.fdc_id for food in catalog_foods.values() if food.source and food.fdc_id is not None}
+            copies: dict[tuple[str, int], Food] = {}
+            if source_fdc_ids:
+                for food in db.session.scalars(
+                    db.select(Food).where(Food.user_id == user_id).where(Food.fdc_id.in_(source_fdc_ids)).order_by(Food.id)
+                ):
+                    if food.source and food.fdc_id is not None:
+                        copies.setdefault((food.source, food.fdc_id), food)
+
             for food_id in food_ids:
                 try:
                     with db.session.begin_nested():
-                        catalog_food = Food.get(catalog_user_id, food_id)
+                        catalog_food = catalog_foods.get(food_id)
+                        if not catalog_food:
+                            raise ValueError(f"Food record not found for ID {food_id}")
 
                         # If this came from a source system, avoid duplicating the same source record
                         # for a user when they retry the same batch copy request.
                         if catalog_food.source and catalog_food.fdc_id is not None:
-                            existing = Food.get_by_user_source_fdc_id(
-                                user_id,
-                                catalog_food.source,
-                                catalog_food.fdc_id,
-                            )
+                            existing = copies.get((catalog_food.source, catalog_food.fdc_id))
                             if existing:
                                 skipped += 1
                                 items.append(
@@ -1639,6 +1928,8 @@ def copy_catalog_foods():
                             }
                         )
                         new_food = Food.add(user_id, cloned_payload)
+                        if new_food.source and new_food.fdc_id is not None:
+                            copies.setdefault((new_food.source, new_food.fdc_id), new_food)
                         created += 1
                         items.append(
                             {
@@ -1704,7 +1995,8 @@ def set_catalog_food_starter_flag(food_id: int):
 @log_route
 def get_recipes():
     """
-    Get all Recipes for this user
+    Get all Recipes for this user (with their ingredients too, for
+    ?include=ingredients; see projection.py)
     """
     recipes: list[Any] = []
     try:
@@ -1715,10 +2007,25 @@ def get_recipes():
             if not user_id:
                 raise ValueError(f"Could not retrieve user record for email '{email}'")
 
+            # If the client's copy is current, don't bother loading anything.  The
+            # ingredients' names come from the foods, so they're part of the
+            # version too when they're included.
+            fieldset = _requested_fieldset("recipes")
+            collections: tuple[str, ...] = (CollectionVersion.RECIPES,)
+            if fieldset and "ingredient_names" in fieldset.include:
+                collections += (CollectionVersion.FOODS,)
+            etag = _collection_etag(user_id, collections)
+            not_modified = _not_modified(etag)
+            if not_modified:
+                return not_modified
+
             # Get all the Recipes associated with that user_id
-            recipe_daos = Recipe.get_all_for_user(user_id)
-            for recipe_dao in recipe_daos:
-                recipes.append(recipe_dao.json())
+            if fieldset:
+                recipes = Projection.load(fieldset, Recipe.query_for_user(user_id))
+            else:
+                recipe_daos = Recipe.get_all_for_user(user_id)
+                for recipe_dao in recipe_daos:
+                    recipes.append(recipe_dao.json())
     except Exception as e:
         msg = f"Recipe records could not be retrieved: {str(e)}"
         logging.error(msg)
@@ -1726,7 +2033,7 @@ def get_recipes():
     else:
         msg = "Recipe records retrieved"
         logging.info(msg)
-        return jsonify(recipes), 200
+        return _with_etag(_list_response(recipes), etag), 200
     
 
 @bp.route("/api/recipe/<int:recipe_id>", methods = ["GET"])
@@ -1979,6 +2286,9 @@ def get_daily_log_entries():
       ?start=2026-04-01&end=2026-04-07   returns entries for a date range
 
     If no parameters are given, returns all entries for the user.
+
+    ?fields= and ?include= trim the entries down (see projection.py), and
+    they're sent as a columnar table if the client asks (see columnar.py).
     """
     entries: list[Any] = []
     try:
@@ -1991,21 +2301,29 @@ def get_daily_log_entries():
             date_str = request.args.get("date")
             start_str = request.args.get("start")
             end_str = request.args.get("end")
+            fieldset = _requested_fieldset("daily_logs")
 
             if date_str:
                 # Single-date query
                 date = datetime.strptime(date_str, "%Y-%m-%d").date()
-                log_daos = DailyLogItem.get_by_date(user_id, date)
+                if fieldset:
+                    entries = Projection.load(fieldset, DailyLogItem.query_by_date(user_id, date))
+                else:
+                    log_daos = DailyLogItem.get_by_date(user_id, date)
             elif start_str and end_str:
                 # Date-range query (weekly, monthly views)
                 start = datetime.strptime(start_str, "%Y-%m-%d").date()
                 end = datetime.strptime(end_str, "%Y-%m-%d").date()
-                log_daos = DailyLogItem.get_by_range(user_id, start, end)
+                if fieldset:
+                    entries = Projection.load(fieldset, DailyLogItem.query_by_range(user_id, start, end))
+                else:
+                    log_daos = DailyLogItem.get_by_range(user_id, start, end)
             else:
                 raise ValueError("Either 'date' or both 'start' and 'end' query parameters are required")
 
-            for log_dao in log_daos:
-                entries.append(log_dao.json())
+            if not fieldset:
+                for log_dao in log_daos:
+                    entries.append(log_dao.json())
     except Exception as e:
         msg = f"DailyLogItem records could not be retrieved: {str(e)}"
         logging.error(msg)
@@ -2013,7 +2331,7 @@ def get_daily_log_entries():
     else:
         msg = f"{len(entries)} DailyLogItem records retrieved"
         logging.info(msg)
-        return jsonify(entries), 200
+        return _list_response(entries), 200
 
 
 @bp.route("/api/dailylogitem/<int:log_id>", methods = ["GET"])
@@ -2164,6 +2482,230 @@ def delete_daily_log_entry(log_id: int):
         return jsonify({"msg": msg}), 200
 
 
+##############################
+# BOOTSTRAP
+##############################
+# The sections of GET /api/bootstrap, and the collections each one is built from
+_BOOTSTRAP_SECTIONS: dict[str, tuple[str, ...]] = {
+    "whoami": (),
+    "preferences": (CollectionVersion.PREFERENCES,),
+    "foods": (CollectionVersion.FOODS,),
+    "recipes": (CollectionVersion.RECIPES,),
+    "daily_log": (CollectionVersion.DAILY_LOGS,),
+}
+
+@bp.route("/api/bootstrap", methods=["GET"])
+@jwt_required()
+@log_route
+def bootstrap():
+    """
+    BOOTSTRAP - Everything an app loads when it starts, in one request and one
+    transaction, with the user looked up once.  It stands in for /api/whoami,
+    /api/preferences/<context> (all of them), /api/food, /api/recipe and
+    /api/dailylogitem?date=...
+
+    Query parameters:
+      ?include=foods,recipes   only these sections (default: all of whoami,
+                               preferences, foods, recipes, daily_log)
+      ?date=2026-04-02         the day for daily_log (default: today, UTC)
+
+    Each section but whoami has an ETag of its own.  Send the ones you have in
+    If-None-Match (it takes a list) and any section that hasn't changed comes
+    back without its data:
+      {
+        "whoami": {"logged_in_as": "..."},
+        "foods": {"etag": "...", "data": [...]},
+        "recipes": {"etag": "...", "not_modified": true},
+        ...
+      }
+    """
+    body: dict[str, Any] = {}
+    try:
+        include = request.args.get("include")
+        sections = [name.strip() for name in include.split(",") if name.strip()] if include else list(_BOOTSTRAP_SECTIONS)
+        unknown = [name for name in sections if name not in _BOOTSTRAP_SECTIONS]
+        if unknown:
+            raise ValueError(f"Unknown bootstrap section(s): {', '.join(unknown)}")
+        date_str = request.args.get("date")
+        date = datetime.strptime(date_str, "%Y-%m-%d").date() if date_str else datetime.now(timezone.utc).date()
+
+        with db.session.begin():
+            email = get_jwt_identity()
+            user_id = User.get_id_by_email(email)
+            if not user_id:
+                raise ValueError(f"Could not retrieve user record for email '{email}'")
+            # An admin's foods are the catalog's, as at /api/food
+            food_owner_id = _get_effective_food_owner_id() if "foods" in sections else user_id
+
+            # All the user's ETags from one query
+            variants = {"daily_log": f"bootstrap daily_log {date.isoformat()}"}
+            etags = CollectionVersion.etags(user_id, {
+                name: (_BOOTSTRAP_SECTIONS[name], variants.get(name, f"bootstrap {name}"))
+                for name in sections if _BOOTSTRAP_SECTIONS[name]
+            })
+            if food_owner_id != user_id:
+                etags["foods"] = CollectionVersion.etag(food_owner_id, _BOOTSTRAP_SECTIONS["foods"], variant="bootstrap foods")
+
+            for name in sections:
+                if name == "whoami":
+                    body[name] = {"logged_in_as": email}
+                    continue
+                etag = etags[name]
+                if request.if_none_match and request.if_none_match.contains_weak(etag):
+                    Metrics.increment(CONDITIONAL_GET_METRIC, route=f"/api/bootstrap {name}", result="hit")
+                    body[name] = {"etag": etag, "not_modified": True}
+                    continue
+                Metrics.increment(CONDITIONAL_GET_METRIC, route=f"/api/bootstrap {name}", result="stale" if request.if_none_match else "none")
+
+                data: Any
+                if name == "preferences":
+                    data = Preferences.get_all(user_id)
+                elif name == "foods":
+                    data = [food_dao.json() for food_dao in Food.get_all_for_user(food_owner_id)]
+                elif name == "recipes":
+                    data = [recipe_dao.json() for recipe_dao in Recipe.get_all_for_user(user_id)]
+                else:
+                    data = [log_dao.json() for log_dao in DailyLogItem.get_by_date(user_id, date)]
+                body[name] = {"etag": etag, "data": data}
+                if name == "daily_log":
+                    body[name]["date"] = date.isoformat()
+    except Exception as e:
+        msg = f"Bootstrap data could not be retrieved: {str(e)}"
+        logging.error(msg)
+        return jsonify({"msg": msg}), 400
+    else:
+        changed = [name for name, section in body.items() if "data" in section]
+        logging.info(f"Bootstrap data retrieved: {', '.join(changed) or 'nothing changed'}")
+        response = jsonify(body)
+        response.headers["Cache-Control"] = "private, no-cache"
+        return response, 200
+
+
+##############################
+# BATCH WRITES
+##############################
+# What each batch operation's failure message starts with, same as the single routes
+_BATCH_FAILURES = {
+    "dailylog.add": "DailyLogItem entry could not be added",
+    "dailylog.update": "DailyLogItem entry could not be updated",
+    "dailylog.delete": "DailyLogItem entry could not be deleted",
+    "food.add": "Food record could not be added",
+    "food.update": "Food record could not be updated",
+    "recipe.update": "Recipe record could not be updated",
+}
+
+def _run_batch_operation(user_id: int, owner_id: int, is_admin: bool, operation: BatchOperation) -> tuple[int, Any]:
+    """
+    Do what the equivalent single route does, returning its status and body.
+    """
+    data = operation.data or {}
+    if operation.op == "dailylog.add":
+        return 201, DailyLogItem.add_from_schema(user_id, DailyLogItemRequest.model_validate(data)).json()
+    if operation.op == "dailylog.update":
+        update_data = DailyLogItemUpdateRequest.model_validate(data)
+        return 200, DailyLogItem.update_from_schema(user_id, cast(int, operation.id), update_data).json()
+    if operation.op == "dailylog.delete":
+        DailyLogItem.delete(user_id, cast(int, operation.id))
+        return 200, {"msg": f"DailyLogItem entry {operation.id} deleted"}
+    if operation.op == "food.add":
+        food_data = _apply_starter_policy(owner_id, FoodRequest.model_validate(data), is_admin, update=False)
+        return 201, Food.add(owner_id, food_data).json()
+    if operation.op == "food.update":
+        food_data = _apply_starter_policy(owner_id, FoodRequest.model_validate(data), is_admin, update=True)
+        return 200, Food.update(owner_id, food_data).json()
+    return 200, Recipe.update_from_schema(user_id, RecipeRequest.model_validate(data)).json()
+
+
+def _apply_batch_operation(
+    user_id: int,
+    owner_id: int,
+    is_admin: bool,
+    operation: BatchOperation,
+    stored: dict[str, IdempotencyKey],
+) -> dict[str, Any]:
+    """
+    Apply one batch operation in its own SAVEPOINT, so a failure undoes just that
+    operation.  If its idempotency key was seen before, replay the stored result
+    instead; if it succeeds, store the result under its key.
+    """
+    key = operation.idempotency_key
+    request_hash = IdempotencyKey.hash_request(operation.op, operation.id, operation.data)
+    if key and key in stored:
+        if stored[key].request_hash != request_hash:
+            return {"status": 422, "body": {"msg": f"idempotency_key '{key}' was already used for a different request"}}
+        return {"status": stored[key].status, "body": stored[key].response_body, "replayed": True}
+
+    try:
+        with db.session.begin_nested():
+            status, body = _run_batch_operation(user_id, owner_id, is_admin, operation)
+            if key:
+                IdempotencyKey.save(user_id, key, request_hash, status, body)
+    except ValidationError as e:
+        return {"status": 422, "body": {"msg": _format_validation_error_message(e), "errors": e.errors(include_context=False)}}
+    except Exception as e:
+        msg = f"{_BATCH_FAILURES[operation.op]}: {str(e)}"
+        logging.error(msg)
+        return {"status": 400, "body": {"msg": msg}}
+    return {"status": status, "body": body}
+
+
+@bp.route("/api/batch", methods=["POST"])
+@write_required
+@log_route
+def batch_writes():
+    """
+    BATCH - Apply an ordered list of writes (e.g. edits the mobile app queued while
+    offline) in one request and one transaction, with the user lookups done once.
+
+    Request body:
+      {
+        "operations": [
+          {"op": "dailylog.add", "data": {...}, "idempotency_key": "d9c1..."},
+          {"op": "dailylog.update", "id": 8, "data": {...}},
+          {"op": "dailylog.delete", "id": 9},
+          ...
+        ]
+      }
+
+    op is one of dailylog.add/update/delete, food.add/update or recipe.update, and
+    data is the body the equivalent single route takes.
+
+    Each operation succeeds or fails on its own, and the response has one result
+    per operation, in order:
+      {"results": [{"status": 201, "body": {...}}, {"status": 400, "body": {"msg": "..."}}, ...]}
+
+    An operation whose idempotency_key was already applied isn't applied again;
+    its original result is returned with "replayed": true.
+    """
+    try:
+        if not request.is_json:
+            raise ValueError("Invalid request - not JSON")
+        batch = BatchRequest.model_validate(request.json)
+
+        results: list[dict[str, Any]] = []
+        with db.session.begin():
+            user_id = _get_request_user_id()
+            is_admin = _is_admin_request()
+            owner_id = _get_catalog_user_id() if is_admin else user_id
+            stored = IdempotencyKey.get_many(
+                user_id, [operation.idempotency_key for operation in batch.operations if operation.idempotency_key]
+            )
+            for operation in batch.operations:
+                results.append(_apply_batch_operation(user_id, owner_id, is_admin, operation, stored))
+    except ValidationError as e:
+        msg = _format_validation_error_message(e)
+        logging.error(msg)
+        return jsonify({"msg": msg, "errors": e.errors(include_context=False)}), 422
+    except Exception as e:
+        msg = f"Batch could not be applied: {str(e)}"
+        logging.error(msg)
+        return jsonify({"msg": msg}), 400
+    else:
+        failed = sum(1 for result in results if result["status"] >= 400)
+        logging.info(f"Batch applied: {len(results)} operations, {failed} failed")
+        return jsonify({"results": results}), 200
+
+
 ##############################
 # USDA FDC IMPORTER (ADMIN)
 ##############################
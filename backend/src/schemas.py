@@ -489,6 +489,42 @@ class PreferencesRequest(BaseModel):
     model_config = {"extra": "allow"}  # Allow extra fields (everything is part of preferences)
 
 
+##############################
+# BATCH WRITES
+##############################
+BATCH_MAX_OPERATIONS = 100
+
+class BatchOperation(BaseModel):
+    """
+    One write in a /api/batch request.  data is the body the equivalent single
+    route takes, and id is the record ID that route takes in its URL.
+    """
+    op: Literal["dailylog.add", "dailylog.update", "dailylog.delete", "food.add", "food.update", "recipe.update"]
+    id: int | None = None
+    data: dict[str, Any] | None = None
+    idempotency_key: str | None = Field(default=None, min_length=1, max_length=64)
+
+    @model_validator(mode="after")
+    def validate_arguments(self) -> "BatchOperation":
+        if self.op in ("dailylog.update", "dailylog.delete") and self.id is None:
+            raise ValueError(f"{self.op} requires an id")
+        if self.op != "dailylog.delete" and self.data is None:
+            raise ValueError(f"{self.op} requires data")
+        return self
+
+
+class BatchRequest(BaseModel):
+    """Validate a /api/batch request: an ordered list of writes."""
+    operations: list[BatchOperation] = Field(min_length=1, max_length=BATCH_MAX_OPERATIONS)
+
+    @model_validator(mode="after")
+    def validate_unique_keys(self) -> "BatchRequest":
+        keys = [operation.idempotency_key for operation in self.operations if operation.idempotency_key]
+        if len(keys) != len(set(keys)):
+            raise ValueError("idempotency_key values must be unique within a batch")
+        return self
+
+
 ##############################
 # HELPERS
 ##############################
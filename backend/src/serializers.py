@@ -0,0 +1,38 @@
+from __future__ import annotations
+from typing import Any
+from sqlalchemy import inspect
+
+# The list endpoints turn hundreds (sometimes thousands) of rows into dicts, and
+# most of every json() method is just copying column values.  Going through the
+# ORM attributes for that is surprisingly slow: each read is a descriptor call
+# that checks the instance's load state.  Once a row is loaded, though, its
+# column values are sitting in the instance's __dict__, so a ColumnSerializer
+# copies them from there, falling back to the attributes only if something
+# hasn't been loaded (e.g. an expired or brand new object).
+#
+# The column list is worked out from the model's mapper once, on first use, so
+# a column added to the model shows up in the JSON without touching json().
+
+class ColumnSerializer:
+    def __init__(self, model: type, exclude: tuple[str, ...] = ()) -> None:
+        self.model = model
+        self.exclude = exclude
+        self._columns: tuple[str, ...] | None = None
+
+
+    @property
+    def columns(self) -> tuple[str, ...]:
+        if self._columns is None:
+            self._columns = tuple(
+                attr.key for attr in inspect(self.model).column_attrs if attr.key not in self.exclude
+            )
+        return self._columns
+
+
+    def __call__(self, dao: Any) -> dict[str, Any]:
+        columns = self.columns
+        values = dao.__dict__
+        try:
+            return {name: values[name] for name in columns}
+        except KeyError:
+            return {name: getattr(dao, name) for name in columns}
@@ -0,0 +1,128 @@
+from __future__ import annotations
+from typing import Any
+from models import db, ChangeLog, Food, Recipe, Ingredient, DailyLogItem, Preferences
+from exporter import Exporter
+
+# The mobile app used to stay current by re-fetching whole collections, which is
+# expensive on a cellular link.  With sync, it keeps a cursor instead and asks
+# for what changed since then:
+#
+#   GET /api/sync                   everything, plus a cursor
+#   GET /api/sync?since=<cursor>    just the changes since <cursor>
+#
+# The changes come from the ChangeLog.  Each page of entries is folded down to
+# the latest op per record, deleted records become tombstones (just the ID), and
+# the upserted records are loaded in one query per entity.  So the payload grows
+# with how much changed, not with the size of the account.
+#
+# The response leaves out anything that's empty:
+#   {
+#     "cursor": "1234",      pass this as ?since= next time
+#     "more": true,          there are more changes; ask again right away
+#     "reset": ["foods"],    drop ALL local records of these entities first
+#     "deleted": {"foods": [7, 9]},
+#     "upserted": {"foods": [{...}, ...], "preferences": [{...}]}
+#   }
+#
+# A client applies reset, then deleted, then upserted.  The records are in the
+# same format as the rest of the API (and the export files).
+
+SYNC_PAGE_SIZE = 500
+
+class Sync:
+    MODELS: dict[str, Any] = {
+        "foods": Food,
+        "recipes": Recipe,
+        "ingredients": Ingredient,
+        "daily_logs": DailyLogItem,
+        "preferences": Preferences,
+    }
+
+    @staticmethod
+    def parse_cursor(cursor: str | None) -> int | None:
+        """
+        Turn a ?since= value back into a ChangeLog version.  None (no cursor) means
+        the client has nothing yet.
+        """
+        if cursor is None or cursor == "":
+            return None
+        if not cursor.isdigit():
+            raise ValueError(f"Invalid sync cursor '{cursor}'")
+        return int(cursor)
+
+
+    @staticmethod
+    def changes(user_id: int, since: int | None, limit: int = SYNC_PAGE_SIZE) -> dict[str, Any]:
+        """
+        Build the sync response for a client at cursor <since>, with at most
+        <limit> ChangeLog entries' worth of changes.
+
+        Run this in one transaction, so the records read match the cursor.
+        """
+        latest = ChangeLog.latest(user_id)
+        # A cursor from the future can't be trusted (e.g. the database was
+        # restored from a backup), so start over as if there were none
+        if since is None or since > latest:
+            return Sync.full(user_id, latest)
+
+        entries = ChangeLog.since(user_id, since, limit)
+        resets: set[str] = set()
+        ops: dict[tuple[str, int], str] = {}
+        for _, entity, entity_id, op in entries:
+            if op == ChangeLog.RESET:
+                resets.add(entity)
+                ops = {key: key_op for key, key_op in ops.items() if key[0] != entity}
+            else:
+                ops[(entity, entity_id)] = op
+
+        deleted: dict[str, list[int]] = {}
+        upserts: dict[str, list[int]] = {}
+        for (entity, entity_id), op in sorted(ops.items()):
+            (deleted if op == ChangeLog.DELETE else upserts).setdefault(entity, []).append(entity_id)
+
+        upserted: dict[str, list[dict[str, Any]]] = {}
+        for entity, ids in upserts.items():
+            records = Sync.load(user_id, entity, ids)
+            if records:
+                upserted[entity] = records
+
+        response: dict[str, Any] = {
+            "cursor": str(entries[-1].version if entries else since),
+            "more": len(entries) == limit,
+        }
+        if resets:
+            response["reset"] = sorted(resets)
+        if deleted:
+            response["deleted"] = deleted
+        if upserted:
+            response["upserted"] = upserted
+        return response
+
+
+    @staticmethod
+    def full(user_id: int, latest: int) -> dict[str, Any]:
+        """
+        Everything: reset every entity and send every record.  Records from before
+        the ChangeLog existed have no entries, so this is the only way to get them.
+        """
+        upserted: dict[str, list[dict[str, Any]]] = {}
+        for entity in ChangeLog.ENTITIES:
+            records = list(Exporter.iter_records(user_id, entity))
+            if records:
+                upserted[entity] = records
+        response: dict[str, Any] = {"cursor": str(latest), "more": False, "reset": list(ChangeLog.ENTITIES)}
+        if upserted:
+            response["upserted"] = upserted
+        return response
+
+
+    @staticmethod
+    def load(user_id: int, entity: str, ids: list[int]) -> list[dict[str, Any]]:
+        """
+        The user's records of one entity with these IDs, in ID order.
+        """
+        model = Sync.MODELS[entity]
+        return [
+            Exporter.record(dao)
+            for dao in db.session.scalars(Exporter.query(user_id, entity).where(model.id.in_(ids)))
+        ]
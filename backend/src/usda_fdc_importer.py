@@ -3,8 +3,6 @@ import os
 import re
 from typing import Any, Literal, cast
 
-import requests as req
-
 from schemas import FoodRequest, NutritionRequest, NutritionAlternativeRequest
 
 
@@ -287,6 +285,8 @@ class USDAFdcImporter:
         return "available" if _has_core_nutrition_data(usda_food) else "missing_core"
 
     def _get(self, path: str, params: dict[str, Any]) -> Any:
+        # requests is only loaded when the importer is actually used
+        import requests as req
         url = f"{self._base_url}{path}"
         try:
             response = req.get(url, params=params, timeout=self._timeout)
@@ -296,6 +296,7 @@ class USDAFdcImporter:
             raise USDAFdcImporterError(f"USDA request failed ({path}): {str(e)}")
 
     def _post(self, path: str, json_payload: dict[str, Any], params: dict[str, Any]) -> Any:
+        import requests as req
         url = f"{self._base_url}{path}"
         try:
             response = req.post(url, params=params, json=json_payload, timeout=self._timeout)
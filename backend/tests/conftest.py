@@ -1,10 +1,14 @@
 import sys
+from contextlib import contextmanager
 from pathlib import Path
 
+from typing import Any, Callable, ContextManager, Iterator, cast
+
 import pytest
 from _pytest.config import Config
 from _pytest.nodes import Item
 from flask import Flask
+from sqlalchemy import event
 
 
 BACKEND_SRC = Path(__file__).resolve().parents[1] / "src"
@@ -19,6 +23,88 @@ def bare_flask_app() -> Flask:
     return app
 
 
+@pytest.fixture
+def sqlite_app() -> Iterator[Flask]:
+    """
+    A Flask app bound to a fresh in-memory SQLite database with the full schema,
+    for tests that need real SQL rather than a mocked session.  Foreign keys are
+    enforced so dependency-ordering mistakes show up as errors.
+    """
+    from cache import Cache
+    from models import db
+
+    # Cached IDs would point into the last test's database
+    Cache.clear()
+    app = Flask(__name__)
+    app.config["TESTING"] = True
+    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite://"
+    db.init_app(app)
+
+    with app.app_context():
+        def _enable_foreign_keys(dbapi_connection: Any, connection_record: Any) -> None:
+            _ = connection_record
+            cursor = dbapi_connection.cursor()
+            cursor.execute("PRAGMA foreign_keys=ON")
+            cursor.close()
+
+        event.listen(db.engine, "connect", _enable_foreign_keys)
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+        db.engine.dispose()
+
+
+@pytest.fixture
+def user_app(sqlite_app: Flask, monkeypatch: pytest.MonkeyPatch) -> Flask:
+    """
+    sqlite_app with one confirmed user (ID 1, "user1"), who every request is
+    made by: the JWT identity lookups in routes are patched to return them, so
+    route functions can be called (unwrapped) inside a test_request_context.
+    """
+    import datetime
+    import routes
+    from metrics import Metrics
+    from models import db, User, UserStatus
+
+    user = User(
+        username="user1",
+        status=UserStatus.confirmed,
+        encrypted_email_addr=None,
+        email_addr_hash="hash1",
+        created_at=datetime.datetime(2026, 1, 1),
+    )
+    user.id = 1
+    db.session.add(user)
+    db.session.commit()
+
+    monkeypatch.setattr(routes, "get_jwt_identity", lambda: "user1@example.com")
+    monkeypatch.setattr(routes, "get_jwt", lambda: cast(dict[str, Any], {}))
+    monkeypatch.setattr(routes.User, "get_id_by_email", staticmethod(lambda email: 1))
+    Metrics.reset()
+    return sqlite_app
+
+
+@pytest.fixture
+def query_budget() -> Callable[..., ContextManager[Any]]:
+    """
+    Fail the test if the code in the block runs more than max_queries SQL
+    statements, or runs the same SELECT in a loop (see query_capture.py):
+
+        with query_budget(max_queries=4) as queries:
+            ...
+    """
+    from query_capture import QueryCapture, REPEAT_THRESHOLD
+
+    @contextmanager
+    def budget(max_queries: int | None = None, threshold: int = REPEAT_THRESHOLD) -> Iterator[QueryCapture]:
+        with QueryCapture() as queries:
+            yield queries
+        queries.assert_budget(max_queries, threshold)
+
+    return budget
+
+
 def pytest_collection_modifyitems(config: Config, items: list[Item]) -> None:
     # Keep integration tests out of default runs, but allow explicit marker selection.
     if config.getoption("-m"):
@@ -0,0 +1,198 @@
+import datetime
+from pathlib import Path
+from typing import Any
+
+import pytest
+from flask import Flask
+
+from bulk_load import BulkLoad
+from data import Data
+from models import db, User, UserStatus, Food, Recipe, Ingredient, Nutrition, NutritionAlternative
+from schemas import FoodRequest, IngredientRequest, NutritionAlternativeRequest, NutritionRequest, RecipeRequest
+
+BACKEND_DIR = Path(__file__).resolve().parents[2]
+
+
+def _add_user(user_id: int, username: str | None = None) -> None:
+    user = User(
+        username=username or f"user{user_id}",
+        status=UserStatus.confirmed,
+        encrypted_email_addr=None,
+        email_addr_hash=f"hash{user_id}",
+        created_at=datetime.datetime(2026, 1, 1),
+    )
+    user.id = user_id
+    db.session.add(user)
+    db.session.flush()
+
+
+def _food_request(food_id: int, name: str, calories: int, price: float) -> FoodRequest:
+    return FoodRequest(
+        id=food_id,
+        group="fruits",
+        name=name,
+        vendor="Farmer Market",
+        servings=2.0,
+        price=price,
+        nutrition=NutritionRequest(serving_size_description="1 piece", serving_size_g=100, calories=calories),
+        nutrition_alternatives=[
+            NutritionAlternativeRequest(
+                serving_value=1, serving_unit="piece", serving_unit_kind="arbitrary", household_weight_g=100, is_primary=True,
+                nutrition=NutritionRequest(serving_size_description="1 piece", calories=calories),
+            ),
+            NutritionAlternativeRequest(
+                serving_value=50, serving_unit="g", serving_unit_kind="solid", ordinal=1,
+                nutrition=NutritionRequest(serving_size_description="50 g", calories=calories // 2),
+            ),
+        ],
+    )
+
+
+def _recipe_request(recipe_id: int | None, name: str, parent_recipe_id: int | None = None) -> RecipeRequest:
+    return RecipeRequest(
+        id=recipe_id, name=name, total_yield="1 bowl", servings=2, parent_recipe_id=parent_recipe_id,
+        nutrition=NutritionRequest(serving_size_description="1 bowl", calories=999),
+    )
+
+
+def _recipe_snapshot(user_id: int) -> dict[str, dict[str, object]]:
+    snapshot: dict[str, dict[str, object]] = {}
+    for recipe in Recipe.get_all_for_user(user_id):
+        nutrition = recipe.nutrition.json()
+        del nutrition["id"], nutrition["user_id"]
+        snapshot[recipe.name] = {"price": recipe.price, "size_g": recipe.size_g, "nutrition": nutrition}
+    return snapshot
+
+
+def test_bulk_load_maps_keys_and_recalculates_in_dependency_order(sqlite_app: Flask) -> None:
+    _ = sqlite_app
+    _add_user(1)
+    keylists: dict[str, dict[int, int]] = {}
+
+    BulkLoad.load_foods(1, [_food_request(70, "Apple", 100, 4.0), _food_request(71, "Pear", 60, 2.0)], keylists)
+    # The variation is listed before its parent, and the parent's ingredients
+    # are listed after the variation's, so nothing can be computed in file order.
+    BulkLoad.load_recipes(1, [_recipe_request(81, "Deluxe", parent_recipe_id=80), _recipe_request(80, "Salad")], keylists, recalculate=False)
+    recipe_ids = BulkLoad.load_ingredients(1, [
+        IngredientRequest(recipe_id=81, recipe_ingredient_id=80, servings=2, ordinal=0),
+        IngredientRequest(recipe_id=81, food_ingredient_id=71, servings=1),
+        IngredientRequest(recipe_id=80, food_ingredient_id=70, servings=1, ordinal=0),
+        IngredientRequest(recipe_id=80, food_ingredient_id=71, servings=2, ordinal=1),
+    ], keylists)
+
+    assert set(keylists["foods"]) == {70, 71}
+    assert set(keylists["recipes"]) == {80, 81}
+    assert recipe_ids == {keylists["recipes"][80], keylists["recipes"][81]}
+
+    salad = db.session.get(Recipe, keylists["recipes"][80])
+    deluxe = db.session.get(Recipe, keylists["recipes"][81])
+    assert salad is not None and deluxe is not None
+    assert deluxe.parent_recipe_id == salad.id
+    assert salad.nutrition.calories == 100 + 2 * 60
+    assert salad.price == 2.0 + 2.0
+    # Deluxe uses 2 of Salad's 2 servings, plus a Pear
+    assert deluxe.nutrition.calories == 220 + 60
+    assert deluxe.price == 4.0 + 1.0
+    assert [i.ordinal for i in Ingredient.get_all_for_recipe(1, deluxe.id)] == [0, 1]
+
+    assert db.session.scalar(db.select(db.func.count()).select_from(NutritionAlternative)) == 4
+    apple = db.session.get(Food, keylists["foods"][70])
+    assert apple is not None
+    primary = [alt for alt in apple.nutrition_alternatives if alt.is_primary]
+    assert [alt.nutrition_id for alt in primary] == [apple.nutrition_id]
+
+
+def test_parents_in_later_batches_are_linked_once_mapped(sqlite_app: Flask, caplog: pytest.LogCaptureFixture) -> None:
+    _ = sqlite_app
+    _add_user(1)
+    _add_user(2)
+    # Someone else's recipe has the old ID of the missing parent
+    BulkLoad.load_recipes(2, [_recipe_request(None, "Not yours")])
+    keylists: dict[str, dict[int, int]] = {}
+
+    BulkLoad.load_recipes(1, [
+        _recipe_request(81, "Deluxe", parent_recipe_id=80),
+        _recipe_request(82, "Orphan", parent_recipe_id=1),
+    ], keylists, recalculate=False)
+    BulkLoad.load_recipes(1, [_recipe_request(80, "Salad")], keylists, recalculate=False)
+    BulkLoad.link_parents(keylists)
+
+    deluxe = db.session.get(Recipe, keylists["recipes"][81])
+    orphan = db.session.get(Recipe, keylists["recipes"][82])
+    assert deluxe is not None and orphan is not None
+    assert deluxe.parent_recipe_id == keylists["recipes"][80]
+    assert orphan.parent_recipe_id is None
+    assert "Parent recipe 1 of Recipe" in caplog.text
+
+
+def test_bulk_load_rejects_bad_keys_duplicates_and_cycles(sqlite_app: Flask) -> None:
+    _ = sqlite_app
+    _add_user(1)
+    keylists: dict[str, dict[int, int]] = {}
+    BulkLoad.load_foods(1, [_food_request(70, "Apple", 100, 4.0)], keylists)
+    BulkLoad.load_recipes(1, [_recipe_request(80, "A"), _recipe_request(81, "B")], keylists)
+
+    with pytest.raises(ValueError, match="No new key was assigned for foods ID 99"):
+        BulkLoad.load_ingredients(1, [IngredientRequest(recipe_id=80, food_ingredient_id=99, servings=1)], keylists)
+
+    with pytest.raises(ValueError, match="already exists"):
+        BulkLoad.load_ingredients(1, [
+            IngredientRequest(recipe_id=80, food_ingredient_id=70, servings=1),
+            IngredientRequest(recipe_id=80, food_ingredient_id=70, servings=2),
+        ], keylists)
+
+    with pytest.raises(ValueError, match="use each other as ingredients"):
+        BulkLoad.load_ingredients(1, [
+            IngredientRequest(recipe_id=80, recipe_ingredient_id=81, servings=1),
+            IngredientRequest(recipe_id=81, recipe_ingredient_id=80, servings=1),
+        ], keylists)
+
+    with pytest.raises(ValueError, match="rows 0-499 failed validation"):
+        BulkLoad.validate(FoodRequest, [{"name": "no group"}])
+
+
+def test_data_load_bulk_matches_row_by_row_load(sqlite_app: Flask, monkeypatch: pytest.MonkeyPatch) -> None:
+    _ = sqlite_app
+    monkeypatch.chdir(BACKEND_DIR)
+    _add_user(1)
+    _add_user(2)
+
+    Data.load(1, bulk=False)
+    Data.load(2, bulk=True)
+
+    for model in (Food, Recipe, Ingredient, Nutrition):
+        counts = [
+            db.session.scalar(db.select(db.func.count()).select_from(model).where(model.user_id == user_id))
+            for user_id in (1, 2)
+        ]
+        assert counts[0] == counts[1] > 0
+
+    # The row-by-row path adds each Ingredient on top of whatever Nutrition the
+    # Recipe was exported with, and in file order.  Recalculating it until it
+    # settles gives the figures the bulk path computes in one pass.
+    recipe_ids = {ingredient.recipe_id for ingredient in Ingredient.get_all_for_user(1)}
+    for _ in range(len(recipe_ids)):
+        before = _recipe_snapshot(1)
+        for recipe_id in sorted(recipe_ids):
+            Recipe.recalculate(1, recipe_id)
+        if _recipe_snapshot(1) == before:
+            break
+
+    assert _recipe_snapshot(2) == _recipe_snapshot(1)
+
+
+def test_seed_starter_foods_copies_catalog_foods(sqlite_app: Flask, monkeypatch: pytest.MonkeyPatch) -> None:
+    _ = sqlite_app
+    _add_user(Data.CATALOG_USER_ID, Data.CATALOG_USER_NAME)
+    _add_user(10)
+    starter = _food_request(70, "Apple", 100, 4.0).model_copy(update={"starter_food": True, "id": None})
+    BulkLoad.load_foods(Data.CATALOG_USER_ID, [starter, _food_request(71, "Pear", 60, 2.0).model_copy(update={"id": None})])
+
+    # Seeding runs on login, so it mustn't lock the tables to reserve IDs
+    def _no_reservations(model: Any, count: int) -> list[int]:
+        raise AssertionError(f"reserved {count} {model.__name__} IDs")
+    monkeypatch.setattr(BulkLoad, "_reserve_ids", staticmethod(_no_reservations))
+    Data.seed_starter_foods_from_catalog(10)
+
+    foods = Food.get_all_for_user(10)
+    assert [(food.name, food.starter_food, food.nutrition.calories) for food in foods] == [("Apple", False, 100)]
@@ -0,0 +1,137 @@
+import datetime
+from typing import Iterator
+
+import pytest
+from flask import Flask
+
+from cache import CACHE_EVICTIONS_METRIC, CACHE_REQUESTS_METRIC, Cache, MemoryBackend
+from metrics import Metrics
+from models import db, User, UserStatus, CollectionVersion, Preferences
+from purge import Purge
+from query_capture import QueryCapture
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache() -> Iterator[None]:
+    Metrics.reset()
+    Cache.clear()
+    yield
+    Cache.set_enabled(True)
+    Cache.set_shared(True)
+    Cache.clear()
+
+
+def _add_user(user_id: int, username: str | None = None) -> None:
+    user = User(
+        username=username or f"user{user_id}",
+        status=UserStatus.confirmed,
+        encrypted_email_addr=None,
+        email_addr_hash=f"hash{user_id}",
+        created_at=datetime.datetime(2026, 1, 1),
+    )
+    user.id = user_id
+    db.session.add(user)
+    db.session.flush()
+
+
+def test_values_are_loaded_once_and_misses_are_not_kept() -> None:
+    loads: list[str] = []
+
+    def load(value: int | None) -> int | None:
+        loads.append("load")
+        return value
+
+    assert Cache.cached("things", "a", lambda: load(1)) == 1
+    assert Cache.cached("things", "a", lambda: load(2)) == 1
+    assert Cache.cached("things", "b", lambda: load(None)) is None
+    assert Cache.cached("things", "b", lambda: load(3)) == 3
+
+    assert len(loads) == 3
+    assert Metrics.get(CACHE_REQUESTS_METRIC, namespace="things", result="hit") == 1
+    assert Metrics.get(CACHE_REQUESTS_METRIC, namespace="things", result="miss") == 3
+
+
+def test_invalidation_is_per_user_or_per_namespace() -> None:
+    Cache.cached("prefs", "x", lambda: "one", user_id=1)
+    Cache.cached("prefs", "x", lambda: "two", user_id=2)
+
+    Cache.invalidate("prefs", 1)
+    assert Cache.cached("prefs", "x", lambda: "one again", user_id=1) == "one again"
+    assert Cache.cached("prefs", "x", lambda: "reloaded", user_id=2) == "two"
+
+    Cache.invalidate("prefs")
+    assert Cache.cached("prefs", "x", lambda: "reloaded", user_id=2) == "reloaded"
+
+
+def test_memory_backend_expires_and_evicts_least_recently_used(monkeypatch: pytest.MonkeyPatch) -> None:
+    backend = MemoryBackend(max_entries=2)
+    backend.set("a", "things", 1, ttl=60)
+    backend.set("b", "things", 2, ttl=60)
+    backend.get("a")
+    backend.set("c", "things", 3, ttl=60)
+    assert (backend.get("a"), backend.get("b"), backend.get("c")) == (1, None, 3)
+
+    now = datetime.datetime.now().timestamp()
+    monkeypatch.setattr("cache.time.time", lambda: now + 61)
+    assert backend.get("a") is None
+
+    assert Metrics.get(CACHE_EVICTIONS_METRIC, namespace="things", reason="capacity") == 1
+    assert Metrics.get(CACHE_EVICTIONS_METRIC, namespace="things", reason="expired") == 1
+
+
+def test_kill_switch_bypasses_the_cache() -> None:
+    Cache.cached("things", "a", lambda: 1)
+    Cache.set_enabled(False)
+
+    assert Cache.cached("things", "a", lambda: 2) == 2
+    assert Metrics.get(CACHE_REQUESTS_METRIC, namespace="things", result="hit") == 0
+
+
+def test_user_id_lookups_are_cached(sqlite_app: Flask) -> None:
+    _ = sqlite_app
+    _add_user(1)
+    assert User.get_id("user1") == 1
+
+    with QueryCapture() as queries:
+        assert User.get_id("user1") == 1
+    assert queries.count == 0
+
+
+def test_a_deleted_users_id_is_not_served_for_a_new_user(sqlite_app: Flask) -> None:
+    _ = sqlite_app
+    _add_user(1)
+    assert User.get_id("user1") == 1
+
+    Purge.purge_user(1, include_preferences=True)
+    db.session.delete(db.session.get(User, 1))
+    db.session.flush()
+    _add_user(4, username="user1")
+    assert User.get_id("user1") == 4
+
+
+def test_id_lookups_are_not_cached_per_process_with_several_workers(sqlite_app: Flask) -> None:
+    _ = sqlite_app
+    _add_user(1)
+    Cache.set_shared(False)
+    User.get_id("user1")
+
+    with QueryCapture() as queries:
+        assert User.get_id("user1") == 1
+    assert queries.count == 1
+
+
+def test_preference_writes_invalidate_the_cached_preferences(sqlite_app: Flask) -> None:
+    _ = sqlite_app
+    _add_user(1)
+    Preferences.save(1, "foods", {"columns": ["name"]})
+    db.session.flush()
+    assert Preferences.get(1, "foods") == {"columns": ["name"]}
+
+    Preferences.save(1, "foods", {"columns": ["name", "calories"]})
+    db.session.flush()
+    assert Preferences.get(1, "foods") == {"columns": ["name", "calories"]}
+
+    # A bulk delete goes around Preferences.save, but not around CollectionVersion
+    Purge.delete_preferences(1)
+    assert Preferences.get(1, "foods") is None
+    assert CollectionVersion.get(1, CollectionVersion.PREFERENCES) is not None
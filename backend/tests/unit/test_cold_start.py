@@ -0,0 +1,44 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+SRC = Path(__file__).resolve().parents[2] / "src"
+
+# Only needed by the routes that use them (or, for Flask-Migrate, by "flask db"
+# and a first run against an empty database), so they're imported there
+LAZY_MODULES = [
+    "google.oauth2",
+    "google.auth.transport.requests",
+    "requests",
+    "flask_migrate",
+    "alembic",
+]
+
+# Generous, so a slow CI machine doesn't trip it: importing app takes well under
+# a second on a laptop.  See bench/importtime.py for where the time goes.
+COLD_START_BUDGET_SECONDS = float(os.environ.get("COLD_START_BUDGET_SECONDS", "5"))
+
+
+def _cold_import(tmp_path: Path) -> dict:
+    script = (
+        "import json, sys, time\n"
+        "started = time.perf_counter()\n"
+        "import app\n"
+        "app.minimal_app_config(migrate=False)\n"
+        "elapsed = time.perf_counter() - started\n"
+        f"print(json.dumps({{'seconds': elapsed, 'loaded': [m for m in {LAZY_MODULES!r} if m in sys.modules]}}))\n"
+    )
+    # Never connected to: building the app doesn't touch the database
+    env = {**os.environ, "DB_PROTOCOL": f"sqlite:///{tmp_path}/", "DB_HOSTNAME": "localhost", "DB_APP_PASSWORD": "unused"}
+    result = subprocess.run([sys.executable, "-c", script], cwd=SRC, env=env, capture_output=True, text=True, check=False)
+    assert result.returncode == 0, result.stderr
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def test_cold_start_skips_lazy_dependencies_and_fits_the_budget(tmp_path):
+    report = _cold_import(tmp_path)
+
+    assert report["loaded"] == []
+    assert report["seconds"] < COLD_START_BUDGET_SECONDS
@@ -0,0 +1,84 @@
+import datetime
+
+from flask import Flask
+
+from bulk_load import BulkLoad
+from models import db, User, UserStatus, CollectionVersion, Food, Preferences, DailyLogItem
+from purge import Purge
+from schemas import DailyLogItemRequest, FoodRequest, NutritionRequest
+
+
+def _add_user(user_id: int) -> None:
+    user = User(
+        username=f"user{user_id}",
+        status=UserStatus.confirmed,
+        encrypted_email_addr=None,
+        email_addr_hash=f"hash{user_id}",
+        created_at=datetime.datetime(2026, 1, 1),
+    )
+    user.id = user_id
+    db.session.add(user)
+    db.session.flush()
+
+
+def _food_request(name: str) -> FoodRequest:
+    return FoodRequest(
+        group="fruits", name=name, vendor="Farmer Market", servings=2.0, price=4.0,
+        nutrition=NutritionRequest(serving_size_description="1 piece", calories=100),
+    )
+
+
+def _versions(user_id: int) -> dict[str, int]:
+    rows = db.session.scalars(
+        db.select(CollectionVersion)
+        .where(CollectionVersion.user_id == user_id)
+        .where(CollectionVersion.collection != CollectionVersion.CHANGE_LOG)
+    )
+    return {row.collection: row.version for row in rows}
+
+
+def test_orm_writes_bump_only_the_collections_they_touch(sqlite_app: Flask) -> None:
+    _ = sqlite_app
+    _add_user(1)
+    _add_user(2)
+    assert CollectionVersion.last_modified(1) is None
+
+    food = Food.add(1, _food_request("Apple"))
+    db.session.flush()
+    assert _versions(1) == {"foods": 1}
+
+    Preferences.save(1, "daily_log", {"columns": ["calories"]})
+    db.session.flush()
+    assert _versions(1) == {"foods": 1, "preferences": 1}
+
+    DailyLogItem.add_from_schema(1, DailyLogItemRequest(date="2026-04-02", food_id=food.id, servings=1))
+    db.session.flush()
+    # A flush that changes nothing doesn't count
+    db.session.flush()
+    assert _versions(1) == {"foods": 1, "preferences": 1, "daily_logs": 1}
+
+    food.price = 5.0
+    db.session.flush()
+    assert _versions(1)["foods"] == 2
+    assert _versions(2) == {}
+
+    last_modified = CollectionVersion.last_modified(1)
+    assert last_modified is not None and last_modified.tzinfo == datetime.timezone.utc
+
+
+def test_bulk_writes_and_purges_bump_versions(sqlite_app: Flask) -> None:
+    _ = sqlite_app
+    _add_user(1)
+
+    BulkLoad.load_foods(1, [_food_request("Apple"), _food_request("Pear")])
+    assert _versions(1) == {"foods": 1}
+
+    Preferences.save(1, "daily_log", {"columns": ["calories"]})
+    db.session.flush()
+    report = Purge.purge_user(1)
+    assert report.rows["food"] == 2
+    # Nothing to delete in recipes or daily logs, so their versions are untouched
+    assert _versions(1) == {"foods": 2, "preferences": 1}
+
+    Purge.purge_user(1, include_preferences=True)
+    assert _versions(1) == {}
@@ -0,0 +1,139 @@
+import json
+from typing import Any, Callable, cast
+
+from flask import Flask, Response
+
+import routes
+from columnar import Columnar, COLUMNAR_MIMETYPE
+from models import db, Food
+from schemas import FoodRequest, NutritionAlternativeRequest, NutritionRequest
+
+
+def _unwrap(func: Any) -> Callable[..., Any]:
+    return cast(Callable[..., Any], getattr(func, "__wrapped__", func))
+
+
+def _as_response(result: object) -> Response:
+    if isinstance(result, tuple):
+        resp, status = cast(tuple[Response, int], result)
+        resp.status_code = status
+        return resp
+    return cast(Response, result)
+
+
+def _decode(table: dict[str, Any]) -> list[dict[str, Any]]:
+    """
+    The same thing decodeColumnar() does in the TypeScript clients.
+    """
+    count = len(table["values"][0]) if table["values"] else 0
+    records: list[dict[str, Any]] = [{} for _ in range(count)]
+    for column, values in zip(table["columns"], table["values"]):
+        key, _, field = column.partition(".")
+        for record, value in zip(records, values):
+            if field:
+                record.setdefault(key, {})[field] = value
+            else:
+                record[key] = value
+    for key, present in table.get("present", {}).items():
+        for record, is_present in zip(records, present):
+            record[key] = record.get(key, {}) if is_present else None
+    for name, child in table.get("children", {}).items():
+        rows = _decode(child)
+        for record in records:
+            record[name] = [row for row in rows if row[child["key"]] == record["id"]]
+    return records
+
+
+def _records() -> list[dict[str, Any]]:
+    nutrition = {"id": 7, "calories": 120, "protein_g": 8.0}
+    return [
+        {
+            "id": 1, "name": "Milk", "nutrition": nutrition,
+            "nutrition_alternatives": [
+                {"id": 3, "food_id": 1, "serving_unit": "cup", "nutrition": nutrition},
+                {"id": 4, "food_id": 1, "serving_unit": "g", "nutrition": None},
+            ],
+        },
+        {"id": 2, "name": "Apple", "nutrition": None, "nutrition_alternatives": []},
+    ]
+
+
+def test_encode_round_trips_and_flattens_nutrition() -> None:
+    table = Columnar.encode(_records())
+
+    assert table["columns"] == ["id", "name", "nutrition.id", "nutrition.calories", "nutrition.protein_g"]
+    assert table["values"][1] == ["Milk", "Apple"]
+    assert table["values"][3] == [120, None]
+    assert table["children"]["nutrition_alternatives"]["key"] == "food_id"
+    assert _decode(table) == _records()
+
+
+def test_null_objects_and_objects_of_nulls_stay_apart() -> None:
+    records: list[dict[str, Any]] = [
+        {"id": 1, "nutrition": {"calories": None}},
+        {"id": 2, "nutrition": None},
+        {"id": 3, "nutrition": {"calories": 90}},
+    ]
+    table = Columnar.encode(records)
+
+    assert table["present"] == {"nutrition": [True, False, True]}
+    assert _decode(table) == records
+
+
+def test_recipe_ingredients_become_a_child_table() -> None:
+    records = [
+        {"id": 1, "name": "Pie", "ingredients": [
+            {"id": 5, "recipe_id": 1, "food_ingredient_id": 9, "servings": 3.0},
+            {"id": 6, "recipe_id": 1, "food_ingredient_id": 8, "servings": 1.0},
+        ]},
+        {"id": 2, "name": "Base", "ingredients": []},
+    ]
+    table = Columnar.encode(records)
+
+    assert table["columns"] == ["id", "name"]
+    assert table["children"]["ingredients"]["key"] == "recipe_id"
+    assert _decode(table) == records
+
+
+def test_empty_and_childless_lists() -> None:
+    assert Columnar.encode([]) == {"columns": [], "values": []}
+    table = Columnar.encode([{"id": 1, "nutrition_alternatives": []}])
+    assert _decode(table) == [{"id": 1, "nutrition_alternatives": []}]
+
+
+def test_get_foods_negotiates_the_columnar_format(user_app: Flask) -> None:
+    with db.session.begin():
+        for i in range(20):
+            Food.add(1, FoodRequest(
+                group="fruits", name=f"Food {i}", vendor="Farmer Market", servings=1.0, price=1.0,
+                nutrition=NutritionRequest(serving_size_description="1 piece", calories=100 + i),
+                nutrition_alternatives=[NutritionAlternativeRequest(
+                    serving_value=100, serving_unit="g", serving_unit_kind="solid",
+                    nutrition=NutritionRequest(serving_size_description="100 g", calories=50),
+                )],
+            ))
+
+    def _get(accept: str) -> Response:
+        with user_app.test_request_context("/api/food", method="GET", headers={"Accept": accept}):
+            return _as_response(_unwrap(routes.get_foods)())
+
+    plain = _get("application/json")
+    columnar = _get(COLUMNAR_MIMETYPE)
+
+    assert plain.mimetype == "application/json"
+    assert columnar.mimetype == COLUMNAR_MIMETYPE
+    assert "Accept" in columnar.headers["Vary"]
+    assert columnar.get_etag()[0] != plain.get_etag()[0]
+    assert _decode(json.loads(columnar.get_data())) == plain.get_json()
+    assert len(columnar.get_data()) < len(plain.get_data()) / 2
+    # A client that takes anything still gets plain JSON
+    assert _get("*/*").mimetype == "application/json"
+
+
+def test_every_list_route_varies_on_accept(user_app: Flask) -> None:
+    for accept in ("application/json", COLUMNAR_MIMETYPE):
+        # The daily log has no ETag, and so doesn't go through _with_etag
+        with user_app.test_request_context("/api/dailylogitem?date=2026-04-02", method="GET", headers={"Accept": accept}):
+            resp = _as_response(_unwrap(routes.get_daily_log_entries)())
+        assert resp.status_code == 200
+        assert resp.vary.as_set() == {"accept"}
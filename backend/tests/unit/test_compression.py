@@ -0,0 +1,84 @@
+import gzip
+import json
+
+import pytest
+from flask import Flask, Response, jsonify, stream_with_context
+
+import compression
+from compression import Compression, COMPRESSION_METRIC
+from metrics import Metrics
+
+
+@pytest.fixture
+def app(bare_flask_app: Flask, monkeypatch: pytest.MonkeyPatch) -> Flask:
+    monkeypatch.setattr(compression, "brotli", None)
+    Compression.init_app(bare_flask_app)
+    Compression.clear_cache()
+    Metrics.reset()
+
+    @bare_flask_app.route("/foods")
+    def foods() -> Response:
+        response = jsonify([{"id": i, "name": f"Food {i}", "calories": 100} for i in range(200)])
+        response.set_etag("v1")
+        return response
+
+    @bare_flask_app.route("/small")
+    def small() -> Response:
+        return jsonify({"msg": "ok"})
+
+    @bare_flask_app.route("/stream")
+    def stream() -> Response:
+        def _generate():
+            for i in range(100):
+                yield json.dumps({"id": i}) + "\n"
+        return Response(stream_with_context(_generate()), mimetype="application/x-ndjson")
+
+    return bare_flask_app
+
+
+def test_large_json_is_gzipped_and_cached_by_etag(app: Flask) -> None:
+    client = app.test_client()
+
+    first = client.get("/foods", headers={"Accept-Encoding": "gzip, deflate"})
+    second = client.get("/foods", headers={"Accept-Encoding": "gzip"})
+
+    assert first.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in first.headers["Vary"]
+    assert first.headers["ETag"] == 'W/"v1"'
+    assert int(first.headers["Content-Length"]) == len(first.data)
+    assert len(json.loads(gzip.decompress(first.data))) == 200
+    assert second.data == first.data
+    assert Metrics.get(COMPRESSION_METRIC, cache="miss") == 1
+    assert Metrics.get(COMPRESSION_METRIC, cache="hit") == 1
+
+
+def test_not_compressed_when_small_or_not_accepted(app: Flask) -> None:
+    client = app.test_client()
+
+    small = client.get("/small", headers={"Accept-Encoding": "gzip"})
+    plain = client.get("/foods")
+    refused = client.get("/foods", headers={"Accept-Encoding": "gzip;q=0, identity"})
+
+    for response in (small, plain, refused):
+        assert "Content-Encoding" not in response.headers
+    assert plain.headers["ETag"] == '"v1"'
+    assert len(plain.get_json()) == 200
+
+
+def test_streamed_response_is_compressed_as_it_goes(app: Flask) -> None:
+    response = app.test_client().get("/stream", headers={"Accept-Encoding": "gzip"})
+
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "Content-Length" not in response.headers
+    lines = gzip.decompress(response.data).decode().splitlines()
+    assert [json.loads(line)["id"] for line in lines] == list(range(100))
+
+
+def test_brotli_is_preferred_when_available(app: Flask, monkeypatch: pytest.MonkeyPatch) -> None:
+    brotli = pytest.importorskip("brotli")
+    monkeypatch.setattr(compression, "brotli", brotli)
+
+    response = app.test_client().get("/foods", headers={"Accept-Encoding": "gzip, br"})
+
+    assert response.headers["Content-Encoding"] == "br"
+    assert len(json.loads(brotli.decompress(response.data))) == 200
@@ -0,0 +1,108 @@
+import threading
+from pathlib import Path
+from typing import Iterator
+
+import pytest
+from flask import Flask
+from sqlalchemy import text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+from db_pool import CHECKED_OUT_METRIC, CHECKOUT_SECONDS_METRIC, CONNECTIONS_METRIC, EXHAUSTED_METRIC, TIMEOUT_METRIC, DbPool, InstrumentedQueuePool
+from metrics import Metrics
+from models import db
+
+
+@pytest.fixture
+def pool_app(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Iterator[Flask]:
+    """
+    An app on a SQLite file with a pool of two connections, no overflow and a
+    short timeout: small enough to run dry.
+    """
+    Metrics.reset()
+    monkeypatch.setenv("DB_POOL_MAX_OVERFLOW", "0")
+    monkeypatch.setenv("DB_POOL_TIMEOUT", "1")
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{tmp_path / 'pool.db'}"
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = DbPool.engine_options(threads=2)
+    db.init_app(app)
+    with app.app_context():
+        yield app
+        db.engine.dispose()
+
+
+def test_engine_options_are_sized_from_the_threads(monkeypatch: pytest.MonkeyPatch) -> None:
+    for name in ("DB_POOL_SIZE", "DB_POOL_MAX_OVERFLOW", "DB_POOL_RECYCLE", "DB_POOL_PRE_PING", "DB_CONNECT_TIMEOUT"):
+        monkeypatch.delenv(name, raising=False)
+
+    options = DbPool.engine_options(8, "mysql+mysqlconnector://")
+    assert options["poolclass"] is InstrumentedQueuePool
+    assert (options["pool_size"], options["max_overflow"], options["pool_recycle"], options["pool_pre_ping"]) == (8, 2, 1800, True)
+    assert options["connect_args"] == {"connection_timeout": 10}
+
+    monkeypatch.setenv("DB_POOL_SIZE", "3")
+    monkeypatch.setenv("DB_POOL_PRE_PING", "0")
+    options = DbPool.engine_options(8, "sqlite://")
+    assert (options["pool_size"], options["pool_pre_ping"]) == (3, False)
+    assert "connect_args" not in options
+
+
+def test_checkouts_are_timed_and_connections_counted(pool_app: Flask) -> None:
+    with db.engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+        assert Metrics.gauge(CHECKED_OUT_METRIC) == 1
+    with db.engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+
+    assert Metrics.gauge(CHECKED_OUT_METRIC) == 0
+    assert Metrics.histogram(CHECKOUT_SECONDS_METRIC)[0] == 2
+    # The second checkout reused the first connection
+    assert Metrics.get(CONNECTIONS_METRIC, event="opened") == 1
+    assert Metrics.get(EXHAUSTED_METRIC) == 0
+
+    db.engine.dispose()
+    assert Metrics.get(CONNECTIONS_METRIC, event="closed") == 1
+
+
+def test_pool_starvation_is_reported(pool_app: Flask) -> None:
+    """
+    More threads wanting a connection than the pool has: the ones that don't
+    get one in time fail, and the metrics show it.
+    """
+    engine = db.engine
+    holding = threading.Barrier(3)
+    release = threading.Event()
+    errors: list[BaseException] = []
+
+    def hold_a_connection() -> None:
+        try:
+            with engine.connect() as conn:
+                conn.execute(text("SELECT 1"))
+                holding.wait()
+                release.wait(5)
+        except BaseException as e:
+            errors.append(e)
+
+    holders = [threading.Thread(target=hold_a_connection) for _ in range(2)]
+    for holder in holders:
+        holder.start()
+    holding.wait()
+    try:
+        assert Metrics.gauge(CHECKED_OUT_METRIC) == 2
+        with pytest.raises(PoolTimeoutError):
+            engine.connect()
+    finally:
+        release.set()
+        for holder in holders:
+            holder.join()
+
+    assert not errors
+    assert Metrics.get(EXHAUSTED_METRIC) == 1
+    assert Metrics.get(TIMEOUT_METRIC) == 1
+    count, seconds = Metrics.histogram(CHECKOUT_SECONDS_METRIC)
+    assert count == 3 and seconds >= 1
+    assert "# TYPE db_pool_checked_out gauge\ndb_pool_checked_out 0" in Metrics.prometheus()
+
+    # Once they're back, there's one to be had again
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+    assert Metrics.get(CONNECTIONS_METRIC, event="opened") == 2
@@ -0,0 +1,196 @@
+import datetime
+import gzip
+import hashlib
+import io
+import json
+import tarfile
+import zipfile
+from pathlib import Path
+from typing import Any, cast
+
+import pytest
+from flask import Flask
+from sqlalchemy import event
+
+from bulk_load import BulkLoad
+from data import Data
+from exporter import Exporter
+from models import db, User, UserStatus, Food, Recipe, Ingredient, DailyLogItem, Preferences
+from schemas import DailyLogItemRequest, FoodRequest, IngredientRequest, NutritionAlternativeRequest, NutritionRequest, RecipeRequest
+
+
+def _add_user(user_id: int) -> None:
+    user = User(
+        username=f"user{user_id}",
+        status=UserStatus.confirmed,
+        encrypted_email_addr=None,
+        email_addr_hash=f"hash{user_id}",
+        created_at=datetime.datetime(2026, 1, 1),
+    )
+    user.id = user_id
+    db.session.add(user)
+    db.session.flush()
+
+
+def _seed_account(user_id: int, food_count: int = 3) -> None:
+    _add_user(user_id)
+    keylists: dict[str, dict[int, int]] = {}
+    BulkLoad.load_foods(user_id, [
+        FoodRequest(
+            id=100 + n, group="fruits", name=f"Fruit {n}", vendor="Farmer Market", servings=2.0, price=1.0 + n,
+            nutrition=NutritionRequest(serving_size_description="1 piece", calories=50 + n),
+            nutrition_alternatives=[
+                NutritionAlternativeRequest(
+                    serving_value=100, serving_unit="g", serving_unit_kind="solid", is_primary=True,
+                    nutrition=NutritionRequest(serving_size_description="1 piece", calories=50 + n),
+                ),
+                NutritionAlternativeRequest(
+                    serving_value=1, serving_unit="oz", serving_unit_kind="solid", ordinal=1,
+                    nutrition=NutritionRequest(serving_size_description="1 oz", calories=15),
+                ),
+            ],
+        )
+        for n in range(food_count)
+    ], keylists)
+    BulkLoad.load_recipes(user_id, [
+        # A variation that's exported before the recipe it's a variation of
+        RecipeRequest(id=199, name="Fruit salad deluxe", total_yield="1 bowl", servings=2, parent_recipe_id=200,
+                      nutrition=NutritionRequest(serving_size_description="1 bowl")),
+        RecipeRequest(id=200, name="Fruit salad", total_yield="1 bowl", servings=2, nutrition=NutritionRequest(serving_size_description="1 bowl")),
+    ], keylists, recalculate=False)
+    BulkLoad.load_ingredients(user_id, [
+        IngredientRequest(recipe_id=200, food_ingredient_id=100, servings=1, ordinal=0),
+        IngredientRequest(recipe_id=200, food_ingredient_id=101, servings=2, ordinal=1),
+    ], keylists)
+    DailyLogItem.add_from_schema(user_id, DailyLogItemRequest(date="2026-04-02", food_id=keylists["foods"][100], servings=1))
+    db.session.flush()
+
+
+def _read_lines(path: Path) -> list[dict[str, Any]]:
+    opener: Any = gzip.open if path.suffix == ".gz" else open
+    with opener(path, "rt") as f:
+        return [json.loads(line) for line in f]
+
+
+@pytest.mark.parametrize("compress", [True, False])
+def test_export_user_writes_ndjson_and_manifest(sqlite_app: Flask, tmp_path: Path, compress: bool) -> None:
+    _ = sqlite_app
+    _seed_account(1)
+
+    manifest = Exporter.export_user(1, str(tmp_path), compress=compress)
+
+    assert manifest["compressed"] is compress
+    assert {entity: entry["rows"] for entity, entry in manifest["files"].items()} == {
+        "foods": 3, "recipes": 2, "ingredients": 2, "daily_logs": 1,
+    }
+    assert json.loads((tmp_path / "manifest.json").read_text()) == manifest
+
+    foods = _read_lines(tmp_path / manifest["files"]["foods"]["file"])
+    assert [food["name"] for food in foods] == ["Fruit 0", "Fruit 1", "Fruit 2"]
+    assert [len(food["nutrition_alternatives"]) for food in foods] == [2, 2, 2]
+    assert foods[0]["nutrition_alternatives"][1]["nutrition"]["calories"] == 15
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+def test_export_query_count_does_not_grow_with_row_count(sqlite_app: Flask, tmp_path: Path) -> None:
+    _ = sqlite_app
+    _seed_account(1, food_count=2)
+    _seed_account(2, food_count=40)
+    db.session.expunge_all()
+
+    statements: list[str] = []
+
+    def _count(_conn: Any, _cursor: Any, statement: str, *_args: Any) -> None:
+        statements.append(statement)
+
+    event.listen(db.engine, "before_cursor_execute", _count)
+    try:
+        Exporter.export_user(1, str(tmp_path / "small"))
+        small = len(statements)
+        statements.clear()
+        Exporter.export_user(2, str(tmp_path / "large"))
+        large = len(statements)
+    finally:
+        event.remove(db.engine, "before_cursor_execute", _count)
+
+    assert large == small
+
+
+@pytest.mark.parametrize("bulk", [False, True])
+def test_data_load_streams_exported_files_back(sqlite_app: Flask, tmp_path: Path, monkeypatch: pytest.MonkeyPatch, bulk: bool) -> None:
+    _ = sqlite_app
+    _seed_account(1)
+    _add_user(2)
+    monkeypatch.chdir(tmp_path)
+
+    Data.export(1)
+    if not bulk:
+        # The default, for /api/db/load on a running server, leaves the keys to AUTO_INCREMENT
+        def _no_reservations(model: Any, count: int) -> list[int]:
+            raise AssertionError(f"reserved {count} {model.__name__} IDs")
+        monkeypatch.setattr(BulkLoad, "_reserve_ids", staticmethod(_no_reservations))
+    Data.load(2, bulk=bulk)
+
+    def _summary(user_id: int) -> list[tuple[Any, ...]]:
+        return [
+            (food.name, food.price, food.nutrition.calories, sorted(alt.nutrition.calories for alt in food.nutrition_alternatives))
+            for food in Food.get_all_for_user(user_id)
+        ] + [
+            (
+                recipe.name, recipe.price, recipe.nutrition.calories, len(Ingredient.get_all_for_recipe(user_id, recipe.id)),
+                recipe.parent_recipe_id and cast(Recipe, db.session.get(Recipe, recipe.parent_recipe_id)).name,
+            )
+            for recipe in Recipe.get_all_for_user(user_id)
+        ]
+
+    assert _summary(2) == _summary(1)
+
+
+def test_data_load_rejects_files_that_do_not_match_the_manifest(sqlite_app: Flask, tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    _ = sqlite_app
+    _seed_account(1)
+    _add_user(2)
+    monkeypatch.chdir(tmp_path)
+    manifest = Exporter.export_user(1, "./data", compress=False)
+
+    foods_path = tmp_path / "data" / manifest["files"]["foods"]["file"]
+    foods_path.write_text(foods_path.read_text().replace("Fruit 1", "Fruit X"))
+
+    with pytest.raises(ValueError, match="does not match its checksum"):
+        Data.load(2)
+
+
+@pytest.mark.parametrize("archive_format", ["zip", "tar"])
+def test_iter_archive_streams_every_file_with_a_matching_manifest(sqlite_app: Flask, archive_format: str) -> None:
+    _ = sqlite_app
+    _seed_account(1)
+    db.session.add(Preferences(user_id=1, context="daily_log", preferences={"columns": ["calories"]}))
+    db.session.flush()
+
+    data = b"".join(Exporter.iter_archive(1, archive_format))
+
+    files: dict[str, bytes] = {}
+    if archive_format == "zip":
+        with zipfile.ZipFile(io.BytesIO(data)) as archive:
+            files = {name: archive.read(name) for name in archive.namelist()}
+    else:
+        with tarfile.open(fileobj=io.BytesIO(data), mode="r:gz") as archive:
+            for member in archive.getmembers():
+                extracted = archive.extractfile(member)
+                assert extracted is not None
+                files[member.name] = extracted.read()
+
+    manifest = json.loads(files.pop("manifest.json"))
+    assert set(manifest["files"]) == set(Exporter.ARCHIVE_ENTITIES)
+    for entry in manifest["files"].values():
+        content = files[entry["file"]]
+        assert hashlib.sha256(content).hexdigest() == entry["sha256"]
+        assert content.count(b"\n") == entry["rows"]
+    preferences = [json.loads(line) for line in files[manifest["files"]["preferences"]["file"]].splitlines()]
+    assert [(p["context"], p["preferences"]) for p in preferences] == [("daily_log", {"columns": ["calories"]})]
+
+
+def test_iter_archive_rejects_unknown_formats(sqlite_app: Flask) -> None:
+    _ = sqlite_app
+    with pytest.raises(ValueError, match="Unknown archive format"):
+        list(Exporter.iter_archive(1, "rar"))
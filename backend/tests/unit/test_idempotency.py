@@ -0,0 +1,149 @@
+import datetime
+from typing import Any, cast
+
+import pytest
+from flask import Flask, Response, request
+
+import routes
+from idempotency import Idempotency
+from models import db, User, UserStatus, DailyLogItem, Food, IdempotencyKey
+from schemas import FoodRequest, NutritionRequest
+
+
+@pytest.fixture
+def user_app(user_app: Flask, monkeypatch: pytest.MonkeyPatch) -> Flask:
+    # write_required verifies the JWT itself
+    monkeypatch.setattr(routes, "verify_jwt_in_request", lambda: None)
+    Idempotency.clear_cache()
+    return user_app
+
+
+def _add_food() -> int:
+    with db.session.begin():
+        return Food.add(1, FoodRequest(
+            group="fruits", name="Apple", vendor="Farmer Market", servings=1.0, price=1.0,
+            nutrition=NutritionRequest(serving_size_description="1 piece", calories=100),
+        )).id
+
+
+def _post_log(app: Flask, key: str, payload: dict[str, Any]) -> Response:
+    with app.test_request_context("/api/dailylogitem", method="POST", json=payload, headers={"Idempotency-Key": key}):
+        return cast(Response, routes.add_daily_log_entry())
+
+
+def _log_count() -> int:
+    with db.session.begin():
+        return int(db.session.scalar(db.select(db.func.count()).select_from(DailyLogItem)) or 0)
+
+
+def test_repeated_write_is_applied_once(user_app: Flask) -> None:
+    payload = {"date": "2026-04-02", "food_id": _add_food(), "servings": 1}
+
+    first = _post_log(user_app, "abc", payload)
+    assert first.status_code == 201
+    assert "Idempotent-Replayed" not in first.headers
+
+    # From the in-process cache, then from the database
+    cached = _post_log(user_app, "abc", payload)
+    Idempotency.clear_cache()
+    stored = _post_log(user_app, "abc", payload)
+    for replay in (cached, stored):
+        assert replay.status_code == 201
+        assert replay.headers["Idempotent-Replayed"] == "true"
+        assert replay.get_json() == first.get_json()
+    assert _log_count() == 1
+
+    # The same key with a different request is an error, not a replay
+    reused = _post_log(user_app, "abc", {**payload, "servings": 2})
+    assert reused.status_code == 422
+    assert _log_count() == 1
+
+
+def test_failed_write_releases_its_key(user_app: Flask) -> None:
+    food_id = _add_food()
+
+    failed = _post_log(user_app, "abc", {"date": "2026-04-02", "food_id": 9999, "servings": 1})
+    assert failed.status_code == 400
+    with db.session.begin():
+        assert IdempotencyKey.get(1, "abc") is None
+
+    retried = _post_log(user_app, "abc", {"date": "2026-04-02", "food_id": food_id, "servings": 1})
+    assert retried.status_code == 201
+    assert _log_count() == 1
+
+
+def test_in_progress_and_expired_keys(user_app: Flask) -> None:
+    payload = {"date": "2026-04-02", "food_id": _add_food(), "servings": 1}
+    with user_app.test_request_context("/api/dailylogitem", method="POST", json=payload):
+        request_hash = IdempotencyKey.hash_request("POST", "/api/dailylogitem", request.get_data(as_text=True))
+    with db.session.begin():
+        IdempotencyKey.save(1, "pending", request_hash, IdempotencyKey.PENDING, None)
+
+    # Another request with this key is still being handled
+    assert _post_log(user_app, "pending", payload).status_code == 409
+    assert _log_count() == 0
+
+    # ...or it died, and the reservation can be reclaimed
+    with db.session.begin():
+        cast(IdempotencyKey, IdempotencyKey.get(1, "pending")).created_at = datetime.datetime(2026, 1, 1)
+    assert _post_log(user_app, "pending", payload).status_code == 201
+    assert _log_count() == 1
+
+    with db.session.begin():
+        cast(IdempotencyKey, IdempotencyKey.get(1, "pending")).created_at = datetime.datetime(2026, 1, 1)
+        assert IdempotencyKey.expire(datetime.datetime(2026, 1, 2)) == 1
+    with db.session.begin():
+        assert IdempotencyKey.get(1, "pending") is None
+
+
+def test_reuse_while_pending_does_not_cache_the_reservation(user_app: Flask) -> None:
+    payload = {"date": "2026-04-02", "food_id": _add_food(), "servings": 1}
+    with user_app.test_request_context("/api/dailylogitem", method="POST", json=payload):
+        request_hash = IdempotencyKey.hash_request("POST", "/api/dailylogitem", request.get_data(as_text=True))
+    with db.session.begin():
+        IdempotencyKey.save(1, "abc", request_hash, IdempotencyKey.PENDING, None)
+
+    # The key is reused for something else while the first request holds it...
+    assert _post_log(user_app, "abc", {**payload, "servings": 2}).status_code == 422
+
+    # ...then the first request fails and releases it, and its retry is applied
+    Idempotency._release(1, "user1@example.com", "abc")
+    retry = _post_log(user_app, "abc", payload)
+    assert retry.status_code == 201
+    assert "Idempotent-Replayed" not in retry.headers
+    assert _log_count() == 1
+
+
+def test_losing_the_reservation_race_to_a_different_request(user_app: Flask, monkeypatch: pytest.MonkeyPatch) -> None:
+    payload = {"date": "2026-04-02", "food_id": _add_food(), "servings": 1}
+    with db.session.begin():
+        IdempotencyKey.save(1, "abc", "someone else's hash", IdempotencyKey.PENDING, None)
+
+    # The other request's INSERT lands between our SELECT and ours
+    get = IdempotencyKey.get
+    monkeypatch.setattr(IdempotencyKey, "get", staticmethod(
+        lambda user_id, key, for_update=False: get(user_id, key, for_update) if for_update else None
+    ))
+    assert _post_log(user_app, "abc", payload).status_code == 422
+    assert _log_count() == 0
+
+
+def test_deleting_the_account_does_not_store_its_key(user_app: Flask, monkeypatch: pytest.MonkeyPatch) -> None:
+    # Users 1 to 5 are the built-in accounts, which can't be deleted
+    user = User(
+        username="user10", status=UserStatus.confirmed, encrypted_email_addr=None,
+        email_addr_hash="hash10", created_at=datetime.datetime(2026, 1, 1),
+    )
+    user.id = 10
+    with db.session.begin():
+        db.session.add(user)
+    monkeypatch.setattr(routes.User, "get_id_by_email", staticmethod(lambda email: 10))
+    monkeypatch.setattr(routes.User, "get_by_email", staticmethod(lambda email: db.session.get(User, 10)))
+
+    with user_app.test_request_context("/api/user", method="DELETE", headers={"Idempotency-Key": "bye"}):
+        resp = cast(Response, routes.delete_user())
+
+    assert resp.status_code == 200
+    with db.session.begin():
+        assert db.session.get(User, 10) is None
+        assert db.session.scalar(db.select(db.func.count()).select_from(IdempotencyKey)) == 0
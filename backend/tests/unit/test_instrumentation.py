@@ -0,0 +1,82 @@
+from typing import Any, Callable, Iterator, cast
+
+import pytest
+from flask import Flask, Response, jsonify
+from sqlalchemy import event, text
+from sqlalchemy.engine import Engine
+
+import routes
+from instrumentation import Instrumentation, REQUEST_COUNT_METRIC, REQUEST_DURATION_METRIC, REQUEST_STATEMENTS_METRIC, RESPONSE_BYTES_METRIC, STATEMENT_COUNT_METRIC
+from metrics import Metrics
+from models import db
+
+
+def _unwrap(func: Any) -> Callable[..., Any]:
+    return cast(Callable[..., Any], getattr(func, "__wrapped__", func))
+
+
+@pytest.fixture
+def app(sqlite_app: Flask) -> Iterator[Flask]:
+    Metrics.reset()
+    Instrumentation.init_app(sqlite_app)
+
+    @sqlite_app.route("/api/thing/<int:thing_id>")
+    def thing(thing_id: int) -> Response:
+        with db.session.begin():
+            db.session.execute(text("SELECT 1"))
+            db.session.execute(text("SELECT 2"))
+        return jsonify({"id": thing_id, "padding": "x" * 2000})
+
+    yield sqlite_app
+    event.remove(Engine, "before_cursor_execute", Instrumentation._before_cursor_execute)
+    event.remove(Engine, "after_cursor_execute", Instrumentation._after_cursor_execute)
+
+
+def test_requests_are_timed_and_their_statements_counted(app: Flask) -> None:
+    client = app.test_client()
+    client.get("/api/thing/1")
+    client.get("/api/thing/2")
+    client.get("/nowhere")
+
+    route = "/api/thing/<int:thing_id>"
+    assert Metrics.get(REQUEST_COUNT_METRIC, route=route, method="GET", status="200") == 2
+    assert Metrics.get(REQUEST_COUNT_METRIC, route="unmatched", status="404") == 1
+    assert Metrics.histogram(REQUEST_DURATION_METRIC, route=route)[0] == 2
+    assert Metrics.histogram(REQUEST_STATEMENTS_METRIC, route=route) == (2, 4)
+    assert Metrics.get(STATEMENT_COUNT_METRIC, route=route) == 4
+    count, total = Metrics.histogram(RESPONSE_BYTES_METRIC, route=route)
+    assert count == 2 and total > 4000
+
+
+def test_statements_outside_a_request_are_not_counted(app: Flask) -> None:
+    with db.session.begin():
+        db.session.execute(text("SELECT 1"))
+    assert Metrics.get(STATEMENT_COUNT_METRIC) == 0
+
+
+def test_metrics_route_renders_prometheus_text(app: Flask) -> None:
+    app.test_client().get("/api/thing/1")
+    Metrics.increment("conditional_get_total", route="/api/food", result="hit")
+
+    with app.test_request_context("/api/metrics", method="GET"):
+        resp, status = _unwrap(routes.get_metrics)()
+
+    body = resp.get_data(as_text=True)
+    assert status == 200
+    assert resp.mimetype == "text/plain"
+    assert "# TYPE http_request_duration_seconds histogram" in body
+    assert 'http_requests_total{method="GET",route="/api/thing/<int:thing_id>",status="200"} 1' in body
+    assert 'http_request_db_statements_bucket{method="GET",route="/api/thing/<int:thing_id>",le="2"} 1' in body
+    assert 'conditional_get_total{result="hit",route="/api/food"} 1' in body
+
+
+def test_metrics_histogram_buckets_are_cumulative() -> None:
+    Metrics.reset()
+    for value in (0.001, 0.02, 0.02, 30):
+        Metrics.observe("latency_seconds", value, route="/x")
+    body = Metrics.prometheus()
+    assert 'latency_seconds_bucket{route="/x",le="0.005"} 1' in body
+    assert 'latency_seconds_bucket{route="/x",le="0.025"} 3' in body
+    assert 'latency_seconds_bucket{route="/x",le="10"} 3' in body
+    assert 'latency_seconds_bucket{route="/x",le="+Inf"} 4' in body
+    assert 'latency_seconds_count{route="/x"} 4' in body
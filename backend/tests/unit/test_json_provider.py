@@ -0,0 +1,85 @@
+import dataclasses
+import datetime
+import decimal
+import json
+import pytest
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+import json_provider
+from json_provider import FastJSONProvider
+
+
+@dataclasses.dataclass
+class _Point:
+    y: int
+    x: int
+
+
+def _payload() -> object:
+    return [
+        {
+            "name": "Café au lait",
+            "id": 3,
+            "price": decimal.Decimal("4.50"),
+            "price_date": datetime.date(2026, 4, 1),
+            "synced": datetime.datetime(2026, 4, 1, 12, 30, tzinfo=datetime.timezone.utc),
+            "nutrition": {"protein_g": 1.5, "calories": 62, "notes": None},
+            "point": _Point(y=2, x=1),
+            "flags": [True, False],
+        }
+    ]
+
+
+@pytest.fixture
+def apps(bare_flask_app: Flask) -> tuple[Flask, Flask]:
+    fast_app = bare_flask_app
+    fast_app.json = FastJSONProvider(fast_app)
+    stdlib_app = Flask(__name__)
+    stdlib_app.json = DefaultJSONProvider(stdlib_app)
+    return fast_app, stdlib_app
+
+
+def test_response_matches_stdlib_provider(apps: tuple[Flask, Flask]) -> None:
+    fast_app, stdlib_app = apps
+    with fast_app.app_context():
+        fast = fast_app.json.response(_payload())
+    with stdlib_app.app_context():
+        stdlib = stdlib_app.json.response(_payload())
+
+    assert fast.mimetype == "application/json"
+    assert json.loads(fast.get_data()) == json.loads(stdlib.get_data())
+    # Same key order and formatting; only the non-ASCII text is encoded differently
+    assert fast.get_data().decode() == stdlib.get_data().decode().replace("\\u00e9", "é")
+
+
+def test_response_is_indented_in_debug_mode(apps: tuple[Flask, Flask]) -> None:
+    fast_app, _ = apps
+    fast_app.debug = True
+    with fast_app.app_context():
+        body = fast_app.json.response({"b": 1, "a": [1]}).get_data(as_text=True)
+    assert body == '{\n  "a": [\n    1\n  ],\n  "b": 1\n}\n'
+
+
+def test_falls_back_to_stdlib_for_what_orjson_cannot_encode(apps: tuple[Flask, Flask]) -> None:
+    fast_app, _ = apps
+    with fast_app.app_context():
+        big = fast_app.json.response({"n": 2 ** 70})
+        int_keys = fast_app.json.response({10: "a", 2: "b"})
+    assert big.get_json() == {"n": 2 ** 70}
+    assert int_keys.get_data(as_text=True) == '{"2":"b","10":"a"}\n'
+
+
+def test_dumps_passes_stdlib_options_through(apps: tuple[Flask, Flask]) -> None:
+    fast_app, _ = apps
+    assert fast_app.json.dumps({"b": 1, "a": 2}) == '{"a":2,"b":1}'
+    assert fast_app.json.dumps({"b": 1, "a": 2}, separators=(", ", ": ")) == '{"a": 2, "b": 1}'
+
+
+def test_works_without_orjson(apps: tuple[Flask, Flask], monkeypatch: pytest.MonkeyPatch) -> None:
+    fast_app, stdlib_app = apps
+    monkeypatch.setattr(json_provider, "orjson", None)
+    with fast_app.app_context():
+        fast = fast_app.json.response(_payload())
+    with stdlib_app.app_context():
+        stdlib = stdlib_app.json.response(_payload())
+    assert fast.get_data() == stdlib.get_data()
@@ -0,0 +1,102 @@
+import io
+import json
+import logging
+import queue
+from typing import Iterator
+
+import pytest
+from flask import Flask, jsonify
+
+from logs import DROPPED_METRIC, REQUEST_ID_HEADER, SAMPLED_METRIC, DroppingQueueHandler, Logs
+from metrics import Metrics
+
+
+@pytest.fixture
+def output() -> Iterator[io.StringIO]:
+    Metrics.reset()
+    output = io.StringIO()
+    root_level = logging.getLogger().level
+    yield output
+    Logs.shutdown()
+    logging.getLogger().setLevel(root_level)
+
+
+def _records(output: io.StringIO) -> list[dict]:
+    # Wait for the listener thread to write everything queued so far
+    Logs.shutdown()
+    return [json.loads(line) for line in output.getvalue().splitlines()]
+
+
+def test_records_are_written_as_json_with_the_request_id(output: io.StringIO, sqlite_app: Flask) -> None:
+    Logs.configure(output)
+    Logs.init_app(sqlite_app)
+
+    @sqlite_app.route("/api/thing")
+    def thing():
+        logging.getLogger("test_logs").info("Handling %s", "thing")
+        return jsonify({})
+
+    client = sqlite_app.test_client()
+    passed_on = client.get("/api/thing", headers={REQUEST_ID_HEADER: "proxy-123"})
+    generated = client.get("/api/thing", headers={REQUEST_ID_HEADER: "not a valid id"})
+    logging.getLogger("test_logs").debug("Below the default level")
+
+    records = _records(output)
+    assert passed_on.headers[REQUEST_ID_HEADER] == "proxy-123"
+    assert len(generated.headers[REQUEST_ID_HEADER]) == 32
+    assert [(r["level"], r["logger"], r["message"], r["request_id"]) for r in records] == [
+        ("INFO", "test_logs", "Handling thing", "proxy-123"),
+        ("INFO", "test_logs", "Handling thing", generated.headers[REQUEST_ID_HEADER]),
+    ]
+
+
+def test_exceptions_are_kept_and_level_comes_from_the_environment(output: io.StringIO, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv("LOG_LEVEL", "warning")
+    Logs.configure(output)
+    log = logging.getLogger("test_logs")
+    log.info("Left out")
+    try:
+        raise RuntimeError("boom")
+    except RuntimeError:
+        log.exception("Failed")
+
+    (record,) = _records(output)
+    assert record["message"] == "Failed"
+    assert "request_id" not in record
+    assert "RuntimeError: boom" in record["exception"]
+
+
+def test_info_records_are_sampled_but_warnings_never_are(output: io.StringIO, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv("LOG_SAMPLE_RATES", "INFO=0")
+    Logs.configure(output)
+    log = logging.getLogger("test_logs")
+    for _ in range(5):
+        log.info("Busy")
+    log.warning("Important")
+
+    assert [r["message"] for r in _records(output)] == ["Important"]
+    assert Metrics.get(SAMPLED_METRIC, level="INFO") == 5
+
+    with pytest.raises(ValueError):
+        Logs.sample_rates("ERROR=0.5")
+    with pytest.raises(ValueError):
+        Logs.sample_rates("INFO=2")
+
+
+def test_a_full_queue_drops_records_instead_of_blocking() -> None:
+    Metrics.reset()
+    records: queue.Queue[logging.LogRecord] = queue.Queue(2)
+    handler = DroppingQueueHandler(records)
+    log = logging.getLogger("test_logs.full")
+    log.propagate = False
+    log.addHandler(handler)
+    try:
+        for i in range(5):
+            log.warning("Record %d", i)
+    finally:
+        log.removeHandler(handler)
+        log.propagate = True
+
+    assert records.qsize() == 2
+    assert records.get().getMessage() == "Record 0"
+    assert Metrics.get(DROPPED_METRIC) == 3
@@ -248,12 +248,13 @@ def test_food_add_persists_alternatives_with_primary(monkeypatch: pytest.MonkeyP
     # The primary alternative should reuse the Food's primary Nutrition record
     primary_alt = [a for a in session.added if isinstance(a, models.NutritionAlternative) and a.is_primary]
     assert len(primary_alt) == 1
-    assert primary_alt[0].nutrition_id == added.nutrition_id
+    assert primary_alt[0].nutrition is added.nutrition
 
     # The non-primary alternative should have its own Nutrition record
     non_primary_alt = [a for a in session.added if isinstance(a, models.NutritionAlternative) and not a.is_primary]
     assert len(non_primary_alt) == 1
-    assert non_primary_alt[0].nutrition_id != added.nutrition_id
+    assert non_primary_alt[0].nutrition is not None
+    assert non_primary_alt[0].nutrition is not added.nutrition
 
 
 def test_nutrition_alternative_compute_serving_weight_solid() -> None:
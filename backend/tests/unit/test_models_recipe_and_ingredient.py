@@ -78,28 +78,25 @@ def test_recipe_recalculate_sums_food_and_recipe_ingredients(
         assert recipe_id == 99
         return ingredient_rows
 
-    def _food_get(user_id: int, food_id: int) -> object:
+    def _food_get_many(user_id: int, food_ids: set[int]) -> dict[int, object]:
         assert user_id == 1
-        assert food_id == 10
-        return food_dao
+        assert food_ids == {10}
+        return {10: food_dao}
 
-    def _recipe_get(user_id: int, recipe_id: int) -> object:
+    def _recipe_get_many(user_id: int, recipe_ids: set[int]) -> dict[int, object]:
         assert user_id == 1
-        assert recipe_id == 20
-        return recipe_ingredient_dao
+        assert recipe_ids == {20}
+        return {20: recipe_ingredient_dao}
 
-    def _nutrition_get(user_id: int, nutrition_id: int) -> object:
+    def _nutrition_get_many(user_id: int, nutrition_ids: set[int]) -> dict[int, object]:
         assert user_id == 1
-        if nutrition_id == 101:
-            return ingredient_food_nutrition
-        if nutrition_id == 202:
-            return ingredient_recipe_nutrition
-        raise AssertionError(f"Unexpected nutrition id: {nutrition_id}")
+        assert nutrition_ids == {101, 202}
+        return {101: ingredient_food_nutrition, 202: ingredient_recipe_nutrition}
 
     monkeypatch.setattr(models.Ingredient, "get_all_for_recipe", staticmethod(_get_all_for_recipe))
-    monkeypatch.setattr(models.Food, "get", staticmethod(_food_get))
-    monkeypatch.setattr(models.Recipe, "get", staticmethod(_recipe_get))
-    monkeypatch.setattr(models.Nutrition, "get", staticmethod(_nutrition_get))
+    monkeypatch.setattr(models.Food, "get_many", staticmethod(_food_get_many))
+    monkeypatch.setattr(models.Recipe, "get_many", staticmethod(_recipe_get_many))
+    monkeypatch.setattr(models.Nutrition, "get_many", staticmethod(_nutrition_get_many))
 
     recipe_dao = cast(models.Recipe, SimpleNamespace(id=99, nutrition_id=500))
     recipe_nutrition_dao = _NutritionAccumulator()
@@ -222,23 +219,19 @@ def test_recipe_recalculate_sets_total_weight_from_ingredient_nutrition(
     def _get_all_for_recipe(user_id: int, recipe_id: int) -> list[object]:
         return ingredient_rows
 
-    def _food_get(user_id: int, food_id: int) -> object:
-        return food_dao
+    def _food_get_many(user_id: int, food_ids: set[int]) -> dict[int, object]:
+        return {10: food_dao}
 
-    def _recipe_get(user_id: int, recipe_id: int) -> object:
-        return recipe_ingredient_dao
+    def _recipe_get_many(user_id: int, recipe_ids: set[int]) -> dict[int, object]:
+        return {20: recipe_ingredient_dao}
 
-    def _nutrition_get(user_id: int, nutrition_id: int) -> object:
-        if nutrition_id == 101:
-            return ingredient_food_nutrition
-        if nutrition_id == 202:
-            return ingredient_recipe_nutrition
-        raise AssertionError(f"Unexpected nutrition id: {nutrition_id}")
+    def _nutrition_get_many(user_id: int, nutrition_ids: set[int]) -> dict[int, object]:
+        return {101: ingredient_food_nutrition, 202: ingredient_recipe_nutrition}
 
     monkeypatch.setattr(models.Ingredient, "get_all_for_recipe", staticmethod(_get_all_for_recipe))
-    monkeypatch.setattr(models.Food, "get", staticmethod(_food_get))
-    monkeypatch.setattr(models.Recipe, "get", staticmethod(_recipe_get))
-    monkeypatch.setattr(models.Nutrition, "get", staticmethod(_nutrition_get))
+    monkeypatch.setattr(models.Food, "get_many", staticmethod(_food_get_many))
+    monkeypatch.setattr(models.Recipe, "get_many", staticmethod(_recipe_get_many))
+    monkeypatch.setattr(models.Nutrition, "get_many", staticmethod(_nutrition_get_many))
 
     recipe_dao = cast(models.Recipe, SimpleNamespace(id=99, nutrition_id=500, servings=4.0))
     recipe_nutrition_dao = _NutritionAccumulator()
@@ -272,6 +265,8 @@ def test_recipe_recalculate_raises_for_invalid_ingredient_link(
         "get_all_for_recipe",
         staticmethod(_get_all_for_recipe),
     )
+    for model in (models.Food, models.Recipe, models.Nutrition):
+        monkeypatch.setattr(model, "get_many", staticmethod(lambda user_id, ids: {}))
 
     recipe_dao = cast(models.Recipe, SimpleNamespace(id=99, nutrition_id=500))
     recipe_nutrition_dao = _NutritionAccumulator()
@@ -295,11 +290,11 @@ def test_recipe_recalculate_raises_when_ingredient_nutrition_missing(
     def _get_all_for_recipe(user_id: int, recipe_id: int) -> list[object]:
         return ingredient_rows
 
-    def _food_get(user_id: int, food_id: int) -> object:
-        return SimpleNamespace(nutrition_id=101)
+    def _food_get_many(user_id: int, food_ids: set[int]) -> dict[int, object]:
+        return {10: SimpleNamespace(nutrition_id=101)}
 
-    def _nutrition_get(user_id: int, nutrition_id: int) -> None:
-        return None
+    def _nutrition_get_many(user_id: int, nutrition_ids: set[int]) -> dict[int, object]:
+        return {}
 
     monkeypatch.setattr(
         models.Ingredient,
@@ -308,10 +303,11 @@ def test_recipe_recalculate_raises_when_ingredient_nutrition_missing(
     )
     monkeypatch.setattr(
         models.Food,
-        "get",
-        staticmethod(_food_get),
+        "get_many",
+        staticmethod(_food_get_many),
     )
-    monkeypatch.setattr(models.Nutrition, "get", staticmethod(_nutrition_get))
+    monkeypatch.setattr(models.Recipe, "get_many", staticmethod(lambda user_id, recipe_ids: {}))
+    monkeypatch.setattr(models.Nutrition, "get_many", staticmethod(_nutrition_get_many))
 
     recipe_dao = cast(models.Recipe, SimpleNamespace(id=99, nutrition_id=500))
     recipe_nutrition_dao = _NutritionAccumulator()
@@ -0,0 +1,81 @@
+import json
+import multiprocessing
+import os
+import signal
+import socket
+import time
+import urllib.request
+from pathlib import Path
+
+import pytest
+from flask import Flask, jsonify
+from sqlalchemy import text
+
+from models import db
+from prefork import Prefork
+
+
+def _file_app(tmp_path: Path, storage_uri: str) -> Flask:
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{tmp_path / 'prefork.db'}"
+    app.config["RATELIMIT_STORAGE_URI"] = storage_uri
+    db.init_app(app)
+
+    @app.route("/pid")
+    def pid():
+        with db.session.begin():
+            db.session.execute(text("SELECT 1"))
+        return jsonify({"pid": os.getpid()})
+
+    return app
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return int(s.getsockname()[1])
+
+
+def test_reset_after_fork_gives_the_engine_an_empty_pool(tmp_path: Path) -> None:
+    app = _file_app(tmp_path, "memory://")
+    with app.app_context():
+        db.session.execute(text("SELECT 1"))
+        db.session.remove()
+        pool = db.engine.pool
+        assert pool.checkedin() == 1
+
+    Prefork.reset_after_fork(app)
+
+    with app.app_context():
+        assert db.engine.pool is not pool
+        assert db.engine.pool.checkedin() == 0
+        db.engine.dispose()
+
+
+def test_workers_refuse_in_memory_rate_limits(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(os, "fork", lambda: pytest.fail("forked"))
+
+    with pytest.raises(SystemExit):
+        Prefork.run(_file_app(tmp_path, "memory://"), _free_port(), workers=2, threads=1)
+
+
+def test_workers_serve_requests_and_stop_with_the_parent(tmp_path: Path) -> None:
+    port = _free_port()
+    context = multiprocessing.get_context("fork")
+    parent = context.Process(target=Prefork.run, args=(_file_app(tmp_path, "redis://unused"), port, 2, 1))
+    parent.start()
+    try:
+        pids: set[int] = set()
+        deadline = time.monotonic() + 10
+        while time.monotonic() < deadline and not pids:
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/pid", timeout=5) as response:
+                    pids.add(json.loads(response.read())["pid"])
+            except OSError:
+                time.sleep(0.1)
+        assert pids
+        assert parent.pid not in pids and os.getpid() not in pids
+    finally:
+        os.kill(parent.pid or 0, signal.SIGTERM)
+        parent.join(10)
+    assert parent.exitcode == 0
@@ -0,0 +1,200 @@
+import datetime
+from typing import Any, Callable, cast
+
+import pytest
+from flask import Flask, Response
+from sqlalchemy import event
+
+import routes
+from models import db, Food, Recipe, DailyLogItem, Ingredient
+from projection import Projection
+from query_capture import QueryCapture
+from schemas import DailyLogItemRequest, FoodRequest, IngredientRequest, NutritionAlternativeRequest, NutritionRequest, RecipeRequest
+
+
+def _unwrap(func: Any) -> Callable[..., Any]:
+    return cast(Callable[..., Any], getattr(func, "__wrapped__", func))
+
+
+def _as_response(result: object) -> Response:
+    if isinstance(result, tuple):
+        resp, status = cast(tuple[Response, int], result)
+        resp.status_code = status
+        return resp
+    return cast(Response, result)
+
+
+def _add_records() -> None:
+    with db.session.begin():
+        for name, unit_type in (("Milk", "liquid"), ("Apple", "solid")):
+            food = Food.add(1, FoodRequest(
+                group="dairy" if name == "Milk" else "fruits", name=name, vendor="Farmer Market",
+                servings=2.0, price=4.99, price_date="2026-04-01", unit_type=unit_type,
+                size_imperial=32.0, size_metric=946, density=1.03 if unit_type == "liquid" else None,
+                nutrition=NutritionRequest(serving_size_description="1 cup", calories=120, protein_g=8),
+                nutrition_alternatives=[
+                    NutritionAlternativeRequest(
+                        serving_value=1, serving_unit="cup", serving_unit_kind="liquid", is_primary=True,
+                        nutrition=NutritionRequest(serving_size_description="1 cup", calories=120),
+                    ),
+                    NutritionAlternativeRequest(
+                        serving_value=100, serving_unit="g", serving_unit_kind="solid",
+                        nutrition=NutritionRequest(serving_size_description="100 g", calories=50),
+                    ),
+                ],
+            ))
+        Recipe.add_from_schema(1, RecipeRequest(
+            name="Smoothie", total_yield="2 cups", servings=2,
+            nutrition=NutritionRequest(serving_size_description="1 cup", calories=200),
+        ))
+        DailyLogItem.add_from_schema(1, DailyLogItemRequest(date="2026-04-02", food_id=food.id, servings=1))
+    db.session.expunge_all()
+
+
+def _load(entity: str, statement: Any, fields: str | None = None, include: str | None = None) -> list[dict[str, Any]]:
+    fieldset = Projection.parse(entity, fields, include)
+    assert fieldset is not None
+    with db.session.begin():
+        return Projection.load(fieldset, statement)
+
+
+def test_every_field_and_include_matches_json(user_app: Flask) -> None:
+    _ = user_app
+    _add_records()
+    with db.session.begin():
+        foods = [food.json() for food in Food.get_all_for_user(1)]
+        recipes = [recipe.json() for recipe in Recipe.get_all_for_user(1)]
+        logs = [log.json() for log in DailyLogItem.get_by_date(1, datetime.date(2026, 4, 2))]
+
+    assert _load("foods", Food.query_for_user(1), include="nutrition,nutrition_alternatives") == foods
+    assert _load("recipes", Recipe.query_for_user(1), include="nutrition") == recipes
+    assert _load("daily_logs", DailyLogItem.query_by_date(1, datetime.date(2026, 4, 2)), include="nutrition") == logs
+
+
+def test_only_the_requested_columns_and_relations_are_read(user_app: Flask) -> None:
+    _ = user_app
+    _add_records()
+    statements: list[str] = []
+
+    def _record(_conn: Any, _cursor: Any, statement: str, *_args: Any) -> None:
+        statements.append(statement)
+
+    event.listen(db.engine, "before_cursor_execute", _record)
+    try:
+        foods = _load("foods", Food.query_for_user(1), fields="name,size_g")
+        with_nutrition = _load("foods", Food.query_for_user(1), fields="name,nutrition.calories")
+    finally:
+        event.remove(db.engine, "before_cursor_execute", _record)
+
+    # Milk is a liquid, so its size_g comes from its volume and density
+    assert foods == [{"id": 1, "name": "Milk", "size_g": 974}, {"id": 2, "name": "Apple", "size_g": 946}]
+    assert with_nutrition[0] == {"id": 1, "name": "Milk", "nutrition": {"calories": 120}}
+    assert len(statements) == 3
+    assert "vendor" not in statements[0] and "nutrition" not in statements[0]
+    assert "FROM nutrition" in statements[2] and "protein_g" not in statements[2]
+
+
+def test_unknown_fields_and_includes_are_rejected() -> None:
+    assert Projection.parse("foods", None, None) is None
+    with pytest.raises(ValueError, match="Unknown field 'colour'"):
+        Projection.parse("foods", "name,colour", None)
+    with pytest.raises(ValueError, match="Unknown field 'nutrition.colour'"):
+        Projection.parse("foods", "nutrition.colour", None)
+    with pytest.raises(ValueError, match="Unknown include 'nutrition_alternatives'"):
+        Projection.parse("recipes", None, "nutrition_alternatives")
+    fieldset = Projection.parse("recipes", None, "")
+    assert fieldset is not None and not fieldset.include and "user_id" not in fieldset.fields
+
+
+def test_list_routes_accept_fields_and_include(user_app: Flask) -> None:
+    _add_records()
+
+    with user_app.test_request_context("/api/food?fields=name&include=nutrition_alternatives", method="GET"):
+        foods = _as_response(_unwrap(routes.get_foods)())
+    assert foods.status_code == 200
+    assert [sorted(food) for food in foods.get_json()] == [["id", "name", "nutrition_alternatives"]] * 2
+    assert [len(food["nutrition_alternatives"]) for food in foods.get_json()] == [2, 2]
+
+    with user_app.test_request_context("/api/dailylogitem?date=2026-04-02&fields=servings", method="GET"):
+        logs = _as_response(_unwrap(routes.get_daily_log_entries)())
+    assert logs.get_json() == [{"id": 1, "servings": 1.0}]
+
+    with user_app.test_request_context("/api/recipe?fields=name,secret", method="GET"):
+        bad = _as_response(_unwrap(routes.get_recipes)())
+    assert bad.status_code == 400
+    assert "Unknown field 'secret'" in bad.get_json()["msg"]
+
+
+def _add_recipes(count: int) -> None:
+    with db.session.begin():
+        food = Food.add(1, FoodRequest(
+            group="fruits", name="Apple", vendor="Farmer Market", servings=1.0, price=1.0,
+            nutrition=NutritionRequest(serving_size_description="1 piece", calories=100),
+        ))
+        base = Recipe.add_from_schema(1, RecipeRequest(
+            name="Base", total_yield="1 cup", servings=1,
+            nutrition=NutritionRequest(serving_size_description="1 cup", calories=50),
+        ))
+        for i in range(count):
+            Recipe.add_from_schema(1, RecipeRequest(
+                name=f"Pie {i}", total_yield="1 pie", servings=8,
+                nutrition=NutritionRequest(serving_size_description="1 slice", calories=0),
+                ingredients=[
+                    IngredientRequest(food_ingredient_id=food.id, ordinal=0, servings=3),
+                    IngredientRequest(recipe_ingredient_id=base.id, ordinal=1, servings=1),
+                ],
+            ))
+    db.session.expunge_all()
+
+
+def test_recipes_include_their_ingredients(user_app: Flask) -> None:
+    _add_recipes(1)
+
+    with user_app.test_request_context("/api/recipe?fields=name&include=ingredient_names", method="GET"):
+        resp = _as_response(_unwrap(routes.get_recipes)())
+    assert resp.status_code == 200
+    base, pie = resp.get_json()
+    assert base == {"id": 1, "name": "Base", "ingredients": []}
+    assert [(i["food_name"], i["recipe_name"], i["servings"]) for i in pie["ingredients"]] == [
+        ("Apple", None, 3.0), (None, "Base", 1.0),
+    ]
+
+    # Without the names, the same rows as /api/recipe/<id>/ingredient
+    recipes = _load("recipes", Recipe.query_for_user(1), include="ingredients")
+    with db.session.begin():
+        expected = [
+            {key: value for key, value in ingredient.json().items() if key != "user_id"}
+            for ingredient in Ingredient.get_all_for_recipe(1, pie["id"])
+        ]
+    assert recipes[1]["ingredients"] == expected
+    assert "nutrition" not in recipes[1]
+
+
+def test_renaming_an_ingredient_food_changes_the_recipes_etag(user_app: Flask) -> None:
+    _add_recipes(1)
+
+    def _get(etag: str | None = None) -> Response:
+        headers = {"If-None-Match": etag} if etag else {}
+        with user_app.test_request_context("/api/recipe?include=ingredient_names", method="GET", headers=headers):
+            return _as_response(_unwrap(routes.get_recipes)())
+
+    first = _get()
+    etag = first.headers["ETag"]
+    assert _get(etag).status_code == 304
+
+    with db.session.begin():
+        db.session.get(Food, 1).name = "Green apple"
+    renamed = _get(etag)
+    assert renamed.status_code == 200
+    assert renamed.get_json()[1]["ingredients"][0]["food_name"] == "Green apple"
+
+
+@pytest.mark.parametrize("count", [1, 10, 50])
+def test_recipe_ingredients_take_the_same_queries_however_many_recipes(user_app: Flask, count: int) -> None:
+    _add_recipes(count)
+
+    with QueryCapture() as queries:
+        recipes = _load("recipes", Recipe.query_for_user(1), include="nutrition,ingredient_names")
+    assert len(recipes) == count + 1
+    # The recipes, their nutrition and their ingredients
+    assert queries.count == 3
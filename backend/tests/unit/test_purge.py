@@ -0,0 +1,139 @@
+import datetime
+
+from flask import Flask
+
+from models import db, User, UserStatus, Food, Recipe, Nutrition, NutritionAlternative, DailyLogItem, Ingredient, Preferences
+from purge import Purge
+from schemas import (
+    DailyLogItemRequest, FoodRequest, IngredientRequest, NutritionAlternativeRequest, NutritionRequest, RecipeRequest
+)
+
+
+def _add_user(user_id: int) -> None:
+    db.session.add(User(
+        username=f"user{user_id}",
+        status=UserStatus.confirmed,
+        encrypted_email_addr=None,
+        email_addr_hash=f"hash{user_id}",
+        created_at=datetime.datetime(2026, 1, 1),
+    ))
+    db.session.flush()
+
+
+def _food_request(name: str) -> FoodRequest:
+    return FoodRequest(
+        group="fruits",
+        name=name,
+        vendor="Farmer Market",
+        servings=2.0,
+        price=4.0,
+        nutrition=NutritionRequest(serving_size_description="1 piece", calories=100),
+        nutrition_alternatives=[
+            NutritionAlternativeRequest(
+                serving_value=1, serving_unit="piece", serving_unit_kind="arbitrary", household_weight_g=150, is_primary=True,
+                nutrition=NutritionRequest(serving_size_description="1 piece", calories=100),
+            ),
+            NutritionAlternativeRequest(
+                serving_value=100, serving_unit="g", serving_unit_kind="solid", ordinal=1,
+                nutrition=NutritionRequest(serving_size_description="100 g", calories=80),
+            ),
+        ],
+    )
+
+
+def _seed_account(user_id: int) -> None:
+    """
+    Two foods (with alternatives), a recipe, a variation of that recipe that uses
+    it as an ingredient, daily log entries for both kinds, and a preference row.
+    """
+    _add_user(user_id)
+    apple = Food.add(user_id, _food_request("Apple"))
+    pear = Food.add(user_id, _food_request("Pear"))
+
+    base = Recipe.add_from_schema(user_id, RecipeRequest(
+        name="Fruit salad", total_yield="1 bowl", servings=2,
+        nutrition=NutritionRequest(serving_size_description="1 bowl"),
+        ingredients=[
+            IngredientRequest(food_ingredient_id=apple.id, servings=1, ordinal=0),
+            IngredientRequest(food_ingredient_id=pear.id, servings=1, ordinal=1),
+        ],
+    ))
+    Recipe.add_from_schema(user_id, RecipeRequest(
+        name="Fruit salad deluxe", total_yield="1 bowl", servings=2, parent_recipe_id=base.id,
+        nutrition=NutritionRequest(serving_size_description="1 bowl"),
+        ingredients=[IngredientRequest(recipe_ingredient_id=base.id, servings=2, ordinal=0)],
+    ))
+
+    DailyLogItem.add_from_schema(user_id, DailyLogItemRequest(date="2026-04-02", food_id=apple.id, servings=1))
+    DailyLogItem.add_from_schema(user_id, DailyLogItemRequest(date="2026-04-02", recipe_id=base.id, servings=1))
+    Preferences.save(user_id, "foods.columns", {"name": True})
+    db.session.flush()
+
+
+def _count(model: object, **filters: object) -> int:
+    query = db.select(db.func.count()).select_from(model)  # type: ignore[arg-type]
+    for key, value in filters.items():
+        query = query.where(getattr(model, key) == value)
+    return db.session.scalar(query) or 0
+
+
+def test_purge_user_deletes_everything_in_dependency_order(sqlite_app: Flask) -> None:
+    _ = sqlite_app
+    _seed_account(1)
+    _seed_account(2)
+
+    report = Purge.purge_user(1, include_preferences=True, chunk_size=1)
+
+    assert report.rows == {
+        "daily_log_item": 2,
+        # 2 log snapshots + 2 recipes + 2 foods + 2 non-primary alternatives
+        "nutrition": 8,
+        "ingredient": 3,
+        "recipe": 2,
+        "nutrition_alternative": 4,
+        "food": 2,
+        "preferences": 1,
+    }
+    assert report.total_rows == 22
+    assert report.elapsed_seconds > 0
+    assert report.json()["rows"]["food"] == 2
+
+    for model in (Food, Recipe, Ingredient, DailyLogItem, Nutrition, Preferences):
+        assert _count(model, user_id=1) == 0
+    assert _count(NutritionAlternative) == 4
+
+    # The other account is untouched
+    assert _count(Food, user_id=2) == 2
+    assert _count(Recipe, user_id=2) == 2
+    assert _count(DailyLogItem, user_id=2) == 2
+    assert _count(Nutrition, user_id=2) == 8
+    assert _count(Preferences, user_id=2) == 1
+
+
+def test_purge_user_keeps_preferences_and_sweeps_orphaned_nutrition(sqlite_app: Flask) -> None:
+    _ = sqlite_app
+    _seed_account(1)
+    orphan = Nutrition(1, NutritionRequest(serving_size_description="orphan"))
+    db.session.add(orphan)
+    db.session.flush()
+
+    report = Purge.purge_user(1)
+
+    assert "preferences" not in report.rows
+    assert report.rows["nutrition"] == 9
+    assert _count(Preferences, user_id=1) == 1
+    assert _count(Nutrition, user_id=1) == 0
+
+
+def test_model_delete_all_for_user_methods_use_set_based_purge(sqlite_app: Flask) -> None:
+    _ = sqlite_app
+    _seed_account(1)
+
+    DailyLogItem.delete_all_for_user(1)
+    Recipe.delete_all_for_user(1)
+    Food.delete_all_for_user(1)
+
+    assert _count(DailyLogItem, user_id=1) == 0
+    assert _count(Recipe, user_id=1) == 0
+    assert _count(Food, user_id=1) == 0
+    assert _count(Nutrition, user_id=1) == 0
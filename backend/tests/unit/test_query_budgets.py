@@ -0,0 +1,214 @@
+import datetime
+from typing import Any, Callable, ContextManager, cast
+
+import pytest
+from flask import Flask, Response
+
+import routes
+from data import Data
+from models import db, User, UserStatus, Food, Recipe, DailyLogItem
+from query_capture import QueryCapture
+from schemas import DailyLogItemRequest, FoodRequest, IngredientRequest, NutritionAlternativeRequest, NutritionRequest, RecipeRequest
+
+# Each route's SQL statement budget.  Every test sets up RECORDS records, more
+# than the repeat threshold, so a query per record fails the test even when it
+# squeezes under the budget.
+RECORDS = 5
+BUDGETS = {
+    "get_foods": 5,
+    "get_catalog_foods": 6,
+    # The reads up front, then a savepoint and two flushes' worth of writes per food
+    "copy_catalog_foods": 6 + 10 * RECORDS,
+    "get_recipes": 3,
+    "recalculate_recipe": 5,
+    "get_daily_log_entries": 2,
+    "delete_daily_log_entry": 8,
+}
+
+Budget = Callable[..., ContextManager[QueryCapture]]
+
+
+def _unwrap(func: Any) -> Callable[..., Any]:
+    return cast(Callable[..., Any], getattr(func, "__wrapped__", func))
+
+
+def _as_response(result: object) -> Response:
+    if isinstance(result, tuple):
+        resp, status = cast(tuple[Response, int], result)
+        resp.status_code = status
+        return resp
+    return cast(Response, result)
+
+
+@pytest.fixture
+def user_app(user_app: Flask) -> Flask:
+    # The catalog routes need the catalog user
+    catalog_user = User(
+        username=Data.CATALOG_USER_NAME,
+        status=UserStatus.confirmed,
+        encrypted_email_addr=None,
+        email_addr_hash="hash2",
+        created_at=datetime.datetime(2026, 1, 1),
+    )
+    catalog_user.id = 2
+    db.session.add(catalog_user)
+    db.session.commit()
+    return user_app
+
+
+def _add_foods(user_id: int) -> list[int]:
+    with db.session.begin():
+        food_ids = [
+            Food.add(user_id, FoodRequest(
+                group="fruits", name=f"Fruit {n}", vendor="Farmer Market", servings=1.0, price=1.0,
+                source="usda", fdc_id=1000 + n,
+                nutrition=NutritionRequest(serving_size_description="1 piece", calories=100),
+                nutrition_alternatives=[
+                    NutritionAlternativeRequest(
+                        serving_value=100, serving_unit="g", serving_unit_kind="solid",
+                        nutrition=NutritionRequest(serving_size_description="100 g", calories=50),
+                    ),
+                ],
+            )).id
+            for n in range(RECORDS)
+        ]
+    db.session.expunge_all()
+    return food_ids
+
+
+def _add_recipe(food_ids: list[int]) -> int:
+    with db.session.begin():
+        recipe = Recipe.add_from_schema(1, RecipeRequest(
+            name="Fruit salad", total_yield="1 bowl", servings=2,
+            nutrition=NutritionRequest(serving_size_description="1 bowl"),
+            ingredients=[
+                IngredientRequest(food_ingredient_id=food_id, servings=1, ordinal=n) for n, food_id in enumerate(food_ids)
+            ],
+        ))
+        recipe_id = recipe.id
+        for n in range(RECORDS - 1):
+            Recipe.add_from_schema(1, RecipeRequest(
+                name=f"Snack {n}", total_yield="1 plate", servings=1,
+                nutrition=NutritionRequest(serving_size_description="1 plate", calories=300),
+            ))
+    db.session.expunge_all()
+    return recipe_id
+
+
+def _add_daily_logs(food_ids: list[int]) -> list[int]:
+    with db.session.begin():
+        log_ids = [
+            DailyLogItem.add_from_schema(1, DailyLogItemRequest(date="2026-04-02", food_id=food_id, servings=1)).id
+            for food_id in food_ids
+        ]
+    db.session.expunge_all()
+    return log_ids
+
+
+def _call(app: Flask, route: Callable[..., Any], path: str, *args: Any, method: str = "GET", json: Any = None) -> Response:
+    with app.test_request_context(path, method=method, json=json):
+        return _as_response(_unwrap(route)(*args))
+
+
+def test_get_foods_budget(user_app: Flask, query_budget: Budget) -> None:
+    _add_foods(1)
+
+    with query_budget(BUDGETS["get_foods"]):
+        response = _call(user_app, routes.get_foods, "/api/food")
+    assert response.status_code == 200
+    foods = response.get_json()
+    assert len(foods) == RECORDS
+    assert all(food["nutrition"]["calories"] == 100 for food in foods)
+    assert all(food["nutrition_alternatives"][0]["nutrition"]["calories"] == 50 for food in foods)
+
+
+def test_get_catalog_foods_budget(user_app: Flask, query_budget: Budget) -> None:
+    _add_foods(2)
+
+    with query_budget(BUDGETS["get_catalog_foods"]):
+        response = _call(user_app, routes.get_catalog_foods, "/api/catalog/food")
+    assert response.status_code == 200
+    items = response.get_json()["items"]
+    assert len(items) == RECORDS
+    assert all(len(item["nutrition_alternatives"]) == 1 for item in items)
+
+
+def test_copy_catalog_foods_budget(user_app: Flask, query_budget: Budget) -> None:
+    catalog_food_ids = _add_foods(2)
+
+    with query_budget(BUDGETS["copy_catalog_foods"]):
+        response = _call(
+            user_app, routes.copy_catalog_foods, "/api/catalog/food/copy", method="POST", json={"food_ids": catalog_food_ids},
+        )
+    assert response.status_code == 200
+    assert response.get_json()["created_count"] == RECORDS
+
+    # A retry finds them all already copied
+    with query_budget(BUDGETS["copy_catalog_foods"]):
+        response = _call(
+            user_app, routes.copy_catalog_foods, "/api/catalog/food/copy", method="POST", json={"food_ids": catalog_food_ids},
+        )
+    assert response.get_json()["skipped_count"] == RECORDS
+
+
+def test_get_recipes_budget(user_app: Flask, query_budget: Budget) -> None:
+    _add_recipe(_add_foods(1))
+
+    with query_budget(BUDGETS["get_recipes"]):
+        response = _call(user_app, routes.get_recipes, "/api/recipe")
+    assert response.status_code == 200
+    assert len(response.get_json()) == RECORDS
+
+
+def test_recalculate_recipe_budget(user_app: Flask, query_budget: Budget) -> None:
+    recipe_id = _add_recipe(_add_foods(1))
+
+    with query_budget(BUDGETS["recalculate_recipe"]):
+        response = _call(user_app, routes.recalculate_recipe, f"/api/recipe/{recipe_id}/recalc", recipe_id, method="POST")
+    assert response.status_code == 200
+    with db.session.begin():
+        assert Recipe.get(1, recipe_id).json()["nutrition"]["calories"] == 100 * RECORDS
+
+
+def test_get_daily_log_entries_budget(user_app: Flask, query_budget: Budget) -> None:
+    _add_daily_logs(_add_foods(1))
+
+    for path in ("/api/dailylogitem?date=2026-04-02", "/api/dailylogitem?start=2026-04-01&end=2026-04-07"):
+        with query_budget(BUDGETS["get_daily_log_entries"]):
+            response = _call(user_app, routes.get_daily_log_entries, path)
+        assert response.status_code == 200
+        assert [entry["nutrition"]["calories"] for entry in response.get_json()] == [100] * RECORDS
+
+
+def test_delete_daily_log_entry_budget(user_app: Flask, query_budget: Budget) -> None:
+    log_ids = _add_daily_logs(_add_foods(1))
+
+    with query_budget(BUDGETS["delete_daily_log_entry"]):
+        response = _call(user_app, routes.delete_daily_log_entry, f"/api/dailylogitem/{log_ids[0]}", log_ids[0], method="DELETE")
+    assert response.status_code == 200
+    with db.session.begin():
+        assert [log.ordinal for log in DailyLogItem.get_by_date(1, datetime.date(2026, 4, 2))] == list(range(RECORDS - 1))
+
+
+def test_query_capture_flags_a_query_in_a_loop(user_app: Flask) -> None:
+    food_ids = _add_foods(1)
+
+    with QueryCapture() as queries:
+        with db.session.begin():
+            for food_id in food_ids:
+                Food.get(1, food_id)
+    assert queries.count == RECORDS
+    [(shape, count)] = queries.repeated().items()
+    assert count == RECORDS
+    assert "food.id = ?" in shape
+    with pytest.raises(AssertionError, match="a query in a loop"):
+        queries.assert_budget(max_queries=RECORDS)
+    with pytest.raises(AssertionError, match="over the budget of 2"):
+        queries.assert_budget(max_queries=2, threshold=RECORDS + 1)
+
+
+def test_query_capture_shape_ignores_values() -> None:
+    assert QueryCapture.shape("SELECT * FROM food WHERE id = 12 AND name = 'O''Brien'") == "SELECT * FROM food WHERE id = ? AND name = ?"
+    assert QueryCapture.shape("SELECT *\n  FROM food WHERE id IN (?, ?, ?)") == "SELECT * FROM food WHERE id IN (...)"
+    assert QueryCapture.shape("SELECT * FROM food WHERE id IN (%(id_1)s, %(id_2)s)") == "SELECT * FROM food WHERE id IN (...)"
+    assert QueryCapture.shape("SELECT anon_1.id FROM anon_1") == "SELECT anon_1.id FROM anon_1"
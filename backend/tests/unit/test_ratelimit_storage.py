@@ -0,0 +1,80 @@
+import multiprocessing
+import sqlite3
+from pathlib import Path
+
+from flask import Flask
+from flask_limiter import Limiter
+from flask_limiter.util import get_remote_address
+from limits import parse
+from limits.storage import storage_from_string
+from limits.strategies import FixedWindowRateLimiter, SlidingWindowCounterRateLimiter
+
+from ratelimit_storage import SqliteStorage
+
+
+def _uri(tmp_path: Path) -> str:
+    return f"sqlite:///{tmp_path / 'ratelimit.db'}"
+
+
+def _take_slots(uri: str, attempts: int, results: "multiprocessing.Queue[int]") -> None:
+    limiter = SlidingWindowCounterRateLimiter(storage_from_string(uri))
+    limit = parse("10/minute")
+    results.put(sum(limiter.hit(limit, "register", "127.0.0.1") for _ in range(attempts)))
+
+
+def test_fixed_window_counts_and_clears(tmp_path: Path) -> None:
+    storage = storage_from_string(_uri(tmp_path))
+    assert isinstance(storage, SqliteStorage)
+    limiter = FixedWindowRateLimiter(storage)
+    limit = parse("3/minute")
+
+    assert [limiter.hit(limit, "contact") for _ in range(4)] == [True, True, True, False]
+    assert limiter.get_window_stats(limit, "contact").remaining == 0
+    assert limiter.test(limit, "other")
+
+    limiter.clear(limit, "contact")
+    assert limiter.hit(limit, "contact")
+
+
+def test_processes_share_the_sliding_window(tmp_path: Path) -> None:
+    uri = _uri(tmp_path)
+    storage_from_string(uri)  # create the schema first
+    context = multiprocessing.get_context("fork")
+    results = context.Queue()
+    workers = [context.Process(target=_take_slots, args=(uri, 10, results)) for _ in range(4)]
+    for worker in workers:
+        worker.start()
+    taken = [results.get(timeout=30) for _ in workers]
+    for worker in workers:
+        worker.join(timeout=10)
+
+    # Forty attempts from four processes, and only the limit got through
+    assert sum(taken) == 10
+
+
+def test_expired_counters_are_deleted(tmp_path: Path) -> None:
+    storage = SqliteStorage(_uri(tmp_path))
+    storage.incr("gone", 0)
+    storage.incr("kept", 60)
+    assert storage.get("gone") == 0
+
+    storage._next_expiry = 0
+    storage.incr("kept", 60)
+
+    with sqlite3.connect(storage.path) as conn:
+        assert conn.execute("SELECT key, value FROM ratelimit_counter").fetchall() == [("kept", 2)]
+
+
+def test_flask_limiter_uses_it(tmp_path: Path) -> None:
+    app = Flask(__name__)
+    app.config["RATELIMIT_STORAGE_URI"] = _uri(tmp_path)
+    app.config["RATELIMIT_STRATEGY"] = "sliding-window-counter"
+    limiter = Limiter(key_func=get_remote_address, app=app)
+
+    @app.route("/api/contact", methods=["POST"])
+    @limiter.limit("2/hour")
+    def contact():
+        return "", 204
+
+    client = app.test_client()
+    assert [client.post("/api/contact").status_code for _ in range(3)] == [204, 204, 429]
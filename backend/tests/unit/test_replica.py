@@ -0,0 +1,120 @@
+import datetime
+import shutil
+from pathlib import Path
+from typing import Any, Callable, Iterator, cast
+
+import pytest
+from flask import Flask, Response
+
+import routes
+from crypto import Crypto
+from metrics import Metrics
+from models import db, User, UserStatus, Food, CollectionVersion
+from replica import REPLICA_BIND, REPLICA_REQUESTS_METRIC, Replica
+from schemas import FoodRequest, NutritionRequest
+
+EMAIL = "user1@example.com"
+
+
+def _unwrap(func: Any) -> Callable[..., Any]:
+    return cast(Callable[..., Any], getattr(func, "__wrapped__", func))
+
+
+def _set_last_write(when: datetime.datetime) -> None:
+    with db.session.begin():
+        for version in db.session.scalars(db.select(CollectionVersion)):
+            version.modified_at = when
+    # A new session, as a new request would have
+    db.session.remove()
+
+
+@pytest.fixture
+def replica_app(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Iterator[Flask]:
+    """
+    Two SQLite files, the replica a copy of the primary taken before the one
+    Food on it was renamed: a replica that hasn't caught up yet.
+    """
+    Metrics.reset()
+    monkeypatch.setattr(Crypto, "_symmetric_key", b"k" * 32)
+    monkeypatch.setattr(routes, "get_jwt_identity", lambda: EMAIL)
+    monkeypatch.setattr(routes, "get_jwt", lambda: cast(dict[str, Any], {}))
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{tmp_path / 'primary.db'}"
+    app.config["SQLALCHEMY_BINDS"] = {REPLICA_BIND: f"sqlite:///{tmp_path / 'replica.db'}"}
+    db.init_app(app)
+
+    with app.app_context():
+        db.create_all()
+        with db.session.begin():
+            db.session.add(User(
+                username="user1", status=UserStatus.confirmed, encrypted_email_addr=None,
+                email_addr_hash=Crypto.hash(EMAIL), created_at=datetime.datetime(2026, 1, 1),
+            ))
+            db.session.flush()
+            food = Food.add(1, FoodRequest(
+                group="fruits", name="Apple", vendor="Farmer Market", servings=1.0,
+                nutrition=NutritionRequest(serving_size_description="1 apple", calories=95),
+            ))
+        db.engine.dispose()
+        shutil.copy(tmp_path / "primary.db", tmp_path / "replica.db")
+
+        with db.session.begin():
+            db.session.get(Food, food.id).name = "Green apple"
+        db.session.remove()
+        yield app
+        db.session.remove()
+        for engine in db.engines.values():
+            engine.dispose()
+    # init_app registered a MetaData for the bind on the (shared) db, and the
+    # other tests' apps don't have it
+    db.metadatas.pop(REPLICA_BIND, None)
+
+
+def _food_names(app: Flask) -> list[str]:
+    with app.test_request_context("/api/food"):
+        result = _unwrap(routes.get_foods)()
+    response = cast(Response, result[0] if isinstance(result, tuple) else result)
+    return [food["name"] for food in response.get_json()]
+
+
+def test_reads_go_to_the_replica(replica_app: Flask) -> None:
+    _set_last_write(datetime.datetime(2026, 1, 1))
+
+    assert _food_names(replica_app) == ["Apple"]
+    assert Metrics.get(REPLICA_REQUESTS_METRIC, target="replica") == 1
+
+
+def test_a_user_who_just_wrote_reads_from_the_primary(replica_app: Flask, monkeypatch: pytest.MonkeyPatch) -> None:
+    # The rename has just been stamped
+    assert _food_names(replica_app) == ["Green apple"]
+    assert Metrics.get(REPLICA_REQUESTS_METRIC, target="primary", reason="recent_write") == 1
+
+    # ...until the window's passed
+    monkeypatch.setenv("REPLICA_READ_YOUR_WRITES_SECONDS", "0")
+    assert _food_names(replica_app) == ["Apple"]
+
+
+def test_writes_and_the_reads_after_them_use_the_primary(replica_app: Flask) -> None:
+    _set_last_write(datetime.datetime(2026, 1, 1))
+
+    with replica_app.test_request_context("/api/food"):
+        assert Replica.route_reads(EMAIL)
+        with db.session.begin():
+            assert db.session.scalar(db.select(Food.name)) == "Apple"
+            Food.add(1, FoodRequest(
+                group="fruits", name="Pear", vendor="Farmer Market", servings=1.0,
+                nutrition=NutritionRequest(serving_size_description="1 pear", calories=100),
+            ))
+            db.session.flush()
+            assert db.session.scalars(db.select(Food.name).order_by(Food.name)).all() == ["Green apple", "Pear"]
+        db.session.remove()
+
+
+def test_other_requests_use_the_primary(replica_app: Flask) -> None:
+    _set_last_write(datetime.datetime(2026, 1, 1))
+
+    with replica_app.test_request_context("/api/food", method="POST"):
+        with db.session.begin():
+            assert db.session.scalar(db.select(Food.name)) == "Green apple"
+        db.session.remove()
+    assert Metrics.get(REPLICA_REQUESTS_METRIC) == 0
@@ -0,0 +1,70 @@
+from typing import Any, Callable, cast
+
+from flask import Flask, Response
+
+import routes
+from models import db, DailyLogItem, Food, IdempotencyKey
+from schemas import FoodRequest, NutritionRequest
+
+
+def _unwrap(func: Any) -> Callable[..., Any]:
+    return cast(Callable[..., Any], getattr(func, "__wrapped__", func))
+
+
+def _food_data(name: str) -> dict[str, Any]:
+    return FoodRequest(
+        group="fruits", name=name, vendor="Farmer Market", servings=1.0, price=1.0,
+        nutrition=NutritionRequest(serving_size_description="1 piece", calories=100),
+    ).model_dump()
+
+
+def _post_batch(app: Flask, operations: list[dict[str, Any]]) -> tuple[Response, int]:
+    with app.test_request_context("/api/batch", method="POST", json={"operations": operations}):
+        return cast(tuple[Response, int], _unwrap(routes.batch_writes)())
+
+
+def _count(model: Any) -> int:
+    with db.session.begin():
+        return int(db.session.scalar(db.select(db.func.count()).select_from(model)) or 0)
+
+
+def test_batch_applies_operations_independently_and_replays_keys(user_app: Flask) -> None:
+    with db.session.begin():
+        food_id = Food.add(1, FoodRequest.model_validate(_food_data("Apple"))).id
+
+    operations: list[dict[str, Any]] = [
+        {"op": "dailylog.add", "data": {"date": "2026-04-02", "food_id": food_id, "servings": 1}, "idempotency_key": "log-1"},
+        {"op": "food.add", "data": _food_data("Pear"), "idempotency_key": "food-1"},
+        {"op": "dailylog.update", "id": 9999, "data": {"servings": 2}},
+        {"op": "food.update", "data": {**_food_data("Green apple"), "id": food_id}},
+    ]
+    resp, status = _post_batch(user_app, operations)
+    results = resp.get_json()["results"]
+
+    assert status == 200
+    assert [result["status"] for result in results] == [201, 201, 400, 200]
+    assert results[2]["body"]["msg"].startswith("DailyLogItem entry could not be updated")
+    assert results[3]["body"]["name"] == "Green apple"
+    assert (_count(DailyLogItem), _count(Food), _count(IdempotencyKey)) == (1, 2, 2)
+
+    # The app retries the whole batch: the keyed operations aren't applied again
+    replay, _ = _post_batch(user_app, operations)
+    replayed = replay.get_json()["results"]
+    assert [result.get("replayed", False) for result in replayed] == [True, True, False, False]
+    assert replayed[0]["body"] == results[0]["body"]
+    assert (_count(DailyLogItem), _count(Food)) == (1, 2)
+
+    # A key can't be reused for something else
+    misuse, _ = _post_batch(user_app, [{"op": "food.add", "data": _food_data("Plum"), "idempotency_key": "food-1"}])
+    assert misuse.get_json()["results"][0]["status"] == 422
+    assert _count(Food) == 2
+
+
+def test_batch_rejects_malformed_requests(user_app: Flask) -> None:
+    _, status = _post_batch(user_app, [{"op": "dailylog.delete"}])
+    assert status == 422
+
+    keys = [{"op": "dailylog.delete", "id": n, "idempotency_key": "same"} for n in (1, 2)]
+    resp, status = _post_batch(user_app, keys)
+    assert status == 422
+    assert "unique" in resp.get_json()["msg"]
@@ -0,0 +1,68 @@
+from typing import Any, Callable, cast
+
+from flask import Flask, Response
+
+import routes
+from models import db, Food, DailyLogItem, Preferences
+from query_capture import QueryCapture
+from schemas import DailyLogItemRequest, FoodRequest, NutritionRequest
+
+
+def _unwrap(func: Any) -> Callable[..., Any]:
+    return cast(Callable[..., Any], getattr(func, "__wrapped__", func))
+
+
+def _add_food(name: str) -> Food:
+    with db.session.begin():
+        return Food.add(1, FoodRequest(
+            group="fruits", name=name, vendor="Farmer Market", servings=1.0, price=1.0,
+            nutrition=NutritionRequest(serving_size_description="1 piece", calories=100),
+        ))
+
+
+def _bootstrap(app: Flask, query: str = "", etags: list[str] | None = None) -> tuple[int, dict[str, Any]]:
+    headers = {"If-None-Match": ", ".join(f'"{etag}"' for etag in etags)} if etags else {}
+    with app.test_request_context(f"/api/bootstrap{query}", method="GET", headers=headers):
+        resp, status = cast(tuple[Response, int], _unwrap(routes.bootstrap)())
+        return status, resp.get_json()
+
+
+def test_bootstrap_returns_every_section(user_app: Flask) -> None:
+    food = _add_food("Apple")
+    with db.session.begin():
+        Preferences.save(1, "foods.columns", {"columns": ["name"]})
+        DailyLogItem.add_from_schema(1, DailyLogItemRequest(date="2026-04-02", food_id=food.id, servings=1.0))
+
+    status, body = _bootstrap(user_app, "?date=2026-04-02")
+
+    assert status == 200
+    assert body["whoami"] == {"logged_in_as": "user1@example.com"}
+    assert body["preferences"]["data"] == {"foods.columns": {"columns": ["name"]}}
+    assert [f["name"] for f in body["foods"]["data"]] == ["Apple"]
+    assert body["recipes"]["data"] == []
+    assert len(body["daily_log"]["data"]) == 1
+    assert body["daily_log"]["date"] == "2026-04-02"
+
+
+def test_unchanged_sections_are_left_out(user_app: Flask) -> None:
+    _add_food("Apple")
+    _, first = _bootstrap(user_app, "?include=foods,recipes")
+    assert set(first) == {"foods", "recipes"}
+    etags = [first["foods"]["etag"], first["recipes"]["etag"]]
+
+    with QueryCapture() as queries:
+        _, cached = _bootstrap(user_app, "?include=foods,recipes", etags)
+    assert cached["foods"] == {"etag": etags[0], "not_modified": True}
+    assert cached["recipes"] == {"etag": etags[1], "not_modified": True}
+    assert not any("FROM food" in statement for statement in queries.statements)
+
+    _add_food("Pear")
+    _, changed = _bootstrap(user_app, "?include=foods,recipes", etags)
+    assert [f["name"] for f in changed["foods"]["data"]] == ["Apple", "Pear"]
+    assert changed["recipes"]["not_modified"]
+
+
+def test_unknown_sections_are_rejected(user_app: Flask) -> None:
+    status, body = _bootstrap(user_app, "?include=foods,everything")
+    assert status == 400
+    assert "everything" in body["msg"]
@@ -0,0 +1,96 @@
+from typing import Any, Callable, cast
+
+from flask import Flask, Response
+from sqlalchemy import event
+
+import routes
+from metrics import Metrics
+from models import db, Food, Preferences
+from schemas import FoodRequest, NutritionRequest
+
+
+def _unwrap(func: Any) -> Callable[..., Any]:
+    return cast(Callable[..., Any], getattr(func, "__wrapped__", func))
+
+
+def _as_response(result: object) -> Response:
+    if isinstance(result, tuple):
+        resp, status = cast(tuple[Response, int], result)
+        resp.status_code = status
+        return resp
+    return cast(Response, result)
+
+
+def _add_food(name: str) -> Food:
+    with db.session.begin():
+        return Food.add(1, FoodRequest(
+            group="fruits", name=name, vendor="Farmer Market", servings=1.0, price=1.0,
+            nutrition=NutritionRequest(serving_size_description="1 piece", calories=100),
+        ))
+
+
+def _get(app: Flask, route: Callable[..., Any], path: str, etag: str | None = None, *args: Any) -> Response:
+    headers = {"If-None-Match": f'"{etag}"'} if etag else {}
+    with app.test_request_context(path, method="GET", headers=headers):
+        return _as_response(_unwrap(route)(*args))
+
+
+def test_get_foods_returns_304_until_foods_change(user_app: Flask) -> None:
+    _add_food("Apple")
+
+    first = _get(user_app, routes.get_foods, "/api/food")
+    etag = first.get_etag()[0]
+    assert first.status_code == 200
+    assert [food["name"] for food in first.get_json()] == ["Apple"]
+    assert first.headers["Cache-Control"] == "private, no-cache"
+
+    statements: list[str] = []
+
+    def _record(_conn: Any, _cursor: Any, statement: str, *_args: Any) -> None:
+        statements.append(statement)
+
+    event.listen(db.engine, "before_cursor_execute", _record)
+    try:
+        cached = _get(user_app, routes.get_foods, "/api/food", etag)
+    finally:
+        event.remove(db.engine, "before_cursor_execute", _record)
+    assert cached.status_code == 304
+    assert cached.get_etag()[0] == etag
+    assert not any("FROM food" in statement for statement in statements)
+
+    # A write to another collection doesn't invalidate the Foods
+    with db.session.begin():
+        Preferences.save(1, "daily_log", {"columns": ["calories"]})
+    assert _get(user_app, routes.get_foods, "/api/food", etag).status_code == 304
+
+    _add_food("Pear")
+    changed = _get(user_app, routes.get_foods, "/api/food", etag)
+    assert changed.status_code == 200
+    assert changed.get_etag()[0] != etag
+    assert len(changed.get_json()) == 2
+
+    assert Metrics.get(routes.CONDITIONAL_GET_METRIC, route="/api/food", result="hit") == 2
+    assert Metrics.get(routes.CONDITIONAL_GET_METRIC, route="/api/food", result="stale") == 1
+    assert Metrics.ratio(routes.CONDITIONAL_GET_METRIC, {"result": "hit"}, route="/api/food") == 2 / 4
+
+
+def test_get_preferences_and_recipes_have_their_own_etags(user_app: Flask) -> None:
+    with db.session.begin():
+        Preferences.save(1, "daily_log", {"columns": ["calories"]})
+
+    prefs = _get(user_app, routes.get_preferences, "/api/preferences/daily_log", None, "daily_log")
+    recipes = _get(user_app, routes.get_recipes, "/api/recipe")
+    prefs_etag = prefs.get_etag()[0]
+    assert prefs.status_code == recipes.status_code == 200
+    assert prefs_etag != recipes.get_etag()[0]
+
+    # Each context has its own ETag, even though they share a counter
+    other = _get(user_app, routes.get_preferences, "/api/preferences/food", prefs_etag, "food")
+    assert other.status_code == 200
+
+    assert _get(user_app, routes.get_preferences, "/api/preferences/daily_log", prefs_etag, "daily_log").status_code == 304
+    with db.session.begin():
+        Preferences.save(1, "daily_log", {"columns": ["protein"]})
+    updated = _get(user_app, routes.get_preferences, "/api/preferences/daily_log", prefs_etag, "daily_log")
+    assert updated.status_code == 200
+    assert updated.get_json()["preferences"] == {"columns": ["protein"]}
@@ -1,5 +1,6 @@
 from types import SimpleNamespace, TracebackType
-from typing import Any, Callable, cast
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Iterator, cast
 
 import pytest
 from flask import Flask, Response
@@ -122,6 +123,7 @@ def test_food_crud_endpoints(bare_flask_app: Flask, monkeypatch: pytest.MonkeyPa
     monkeypatch.setattr(routes.Food, "get", staticmethod(_get_food))
     monkeypatch.setattr(routes.Food, "add", staticmethod(_add_food))
     monkeypatch.setattr(routes.Food, "update", staticmethod(_update_food))
+    monkeypatch.setattr(routes.CollectionVersion, "etag", staticmethod(lambda user_id, collections, variant="": "tag"))
 
     with bare_flask_app.test_request_context("/api/food", method="GET"):
         get_all_resp, get_all_status = _as_response_status(_unwrap(routes.get_foods)())
@@ -210,6 +212,7 @@ def test_recipe_crud_and_ingredients_get(bare_flask_app: Flask, monkeypatch: pyt
     monkeypatch.setattr(routes.Recipe, "get", staticmethod(_get_recipe))
     monkeypatch.setattr(routes.Recipe, "add_from_schema", staticmethod(_add_recipe))
     monkeypatch.setattr(routes.Recipe, "update_from_schema", staticmethod(_update_recipe))
+    monkeypatch.setattr(routes.CollectionVersion, "etag", staticmethod(lambda user_id, collections, variant="": "tag"))
     monkeypatch.setattr(routes.Ingredient, "get_all_for_recipe", staticmethod(_get_all_ingredients))
 
     with bare_flask_app.test_request_context("/api/recipe", method="GET"):
@@ -606,3 +609,97 @@ def test_delete_daily_log_entry_returns_400_on_error(
 
     assert status == 400
     assert "DailyLogItem entry could not be deleted: boom" == resp.get_json()["msg"]
+
+
+def _mock_export(monkeypatch: pytest.MonkeyPatch, last_modified: datetime | None) -> list[tuple[int, str]]:
+    _mock_session(monkeypatch)
+    monkeypatch.setattr(routes, "get_jwt_identity", lambda: "testuser")
+    monkeypatch.setattr(routes.User, "get_id_by_email", staticmethod(lambda email: 1))
+    monkeypatch.setattr(routes.CollectionVersion, "last_modified", staticmethod(lambda user_id: last_modified))
+    calls: list[tuple[int, str]] = []
+
+    def _iter_archive(user_id: int, archive_format: str) -> Iterator[bytes]:
+        calls.append((user_id, archive_format))
+        yield b"part1"
+        yield b"part2"
+
+    monkeypatch.setattr(routes.Exporter, "iter_archive", staticmethod(_iter_archive))
+    return calls
+
+
+def test_export_user_data_streams_archive(bare_flask_app: Flask, monkeypatch: pytest.MonkeyPatch) -> None:
+    modified_at = datetime(2026, 4, 2, 12, 30, 15, 500000, tzinfo=timezone.utc)
+    calls = _mock_export(monkeypatch, modified_at)
+
+    with bare_flask_app.test_request_context("/api/export?format=tar", method="GET"):
+        resp, status = _as_response_status(_unwrap(routes.export_user_data)())
+        body = b"".join(resp.response)
+
+    assert status == 200
+    assert body == b"part1part2"
+    assert calls == [(1, "tar")]
+    assert resp.mimetype == "application/gzip"
+    assert resp.headers["Content-Disposition"] == 'attachment; filename="trackeats-export.tar.gz"'
+    assert resp.last_modified == modified_at.replace(microsecond=0)
+
+
+def test_export_user_data_returns_304_when_not_modified(bare_flask_app: Flask, monkeypatch: pytest.MonkeyPatch) -> None:
+    calls = _mock_export(monkeypatch, datetime(2026, 4, 2, 12, 30, 15, 500000, tzinfo=timezone.utc))
+    headers = {"If-Modified-Since": "Thu, 02 Apr 2026 12:30:15 GMT"}
+
+    with bare_flask_app.test_request_context("/api/export", method="GET", headers=headers):
+        resp, status = _as_response_status(_unwrap(routes.export_user_data)())
+
+    assert status == 304
+    assert calls == []
+
+
+def test_export_user_data_withholds_last_modified_until_its_second_is_over(
+    bare_flask_app: Flask, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    # Changed just now, so a later change could still land in the same second
+    calls = _mock_export(monkeypatch, datetime.now(timezone.utc))
+    headers = {"If-Modified-Since": (datetime.now(timezone.utc) + timedelta(hours=1)).strftime("%a, %d %b %Y %H:%M:%S GMT")}
+
+    with bare_flask_app.test_request_context("/api/export", method="GET", headers=headers):
+        resp, status = _as_response_status(_unwrap(routes.export_user_data)())
+        b"".join(resp.response)
+
+    assert status == 200
+    assert resp.last_modified is None
+    assert calls == [(1, "zip")]
+
+
+def test_export_user_data_rejects_unknown_format(bare_flask_app: Flask, monkeypatch: pytest.MonkeyPatch) -> None:
+    calls = _mock_export(monkeypatch, None)
+
+    with bare_flask_app.test_request_context("/api/export?format=rar", method="GET"):
+        resp, status = _as_response_status(_unwrap(routes.export_user_data)())
+
+    assert status == 400
+    assert resp.get_json()["msg"].startswith("Data export failed: format must be one of")
+    assert calls == []
+
+
+def test_sync_changes_passes_cursor_and_rejects_bad_ones(bare_flask_app: Flask, monkeypatch: pytest.MonkeyPatch) -> None:
+    _mock_session(monkeypatch)
+    monkeypatch.setattr(routes, "get_jwt_identity", lambda: "testuser")
+    monkeypatch.setattr(routes.User, "get_id_by_email", staticmethod(lambda email: 1))
+    calls: list[tuple[int, int | None, int]] = []
+
+    def _changes(user_id: int, since: int | None, limit: int) -> dict[str, Any]:
+        calls.append((user_id, since, limit))
+        return {"cursor": "42", "more": False}
+
+    monkeypatch.setattr(routes.Sync, "changes", staticmethod(_changes))
+
+    with bare_flask_app.test_request_context("/api/sync?since=17&limit=50", method="GET"):
+        resp, status = _as_response_status(_unwrap(routes.sync_changes)())
+    assert status == 200
+    assert resp.get_json() == {"cursor": "42", "more": False}
+    assert calls == [(1, 17, 50)]
+
+    with bare_flask_app.test_request_context("/api/sync?since=abc", method="GET"):
+        resp, status = _as_response_status(_unwrap(routes.sync_changes)())
+    assert status == 400
+    assert resp.get_json()["msg"] == "Sync failed: Invalid sync cursor 'abc'"
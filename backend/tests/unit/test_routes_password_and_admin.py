@@ -456,20 +456,17 @@ def test_delete_user_admin_happy_path(bare_flask_app: Flask, monkeypatch: pytest
 
     monkeypatch.setattr(routes.User, "get_by_email", staticmethod(_get_by_email))
 
-    calls: dict[str, int] = {}
+    calls: dict[str, Any] = {}
 
-    def _delete_recipes(user_id: int) -> None:
-        calls["recipe"] = user_id
+    def _purge_user(user_id: int, include_preferences: bool = False) -> None:
+        calls["user_id"] = user_id
+        calls["include_preferences"] = include_preferences
 
-    def _delete_foods(user_id: int) -> None:
-        calls["food"] = user_id
-
-    monkeypatch.setattr(routes.Recipe, "delete_all_for_user", staticmethod(_delete_recipes))
-    monkeypatch.setattr(routes.Food, "delete_all_for_user", staticmethod(_delete_foods))
+    monkeypatch.setattr(routes.Purge, "purge_user", staticmethod(_purge_user))
 
     with bare_flask_app.test_request_context("/api/user", method="DELETE"):
         _, status = _as_response_status(_unwrap(routes.delete_user)())
 
     assert status == 200
-    assert calls == {"recipe": 42, "food": 42}
+    assert calls == {"user_id": 42, "include_preferences": True}
     assert deleted == [user_dao]
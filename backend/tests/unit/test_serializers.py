@@ -0,0 +1,72 @@
+import datetime
+from flask import Flask
+from sqlalchemy.orm import selectinload
+from models import db, User, UserStatus, Food, Nutrition, Recipe
+from schemas import FoodRequest, NutritionAlternativeRequest, NutritionRequest
+from serializers import ColumnSerializer
+
+
+def _add_food() -> int:
+    user = User(
+        username="user1",
+        status=UserStatus.confirmed,
+        encrypted_email_addr=None,
+        email_addr_hash="hash1",
+        created_at=datetime.datetime(2026, 1, 1),
+    )
+    user.id = 1
+    db.session.add(user)
+    db.session.flush()
+    food = Food.add(1, FoodRequest(
+        group="fruits", name="Orange", vendor="Farmer Market", servings=2.0, price=4.99,
+        size_imperial=16.0, size_metric=454, price_date="2026-04-01",
+        nutrition=NutritionRequest(serving_size_description="1 orange", calories=62),
+        nutrition_alternatives=[
+            NutritionAlternativeRequest(
+                serving_value=100, serving_unit="g", serving_unit_kind="solid",
+                nutrition=NutritionRequest(serving_size_description="100 g", calories=47),
+            ),
+        ],
+    ))
+    return food.id
+
+
+def test_column_serializer_covers_every_column_but_the_excluded_ones() -> None:
+    serializer = ColumnSerializer(Food, exclude=("group", "price_date", "last_synced_at"))
+    all_columns = {attr.key for attr in Food.__mapper__.column_attrs}
+    assert set(serializer.columns) == all_columns - {"group", "price_date", "last_synced_at"}
+    assert "user_id" not in ColumnSerializer(Recipe, exclude=("user_id",)).columns
+
+
+def test_food_json_is_the_same_whether_or_not_it_is_loaded(sqlite_app: Flask) -> None:
+    _ = sqlite_app
+    with db.session.begin():
+        food_id = _add_food()
+    db.session.expunge_all()
+
+    with db.session.begin():
+        food = db.session.scalars(
+            db.select(Food).options(selectinload(Food.nutrition), selectinload(Food.nutrition_alternatives))
+        ).one()
+        loaded = food.json()
+        # An expired object has nothing in its __dict__, so this takes the slow path
+        db.session.expire(food)
+        expired = food.json()
+
+    assert loaded == expired
+    assert loaded["id"] == food_id
+    assert loaded["user_id"] == 1
+    assert loaded["group"] == "fruits"
+    assert loaded["price_date"] == "2026-04-01"
+    assert loaded["last_synced_at"] is None
+    assert loaded["size_g"] == 454
+    assert set(loaded["nutrition"]) == {attr.key for attr in Nutrition.__mapper__.column_attrs}
+    assert loaded["nutrition"]["calories"] == 62
+    assert [alt["nutrition"]["calories"] for alt in loaded["nutrition_alternatives"]] == [47]
+
+
+def test_json_of_a_new_object_fills_in_unset_columns() -> None:
+    data = Nutrition(1, NutritionRequest(serving_size_description="1 cup", calories=80)).json()
+    assert data["id"] is None
+    assert data["user_id"] == 1
+    assert data["calories"] == 80
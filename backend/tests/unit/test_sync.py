@@ -0,0 +1,105 @@
+import datetime
+from typing import Any
+
+from flask import Flask
+
+from bulk_load import BulkLoad
+from models import db, User, UserStatus, ChangeLog, Food, Preferences, DailyLogItem
+from purge import Purge
+from schemas import DailyLogItemRequest, FoodRequest, NutritionRequest
+from sync import Sync
+
+
+def _add_user(user_id: int) -> None:
+    user = User(
+        username=f"user{user_id}",
+        status=UserStatus.confirmed,
+        encrypted_email_addr=None,
+        email_addr_hash=f"hash{user_id}",
+        created_at=datetime.datetime(2026, 1, 1),
+    )
+    user.id = user_id
+    db.session.add(user)
+    db.session.flush()
+
+
+def _food_request(name: str, calories: int = 100) -> FoodRequest:
+    return FoodRequest(
+        group="fruits", name=name, vendor="Farmer Market", servings=2.0, price=4.0,
+        nutrition=NutritionRequest(serving_size_description="1 piece", calories=calories),
+    )
+
+
+def _sync(user_id: int, cursor: str | None, limit: int = 500) -> dict[str, Any]:
+    return Sync.changes(user_id, Sync.parse_cursor(cursor), limit)
+
+
+def test_sync_returns_only_what_changed_since_the_cursor(sqlite_app: Flask) -> None:
+    _ = sqlite_app
+    _add_user(1)
+    _add_user(2)
+    food_ids = BulkLoad.load_foods(1, [_food_request(f"Fruit {n}") for n in range(40)])
+    BulkLoad.load_foods(2, [_food_request("Someone else's")])
+    Preferences.save(1, "daily_log", {"columns": ["calories"]})
+    db.session.flush()
+
+    full = _sync(1, None)
+    assert full["reset"] == list(ChangeLog.ENTITIES)
+    assert len(full["upserted"]["foods"]) == 40
+    assert full["upserted"]["preferences"][0]["context"] == "daily_log"
+    assert _sync(1, full["cursor"]) == {"cursor": full["cursor"], "more": False}
+
+    # Change one Food twice (the second time only its Nutrition), delete another,
+    # and log something
+    apple = db.session.get(Food, food_ids[0])
+    assert apple is not None
+    apple.name = "Apple"
+    db.session.flush()
+    apple.nutrition.calories = 95
+    db.session.flush()
+    Food.delete(1, food_ids[1])
+    log = DailyLogItem.add_from_schema(1, DailyLogItemRequest(date="2026-04-02", food_id=food_ids[2], servings=1))
+    db.session.flush()
+
+    delta = _sync(1, full["cursor"])
+    assert delta["deleted"] == {"foods": [food_ids[1]]}
+    assert [(food["name"], food["nutrition"]["calories"]) for food in delta["upserted"]["foods"]] == [("Apple", 95)]
+    assert [item["id"] for item in delta["upserted"]["daily_logs"]] == [log.id]
+    assert "reset" not in delta
+
+    # Paging: each page moves the cursor on, and the last one says there's no more
+    first_page = _sync(1, full["cursor"], limit=2)
+    assert first_page["more"] is True
+    rest = _sync(1, first_page["cursor"])
+    assert rest["more"] is False and rest["cursor"] == delta["cursor"]
+
+
+def test_purge_logs_a_reset_and_compaction_keeps_sync_results(sqlite_app: Flask) -> None:
+    _ = sqlite_app
+    _add_user(1)
+    food_ids = BulkLoad.load_foods(1, [_food_request("Apple"), _food_request("Pear")])
+    cursor = _sync(1, None)["cursor"]
+
+    for calories in (10, 20, 30):
+        food = db.session.get(Food, food_ids[0])
+        assert food is not None
+        food.nutrition.calories = calories
+        db.session.flush()
+    before = _sync(1, "0")
+
+    assert ChangeLog.compact(1) == 3
+    assert _sync(1, "0") == before
+    assert _sync(1, cursor)["upserted"]["foods"][0]["nutrition"]["calories"] == 30
+
+    Purge.purge_user(1)
+    # Purge doesn't touch the session, which still holds the deleted Foods
+    db.session.expunge_all()
+    BulkLoad.load_foods(1, [_food_request("Plum")])
+    after_purge = _sync(1, cursor)
+    assert after_purge["reset"] == ["foods"]
+    assert [food["name"] for food in after_purge["upserted"]["foods"]] == ["Plum"]
+    # The reset superseded everything before it
+    assert db.session.scalar(db.select(db.func.count()).select_from(ChangeLog)) == 2
+
+    # A cursor the server never handed out means starting over
+    assert _sync(1, "999999")["reset"] == list(ChangeLog.ENTITIES)
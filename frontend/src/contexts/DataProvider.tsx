@@ -18,6 +18,7 @@ import {
     RECIPE_RECALC_TIMEOUT_MS,
 } from '@/utils/constants';
 import { generateIngredientSummary } from "../utils/generateIngredientSummary";
+import { ColumnarTable, COLUMNAR_MIME_TYPE, decodeColumnar } from "../utils/columnar";
 
 const SOCIAL_SEED_PROMPT_SEEN_KEY = 'social_seed_prompt_seen';
 
@@ -436,8 +437,11 @@ export const DataProvider: React.FC<{children: React.ReactNode}> = ({children})
 
     const getFoods = useCallback(async (): Promise<void> => {
         try {
-            const response = await axios.get<IFood[]>("/api/food", { timeout: 10000 })
-            setFoods(response.data);
+            const response = await axios.get<ColumnarTable | IFood[]>("/api/food", {
+                timeout: 10000,
+                headers: { Accept: COLUMNAR_MIME_TYPE },
+            })
+            setFoods(decodeColumnar<IFood>(response.data));
         } catch(error) {
             handleError(error)
         }
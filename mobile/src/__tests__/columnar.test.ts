@@ -0,0 +1,73 @@
+import { decodeColumnar, ColumnarTable } from '@/utils/columnar'
+
+// What the backend sends for two foods, one with two alternatives
+const foodsTable: ColumnarTable = {
+  columns: ['id', 'name', 'nutrition.id', 'nutrition.calories'],
+  values: [
+    [1, 2],
+    ['Milk', 'Apple'],
+    [7, null],
+    [120, null],
+  ],
+  present: { nutrition: [true, false] },
+  children: {
+    nutrition_alternatives: {
+      key: 'food_id',
+      columns: ['id', 'food_id', 'serving_unit', 'nutrition.id', 'nutrition.calories'],
+      values: [
+        [3, 4],
+        [1, 1],
+        ['cup', 'g'],
+        [7, null],
+        [120, null],
+      ],
+      present: { nutrition: [true, false] },
+    },
+  },
+}
+
+describe('decodeColumnar', () => {
+  it('(a) rebuilds records with nested nutrition and child lists', () => {
+    expect(decodeColumnar(foodsTable)).toEqual([
+      {
+        id: 1,
+        name: 'Milk',
+        nutrition: { id: 7, calories: 120 },
+        nutrition_alternatives: [
+          { id: 3, food_id: 1, serving_unit: 'cup', nutrition: { id: 7, calories: 120 } },
+          { id: 4, food_id: 1, serving_unit: 'g', nutrition: null },
+        ],
+      },
+      { id: 2, name: 'Apple', nutrition: null, nutrition_alternatives: [] },
+    ])
+  })
+
+  it('(b) tells a null object from one whose fields are all null', () => {
+    const table: ColumnarTable = {
+      columns: ['id', 'nutrition.calories'],
+      values: [
+        [1, 2],
+        [null, null],
+      ],
+      present: { nutrition: [true, false] },
+    }
+    expect(decodeColumnar(table)).toEqual([
+      { id: 1, nutrition: { calories: null } },
+      { id: 2, nutrition: null },
+    ])
+  })
+
+  it('(c) falls back to all-null fields without present', () => {
+    const table = { ...foodsTable, present: undefined }
+    expect(decodeColumnar<{ nutrition: unknown }>(table)[1].nutrition).toBeNull()
+  })
+
+  it('(d) handles an empty table', () => {
+    expect(decodeColumnar({ columns: [], values: [] })).toEqual([])
+  })
+
+  it('(e) passes a plain JSON list through unchanged', () => {
+    const foods = [{ id: 1, name: 'Milk' }]
+    expect(decodeColumnar(foods)).toBe(foods)
+  })
+})
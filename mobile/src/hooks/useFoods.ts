@@ -1,6 +1,7 @@
 import { useQuery } from '@tanstack/react-query'
 import api from '@/services/api'
 import { IFood, FoodGroup } from '@/types/food'
+import { ColumnarTable, COLUMNAR_MIME_TYPE, decodeColumnar } from '@/utils/columnar'
 
 /**
  * Pure function to filter foods by search term and group
@@ -33,7 +34,7 @@ export function filterFoods(
 
 /**
  * React Query hook for fetching and caching foods
- * Fetches from GET /api/food
+ * Fetches from GET /api/food, in the compact columnar format
  * Caches for 5 minutes (staleTime)
  * Logs fetch lifecycle for observability
  */
@@ -44,8 +45,10 @@ export function useFoods(): ReturnType<typeof useQuery<IFood[], Error>> {
       console.log('[FOODS] Fetching food list')
 
       try {
-        const response = await api.get<IFood[]>('/api/food')
-        const foods = response.data
+        const response = await api.get<ColumnarTable | IFood[]>('/api/food', {
+          headers: { Accept: COLUMNAR_MIME_TYPE },
+        })
+        const foods = decodeColumnar<IFood>(response.data)
         console.log(`[FOODS] Loaded ${foods.length} foods`)
         return foods
       } catch (error: unknown) {
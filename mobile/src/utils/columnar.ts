@@ -0,0 +1,101 @@
+/**
+ * Decoder for the backend's columnar list format.
+ *
+ * Sending `Accept: application/vnd.trackeats.columnar+json` to /api/food,
+ * /api/recipe or /api/dailylogitem gets the list back as a table: each key
+ * name once, then one array of values per column. That's a fraction of the
+ * size of the usual JSON and much quicker to parse on a phone.
+ * decodeColumnar() turns it back into the usual records.
+ */
+
+export const COLUMNAR_MIME_TYPE = 'application/vnd.trackeats.columnar+json'
+
+export interface ColumnarTable {
+  /** Column names; "nutrition.calories" is field calories of nested object nutrition */
+  columns: string[]
+  /** One array per column, in the same order as columns */
+  values: unknown[][]
+  /** For each nested object (e.g. nutrition), whether each record has one or it's null */
+  present?: Record<string, boolean[]>
+  /** Nested lists of records (e.g. a food's nutrition_alternatives) */
+  children?: Record<string, ColumnarChildTable>
+}
+
+export interface ColumnarChildTable extends ColumnarTable {
+  /** The column holding the id of each row's parent record */
+  key: string
+}
+
+type DecodedRecord = Record<string, unknown>
+
+function decodeTable(table: ColumnarTable): DecodedRecord[] {
+  const count = table.values.length > 0 ? table.values[0].length : 0
+  const records: DecodedRecord[] = Array.from({ length: count }, () => ({}))
+  const nestedKeys = new Set<string>()
+
+  table.columns.forEach((column, index) => {
+    const values = table.values[index]
+    const dot = column.indexOf('.')
+    if (dot < 0) {
+      for (let i = 0; i < count; i++) {
+        records[i][column] = values[i]
+      }
+      return
+    }
+    const key = column.slice(0, dot)
+    const field = column.slice(dot + 1)
+    nestedKeys.add(key)
+    for (let i = 0; i < count; i++) {
+      const nested = (records[i][key] ??= {}) as DecodedRecord
+      nested[field] = values[i]
+    }
+  })
+
+  if (table.present) {
+    for (const [key, present] of Object.entries(table.present)) {
+      records.forEach((record, i) => {
+        record[key] = present[i] ? (record[key] ?? {}) : null
+      })
+    }
+  } else {
+    // An older backend doesn't send present: a nested object whose fields
+    // are all null was null to begin with
+    for (const record of records) {
+      for (const key of nestedKeys) {
+        const nested = record[key] as DecodedRecord
+        if (Object.values(nested).every((value) => value === null)) {
+          record[key] = null
+        }
+      }
+    }
+  }
+
+  for (const [name, child] of Object.entries(table.children ?? {})) {
+    const byParent = new Map<unknown, DecodedRecord[]>()
+    for (const row of decodeTable(child)) {
+      const parentId = row[child.key]
+      const rows = byParent.get(parentId)
+      if (rows) {
+        rows.push(row)
+      } else {
+        byParent.set(parentId, [row])
+      }
+    }
+    for (const record of records) {
+      record[name] = byParent.get(record.id) ?? []
+    }
+  }
+
+  return records
+}
+
+/**
+ * Turn a columnar response back into a list of records. A plain JSON list
+ * (e.g. from a backend that doesn't know the format) is returned as is.
+ */
+export function decodeColumnar<T>(data: ColumnarTable | T[]): T[] {
+  if (Array.isArray(data)) {
+    return data
+  }
+  return decodeTable(data) as T[]
+}